@@ -0,0 +1,121 @@
+#
+# Author: Rohtash Lakra
+#
+# Compares the benchmarks' results against their baseline and flags the regressions beyond a threshold (exits with 1).
+# It reads the micro-benchmarks of 'pytest-benchmark' (their median) and the load scenarios of 'benchmarks.scenario'
+# (their throughput and latencies), the baselines are kept in 'benchmarks/baselines/' (only their measures).
+#
+# Usage:
+#   python -m benchmarks.compare benchmarks/baselines/micro.json micro.json --threshold 10
+#   python -m benchmarks.compare benchmarks/baselines/scenario.json scenario.json --threshold 20
+#   python -m benchmarks.compare benchmarks/baselines/micro.json micro.json --update  # accepts the current results
+#
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+
+class Measure(NamedTuple):
+    """A benchmark's value, i.e. the median micro-seconds of a call or the requests per second of an endpoint"""
+    name: str
+    value: float
+    unit: str
+    higherIsBetter: bool = False
+
+
+class Comparison(NamedTuple):
+    """A measure against its baseline, the change is in percents (positive is worse)"""
+    name: str
+    baseline: float
+    current: float
+    unit: str
+    changePercent: float
+    regressed: bool
+
+
+def readMeasures(path: str) -> Dict[str, Measure]:
+    """Returns the measures of a results' file (of 'pytest-benchmark' or 'benchmarks.scenario') by their names"""
+    with open(path) as file:
+        results = json.load(file)
+
+    if "benchmarks" in results:
+        # pytest-benchmark's seconds, the median is the least sensitive to the outliers of a shared box
+        measures = [Measure(benchmark["name"], benchmark["stats"]["median"] * 1_000_000, "us")
+                    for benchmark in results["benchmarks"]]
+    else:
+        measures = [Measure(result["name"], result["value"], result["unit"], result.get("higher_is_better", False))
+                    for result in results["results"]]
+
+    return {measure.name: measure for measure in measures}
+
+
+def writeMeasures(path: str, measures: Dict[str, Measure]) -> None:
+    """Writes the measures as a baseline, with the machine they were measured on"""
+    results = {
+        "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "results": [{"name": measure.name, "value": round(measure.value, 3), "unit": measure.unit,
+                     "higher_is_better": measure.higherIsBetter} for measure in measures.values()],
+    }
+    with open(path, "w") as file:
+        json.dump(results, file, indent=2)
+
+
+def compare(baselines: Dict[str, Measure], currents: Dict[str, Measure], thresholdPercent: float) -> List[Comparison]:
+    """Returns the comparisons of the measures of both results, a measure is regressed when it's worse than its
+    baseline by more than the threshold"""
+    comparisons = []
+    for name, baseline in baselines.items():
+        current = currents.get(name)
+        if current is None or not baseline.value:
+            continue
+
+        changePercent = (current.value - baseline.value) / baseline.value * 100
+        if baseline.higherIsBetter:
+            changePercent = -changePercent
+
+        comparisons.append(Comparison(name=name, baseline=baseline.value, current=current.value, unit=baseline.unit,
+                                      changePercent=round(changePercent, 1),
+                                      regressed=changePercent > thresholdPercent))
+
+    return comparisons
+
+
+def main(args: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Flags the benchmarks regressed against their baseline")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=10.0, help="the tolerated change in percents")
+    parser.add_argument("--update", action="store_true", help="replaces the baseline with the current results")
+    args = parser.parse_args(args)
+
+    currents = readMeasures(args.current)
+    if args.update or not os.path.exists(args.baseline):
+        writeMeasures(args.baseline, currents)
+        print(f"Recorded [{len(currents)}] benchmarks as the baseline '{args.baseline}'.")
+        return 0
+
+    baselines = readMeasures(args.baseline)
+    comparisons = compare(baselines, currents, args.threshold)
+    print(f"{'benchmark':<40}{'baseline':>12}{'current':>12}{'unit':>6}{'change':>10}")
+    for comparison in comparisons:
+        flag = "  REGRESSED" if comparison.regressed else ""
+        print(f"{comparison.name:<40}{comparison.baseline:>12.2f}{comparison.current:>12.2f}{comparison.unit:>6}"
+              f"{comparison.changePercent:>+9.1f}%{flag}")
+
+    missing = sorted(set(baselines) - set(currents))
+    if missing:
+        print(f"Not measured: {missing}")
+
+    regressions = [comparison for comparison in comparisons if comparison.regressed]
+    print(f"{len(regressions)} of {len(comparisons)} benchmarks regressed beyond {args.threshold}%.")
+    return 1 if regressions else 0
+
+
+# Starting point
+if __name__ == '__main__':
+    sys.exit(main())
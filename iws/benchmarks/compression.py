@@ -0,0 +1,68 @@
+#
+# Author: Rohtash Lakra
+#
+# Measures the bytes on the wire and the CPU per response of each encoding and level, of the JSON bodies of the list
+# routes (a page of users with their 'created_at'/'updated_at'), to choose the 'COMPRESSION_*' levels.
+#
+# Usage:
+#   python -m benchmarks.compression [rows] [requests]
+#
+import sys
+import time
+from datetime import datetime, timedelta
+from random import Random
+
+from flask import Flask, json
+
+from framework.compression import Compressor, ContentEncoding
+from framework.http import HTTPStatus
+from framework.orm.pydantic.model import ResponseModel
+from rest.user.model import User
+
+
+def newBody(rows: int) -> bytes:
+    response = ResponseModel(status=HTTPStatus.OK.statusCode)
+    random = Random(7)
+    names = ["Roh", "Lak", "Ava", "Noah", "Mia", "Liam", "Zoe", "Ethan", "Ivy", "Owen"]
+    startedAt = datetime(2025, 1, 1)
+    response.data = []
+    for index in range(rows):
+        createdAt = startedAt + timedelta(seconds=random.randrange(30_000_000), microseconds=random.randrange(10**6))
+        response.data.append(User(id=index + 1, email=f"{random.choice(names).lower()}{index}@lakra.com",
+                                  first_name=random.choice(names), last_name=random.choice(names),
+                                  birth_date=f"19{random.randrange(50, 99)}-0{random.randrange(1, 9)}-1{index % 10}",
+                                  user_name=f"{random.choice(names).lower()}_{random.randrange(10**6)}",
+                                  created_at=createdAt,
+                                  updated_at=createdAt + timedelta(seconds=random.randrange(10**6))))
+    # serialised as 'make_response()' does
+    with Flask(__name__).app_context():
+        return json.dumps(response.to_json()).encode()
+
+
+def cpuMicros(count: int, function) -> float:
+    startedAt = time.thread_time()
+    for _ in range(count):
+        function()
+
+    return (time.thread_time() - startedAt) / count * 1_000_000
+
+
+def main(rows: int = 100, count: int = 200):
+    body = newBody(rows)
+    print(f"{rows} rows, identity={len(body)} bytes")
+    print(f"{'encoding':<10}{'level':>6}{'bytes':>10}{'ratio':>8}{'cpu µs':>10}")
+    compressor = Compressor()
+    levels = {ContentEncoding.GZIP: (1, 5, 6, 9), ContentEncoding.BR: (1, 4, 5, 11)}
+    for encoding in compressor.compressors:
+        for level in levels[encoding]:
+            compressor.gzipLevel = compressor.brotliQuality = level
+            compressed = compressor.compress(body, encoding)
+            micros = cpuMicros(max(1, count // 10) if level == 11 else count,
+                               lambda: compressor.compress(body, encoding))
+            print(f"{encoding.value:<10}{level:>6}{len(compressed):>10}{len(body) / len(compressed):>8.1f}"
+                  f"{micros:>10.1f}")
+
+
+# Starting point
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100, int(sys.argv[2]) if len(sys.argv) > 2 else 200)
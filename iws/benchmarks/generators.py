@@ -0,0 +1,54 @@
+#
+# Author: Rohtash Lakra
+#
+# Compares the per-character 'secrets.choice()' token/password generation against the batched generators.
+#
+# Usage:
+#   python -m benchmarks.generators [count]
+#
+import secrets
+import sys
+import time
+
+from framework.security.crypto import ALPHA_NUMERIC, PasswordGenerator, TokenGenerator
+
+
+def choiceToken(length: int) -> str:
+    return ''.join(secrets.choice(ALPHA_NUMERIC) for _ in range(length))
+
+
+def choicePassword(length: int = 10, atLeastDigits: int = 1) -> str:
+    while True:
+        password = ''.join(secrets.choice(ALPHA_NUMERIC) for _ in range(length))
+        if (any(c.islower() for c in password)
+                and any(c.isupper() for c in password)
+                and sum(c.isdigit() for c in password) >= atLeastDigits):
+            return password
+
+
+def perSecond(count: int, function) -> float:
+    startedAt = time.perf_counter()
+    function()
+    return count / (time.perf_counter() - startedAt)
+
+
+def main(count: int = 1000000):
+    # the per-character baseline is measured on a smaller count
+    baseline = max(1, count // 20)
+    tokenGenerator = TokenGenerator(length=16)
+    passwordGenerator = PasswordGenerator(length=12, atLeastDigits=3)
+    shapes = {
+        "token": (perSecond(baseline, lambda: [choiceToken(16) for _ in range(baseline)]),
+                  perSecond(count, lambda: tokenGenerator.generate_many(count))),
+        "password": (perSecond(baseline, lambda: [choicePassword(12, 3) for _ in range(baseline)]),
+                     perSecond(count, lambda: passwordGenerator.generate_many(count))),
+    }
+
+    print(f"{'shape':<10}{'choice()/s':>14}{'batched/s':>14}{'speedup':>10}")
+    for name, (before, after) in shapes.items():
+        print(f"{name:<10}{before:>14,.0f}{after:>14,.0f}{after / before:>9.1f}x")
+
+
+# Starting point
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -0,0 +1,98 @@
+#
+# Author: Rohtash Lakra
+#
+# A dependency-free HTTP load generator to compare the deployments (i.e. the gunicorn worker modes).
+#
+# Usage:
+#   ./runApp.sh prod    # gunicorn -c gunicorn.conf.py
+#   python -m benchmarks.loadtest --url http://127.0.0.1:8080/rest/v1/roles/ --concurrency 64 --requests 5000
+#
+import argparse
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+
+def percentile(values: List[float], percent: float) -> float:
+    """Returns the percentile of the sorted values"""
+    if not values:
+        return 0.0
+
+    index = min(len(values) - 1, max(0, int(round(percent / 100 * len(values))) - 1))
+    return values[index]
+
+
+class LoadTest(object):
+    """Sends the requests concurrently and collects the latencies and the status codes"""
+
+    def __init__(self, url: str, concurrency: int, requests: int, headers: Optional[Dict[str, str]] = None,
+                 timeout: float = 10.0):
+        self.url = url
+        self.concurrency = concurrency
+        self.requests = requests
+        self.headers = headers or {}
+        self.timeout = timeout
+        self.latencies: List[float] = []
+        self.statuses: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def _send(self, _):
+        request = urllib.request.Request(self.url, headers=self.headers)
+        startTime = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as ex:
+            status = ex.code
+        except Exception:
+            status = 0
+
+        elapsedMillis = (time.perf_counter() - startTime) * 1000
+        with self._lock:
+            self.latencies.append(elapsedMillis)
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def run(self) -> Dict[str, object]:
+        """Runs the load test and returns the summary"""
+        startTime = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            list(executor.map(self._send, range(self.requests)))
+
+        elapsedSeconds = time.perf_counter() - startTime
+        latencies = sorted(self.latencies)
+        return {
+            "url": self.url,
+            "concurrency": self.concurrency,
+            "requests": self.requests,
+            "seconds": round(elapsedSeconds, 3),
+            "rps": round(self.requests / elapsedSeconds, 1) if elapsedSeconds else 0.0,
+            "mean_ms": round(statistics.fmean(latencies), 2) if latencies else 0.0,
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+            "statuses": self.statuses,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP load generator")
+    parser.add_argument("--url", default="http://127.0.0.1:8080/rest/v1/roles/")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--header", action="append", default=[], help="i.e. 'Authorization: Bearer <token>'")
+    args = parser.parse_args()
+
+    headers = dict(header.split(":", 1) for header in args.header)
+    headers = {key.strip(): value.strip() for key, value in headers.items()}
+    print(json.dumps(LoadTest(args.url, args.concurrency, args.requests, headers).run(), indent=2))
+
+
+# Starting point
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+#
+# Author: Rohtash Lakra
+#
+# The micro-benchmarks of the hot helpers of a request: the mappers, the response's serialisation, the hashes and the
+# ciphers, the log filter and the enum lookups. They need 'pytest-benchmark' (see 'benchmarks/requirements.txt') and
+# are not collected by the unit-tests, they are run explicitly.
+#
+# Usage:
+#   python -m pytest benchmarks/micro.py --benchmark-json=micro.json
+#   python -m benchmarks.compare benchmarks/baselines/micro.json micro.json
+#
+import logging
+import secrets
+
+import pytest
+
+from framework.enums import EnvType
+from framework.http import HTTPStatus
+from framework.logger import SensitiveDataFilter
+from framework.orm.pydantic.model import ResponseModel
+from framework.security.crypto import CryptoUtils
+from framework.security.hash import HashUtils
+from framework.tuning import WorkerMode
+from rest.role.mapper import RoleMapper
+from rest.role.model import Role
+from rest.user.mapper import UserMapper
+from rest.user.model import User
+from rest.user.schema import UserSchema
+
+pytest.importorskip("pytest_benchmark")
+
+ENC_KEY = secrets.token_hex(16)
+ENC_NONCE = secrets.token_hex(6)
+
+
+def newUser(index: int = 0) -> User:
+    return User(id=index + 1, email=f"user{index}@lakra.com", first_name="Roh", last_name="Lak",
+                birth_date="2024-12-27", user_name=f"user{index}", password="password")
+
+
+def test_user_from_model(benchmark):
+    user = newUser()
+    assert benchmark(UserMapper.fromModel, user).email == user.email
+
+
+def test_user_from_schema(benchmark):
+    userSchema = UserSchema(email="user@lakra.com", first_name="Roh", last_name="Lak", birth_date="2024-12-27",
+                            user_name="user")
+    assert benchmark(UserMapper.fromSchema, userSchema).email == userSchema.email
+
+
+def test_role_from_model(benchmark):
+    role = Role(name="Admin", active=True)
+    assert benchmark(RoleMapper.fromModel, role).name == role.name
+
+
+def test_response_to_json(benchmark):
+    """A page of 20 users"""
+    response = ResponseModel(status=HTTPStatus.OK.statusCode)
+    response.data = [newUser(index) for index in range(20)]
+    assert len(benchmark(response.to_json)["data"]) == 20
+
+
+def test_hash_code(benchmark):
+    assert len(benchmark(HashUtils.hashCode, "password")) == 64
+
+
+def test_check_hash_code(benchmark):
+    salt, hashCode = HashUtils.hashCodeWithSalt(HashUtils.hashCode("password"))
+    assert benchmark(HashUtils.checkHashCode, "password", salt, hashCode)
+
+
+def test_encrypt_with_aesgcm(benchmark):
+    encrypted = benchmark(CryptoUtils.encrypt_with_aesgcm, ENC_KEY, ENC_NONCE, '{"user_id": 1}')
+    assert CryptoUtils.decrypt_with_aesgcm(ENC_KEY, ENC_NONCE, encrypted) == {"user_id": 1}
+
+
+def test_decrypt_with_aesgcm(benchmark):
+    encrypted = CryptoUtils.encrypt_with_aesgcm(ENC_KEY, ENC_NONCE, '{"user_id": 1}')
+    assert benchmark(CryptoUtils.decrypt_with_aesgcm, ENC_KEY, ENC_NONCE, encrypted) == {"user_id": 1}
+
+
+def test_sensitive_data_filter(benchmark):
+    sensitiveDataFilter = SensitiveDataFilter()
+
+    def filterRecord():
+        record = logging.LogRecord("iws", logging.INFO, __file__, 1, "login %s, card=1234-5678-9012-3456",
+                                   ({"email": "user@lakra.com", "password": "secret", "user_name": "user"},), None)
+        sensitiveDataFilter.filter(record)
+        return record
+
+    record = benchmark(filterRecord)
+    assert record.args["password"] == "******"
+
+
+def test_enum_of_name(benchmark):
+    assert benchmark(WorkerMode.of_name, "eventlet") == WorkerMode.EVENTLET
+
+
+def test_http_status_from_status(benchmark):
+    assert benchmark(HTTPStatus.fromStatus, 404) == HTTPStatus.NOT_FOUND
+
+
+def test_env_type_is_production(benchmark):
+    assert not benchmark(EnvType.is_production, "development")
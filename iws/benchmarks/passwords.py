@@ -0,0 +1,30 @@
+#
+# Author: Rohtash Lakra
+#
+# Finds the scrypt cost 'n' of the password hashes for a target login latency on this host (set it as
+# 'PASSWORD_SCRYPT_N') and shows what the verified password cache saves on a burst of logins.
+#
+# Usage:
+#   python -m benchmarks.passwords [targetMillis]
+#
+import sys
+import timeit
+
+from framework.security.password import PasswordHasher, VerifiedPasswordCache
+
+
+def main(targetMillis: float = 100):
+    result = PasswordHasher.benchmark(targetMillis / 1000)
+    print(f"PASSWORD_SCRYPT_N={result['n']} (r={result['r']}, p={result['p']}), "
+          f"hash={result['seconds'] * 1000:.1f} ms, memory={128 * result['r'] * result['n'] // 1024 // 1024} MB")
+
+    passwordHasher = PasswordHasher(n=result["n"], r=result["r"], p=result["p"], cache=VerifiedPasswordCache())
+    encoded = passwordHasher.hash("password")
+    verifyMillis = timeit.timeit(lambda: passwordHasher.verify("password", encoded), number=1) * 1000
+    cachedMicros = timeit.timeit(lambda: passwordHasher.verify("password", encoded), number=1000) * 1000
+    print(f"verify={verifyMillis:.1f} ms, cached verify={cachedMicros:.1f} µs")
+
+
+# Starting point
+if __name__ == '__main__':
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 100)
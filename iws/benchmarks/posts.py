@@ -0,0 +1,122 @@
+#
+# Author: Rohtash Lakra
+#
+# Measures the latency of the post feed and search on a seeded database: the first page of the feed, a deep page by its
+# keyset cursor and by the 'OFFSET' it replaces, and the searches of a rare, a common and a prefix term in both orders
+# (the 'rank' order of the newest 'POSTS_SEARCH_CANDIDATES' matches and of all of them).
+# The comments: the newest 3 of every post of the first and of the oldest (most commented) page, by the correlated
+# 'LIMIT' of 'CommentRepository.latest()' and by the 'row_number()' window it replaces, and a deep page of the most
+# commented post.
+# The database is seeded once per size, i.e. '/tmp/iws-posts-1000000.db' ('--reset' seeds it again).
+#
+# Usage:
+#   python -m benchmarks.posts [posts] [--reset]
+#
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine, func, select, text
+
+from framework.db.search import FullTextIndex
+from framework.db.seed import DatasetGenerator, SeedOptions, parseCount
+from framework.orm.sqlalchemy.schema import BaseSchema
+from rest.post.repository import CommentRepository, PostRepository
+from rest.post.schema import CommentSchema
+from rest.post.service import PostService
+
+SEARCHES = ["rohtash lakra", "python", "cache latency", "perf*"]
+
+
+def percentiles(count: int, function) -> str:
+    timings = []
+    for _ in range(count):
+        startedAt = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - startedAt) * 1000)
+
+    timings.sort()
+    return f"p50={statistics.median(timings):8.2f}ms  p95={timings[int(len(timings) * 0.95) - 1]:8.2f}ms"
+
+
+def seed(path: str, posts: int, reset: bool):
+    engine = create_engine(f"sqlite:///{path}")
+    BaseSchema.metadata.create_all(engine)
+    generator = DatasetGenerator(engine, SeedOptions(users=posts, postsPerUser=1.0, addressesPerUser=0,
+                                                     commentsPerPost=3.0, attachmentsPerPost=0, companies=0))
+    if reset:
+        generator.clear()
+    if generator.isEmpty():
+        startedAt = time.perf_counter()
+        generator.generate()
+        print(f"Seeded {posts:,} posts in {time.perf_counter() - startedAt:.1f}s")
+
+    return engine
+
+
+def windowed(repository: CommentRepository, postIds, perPost: int = 3):
+    """The newest comments of the posts numbered by a 'row_number()' window, all the posts' comments are read"""
+    position = func.row_number().over(partition_by=CommentSchema.post_id, order_by=repository.newestFirst)
+    ranked = (select(*repository.commentColumns, position.label("position"))
+              .where(CommentSchema.post_id.in_(postIds))
+              .subquery())
+    return repository._execute(select(ranked).where(ranked.c.position <= perPost))
+
+
+def main(posts: int = 100_000, reset: bool = False, count: int = 50):
+    # the queries, not the logs of the services
+    logging.disable(logging.CRITICAL)
+    engine = seed(os.path.join(tempfile.gettempdir(), f"iws-posts-{posts}.db"), posts, reset)
+    postService = PostService(PostRepository(engine))
+    # the ranked searches of all the matches, not only of the newest 'POSTS_SEARCH_CANDIDATES'
+    allMatchesService = PostService(PostRepository(engine), candidates=0)
+
+    # the cursor of the page in the middle of the feed
+    with engine.connect() as connection:
+        middle = connection.execute(text("SELECT posted_on, id FROM posts ORDER BY posted_on DESC, id DESC "
+                                         "LIMIT 1 OFFSET :offset"), {"offset": posts // 2}).one()
+
+        def offsetPage():
+            connection.execute(text("SELECT * FROM posts ORDER BY posted_on DESC, id DESC LIMIT 21 OFFSET :offset"),
+                               {"offset": posts // 2}).all()
+
+        print(f"{'feed, first page':<36}{percentiles(count, lambda: postService.feed())}")
+        print(f"{'feed, middle page by cursor':<36}"
+              f"{percentiles(count, lambda: postService.repository.feed(tuple(middle), 21))}")
+        print(f"{'feed, middle page by offset':<36}{percentiles(max(count // 10, 3), offsetPage)}")
+
+        commentRepository = CommentRepository(engine)
+        oldestIds = list(range(1, 21))
+        newestIds = [post.id for post in postService.feed()[0]]
+        for label, ids in (("first page", newestIds), ("oldest page", oldestIds)):
+            comments = sum(connection.execute(text(f"SELECT comment_count FROM posts WHERE id = {id}")).scalar()
+                           for id in ids)
+            print(f"comments of the feed's {label} ({comments:,} comments)")
+            print(f"{'  newest 3 per post':<36}{percentiles(count, lambda: commentRepository.latest(ids, 3))}")
+            print(f"{'  newest 3 per post by row_number()':<36}"
+                  f"{percentiles(count, lambda: windowed(commentRepository, ids))}")
+
+        hottest, comments = connection.execute(text("SELECT id, comment_count FROM posts "
+                                                    "ORDER BY comment_count DESC LIMIT 1")).one()
+        middle = connection.execute(text("SELECT created_at, id FROM comments WHERE post_id = :id ORDER BY "
+                                         "created_at DESC, id DESC LIMIT 1 OFFSET :offset"),
+                                    {"id": hottest, "offset": comments // 2}).one()
+        print(f"{f'comments, middle page ({comments:,})':<36}"
+              f"{percentiles(count, lambda: commentRepository.page(hottest, tuple(middle), 21))}")
+
+        for query in SEARCHES:
+            matches = connection.execute(text("SELECT COUNT(*) FROM posts_fts WHERE posts_fts MATCH :query"),
+                                         {"query": FullTextIndex.matchExpression(query)}).scalar()
+            print(f"search '{query}' ({matches:,} matches)")
+            for label, service, order in (("rank", postService, "rank"), ("rank, all the matches", allMatchesService,
+                                                                         "rank"), ("newest", postService, "newest")):
+                print(f"{'  ' + label:<36}{percentiles(count, lambda: service.search(query, order))}")
+
+
+# Starting point
+if __name__ == '__main__':
+    main(parseCount(sys.argv[1]) if len(sys.argv) > 1 and not sys.argv[1].startswith("--") else 100_000,
+         reset="--reset" in sys.argv)
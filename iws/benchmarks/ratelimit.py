@@ -0,0 +1,47 @@
+#
+# Author: Rohtash Lakra
+#
+# Measures the per-request cost of the rate limiter: the counted (allowed) requests of each store and the rejected
+# requests of a throttled client (answered by the limiter's in-process cache, never the store).
+#
+# Usage:
+#   python -m benchmarks.ratelimit [requests]
+#
+import os
+import sys
+import tempfile
+import time
+
+from framework.ratelimit import MemoryRateLimitStore, RateLimit, RateLimitAlgorithm, RateLimiter, SQLiteRateLimitStore
+
+
+def micros(count: int, function) -> float:
+    startedAt = time.perf_counter()
+    for index in range(count):
+        function(index)
+
+    return (time.perf_counter() - startedAt) / count * 1_000_000
+
+
+def main(count: int = 20000):
+    with tempfile.TemporaryDirectory() as tempDir:
+        stores = {
+            "memory": MemoryRateLimitStore(),
+            "sqlite": SQLiteRateLimitStore(os.path.join(tempDir, "rate-limits.db")),
+        }
+        print(f"{'store':<8}{'algorithm':<16}{'allowed µs':>12}{'rejected µs':>13}")
+        for name, store in stores.items():
+            for algorithm in RateLimitAlgorithm:
+                limiter = RateLimiter(store=store, algorithm=algorithm)
+                # a key per request is always allowed, a single key of a tiny limit is throttled
+                allowed = micros(count, lambda index: limiter.hit(f"ip:{algorithm}:{index}", RateLimit(10, 60)))
+                limiter.hit("ip:throttled", RateLimit(1, 60))
+                rejected = micros(count, lambda index: limiter.hit("ip:throttled", RateLimit(1, 60)))
+                print(f"{name:<8}{algorithm.value:<16}{allowed:>12.2f}{rejected:>13.2f}")
+
+            store.close()
+
+
+# Starting point
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,148 @@
+#
+# Author: Rohtash Lakra
+#
+# A scripted load scenario of the REST API: starts 'gunicorn -c gunicorn.conf.py' on a temporary SQLite database,
+# seeds it through the API (the roles, the companies, the contacts and the users), logs a user in and drives each
+# end-point with the load generator. It runs offline on one box, the results are written in the baseline's format.
+#
+# Usage:
+#   python -m benchmarks.scenario --workers 2 --concurrency 8 --requests 500 --output scenario.json
+#   python -m benchmarks.compare benchmarks/baselines/scenario.json scenario.json --threshold 20
+#
+import argparse
+import json
+import os
+import platform
+import secrets
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from benchmarks.loadtest import LoadTest
+from benchmarks.workers import freePort, waitUntilReady
+
+
+class EndPoint(NamedTuple):
+    """An end-point of the scenario, 'auth' end-points are sent with the logged-in user's token"""
+    name: str
+    path: str
+    auth: bool = False
+
+
+END_POINTS = (
+    EndPoint("roles", "/rest/v1/roles/"),
+    EndPoint("companies", "/rest/v1/companies/"),
+    EndPoint("contacts", "/rest/v1/contacts/"),
+    EndPoint("users", "/rest/v1/users/", auth=True),
+)
+
+
+def sendJson(url: str, body: Any, headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    request = urllib.request.Request(url, data=json.dumps(body).encode(), method="POST",
+                                     headers={"Content-Type": "application/json", **(headers or {})})
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:
+            return json.loads(response.read())
+    except urllib.error.HTTPError as ex:
+        raise RuntimeError(f"POST {url} failed with [{ex.code}]: {ex.read()[:1000]}") from ex
+
+
+def seed(baseUrl: str, count: int) -> Dict[str, str]:
+    """Creates 'count' records of each end-point and returns the auth header of a logged-in user"""
+    suffix = secrets.token_hex(4)
+    sendJson(f"{baseUrl}/rest/v1/roles/batch",
+             [{"name": f"Role-{suffix}-{index}", "active": True} for index in range(count)])
+    sendJson(f"{baseUrl}/rest/v1/companies/batch",
+             [{"name": f"Company-{suffix}-{index}", "active": True, "branches": []} for index in range(count)])
+    sendJson(f"{baseUrl}/rest/v1/contacts/batch",
+             [{"first_name": "Roh", "last_name": f"Lak{index}", "country": "United States",
+               "subject": f"Hello-{suffix}-{index}"} for index in range(count)])
+    users = [{"email": f"user-{suffix}-{index}@lakra.com", "user_name": f"user-{suffix}-{index}",
+              "password": "Password@123", "first_name": "Roh", "last_name": "Lak", "birth_date": "2024-12-27"}
+             for index in range(count)]
+    sendJson(f"{baseUrl}/rest/v1/users/batch", users)
+    login = sendJson(f"{baseUrl}/rest/v1/users/login",
+                     {"email": users[0]["email"], "password": users[0]["password"], "token_type": "jwt"})
+    return {"Authorization": f"Bearer {login['data'][0]['token']}"}
+
+
+def toMeasures(endPoint: EndPoint, result: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Returns the measures of an end-point's load test"""
+    return [
+        {"name": f"{endPoint.name}.rps", "value": result["rps"], "unit": "rps", "higher_is_better": True},
+        {"name": f"{endPoint.name}.p50_ms", "value": result["p50_ms"], "unit": "ms"},
+        {"name": f"{endPoint.name}.p95_ms", "value": result["p95_ms"], "unit": "ms"},
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load scenario of the REST API on a seeded SQLite database")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=20, help="the records of each end-point")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--output", help="writes the results to the JSON file")
+    args = parser.parse_args()
+
+    measures: List[Dict[str, Any]] = []
+    statuses: Dict[str, Dict[int, int]] = {}
+    with tempfile.TemporaryDirectory() as tempDir:
+        port = freePort()
+        env = {**os.environ,
+               "HOST": "127.0.0.1",
+               "PORT": str(port),
+               "WORKERS": str(args.workers),
+               "DB_NAME": os.path.join(tempDir, "posts"),
+               "RATE_LIMIT_ENABLED": "false",
+               "RATE_LIMIT_PATH": os.path.join(tempDir, "rate-limits.db"),
+               "METRICS_DIR": os.path.join(tempDir, "metrics"),
+               "ENC_KEY": secrets.token_hex(16),
+               "ENC_NONCE": secrets.token_hex(6),
+               "CLIENT_ID_KEY": "posts-iws-benchmarks",
+               "CLIENT_ID_SECRET": secrets.token_hex(32),
+               "ACCESS_LOG": "",
+               "LOG_LEVEL": "warning"}
+        subprocess.run([sys.executable, "-m", "flask", "--app", "wsgi", "init-db"], env=env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        process = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"], env=env,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            baseUrl = f"http://127.0.0.1:{port}"
+            waitUntilReady(f"{baseUrl}/health-check/", process)
+            authHeaders = seed(baseUrl, args.seed)
+            for endPoint in END_POINTS:
+                headers = authHeaders if endPoint.auth else {}
+                LoadTest(f"{baseUrl}{endPoint.path}", args.concurrency, args.warmup, headers).run()
+                result = LoadTest(f"{baseUrl}{endPoint.path}", args.concurrency, args.requests, headers).run()
+                measures.extend(toMeasures(endPoint, result))
+                statuses[endPoint.name] = result["statuses"]
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+    print(f"{'benchmark':<24}{'value':>12}{'unit':>6}")
+    for measure in measures:
+        print(f"{measure['name']:<24}{measure['value']:>12}{measure['unit']:>6}")
+    print(f"statuses={statuses}")
+
+    if args.output:
+        results = {
+            "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "machine": {"python": platform.python_version(), "platform": platform.platform(),
+                        "cpus": os.cpu_count()},
+            "options": vars(args),
+            "statuses": statuses,
+            "results": measures,
+        }
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+# Starting point
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,32 @@
+#
+# Author: Rohtash Lakra
+#
+# Checks the startup budget of a worker: the import time of the app's factory module ('python -X importtime') and the
+# measured phases of 'create_app()'. Exits with 1 when the import is over the budget, so it can gate a build.
+#
+# Usage:
+#   python -m benchmarks.startup [budgetMillis] [module]
+#
+import sys
+
+from framework.startup import checkImportBudget
+
+
+def main(budgetMillis: float = 1500, module: str = "webapp"):
+    withinBudget, millis, slowest = checkImportBudget(module, budgetMillis)
+    print(f"import {module}: {millis:.1f} ms (budget {budgetMillis:.0f} ms)")
+    print(f"{'module':<48}{'self ms':>10}{'cumulative ms':>15}")
+    for importTime in slowest:
+        print(f"{importTime.module:<48}{importTime.selfMicros / 1000:>10.1f}{importTime.cumulativeMicros / 1000:>15.1f}")
+
+    from webapp import WebApp
+    webApp = WebApp()
+    webApp.create_app(test_mode=True)
+    print(f"create_app: {webApp.startup.summary()}")
+    if not withinBudget:
+        print(f"The import of '{module}' is over the budget!")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 1500, sys.argv[2] if len(sys.argv) > 2 else "webapp")
@@ -0,0 +1,56 @@
+#
+# Author: Rohtash Lakra
+#
+# Compares the per-query overhead of the legacy 'session.query()' against the cached 'select()' templates.
+#
+# Usage:
+#   python -m benchmarks.statements [iterations]
+#
+import sys
+import timeit
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from framework.db.statistics import CompiledCacheStats
+from framework.orm.sqlalchemy.schema import BaseSchema
+from framework.orm.sqlalchemy.statement import selectById, selectByColumn, selectAll
+from rest.role.schema import RoleSchema
+
+
+def main(iterations: int = 5000):
+    engine = create_engine("sqlite://")
+    BaseSchema.metadata.create_all(bind=engine)
+    cacheStats = CompiledCacheStats().attach(engine)
+    with Session(bind=engine) as session:
+        session.add_all([RoleSchema(name=f"Role-{index}", active=True) for index in range(100)])
+        session.commit()
+
+    with Session(bind=engine) as session:
+        shapes = {
+            "byId": (
+                lambda: session.query(RoleSchema).filter(RoleSchema.id == 42).one(),
+                lambda: session.execute(selectById(RoleSchema), {"id": 42}).unique().scalar_one(),
+            ),
+            "byName": (
+                lambda: session.query(RoleSchema).filter_by(name="Role-42").all(),
+                lambda: session.execute(selectByColumn(RoleSchema, "name"), {"name": "Role-42"}).unique().scalars().all(),
+            ),
+            "listAll": (
+                lambda: session.query(RoleSchema).all(),
+                lambda: session.execute(selectAll(RoleSchema)).unique().scalars().all(),
+            ),
+        }
+
+        print(f"{'shape':<10}{'query() µs':>14}{'select() µs':>14}{'speedup':>10}")
+        for name, (before, after) in shapes.items():
+            beforeMicros = timeit.timeit(before, number=iterations) / iterations * 1_000_000
+            afterMicros = timeit.timeit(after, number=iterations) / iterations * 1_000_000
+            print(f"{name:<10}{beforeMicros:>14.1f}{afterMicros:>14.1f}{beforeMicros / afterMicros:>9.2f}x")
+
+    print(f"compiled cache stats={cacheStats.stats()}")
+
+
+# Starting point
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
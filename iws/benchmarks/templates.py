@@ -0,0 +1,69 @@
+#
+# Author: Rohtash Lakra
+#
+# Measures the render time per page of the webapp: 'compile' parses and compiles the page's templates (a worker without
+# the bytecode cache), 'bytecode' loads them from the bytecode cache (a new worker after 'flask compile-templates') and
+# 'warm' renders the templates already loaded. Also compares the 'strftime' filter with its former 'strptime' parsing.
+#
+# Usage:
+#   python -m benchmarks.templates [requests]
+#
+import logging
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from framework.templates import formatDateTime
+
+PAGES = ["/", "/contact-us", "/api/v1/blogs/", "/api/v1/posts/", "/api/v1/accounts/login", "/api/v1/admin/",
+         "/api/v1/comments/checkout"]
+
+
+def millis(count: int, function) -> float:
+    startedAt = time.perf_counter()
+    for _ in range(count):
+        function()
+
+    return (time.perf_counter() - startedAt) / count * 1000
+
+
+def strptimeFilter(date_str: str, datetime_format: str = None) -> str:
+    """The former filter, parsing the timestamp on every call"""
+    return datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S.%f").replace(tzinfo=None).strftime(datetime_format)
+
+
+def main(count: int = 50):
+    # the renders, not the logs of the requests
+    logging.disable(logging.CRITICAL)
+    from common.config import Config
+    Config.TEMPLATES_CACHE_DIR = tempfile.mkdtemp(prefix="iws-templates-")
+    from webapp import WebApp
+    app = WebApp().create_app(test_mode=True)
+    client = app.test_client()
+    environment = app.jinja_env
+
+    def compile(page: str):
+        environment.cache.clear()
+        environment.bytecode_cache.clear()
+        client.get(page)
+
+    def bytecode(page: str):
+        environment.cache.clear()
+        client.get(page)
+
+    print(f"{'page':<28}{'compile ms':>12}{'bytecode ms':>13}{'warm ms':>10}")
+    for page in PAGES:
+        timings = [millis(count, lambda: compile(page)), millis(count, lambda: bytecode(page)),
+                   millis(count, lambda: client.get(page))]
+        print(f"{page:<28}" + "".join(f"{timing:>{width}.2f}" for timing, width in zip(timings, (12, 13, 10))))
+
+    timestamp, datetimeFormat = "2024-10-13T00:20:27.466337", "%b %d, %Y at %I:%M%p"
+    parsed = millis(count * 1000, lambda: strptimeFilter(timestamp, datetimeFormat)) * 1000
+    memoised = millis(count * 1000, lambda: formatDateTime(timestamp, datetimeFormat)) * 1000
+    print(f"strftime filter: strptime={parsed:.2f}µs, memoised={memoised:.2f}µs")
+
+
+# Starting point
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
@@ -0,0 +1,53 @@
+#
+# Author: Rohtash Lakra
+#
+# Compares the auth-token throughput of the legacy JSON tokens (a new AESGCM per call and a fixed nonce) against the
+# key-ring's binary tokens (cached ciphers, a random nonce per token).
+#
+# Usage:
+#   python -m benchmarks.tokens [iterations]
+#
+import json
+import sys
+import time
+import timeit
+
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from framework.security.crypto import KeyRing
+from framework.security.jwt import AuthModel
+
+KEY = "12345678123456781234567812345678"
+NONCE = "123456781234"
+
+
+def legacyEncode(authModel: AuthModel) -> bytes:
+    return AESGCM(KEY.encode()).encrypt(NONCE.encode(), authModel.to_json().encode(), None)
+
+
+def legacyDecode(token: bytes) -> AuthModel:
+    return AuthModel(**json.loads(AESGCM(KEY.encode()).decrypt(NONCE.encode(), token, None)))
+
+
+def main(iterations: int = 20000):
+    keyRing = KeyRing.fromText(f"1:{KEY}")
+    authModel = AuthModel(user_id=42, auth_token="password", iat=int(time.time()))
+    legacyToken = legacyEncode(authModel)
+    token = keyRing.encode(authModel.to_bytes())
+    shapes = {
+        "encode": (lambda: legacyEncode(authModel), lambda: keyRing.encode(authModel.to_bytes())),
+        "decode": (lambda: legacyDecode(legacyToken), lambda: AuthModel.from_bytes(keyRing.decode(token))),
+    }
+
+    print(f"{'shape':<10}{'legacy ops/s':>14}{'key-ring ops/s':>16}{'speedup':>10}")
+    for name, (before, after) in shapes.items():
+        beforeOps = iterations / timeit.timeit(before, number=iterations)
+        afterOps = iterations / timeit.timeit(after, number=iterations)
+        print(f"{name:<10}{beforeOps:>14,.0f}{afterOps:>16,.0f}{afterOps / beforeOps:>9.2f}x")
+
+    print(f"token length: legacy={len(legacyToken) * 4 // 3}, key-ring={len(token)}")
+
+
+# Starting point
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,115 @@
+#
+# Author: Rohtash Lakra
+#
+# Records the throughput and the latency of each gunicorn worker mode: starts 'gunicorn -c gunicorn.conf.py' per mode
+# (on a temporary database), waits for its health-check, warms it up and runs the load generator against it. The modes
+# whose packages are not installed (i.e. gevent, eventlet) or which the DB driver would block are skipped.
+#
+# Usage:
+#   python -m benchmarks.workers --modes gthread,gevent --workers 2 --concurrency 32 --requests 2000 \
+#       --output workers.json
+#
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from typing import Dict, List
+
+from benchmarks.loadtest import LoadTest
+from framework.tuning import DB_DRIVER, WorkerMode
+
+
+def freePort() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def waitUntilReady(url: str, process: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"The server exited with [{process.returncode}]!")
+
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            time.sleep(0.2)
+
+    raise TimeoutError(f"The server is not ready at [{url}]!")
+
+
+def runMode(mode: WorkerMode, args, env: Dict[str, str]) -> Dict[str, object]:
+    port = freePort()
+    modeEnv = {**env, "WORKER_MODE": mode.value, "PORT": str(port), "ACCESS_LOG": ""}
+    process = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"], env=modeEnv,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        baseUrl = f"http://127.0.0.1:{port}"
+        waitUntilReady(f"{baseUrl}/health-check/", process)
+        LoadTest(f"{baseUrl}{args.path}", args.concurrency, args.warmup).run()
+        result = LoadTest(f"{baseUrl}{args.path}", args.concurrency, args.requests).run()
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+    return {"mode": mode.value, "workers": args.workers, **result}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput and latency of the gunicorn worker modes")
+    parser.add_argument("--modes", default=",".join(mode.value for mode in WorkerMode))
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--path", default="/rest/v1/roles/")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--output", help="appends the results to the JSON file")
+    args = parser.parse_args()
+
+    results: List[Dict[str, object]] = []
+    with tempfile.TemporaryDirectory() as tempDir:
+        env = {**os.environ,
+               "HOST": "127.0.0.1",
+               "WORKERS": str(args.workers),
+               "DB_NAME": os.path.join(tempDir, "posts"),
+               "RATE_LIMIT_ENABLED": "false",
+               "RATE_LIMIT_PATH": os.path.join(tempDir, "rate-limits.db"),
+               "LOG_LEVEL": "warning"}
+        subprocess.run([sys.executable, "-m", "flask", "--app", "wsgi", "init-db"], env=env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        for name in args.modes.split(","):
+            mode = WorkerMode.of_name(name.strip())
+            if mode is None or not mode.isAvailable() or not mode.isSupported(DB_DRIVER):
+                print(f"Skipping the worker mode '{name}', it's not installed or blocked by '{DB_DRIVER}'.")
+                continue
+
+            results.append(runMode(mode, args, env))
+
+    print(f"{'mode':<10}{'workers':>8}{'rps':>10}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}  statuses")
+    for result in results:
+        print(f"{result['mode']:<10}{result['workers']:>8}{result['rps']:>10}{result['mean_ms']:>10}"
+              f"{result['p50_ms']:>10}{result['p95_ms']:>10}{result['p99_ms']:>10}  {result['statuses']}")
+
+    if args.output:
+        history = []
+        if os.path.exists(args.output):
+            with open(args.output) as file:
+                history = json.load(file)
+
+        recordedAt = time.strftime("%Y-%m-%dT%H:%M:%S")
+        history.extend({"recorded_at": recordedAt, **result} for result in results)
+        with open(args.output, "w") as file:
+            json.dump(history, file, indent=2)
+
+
+# Starting point
+if __name__ == '__main__':
+    main()
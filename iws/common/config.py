@@ -1,6 +1,7 @@
 import json
 import os
 import secrets
+from functools import lru_cache
 
 from dotenv import load_dotenv
 
@@ -10,13 +11,50 @@ from framework.enums import EnvType
 load_dotenv()
 
 app_config = None
+APP_CONFIG_FILE_PATH = 'tests/data/app-configs.json'
+
+
+@lru_cache(maxsize=4)
+def loadAppConfigs(path: str = APP_CONFIG_FILE_PATH) -> dict:
+    """Returns the app's JSON configs, the file is read once on the first call"""
+    with open(path) as config_file:
+        return json.load(config_file)
+
+
+class AppConfig(object):
+    """A value of the app's JSON configs (i.e. 'SECURITY_CONFIGS' > 'ENCRYPTION_CONFIGS' > 'ENC_KEY'), the file is
+    read on the first access of a value (i.e. by 'app.config.from_object()') and not on import"""
+
+    def __init__(self, *keys: str, path: str = APP_CONFIG_FILE_PATH):
+        self.keys = keys
+        self.path = path
+
+    def __str__(self):
+        """Returns the string representation of this object"""
+        return f"{self.__class__.__name__} <{'.'.join(self.keys)}>"
+
+    def __repr__(self):
+        """Returns the string representation of this object"""
+        return str(self)
+
+    def __get__(self, instance, owner):
+        value = loadAppConfigs(self.path)
+        for key in self.keys:
+            value = value.get(key) if isinstance(value, dict) else None
+
+        return value
 
 
 class Config:
     """Configuration file."""
 
-    __APP_CONFIG_FILE_PATH = 'tests/data/app-configs.json'
     __CORS_ENABLED = 'CORS_ENABLED'
+    __QUERY_ADVISOR_ENABLED = 'QUERY_ADVISOR_ENABLED'
+    __SLOW_QUERY_THRESHOLD_MS = 'SLOW_QUERY_THRESHOLD_MS'
+    __QUERY_DIAGNOSTICS_ENABLED = 'QUERY_DIAGNOSTICS_ENABLED'
+    __N_PLUS_ONE_THRESHOLD = 'N_PLUS_ONE_THRESHOLD'
+    __DB_REPLICAS = 'DB_REPLICAS'
+    __DB_REPLICA_POLICY = 'DB_REPLICA_POLICY'
 
     __HEADERS = 'headers'
     __DEFAULT = 'default'
@@ -35,8 +73,52 @@ class Config:
     __ENCRYPTION_CONFIGS = 'ENCRYPTION_CONFIGS'
     __ENC_KEY = 'ENC_KEY'
     __ENC_NONCE = 'ENC_NONCE'
+    __ENC_KEYS = 'ENC_KEYS'
+    __ENC_KEY_ID = 'ENC_KEY_ID'
+    __AUTH_TOKEN_MAX_AGE_SECONDS = 'AUTH_TOKEN_MAX_AGE_SECONDS'
     __CLIENT_ID_KEY = 'CLIENT_ID_KEY'
     __CLIENT_ID_SECRET = 'CLIENT_ID_SECRET'
+    __JWT_EXPIRES_IN_SECONDS = 'JWT_EXPIRES_IN_SECONDS'
+    __TOKEN_STORE = 'TOKEN_STORE'
+    __TOKEN_STORE_PATH = 'TOKEN_STORE_PATH'
+    __TOKEN_STORE_MAX_SIZE = 'TOKEN_STORE_MAX_SIZE'
+    __TOKEN_STORE_SWEEP_SECONDS = 'TOKEN_STORE_SWEEP_SECONDS'
+    __REVOCATION_LIST_PATH = 'REVOCATION_LIST_PATH'
+    __REVOCATION_LIST_CAPACITY = 'REVOCATION_LIST_CAPACITY'
+    __REVOCATION_LIST_ERROR_RATE = 'REVOCATION_LIST_ERROR_RATE'
+    __PASSWORD_SCRYPT_N = 'PASSWORD_SCRYPT_N'
+    __PASSWORD_SCRYPT_R = 'PASSWORD_SCRYPT_R'
+    __PASSWORD_SCRYPT_P = 'PASSWORD_SCRYPT_P'
+    __PASSWORD_CACHE_SECONDS = 'PASSWORD_CACHE_SECONDS'
+    __RATE_LIMIT_ENABLED = 'RATE_LIMIT_ENABLED'
+    __RATE_LIMIT_STORE = 'RATE_LIMIT_STORE'
+    __RATE_LIMIT_PATH = 'RATE_LIMIT_PATH'
+    __RATE_LIMIT_ALGORITHM = 'RATE_LIMIT_ALGORITHM'
+    __RATE_LIMIT_DEFAULT = 'RATE_LIMIT_DEFAULT'
+    __RATE_LIMIT_LOGIN = 'RATE_LIMIT_LOGIN'
+    __PROXY_FIX_X_FOR = 'PROXY_FIX_X_FOR'
+    __BLUEPRINTS = 'BLUEPRINTS'
+    __DB_ECHO = 'DB_ECHO'
+    __DB_CREATE_ALL = 'DB_CREATE_ALL'
+    __DB_POOL_SIZE = 'DB_POOL_SIZE'
+    __DB_MAX_OVERFLOW = 'DB_MAX_OVERFLOW'
+    __METRICS_ENABLED = 'METRICS_ENABLED'
+    __METRICS_DIR = 'METRICS_DIR'
+    __METRICS_FLUSH_SECONDS = 'METRICS_FLUSH_SECONDS'
+    __CONDITIONAL_GET_ENABLED = 'CONDITIONAL_GET_ENABLED'
+    __RESPONSE_CACHE_ENABLED = 'RESPONSE_CACHE_ENABLED'
+    __RESPONSE_CACHE_STORE = 'RESPONSE_CACHE_STORE'
+    __RESPONSE_CACHE_PATH = 'RESPONSE_CACHE_PATH'
+    __RESPONSE_CACHE_TTL_SECONDS = 'RESPONSE_CACHE_TTL_SECONDS'
+    __RESPONSE_CACHE_MAX_SIZE = 'RESPONSE_CACHE_MAX_SIZE'
+    __COMPRESSION_ENABLED = 'COMPRESSION_ENABLED'
+    __COMPRESSION_MIN_SIZE = 'COMPRESSION_MIN_SIZE'
+    __COMPRESSION_GZIP_LEVEL = 'COMPRESSION_GZIP_LEVEL'
+    __COMPRESSION_BROTLI_QUALITY = 'COMPRESSION_BROTLI_QUALITY'
+    __TEMPLATES_CACHE_ENABLED = 'TEMPLATES_CACHE_ENABLED'
+    __TEMPLATES_CACHE_DIR = 'TEMPLATES_CACHE_DIR'
+    __TEMPLATES_AUTO_RELOAD = 'TEMPLATES_AUTO_RELOAD'
+    __POSTS_SEARCH_CANDIDATES = 'POSTS_SEARCH_CANDIDATES'
 
     __SECRET_KEY = 'SECRET_KEY'
     __AWS_SECRET_NAME = 'AWS_SECRET_NAME'
@@ -50,17 +132,103 @@ class Config:
 
     ENC_KEY = None
     ENC_NONCE = None
+    # the auth-token key-ring, comma separated 'keyId:key' pairs (i.e. '1:<32 chars>,2:<32 chars>') and the id of the
+    # active key (defaults to the highest), the 'ENC_KEY' is the key '1' when not set
+    ENC_KEYS = None
+    ENC_KEY_ID = None
+    # the JWT's audience and signing secret
+    CLIENT_ID = None
+    CLIENT_SECRET = None
 
     # env configs
     CORS_ENABLED = bool(os.getenv(__CORS_ENABLED))
+    # dev-only query plan advisor, never enabled in production
+    QUERY_ADVISOR_ENABLED = EnvType.getenv_bool(__QUERY_ADVISOR_ENABLED)
+    SLOW_QUERY_THRESHOLD_MS = float(os.getenv(__SLOW_QUERY_THRESHOLD_MS, 100))
+    # counts the statements of every request, logs the slow ones and the shapes repeated as N+1 suspects
+    QUERY_DIAGNOSTICS_ENABLED = EnvType.getenv_bool(__QUERY_DIAGNOSTICS_ENABLED)
+    N_PLUS_ONE_THRESHOLD = int(os.getenv(__N_PLUS_ONE_THRESHOLD, 5))
+    # comma separated read-replica db names (i.e. 'postsReplica1,postsReplica2') and 'round_robin' or 'least_loaded'
+    DB_REPLICAS = os.getenv(__DB_REPLICAS)
+    DB_REPLICA_POLICY = os.getenv(__DB_REPLICA_POLICY, 'round_robin')
+    # the sealed auth-tokens are accepted for this long after they are issued (1 day by default)
+    AUTH_TOKEN_MAX_AGE_SECONDS = int(os.getenv(__AUTH_TOKEN_MAX_AGE_SECONDS, 60 * 60 * 24))
+    # the stateless JWT access tokens (15 minutes by default)
+    JWT_EXPIRES_IN_SECONDS = int(os.getenv(__JWT_EXPIRES_IN_SECONDS, 60 * 15))
+    # the user's tokens store, 'memory' (per worker LRU) or 'sqlite' (shared by the workers of a host)
+    TOKEN_STORE = os.getenv(__TOKEN_STORE, 'memory')
+    TOKEN_STORE_PATH = os.getenv(__TOKEN_STORE_PATH, 'tokens.db')
+    TOKEN_STORE_MAX_SIZE = int(os.getenv(__TOKEN_STORE_MAX_SIZE, 10000))
+    TOKEN_STORE_SWEEP_SECONDS = float(os.getenv(__TOKEN_STORE_SWEEP_SECONDS, 60))
+    # the revoked JWT 'jti's filter, mapped by all the workers of a host
+    REVOCATION_LIST_PATH = os.getenv(__REVOCATION_LIST_PATH, 'revoked-tokens.bin')
+    REVOCATION_LIST_CAPACITY = int(os.getenv(__REVOCATION_LIST_CAPACITY, 100000))
+    REVOCATION_LIST_ERROR_RATE = float(os.getenv(__REVOCATION_LIST_ERROR_RATE, 0.001))
+    # the scrypt cost of the password hashes (tune 'n' with 'python -m benchmarks.passwords') and how long a verified
+    # password is remembered, the changed costs are applied to the stored hashes on the next login
+    PASSWORD_SCRYPT_N = int(os.getenv(__PASSWORD_SCRYPT_N, 2 ** 14))
+    PASSWORD_SCRYPT_R = int(os.getenv(__PASSWORD_SCRYPT_R, 8))
+    PASSWORD_SCRYPT_P = int(os.getenv(__PASSWORD_SCRYPT_P, 1))
+    PASSWORD_CACHE_SECONDS = float(os.getenv(__PASSWORD_CACHE_SECONDS, 60))
+    # the per-client rate limits, the state is 'memory' (per worker) or 'sqlite' (one budget for the workers of a host)
+    RATE_LIMIT_ENABLED = EnvType.getenv_bool(__RATE_LIMIT_ENABLED, True)
+    RATE_LIMIT_STORE = os.getenv(__RATE_LIMIT_STORE, 'sqlite')
+    RATE_LIMIT_PATH = os.getenv(__RATE_LIMIT_PATH, 'rate-limits.db')
+    RATE_LIMIT_ALGORITHM = os.getenv(__RATE_LIMIT_ALGORITHM, 'token_bucket')
+    RATE_LIMIT_DEFAULT = os.getenv(__RATE_LIMIT_DEFAULT, '300/minute')
+    RATE_LIMIT_LOGIN = os.getenv(__RATE_LIMIT_LOGIN, '10/minute')
+    # the number of proxies in front of the app, their 'X-Forwarded-For' and 'X-Forwarded-Proto' are trusted (and the
+    # clients are rate limited by the resolved address), none by default as any client can send 'X-Forwarded-For'
+    PROXY_FIX_X_FOR = int(os.getenv(__PROXY_FIX_X_FOR, 0))
+    # the comma separated blueprint trees the app serves (i.e. 'rest' for an API only worker), all by default
+    BLUEPRINTS = os.getenv(__BLUEPRINTS, 'rest,api,webapp')
+    # logs the emitted SQL, and creates the missing tables on startup (run 'flask --app wsgi init-db' instead)
+    DB_ECHO = EnvType.getenv_bool(__DB_ECHO)
+    DB_CREATE_ALL = EnvType.getenv_bool(__DB_CREATE_ALL)
+    # the DB connections pool of a worker, sized with its threads by 'gunicorn.conf.py'
+    DB_POOL_SIZE = int(os.getenv(__DB_POOL_SIZE, 5))
+    DB_MAX_OVERFLOW = int(os.getenv(__DB_MAX_OVERFLOW, 10))
+    # the requests' and the statements' metrics on '/metrics', summed across the workers through the files of a shared
+    # directory (set by 'gunicorn.conf.py'), a single process exports its own without one
+    METRICS_ENABLED = EnvType.getenv_bool(__METRICS_ENABLED, True)
+    METRICS_DIR = os.getenv(__METRICS_DIR)
+    METRICS_FLUSH_SECONDS = float(os.getenv(__METRICS_FLUSH_SECONDS, 1))
+    # the 'ETag' of the read routes from the versions of their tables, a matching 'If-None-Match' gets '304'
+    CONDITIONAL_GET_ENABLED = EnvType.getenv_bool(__CONDITIONAL_GET_ENABLED, True)
+    # the serialized responses of the cached read routes, 'memory' (an LRU per worker) or 'sqlite' (shared by the
+    # workers of a host), evicted by the commits changing their tables or after their TTL
+    RESPONSE_CACHE_ENABLED = EnvType.getenv_bool(__RESPONSE_CACHE_ENABLED, True)
+    RESPONSE_CACHE_STORE = os.getenv(__RESPONSE_CACHE_STORE, 'memory')
+    RESPONSE_CACHE_PATH = os.getenv(__RESPONSE_CACHE_PATH, 'response-cache.db')
+    RESPONSE_CACHE_TTL_SECONDS = float(os.getenv(__RESPONSE_CACHE_TTL_SECONDS, 60))
+    RESPONSE_CACHE_MAX_SIZE = int(os.getenv(__RESPONSE_CACHE_MAX_SIZE, 1000))
+    # the 'br' or 'gzip' responses of at least the min size (in bytes), the low levels cost a fraction of the CPU of
+    # the best ones for a close ratio (see 'python -m benchmarks.compression')
+    COMPRESSION_ENABLED = EnvType.getenv_bool(__COMPRESSION_ENABLED, True)
+    COMPRESSION_MIN_SIZE = int(os.getenv(__COMPRESSION_MIN_SIZE, 1024))
+    COMPRESSION_GZIP_LEVEL = int(os.getenv(__COMPRESSION_GZIP_LEVEL, 5))
+    COMPRESSION_BROTLI_QUALITY = int(os.getenv(__COMPRESSION_BROTLI_QUALITY, 4))
+    # the compiled templates are kept in a directory shared by the workers (the user's temp one without it), their
+    # files are only checked for changes in development
+    TEMPLATES_CACHE_ENABLED = EnvType.getenv_bool(__TEMPLATES_CACHE_ENABLED, True)
+    TEMPLATES_CACHE_DIR = os.getenv(__TEMPLATES_CACHE_DIR)
+    TEMPLATES_AUTO_RELOAD = EnvType.getenv_bool(__TEMPLATES_AUTO_RELOAD, EnvType.is_development(EnvType.get_env_type())
+                                                or EnvType.is_local(EnvType.get_env_type()))
+    # the ranked searches of the posts score the newest matches only (0 scores all), a common word matches too many
+    # posts to score them all per request (see 'python -m benchmarks.posts')
+    POSTS_SEARCH_CANDIDATES = int(os.getenv(__POSTS_SEARCH_CANDIDATES, 2000))
 
     # load ENV specific configs
     if EnvType.is_testing(EnvType.get_env_type()):
-        # loads app's config file
-        with open(__APP_CONFIG_FILE_PATH) as config_file:
-            APP_CONFIGS = json.load(config_file)
-
-        SECURITY_CONFIGS = APP_CONFIGS.get(__SECURITY_CONFIGS)
+        # the app's config file is read on the first access of its security configs
+        SECURITY_CONFIGS = AppConfig(__SECURITY_CONFIGS)
+        ENCRYPTION_CONFIGS = AppConfig(__SECURITY_CONFIGS, __ENCRYPTION_CONFIGS)
+        ENC_KEY = AppConfig(__SECURITY_CONFIGS, __ENCRYPTION_CONFIGS, __ENC_KEY)
+        ENC_NONCE = AppConfig(__SECURITY_CONFIGS, __ENCRYPTION_CONFIGS, __ENC_NONCE)
+        ENC_KEYS = AppConfig(__SECURITY_CONFIGS, __ENCRYPTION_CONFIGS, __ENC_KEYS)
+        ENC_KEY_ID = AppConfig(__SECURITY_CONFIGS, __ENCRYPTION_CONFIGS, __ENC_KEY_ID)
+        CLIENT_ID = AppConfig(__SECURITY_CONFIGS, __CLIENT_ID_KEY)
+        CLIENT_SECRET = AppConfig(__SECURITY_CONFIGS, __CLIENT_ID_SECRET)
 
         # Database Configs
         DB_HOSTNAME = os.getenv(__DB_HOSTNAME)
@@ -75,6 +243,12 @@ class Config:
         SECURITY_CONFIGS = os.getenv(__SECURITY_CONFIGS)
         AWS_SECRET_NAME = os.getenv(__AWS_SECRET_NAME)
         SECRET_KEY = os.getenv(__SECRET_KEY)
+        ENC_KEY = os.getenv(__ENC_KEY)
+        ENC_NONCE = os.getenv(__ENC_NONCE)
+        ENC_KEYS = os.getenv(__ENC_KEYS)
+        ENC_KEY_ID = os.getenv(__ENC_KEY_ID)
+        CLIENT_ID = os.getenv(__CLIENT_ID_KEY)
+        CLIENT_SECRET = os.getenv(__CLIENT_ID_SECRET)
 
         # Database Configs
         DB_HOSTNAME = os.getenv(__DB_HOSTNAME)
@@ -83,14 +257,6 @@ class Config:
         DB_USERNAME = os.getenv(__DB_USERNAME)
         DB_PASSWORD = os.getenv(__DB_PASSWORD)
 
-    if SECURITY_CONFIGS:
-        ENCRYPTION_CONFIGS = SECURITY_CONFIGS.get(__ENCRYPTION_CONFIGS)
-        ENC_KEY = ENCRYPTION_CONFIGS.get(__ENC_KEY)
-        ENC_NONCE = ENCRYPTION_CONFIGS.get(__ENC_NONCE)
-    else:
-        ENC_KEY = os.getenv(__ENC_KEY)
-        ENC_NONCE = os.getenv(__ENC_NONCE)
-
     @staticmethod
     def is_cors_enabled():
         return Config.CORS_ENABLED
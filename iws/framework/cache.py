@@ -0,0 +1,448 @@
+#
+# Author: Rohtash Lakra
+# Reference:
+# - https://www.rfc-editor.org/rfc/rfc9111
+# - https://docs.sqlalchemy.org/en/20/orm/events.html#sqlalchemy.orm.SessionEvents.after_commit
+#
+import functools
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from enum import auto, unique
+from typing import Any, Callable, Dict, FrozenSet, Iterable, Optional, Set
+
+from flask import Flask, Response, current_app, g, request
+
+from framework.enums import AutoLowerCase
+from framework.http import HTTPStatus
+
+logger = logging.getLogger(__name__)
+
+
+@unique
+class ResponseCacheStoreType(AutoLowerCase):
+    """ResponseCacheStoreType represents the backend of the cached responses"""
+    MEMORY = auto()
+    SQLITE = auto()
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    """The serialized body of a response and the tables it was read from, expires at 'expiresAt' (epoch seconds).
+    The body of a compressed variant is encoded with its 'contentEncoding'."""
+    status: int
+    contentType: str
+    body: bytes
+    tables: FrozenSet[str]
+    expiresAt: float
+    contentEncoding: Optional[str] = None
+
+    def isExpired(self, now: Optional[float] = None) -> bool:
+        return self.expiresAt <= (time.time() if now is None else now)
+
+
+class AbstractResponseCacheStore(ABC):
+    """The interface of the cached responses' stores"""
+
+    def __str__(self):
+        """Returns the string representation of this object"""
+        return f"{self.__class__.__name__} <size={self.size()}>"
+
+    def __repr__(self):
+        """Returns the string representation of this object"""
+        return str(self)
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """Returns the unexpired response of the key"""
+        pass
+
+    @abstractmethod
+    def set(self, key: str, response: CachedResponse) -> None:
+        """Stores the response of the key"""
+        pass
+
+    @abstractmethod
+    def invalidate(self, tables: Iterable[str]) -> int:
+        """Removes the responses read from any of the tables and returns their number"""
+        pass
+
+    @abstractmethod
+    def size(self) -> int:
+        """Returns the number of the cached responses"""
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Removes all the responses"""
+        pass
+
+    def close(self) -> None:
+        """Releases the resources of the store"""
+        pass
+
+
+class MemoryResponseCacheStore(AbstractResponseCacheStore):
+    """The per-process LRU of 'maxSize' responses, each worker caches its own"""
+
+    def __init__(self, maxSize: int = 1000):
+        self.maxSize = maxSize
+        self._lock = threading.Lock()
+        self._responses: OrderedDict[str, CachedResponse] = OrderedDict()
+        # the keys of the responses per table, so an invalidation doesn't scan all the responses
+        self._keys: Dict[str, Set[str]] = {}
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            response = self._responses.get(key)
+            if response is None:
+                return None
+
+            if response.isExpired():
+                self._remove(key)
+                return None
+
+            self._responses.move_to_end(key)
+            return response
+
+    def set(self, key: str, response: CachedResponse) -> None:
+        with self._lock:
+            self._remove(key)
+            while len(self._responses) >= self.maxSize:
+                # drop the least recently used
+                self._remove(next(iter(self._responses)))
+
+            self._responses[key] = response
+            for table in response.tables:
+                self._keys.setdefault(table, set()).add(key)
+
+    def _remove(self, key: str) -> None:
+        response = self._responses.pop(key, None)
+        if response is not None:
+            for table in response.tables:
+                keys = self._keys.get(table)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._keys[table]
+
+    def invalidate(self, tables: Iterable[str]) -> int:
+        with self._lock:
+            keys = set().union(*(self._keys.get(table, ()) for table in tables))
+            for key in keys:
+                self._remove(key)
+
+        return len(keys)
+
+    def size(self) -> int:
+        return len(self._responses)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._responses.clear()
+            self._keys.clear()
+
+
+class SQLiteResponseCacheStore(AbstractResponseCacheStore):
+    """The responses shared by all the workers of a host through a SQLite (WAL) file, a worker's commit evicts the
+    responses of its tables for all the workers.
+
+    The durability is relaxed ('synchronous=OFF'), a lost write after a crash is a miss. The expired and, above the
+    'maxSize', the soonest expiring responses are swept on every 'sweepEvery' writes.
+    """
+
+    CREATE_TABLE = ("CREATE TABLE IF NOT EXISTS response_cache ("
+                    "key TEXT PRIMARY KEY, status INTEGER NOT NULL, content_type TEXT NOT NULL, content_encoding TEXT, "
+                    "body BLOB NOT NULL, "
+                    # the names of the tables as ',roles,permissions,' for the 'LIKE' of the invalidation
+                    "tables TEXT NOT NULL, expires_at REAL NOT NULL)")
+
+    def __init__(self, path: str, maxSize: int = 1000, timeout: float = 5.0, sweepEvery: int = 100):
+        self.path = path
+        self.maxSize = maxSize
+        self.timeout = timeout
+        self.sweepEvery = sweepEvery
+        self._writes = 0
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(self.CREATE_TABLE)
+
+    def _connection(self) -> sqlite3.Connection:
+        # the connection is created in the thread (and the process) using it, never shared after a fork
+        connection = getattr(self._local, "connection", None)
+        if connection is None or getattr(self._local, "pid", None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None,
+                                         check_same_thread=False)
+            connection.execute("PRAGMA synchronous=OFF")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+
+        return connection
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        row = self._connection().execute("SELECT status, content_type, body, tables, expires_at, content_encoding "
+                                         "FROM response_cache WHERE key = ? AND expires_at > ?",
+                                         (key, time.time())).fetchone()
+        if row is None:
+            return None
+
+        status, contentType, body, tables, expiresAt, contentEncoding = row
+        return CachedResponse(status, contentType, bytes(body), frozenset(filter(None, tables.split(","))), expiresAt,
+                              contentEncoding)
+
+    def set(self, key: str, response: CachedResponse) -> None:
+        self._connection().execute("INSERT OR REPLACE INTO response_cache "
+                                   "(key, status, content_type, content_encoding, body, tables, expires_at) "
+                                   "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                   (key, response.status, response.contentType, response.contentEncoding,
+                                    response.body, f",{','.join(sorted(response.tables))},", response.expiresAt))
+        self._writes += 1
+        if self._writes % self.sweepEvery == 0:
+            self.sweep()
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Removes the expired responses and the soonest expiring ones above the 'maxSize'"""
+        connection = self._connection()
+        removed = connection.execute("DELETE FROM response_cache WHERE expires_at <= ?",
+                                     (now or time.time(),)).rowcount
+        removed += connection.execute("DELETE FROM response_cache WHERE key IN (SELECT key FROM response_cache "
+                                      "ORDER BY expires_at DESC LIMIT -1 OFFSET ?)", (self.maxSize,)).rowcount
+        return removed
+
+    def invalidate(self, tables: Iterable[str]) -> int:
+        tables = sorted(set(tables))
+        if not tables:
+            return 0
+
+        where = " OR ".join(["tables LIKE ?"] * len(tables))
+        return self._connection().execute(f"DELETE FROM response_cache WHERE {where}",
+                                          [f"%,{table},%" for table in tables]).rowcount
+
+    def size(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+
+    def clear(self) -> None:
+        self._connection().execute("DELETE FROM response_cache")
+
+    def close(self) -> None:
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+
+def principalScope() -> str:
+    """Returns the scope of the authenticated user (set by '@auth'), the users of a scope share the responses"""
+    user = getattr(g, "user", None)
+    if user is None or not getattr(user, "id", None):
+        return "anonymous"
+
+    return "admin" if getattr(user, "admin", False) else "user"
+
+
+@dataclass
+class RouteStats:
+    """The counters of a cached route"""
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    bypasses: int = 0
+
+
+class ResponseCache(object):
+    """ResponseCache serves the repeated GETs of the read routes from their serialized responses.
+
+    - '@responseCache.cached("roles", "permissions", ttl=300)' caches the route's '200 OK' responses, read from the
+      tables, for the 'ttl' seconds (defaults to the cache's 'ttl').
+    - the key is the route, its path and sorted query, the principal's scope (see 'principalScope()') and the versions
+      of the tables, so a worker never serves a response older than a change committed by any worker.
+    - the 'versions.onCommit()' callback evicts the responses of the tables changed by the worker's transactions.
+
+    - with a 'compressor', the variant of the request's encoding is kept next to the response (compressed on its first
+      request), so a hot response is compressed once.
+
+    The 'X-Cache' header tells a 'HIT' from a 'MISS', 'stats()' and the 'response_cache_requests_total' metric count
+    them per route.
+    """
+
+    def __init__(self, store: Optional[AbstractResponseCacheStore] = None, ttl: float = 60, enabled: bool = True):
+        self.store = store
+        self.ttl = ttl
+        self.enabled = enabled
+        self.versions = None
+        self.compressor = None
+        self.requests = None
+        self.invalidations = 0
+        self._lock = threading.Lock()
+        self.routes: Dict[str, RouteStats] = {}
+
+    def __str__(self):
+        """Returns the string representation of this object"""
+        return f"{self.__class__.__name__} <store={self.store}, ttl={self.ttl}, enabled={self.enabled}>"
+
+    def __repr__(self):
+        """Returns the string representation of this object"""
+        return str(self)
+
+    def init_app(self, app: Flask, store: Optional[AbstractResponseCacheStore] = None, versions=None, metrics=None,
+                 compressor=None, ttl: Optional[float] = None, enabled: Optional[bool] = None) -> "ResponseCache":
+        """Configures the cache, its keys have the 'versions' of the tables, its counters are in the 'metrics' and its
+        compressed variants are of the 'compressor'"""
+        if store is not None:
+            self.store = store
+        if compressor is not None:
+            self.compressor = compressor
+        if ttl is not None:
+            self.ttl = ttl
+        if enabled is not None:
+            self.enabled = enabled
+        if versions is not None:
+            self.versions = versions
+            versions.onCommit(self.invalidate)
+        if metrics is not None and self.requests is None:
+            self.requests = metrics.counter("response_cache_requests_total", "The requests of the cached routes",
+                                            ("route", "result"))
+
+        app.extensions["responseCache"] = self
+        logger.debug(f"init_app(), responseCache={self}")
+        return self
+
+    def invalidate(self, tables: Iterable[str]) -> int:
+        """Evicts the responses read from any of the tables"""
+        if self.store is None:
+            return 0
+
+        removed = self.store.invalidate(tables)
+        with self._lock:
+            self.invalidations += removed
+
+        logger.debug(f"invalidate({tables}), removed={removed}")
+        return removed
+
+    def clear(self) -> None:
+        if self.store is not None:
+            self.store.clear()
+
+    def buildKey(self, route: str, tables: Iterable[str], scope: Callable[[], str]) -> str:
+        """Returns the key of the request's response"""
+        versions = self.versions.getRequestVersions(tables) if self.versions is not None and self.versions.engines \
+            else {}
+        signature = (f"{request.path}?{sorted(request.args.items(multi=True))}|{scope()}|"
+                     f"{sorted((name, version) for name, (version, _) in versions.items())}")
+        return f"{route}:{hashlib.blake2b(signature.encode(), digest_size=16).hexdigest()}"
+
+    def _count(self, route: str, name: str, result: Optional[str] = None) -> None:
+        """Increments the route's counter of the name and the metric of the request's result, if any"""
+        with self._lock:
+            routeStats = self.routes.setdefault(route, RouteStats())
+            setattr(routeStats, name, getattr(routeStats, name) + 1)
+
+        if result is not None and self.requests is not None:
+            self.requests.inc(route, result)
+
+    def cached(self, *tables: str, ttl: Optional[float] = None, scope: Callable[[], str] = principalScope):
+        """Caches the '200 OK' responses of the route reading the tables for the 'ttl' seconds"""
+
+        def _decorator(func):
+            route = f"{func.__module__}.{func.__name__}"
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled or self.store is None or request.method not in ("GET", "HEAD"):
+                    return func(*args, **kwargs)
+
+                try:
+                    key = self.buildKey(route, tables, scope)
+                    encoding = self.compressor.negotiate() if self.compressor is not None else None
+                    variantKey = f"{key}.{encoding.value}" if encoding is not None else key
+                    cachedResponse = self.store.get(variantKey)
+                    hasVariant = cachedResponse is not None or variantKey == key
+                    if not hasVariant:
+                        cachedResponse = self.store.get(key)
+                except Exception as ex:
+                    # the route is still served without its cache
+                    logger.error(f"The response cache of {route} failed: {ex}")
+                    self._count(route, "bypasses", "bypass")
+                    return func(*args, **kwargs)
+
+                if cachedResponse is not None:
+                    self._count(route, "hits", "hit")
+                    response = self.toResponse(cachedResponse)
+                    response.headers["X-Cache"] = "HIT"
+                    if not hasVariant:
+                        self._storeVariant(route, variantKey, response, cachedResponse, encoding)
+                    return response
+
+                self._count(route, "misses", "miss")
+                response = current_app.make_response(func(*args, **kwargs))
+                response.headers["X-Cache"] = "MISS"
+                if response.status_code == HTTPStatus.OK.statusCode and not response.is_streamed:
+                    entry = CachedResponse(response.status_code, response.content_type, response.get_data(),
+                                           frozenset(tables), time.time() + (self.ttl if ttl is None else ttl))
+                    self._store(route, key, entry)
+                    if variantKey != key:
+                        self._storeVariant(route, variantKey, response, entry, encoding)
+
+                return response
+
+            return wrapper
+
+        return _decorator
+
+    @staticmethod
+    def toResponse(cachedResponse: CachedResponse) -> Response:
+        response = current_app.response_class(cachedResponse.body, status=cachedResponse.status,
+                                              content_type=cachedResponse.contentType)
+        if cachedResponse.contentEncoding:
+            response.headers["Content-Encoding"] = cachedResponse.contentEncoding
+
+        return response
+
+    def _store(self, route: str, key: str, entry: CachedResponse) -> None:
+        try:
+            self.store.set(key, entry)
+            self._count(route, "stores")
+        except Exception as ex:
+            logger.error(f"The response of {route} isn't cached: {ex}")
+
+    def _storeVariant(self, route: str, variantKey: str, response: Response, entry: CachedResponse, encoding) -> None:
+        """Compresses the response and keeps it as the variant of the encoding (the response itself, if it's not worth
+        compressing), it expires with its response"""
+        self.compressor.compressResponse(response, encoding)
+        self._store(route, variantKey, replace(entry, body=response.get_data(),
+                                               contentEncoding=response.headers.get("Content-Encoding")))
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the hits, misses and stores of the cache and of its routes"""
+        with self._lock:
+            routes = {route: dict(vars(routeStats)) for route, routeStats in self.routes.items()}
+            invalidations = self.invalidations
+
+        stats = {name: sum(routeStats[name] for routeStats in routes.values())
+                 for name in ("hits", "misses", "stores", "bypasses")}
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["invalidations"] = invalidations
+        stats["size"] = self.store.size() if self.store is not None else 0
+        stats["routes"] = routes
+        return stats
+
+
+def createResponseCacheStore(storeType: ResponseCacheStoreType, path: Optional[str] = None,
+                             maxSize: int = 1000) -> AbstractResponseCacheStore:
+    """Creates the cached responses' store of the type"""
+    logger.debug(f"+createResponseCacheStore({storeType}, {path}, {maxSize})")
+    if storeType == ResponseCacheStoreType.SQLITE:
+        store = SQLiteResponseCacheStore(path, maxSize=maxSize)
+    else:
+        store = MemoryResponseCacheStore(maxSize=maxSize)
+
+    logger.debug(f"-createResponseCacheStore(), store={store}")
+    return store
@@ -0,0 +1,169 @@
+#
+# Author: Rohtash Lakra
+# Reference:
+# - https://www.rfc-editor.org/rfc/rfc9110#name-accept-encoding
+# - https://www.rfc-editor.org/rfc/rfc7932 (Brotli)
+#
+import gzip
+import logging
+import time
+from enum import auto, unique
+from typing import Callable, Dict, Optional
+
+from flask import Flask, Response, request
+
+from framework.enums import AutoLowerCase
+from framework.metrics import STATEMENT_BUCKETS
+
+try:
+    import brotli
+except ImportError:
+    # the responses are only gzipped without the 'Brotli' package
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# the media types worth compressing, besides 'text/*'
+COMPRESSIBLE_TYPES = frozenset({"application/json", "application/javascript", "application/xml", "image/svg+xml"})
+
+
+def isCompressibleType(mimetype: Optional[str]) -> bool:
+    """Returns True for the textual media types"""
+    return bool(mimetype) and (mimetype.startswith("text/") or mimetype in COMPRESSIBLE_TYPES)
+
+
+@unique
+class ContentEncoding(AutoLowerCase):
+    """ContentEncoding represents the compressions of the responses, in the order of preference"""
+    BR = auto()
+    GZIP = auto()
+
+
+class Compressor(object):
+    """Compressor compresses the responses of the app with the encoding negotiated by the client's 'Accept-Encoding'.
+
+    Only the bodies of at least 'minSize' bytes of the compressible types are compressed, with a low level (the JSON
+    bodies repeat their keys, the ratio of the cheap levels is close to the best ones for a fraction of the CPU).
+
+    A response already carrying a 'Content-Encoding' (i.e. a compressed variant of the response cache) is sent as is.
+    The 'http_response_bytes_total' metric counts the bytes on the wire per encoding and the
+    'http_compression_cpu_seconds' metric the CPU of each compression.
+    """
+
+    def __init__(self, minSize: int = 1024, gzipLevel: int = 5, brotliQuality: int = 4, enabled: bool = True):
+        self.minSize = minSize
+        self.gzipLevel = gzipLevel
+        self.brotliQuality = brotliQuality
+        self.enabled = enabled
+        self.responseBytes = None
+        self.compressionCpu = None
+        self.compressors: Dict[ContentEncoding, Callable[[bytes], bytes]] = {
+            ContentEncoding.GZIP: lambda body: gzip.compress(body, compresslevel=self.gzipLevel, mtime=0),
+        }
+        if brotli is not None:
+            self.compressors[ContentEncoding.BR] = lambda body: brotli.compress(body, mode=brotli.MODE_TEXT,
+                                                                                quality=self.brotliQuality)
+
+    def __str__(self):
+        """Returns the string representation of this object"""
+        return (f"{self.__class__.__name__} <encodings={[encoding.value for encoding in self.compressors]}, "
+                f"minSize={self.minSize}, gzipLevel={self.gzipLevel}, brotliQuality={self.brotliQuality}, "
+                f"enabled={self.enabled}>")
+
+    def __repr__(self):
+        """Returns the string representation of this object"""
+        return str(self)
+
+    def init_app(self, app: Flask, minSize: Optional[int] = None, gzipLevel: Optional[int] = None,
+                 brotliQuality: Optional[int] = None, metrics=None, enabled: Optional[bool] = None) -> "Compressor":
+        """Configures the compressor and compresses the responses of the app"""
+        if minSize is not None:
+            self.minSize = minSize
+        if gzipLevel is not None:
+            self.gzipLevel = gzipLevel
+        if brotliQuality is not None:
+            self.brotliQuality = brotliQuality
+        if enabled is not None:
+            self.enabled = enabled
+        if metrics is not None and self.responseBytes is None:
+            self.responseBytes = metrics.counter("http_response_bytes_total", "The bytes of the response bodies sent",
+                                                 ("encoding",))
+            self.compressionCpu = metrics.histogram("http_compression_cpu_seconds",
+                                                    "The CPU time of the compressed responses", ("encoding",),
+                                                    buckets=STATEMENT_BUCKETS)
+
+        app.after_request(self.afterRequest)
+        app.extensions["compressor"] = self
+        logger.debug(f"init_app(), compressor={self}")
+        return self
+
+    def negotiate(self) -> Optional[ContentEncoding]:
+        """Returns the request's preferred encoding (the first on a tie) or None for the identity"""
+        if not self.enabled or not request.accept_encodings:
+            return None
+
+        preferred, preferredQuality = None, 0
+        for encoding in ContentEncoding:
+            quality = request.accept_encodings.quality(encoding.value) if encoding in self.compressors else 0
+            if quality > preferredQuality:
+                preferred, preferredQuality = encoding, quality
+
+        return preferred
+
+    def isCompressible(self, response: Response) -> bool:
+        """Returns True if the response's body is worth compressing"""
+        if response.status_code < 200 or response.status_code in (204, 206, 304):
+            return False
+
+        if response.direct_passthrough or response.is_streamed or "Content-Encoding" in response.headers:
+            return False
+
+        if not isCompressibleType(response.mimetype) or response.cache_control.no_transform:
+            return False
+
+        return (response.content_length or len(response.get_data())) >= self.minSize
+
+    def compress(self, body: bytes, encoding: ContentEncoding) -> bytes:
+        """Returns the body compressed with the encoding"""
+        startedAt = time.thread_time()
+        compressed = self.compressors[encoding](body)
+        if self.compressionCpu is not None:
+            self.compressionCpu.observe(time.thread_time() - startedAt, encoding.value)
+
+        return compressed
+
+    def compressResponse(self, response: Response, encoding: Optional[ContentEncoding]) -> bool:
+        """Replaces the response's body with its compressed one, unless it's not compressible or not smaller"""
+        if encoding is None or not self.isCompressible(response):
+            return False
+
+        body = response.get_data()
+        compressed = self.compress(body, encoding)
+        if len(compressed) >= len(body):
+            return False
+
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding.value
+        # a strong tag is of the exact bytes, so each encoding has its own
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(f"{etag}-{encoding.value}")
+
+        return True
+
+    def afterRequest(self, response: Response) -> Response:
+        if not self.enabled:
+            return response
+
+        if isCompressibleType(response.mimetype):
+            # the caches between keep a variant per encoding
+            response.vary.add("Accept-Encoding")
+
+        if "Content-Encoding" not in response.headers:
+            self.compressResponse(response, self.negotiate())
+
+        if self.responseBytes is not None and response.content_length is not None:
+            self.responseBytes.inc(response.headers.get("Content-Encoding", "identity"),
+                                   amount=response.content_length)
+
+        return response
@@ -0,0 +1,114 @@
+#
+# Author: Rohtash Lakra
+#
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from sqlalchemy import Engine, event
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class QueryPlanReport:
+    """QueryPlanReport holds the captured plan of a slow statement"""
+    statement: str
+    elapsedMillis: float
+    plan: List[str] = field(default_factory=list)
+    fullScans: List[str] = field(default_factory=list)
+
+    def hasFullScan(self) -> bool:
+        """Returns true if the plan contains at least one full table scan"""
+        return len(self.fullScans) > 0
+
+
+class QueryPlanAdvisor(object):
+    """QueryPlanAdvisor is a development aid that listens to the engine's cursor events, captures the
+    'EXPLAIN QUERY PLAN' of every SELECT statement slower than the threshold and flags full table scans.
+
+    It must not be enabled in production as it runs an extra statement for every slow query.
+    """
+
+    EXPLAIN_PREFIX = "EXPLAIN QUERY PLAN "
+    KEY_START_TIMES = "advisor_start_times"
+
+    def __init__(self, thresholdMillis: float = 100, maxReports: int = 100):
+        self.thresholdMillis = thresholdMillis
+        self.reports = deque(maxlen=maxReports)
+        self.engine: Optional[Engine] = None
+
+    def attach(self, engine: Engine) -> "QueryPlanAdvisor":
+        """Attaches this advisor to the engine"""
+        logger.debug(f"+attach({engine}), thresholdMillis={self.thresholdMillis}")
+        self.engine = engine
+        event.listen(engine, "before_cursor_execute", self._beforeCursorExecute)
+        event.listen(engine, "after_cursor_execute", self._afterCursorExecute)
+        logger.debug(f"-attach()")
+        return self
+
+    def detach(self):
+        """Detaches this advisor from the engine"""
+        if self.engine is not None:
+            event.remove(self.engine, "before_cursor_execute", self._beforeCursorExecute)
+            event.remove(self.engine, "after_cursor_execute", self._afterCursorExecute)
+            self.engine = None
+
+    def _beforeCursorExecute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault(self.KEY_START_TIMES, []).append(time.perf_counter())
+
+    def _afterCursorExecute(self, conn, cursor, statement, parameters, context, executemany):
+        startTimes = conn.info.get(self.KEY_START_TIMES)
+        if not startTimes:
+            return
+
+        elapsedMillis = (time.perf_counter() - startTimes.pop()) * 1000
+        if elapsedMillis < self.thresholdMillis or executemany or not self.isExplainable(conn, statement):
+            return
+
+        try:
+            report = self.explain(conn, statement, parameters, elapsedMillis)
+        except Exception as ex:
+            logger.debug(f"Unable to explain the statement! Error:{ex}")
+            return
+
+        self.reports.append(report)
+        if report.hasFullScan():
+            # parameters are intentionally not logged as they may contain sensitive data
+            logger.warning(f"Slow query [{elapsedMillis:.2f} ms] with full scan {report.fullScans}: {statement}")
+        else:
+            logger.info(f"Slow query [{elapsedMillis:.2f} ms], plan={report.plan}: {statement}")
+
+    @staticmethod
+    def isExplainable(conn, statement: str) -> bool:
+        """Returns true if the statement is a SELECT on SQLite"""
+        return conn.dialect.name == "sqlite" and statement.lstrip().upper().startswith("SELECT")
+
+    @staticmethod
+    def isFullScan(detail: str) -> bool:
+        """Returns true if the plan detail represents a full table scan (i.e. not using any index)"""
+        detail = detail.upper()
+        return detail.startswith("SCAN") and "USING" not in detail and "CONSTANT ROW" not in detail
+
+    def explain(self, conn, statement: str, parameters, elapsedMillis: float) -> QueryPlanReport:
+        """Captures the query plan of the statement using a raw DBAPI cursor"""
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute(self.EXPLAIN_PREFIX + statement, parameters or ())
+            # rows are (id, parent, notused, detail)
+            plan = [row[-1] for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+        fullScans = [detail for detail in plan if self.isFullScan(detail)]
+        return QueryPlanReport(statement=statement, elapsedMillis=elapsedMillis, plan=plan, fullScans=fullScans)
+
+    def getFullScans(self) -> List[QueryPlanReport]:
+        """Returns the captured reports which contain full table scans"""
+        return [report for report in self.reports if report.hasFullScan()]
+
+    def clear(self):
+        """Clears the captured reports"""
+        self.reports.clear()
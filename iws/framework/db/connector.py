@@ -3,28 +3,37 @@
 #
 import logging
 import sqlite3
+import time
 from pathlib import Path
 from typing import Union, Iterable
 
 import click
 from flask import Flask, g, current_app
+from flask.cli import with_appcontext
 from sqlalchemy import Engine, URL, create_engine
 from sqlalchemy.orm import Session
 
-from framework.enums import KeyEnum
+from framework.db.advisor import QueryPlanAdvisor
+from framework.db.diagnostics import QueryDiagnostics
+from framework.db.router import EngineRouter, ReplicaPolicy
+from framework.db.seed import SEEDED_TABLES, DatasetGenerator, SeedOptions, parseCount
+from framework.db.statistics import CompiledCacheStats
+from framework.enums import KeyEnum, EnvType
 from framework.orm.sqlalchemy.schema import BaseSchema
+from framework.versions import TableVersions
 
 logger = logging.getLogger(__name__)
 
 
 @staticmethod
-def createEngine(dbUri: Union[str, URL], debug: bool = False) -> Engine:
+def createEngine(dbUri: Union[str, URL], debug: bool = False, poolSize: int = 5, maxOverflow: int = 10) -> Engine:
     """Create a new :class:`Engine` instance.
 
-    The debug=True parameter indicates that SQL emitted by connections will be logged to standard out.
+    The debug=True parameter indicates that SQL emitted by connections will be logged to standard out. The pool keeps
+    'poolSize' connections and opens up to 'maxOverflow' more under load.
     """
-    logger.debug(f"+createEngine({dbUri}, {debug})")
-    engine = create_engine(dbUri, pool_recycle=3600, echo=debug)
+    logger.debug(f"+createEngine({dbUri}, {debug}, {poolSize}, {maxOverflow})")
+    engine = create_engine(dbUri, pool_recycle=3600, echo=debug, pool_size=poolSize, max_overflow=maxOverflow)
     engine.execution_options(isolation_level="AUTOCOMMIT")
     logger.debug(f"-createEngine(), engine={engine}")
     return engine
@@ -49,18 +58,77 @@ def createDatabase(engine: Engine) -> None:
     logger.debug(f"-createDatabase(), engine={engine}")
 
 
-# 'click.command()' defines a command line command called init-db that calls the 'init_db' function and shows a success
-# message to the user. You can read Command Line Interface to learn more about writing commands.
+# 'click.command()' defines a command line command called init-db that creates the tables, it runs once per deployment
+# (i.e. 'flask --app wsgi init-db') instead of on the startup of every worker.
 @click.command('init-db')
+@with_appcontext
 def init_db_command():
-    """Clear the existing data and create new tables."""
+    """Create the missing tables of the database and its read-replicas."""
     click.echo('Initializing the database ...')
-    db = SQLite3Connector()
-    db.init(None)
-    # db.init_db()
+    current_app.extensions[KEY_CONNECTOR].create_all()
     click.echo('Database is successfully initialized.')
 
 
+class CountParamType(click.ParamType):
+    """The counts of the rows, in any notation (i.e. '1e6' or '1_000_000')"""
+    name = "count"
+
+    def convert(self, value, param, ctx):
+        if isinstance(value, int):
+            return value
+
+        try:
+            return parseCount(value)
+        except ValueError as ex:
+            self.fail(str(ex), param, ctx)
+
+
+# i.e. 'flask --app wsgi seed --users 1e6 --seed 7', the same options and seed always generate the same rows
+@click.command('seed')
+@click.option('--users', type=CountParamType(), default=SeedOptions.users, show_default=True,
+              help='The users to generate.')
+@click.option('--seed', type=int, default=SeedOptions.seed, show_default=True, help='The seed of the random data.')
+@click.option('--batch-size', type=CountParamType(), default=SeedOptions.batchSize, show_default=True,
+              help='The rows inserted per transaction.')
+@click.option('--addresses-per-user', type=float, default=SeedOptions.addressesPerUser, show_default=True)
+@click.option('--posts-per-user', type=float, default=SeedOptions.postsPerUser, show_default=True)
+@click.option('--comments-per-post', type=float, default=SeedOptions.commentsPerPost, show_default=True)
+@click.option('--attachments-per-post', type=float, default=SeedOptions.attachmentsPerPost, show_default=True)
+@click.option('--companies', type=CountParamType(), default=SeedOptions.companies, show_default=True)
+@click.option('--branch-depth', type=click.IntRange(min=1, max=255), default=SeedOptions.branchDepth,
+              show_default=True, help='The levels of the companies\' branch trees.')
+@click.option('--reset', is_flag=True, help='Deletes the rows of the seeded tables first.')
+@with_appcontext
+def seed_command(users: int, seed: int, batch_size: int, addresses_per_user: float, posts_per_user: float,
+                 comments_per_post: float, attachments_per_post: float, companies: int, branch_depth: int,
+                 reset: bool):
+    """Load a synthetic dataset of users, roles, companies and posts (not in production)."""
+    if EnvType.is_production(EnvType.get_env_type()):
+        raise click.ClickException('The database is not seeded in production!')
+
+    connector = current_app.extensions[KEY_CONNECTOR]
+    connector.create_all()
+    options = SeedOptions(users=users, seed=seed, batchSize=max(batch_size, 1), addressesPerUser=addresses_per_user,
+                          postsPerUser=posts_per_user, commentsPerPost=comments_per_post,
+                          attachmentsPerPost=attachments_per_post, companies=companies, branchDepth=branch_depth)
+    generator = DatasetGenerator(connector.engine, options)
+    if reset:
+        generator.clear()
+    elif not generator.isEmpty():
+        raise click.ClickException('The database already has rows, use \'--reset\' to replace them!')
+
+    click.echo(f'Seeding the database with {options} ...')
+    startedAt = time.perf_counter()
+    counts = generator.generate()
+    # the rows are not written by the ORM, the cached representations of the clients are stale
+    with connector.engine.begin() as connection:
+        TableVersions.bump(connection, SEEDED_TABLES)
+
+    for name, count in counts.items():
+        click.echo(f'  {name:<20}{count:>12,}')
+    click.echo(f'Database is successfully seeded in {time.perf_counter() - startedAt:.1f} seconds.')
+
+
 # def init_app(app):
 #     # app.teardown_appcontext() tells Flask to call that function when cleaning up after returning the response.
 #     app.teardown_appcontext(SQLite3Database().close_connection())
@@ -69,6 +137,7 @@ def init_db_command():
 
 # Define Constants
 KEY_CONNECTION = 'connection'
+KEY_CONNECTOR = 'connector'
 KEY_POOL_NAME = 'sqlite3_pool'
 SQLITE_PREFIX = 'sqlite:///'
 
@@ -102,6 +171,10 @@ class SQLite3Connector(DatabaseConnector):
         self.db_password = None
         self.db_uri = None
         self.engine: Engine = None
+        self.router: EngineRouter = None
+        self.advisor: QueryPlanAdvisor = None
+        self.diagnostics: QueryDiagnostics = None
+        self.cacheStats: CompiledCacheStats = None
         # self.metadata = None
         # self.session = None
 
@@ -122,6 +195,10 @@ class SQLite3Connector(DatabaseConnector):
         with self.app.app_context():
             current_app.logger.debug(f"Initializing App Context for {app} ...")
         self._init_configs()
+        self.app.extensions[KEY_CONNECTOR] = self
+        # app.cli.add_command() adds a new command that can be called with the flask command.
+        self.app.cli.add_command(init_db_command)
+        self.app.cli.add_command(seed_command)
         # 'app.teardown_appcontext()' tells Flask to call that function when cleaning up after returning the response.
         # self.app.teardown_appcontext(self.close_connection())
 
@@ -158,8 +235,14 @@ class SQLite3Connector(DatabaseConnector):
                 # Set up the SQLAlchemy Database to be a local file 'posts.db'
                 self.app.config['SQLALCHEMY_DATABASE_URI'] = self.db_uri
                 # SQLAlchemy DB Creation
-                self.engine = createEngine(self.db_uri, debug=True)
-                createDatabase(self.engine)
+                self.engine = createEngine(self.db_uri, **self._poolOptions())
+                self.cacheStats = CompiledCacheStats().attach(self.engine)
+                self._init_advisor()
+                self._init_router()
+                self._init_diagnostics()
+                # the tables are created by the 'init-db' command, not on the startup of every worker
+                if self.app.config.get("DB_CREATE_ALL"):
+                    self.create_all()
 
             else:
                 """Initializes the SQLite Database"""
@@ -177,6 +260,69 @@ class SQLite3Connector(DatabaseConnector):
                     # close the connection
                     self.close_connection()
 
+    def _poolOptions(self) -> dict:
+        """Returns the engine's options of the app's config"""
+        return {
+            "debug": self.app.config.get("DB_ECHO", False),
+            "poolSize": self.app.config.get("DB_POOL_SIZE", 5),
+            "maxOverflow": self.app.config.get("DB_MAX_OVERFLOW", 10),
+        }
+
+    def _init_advisor(self):
+        """Attaches the query plan advisor to the engine, if enabled and not in production"""
+        if self.app.config.get("QUERY_ADVISOR_ENABLED") and not EnvType.is_production(EnvType.get_env_type()):
+            thresholdMillis = self.app.config.get("SLOW_QUERY_THRESHOLD_MS", 100)
+            current_app.logger.debug(f"Attaching query plan advisor, thresholdMillis={thresholdMillis}")
+            self.advisor = QueryPlanAdvisor(thresholdMillis=thresholdMillis).attach(self.engine)
+
+    def _init_diagnostics(self):
+        """Attaches the query diagnostics to the engines (the statements per request, the N+1 suspects and the slow
+        statements), if enabled and not in production"""
+        if self.app.config.get("QUERY_DIAGNOSTICS_ENABLED") and not EnvType.is_production(EnvType.get_env_type()):
+            self.diagnostics = QueryDiagnostics(thresholdMillis=self.app.config.get("SLOW_QUERY_THRESHOLD_MS", 100),
+                                                nPlusOneThreshold=self.app.config.get("N_PLUS_ONE_THRESHOLD", 5))
+            for engine in [self.engine, *self.router.replicas]:
+                self.diagnostics.attach(engine)
+
+            self.app.before_request(self.diagnostics.startRequest)
+            self.app.teardown_request(self.diagnostics.endRequest)
+            current_app.logger.debug(f"diagnostics={self.diagnostics}")
+
+    def _init_router(self):
+        """Initializes the primary/read-replica engines router"""
+        replicas = []
+        replicaNames = self.app.config.get("DB_REPLICAS")
+        if replicaNames:
+            for replicaName in [name.strip() for name in replicaNames.split(",") if name.strip()]:
+                if not replicaName.endswith(".db"):
+                    replicaName = '.'.join([replicaName, "db"])
+                replicas.append(createEngine(''.join([SQLITE_PREFIX, replicaName]), **self._poolOptions()))
+
+        policy = ReplicaPolicy.of_name(self.app.config.get("DB_REPLICA_POLICY") or ReplicaPolicy.ROUND_ROBIN.name)
+        self.router = EngineRouter(self.engine, replicas, policy)
+        # the read-your-writes pin lasts for a request
+        self.app.teardown_request(EngineRouter.resetPin)
+        current_app.logger.debug(f"router={self.router}")
+
+    def create_all(self):
+        """Creates the missing tables of the database and its read-replicas"""
+        current_app.logger.debug(f"+create_all(), engine={self.engine}")
+        for engine in [self.engine, *(self.router.replicas if self.router else [])]:
+            createDatabase(engine)
+
+        current_app.logger.debug("-create_all()")
+
+    def dispose(self):
+        """Drops the pooled connections inherited from the parent process (i.e. a gunicorn worker forked from the
+        preloaded app), without closing them for the parent, so each worker opens its own"""
+        for engine in [self.engine, *(self.router.replicas if self.router else [])]:
+            if engine is not None:
+                engine.dispose(close=False)
+
+    def compiledCacheStats(self) -> dict:
+        """Returns the engine's compiled cache stats"""
+        return self.cacheStats.stats() if self.cacheStats else {}
+
     def open_connection(self):
         """Opens the database connection"""
         with self.app.app_context():
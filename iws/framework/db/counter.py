@@ -0,0 +1,145 @@
+#
+# Author: Rohtash Lakra
+# Reference:
+# - https://www.sqlite.org/lang_createtrigger.html
+#
+import logging
+from typing import Dict, Optional
+
+from sqlalchemy import Connection, Table, event, inspect
+from sqlalchemy.schema import CreateColumn
+
+logger = logging.getLogger(__name__)
+
+# the counters of the metadata by their names, i.e. for the bulk loads to pause their triggers
+CHILD_COUNTERS = "childCounters"
+
+
+class ChildCounter(object):
+    """ChildCounter keeps the count of a parent's child rows (and the time of the latest one) in the parent's own
+    columns, i.e. the 'comment_count' and the 'last_comment_at' of a post, so listing the parents doesn't read their
+    children.
+
+    The columns are maintained by the triggers of the child table's inserts, deletes and moves (an update of the
+    foreign key or of the time), in the transaction of the statement changing the child rows, whoever writes them (the
+    ORM, a bulk statement or the SQL shell). A delete recounts the latest time from the children of the parent, a
+    range of the index starting with the foreign key and the time.
+
+    The triggers are created by 'MetaData.create_all()' (i.e. 'flask init-db'), after the tables, and the counters are
+    recounted when their triggers are created for a child table already having some rows. The columns are added to a
+    parent table created before them ('ALTER TABLE ... ADD COLUMN', 'create_all()' doesn't alter the existing tables).
+
+    Only SQLite triggers are created, the other dialects skip the counter.
+    """
+
+    def __init__(self, parent: Table, child: Table, foreignKey: str, countColumn: str,
+                 latestColumn: Optional[str] = None, timeColumn: str = "created_at"):
+        for table, name in ((parent, countColumn), (parent, latestColumn), (child, foreignKey), (child, timeColumn)):
+            if name is not None and name not in table.columns:
+                raise ValueError(f"The table '{table.name}' has no column '{name}'!")
+
+        self.parent = parent
+        self.child = child
+        self.foreignKey = foreignKey
+        self.countColumn = countColumn
+        self.latestColumn = latestColumn
+        self.timeColumn = timeColumn
+        self.name = f"{child.name}_{countColumn}"
+        self.key = parent.primary_key.columns.values()[0].name
+        event.listen(parent.metadata, "after_create", self._afterCreate)
+        parent.metadata.info.setdefault(CHILD_COUNTERS, {})[self.name] = self
+
+    def __str__(self):
+        """Returns the string representation of this object"""
+        return (f"{self.__class__.__name__} <name={self.name}, parent={self.parent.name}, child={self.child.name}, "
+                f"foreignKey={self.foreignKey}, countColumn={self.countColumn}, latestColumn={self.latestColumn}>")
+
+    def __repr__(self):
+        """Returns the string representation of this object"""
+        return str(self)
+
+    @staticmethod
+    def ofMetadata(metadata) -> Dict[str, "ChildCounter"]:
+        """Returns the counters of the metadata by their names"""
+        return metadata.info.get(CHILD_COUNTERS, {})
+
+    @staticmethod
+    def isSupported(connection: Connection) -> bool:
+        return connection.dialect.name == "sqlite"
+
+    def exists(self, connection: Connection) -> bool:
+        """Returns True if the triggers of the counter exist"""
+        return connection.exec_driver_sql("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = ?",
+                                          (f"{self.name}_insert",)).first() is not None
+
+    def create(self, connection: Connection) -> bool:
+        """Creates the triggers if missing, returns True if they are created"""
+        if not self.isSupported(connection):
+            return False
+
+        added = self.addColumns(connection)
+        created = not self.exists(connection)
+        if (added or created) and connection.exec_driver_sql(f"SELECT 1 FROM {self.child.name} LIMIT 1").first():
+            self.recount(connection)
+
+        self.createTriggers(connection)
+        logger.debug(f"create(), counter={self}, created={created}")
+        return created
+
+    def addColumns(self, connection: Connection) -> bool:
+        """Adds the counter's columns missing in the parent table (with their defaults), returns True if any is added"""
+        existing = {column["name"] for column in inspect(connection).get_columns(self.parent.name)}
+        missing = [name for name in (self.countColumn, self.latestColumn) if name and name not in existing]
+        for name in missing:
+            definition = CreateColumn(self.parent.columns[name]).compile(dialect=connection.dialect)
+            connection.exec_driver_sql(f"ALTER TABLE {self.parent.name} ADD COLUMN {definition}")
+            logger.info(f"Added the column '{name}' to the table '{self.parent.name}'.")
+
+        return bool(missing)
+
+    def _latest(self, parentKey: str) -> str:
+        """Returns the 'SET' of the latest time of the children of the parent's key (i.e. 'old.post_id')"""
+        if not self.latestColumn:
+            return ""
+
+        return (f", {self.latestColumn} = (SELECT MAX({self.timeColumn}) FROM {self.child.name} "
+                f"WHERE {self.foreignKey} = {parentKey})")
+
+    def createTriggers(self, connection: Connection) -> None:
+        """Creates the triggers counting the inserted, the deleted and the moved children of the parents"""
+        parent, child, foreignKey, count = self.parent.name, self.child.name, self.foreignKey, self.countColumn
+        # an insert is the latest child, unless it's dated earlier than the parent's latest one
+        latest = (f", {self.latestColumn} = CASE WHEN {self.latestColumn} IS NULL OR {self.latestColumn} < "
+                  f"new.{self.timeColumn} THEN new.{self.timeColumn} ELSE {self.latestColumn} END"
+                  if self.latestColumn else "")
+        connection.exec_driver_sql(
+            f"CREATE TRIGGER IF NOT EXISTS {self.name}_insert AFTER INSERT ON {child} BEGIN "
+            f"UPDATE {parent} SET {count} = {count} + 1{latest} WHERE {self.key} = new.{foreignKey}; END")
+        # a delete recounts the latest time of the parent, the deleted child may have been its latest one
+        decrement = f"{count} = {count} - 1{self._latest(f'old.{foreignKey}')} WHERE {self.key} = old.{foreignKey}"
+        connection.exec_driver_sql(
+            f"CREATE TRIGGER IF NOT EXISTS {self.name}_delete AFTER DELETE ON {child} BEGIN "
+            f"UPDATE {parent} SET {decrement}; END")
+        # a child moved to another parent (or re-dated) is a delete from the old parent and an insert in the new one
+        increment = f"{count} = {count} + 1{self._latest(f'new.{foreignKey}')} WHERE {self.key} = new.{foreignKey}"
+        moved = f"{foreignKey}, {self.timeColumn}" if self.latestColumn else foreignKey
+        connection.exec_driver_sql(
+            f"CREATE TRIGGER IF NOT EXISTS {self.name}_update AFTER UPDATE OF {moved} ON {child} BEGIN "
+            f"UPDATE {parent} SET {decrement}; UPDATE {parent} SET {increment}; END")
+
+    def dropTriggers(self, connection: Connection) -> None:
+        """Drops the triggers, i.e. for a bulk load followed by a 'recount()'"""
+        for name in ("insert", "delete", "update"):
+            connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {self.name}_{name}")
+
+    def recount(self, connection: Connection) -> None:
+        """Recounts the children of all the parents, a range of the child table's foreign key index per parent"""
+        latest = self._latest(f"{self.parent.name}.{self.key}")
+        connection.exec_driver_sql(
+            f"UPDATE {self.parent.name} SET {self.countColumn} = (SELECT COUNT(*) FROM {self.child.name} "
+            f"WHERE {self.foreignKey} = {self.parent.name}.{self.key}){latest}")
+
+    def _afterCreate(self, target, connection: Connection, **kwargs) -> None:
+        # the metadata's event fires on every 'create_all()', the tables' own only when they are created
+        if self.isSupported(connection):
+            self.create(connection)
@@ -0,0 +1,203 @@
+#
+# Author: Rohtash Lakra
+#
+import logging
+import re
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Iterator, List, Tuple
+
+from flask import g, request
+from sqlalchemy import Engine, event
+
+from framework.logger import SensitiveDataFilter
+
+logger = logging.getLogger(__name__)
+
+# the literals, the expanded 'IN (?, ?, ?)' lists and the whitespaces do not change the shape of a statement
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL = re.compile(r"(?<![\w.])\d+(?:\.\d+)?\b")
+PARAMETER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+WHITESPACES = re.compile(r"\s+")
+# the bound parameters are named after their columns, i.e. 'email_1' for 'email'
+PARAMETER_SUFFIX = re.compile(r"_\d+$")
+MASK = "******"
+
+
+def statementShape(statement: str) -> str:
+    """Returns the shape of the statement, the same for the statements differing only by their values"""
+    shape = STRING_LITERAL.sub("?", statement)
+    shape = NUMBER_LITERAL.sub("?", shape)
+    shape = PARAMETER_LIST.sub("(?)", shape)
+    return WHITESPACES.sub(" ", shape).strip()
+
+
+def maskParameters(context, parameters) -> Any:
+    """Returns the bound parameters by their names with the sensitive values masked, or all the values masked when
+    their names are not known (i.e. a raw or an 'executemany' statement)"""
+    if isinstance(parameters, dict):
+        names, values = list(parameters.keys()), list(parameters.values())
+    else:
+        compiled = getattr(context, "compiled", None)
+        names = list(getattr(compiled, "positiontup", None) or [])
+        values = list(parameters or ())
+        if len(names) != len(values):
+            return [MASK] * len(values)
+
+    sensitiveDataFilter = SensitiveDataFilter()
+    masked = {}
+    for name, value in zip(names, values):
+        key = PARAMETER_SUFFIX.sub("", name)
+        masked[name] = sensitiveDataFilter.mask_sensitive_args({key: value})[key]
+
+    return masked
+
+
+@dataclass
+class QueryCounter:
+    """QueryCounter holds the statements (by their shapes) executed within a scope, i.e. a request or a test"""
+    statements: List[Tuple[str, float]] = field(default_factory=list)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def elapsedMillis(self) -> float:
+        return sum(elapsedMillis for _, elapsedMillis in self.statements)
+
+    def record(self, shape: str, elapsedMillis: float) -> None:
+        self.statements.append((shape, elapsedMillis))
+
+    def shapes(self) -> Counter:
+        """Returns the executions per statement shape"""
+        return Counter(shape for shape, _ in self.statements)
+
+    def suspects(self, threshold: int) -> List[Tuple[str, int]]:
+        """Returns the shapes executed at least 'threshold' times, the N+1 suspects (i.e. a query per row of a
+        previous query)"""
+        return [(shape, count) for shape, count in self.shapes().most_common() if count >= threshold]
+
+
+@dataclass
+class RequestQueryReport:
+    """RequestQueryReport holds the statements' count of a request and its N+1 suspects"""
+    endpoint: str
+    count: int
+    elapsedMillis: float
+    suspects: List[Tuple[str, int]] = field(default_factory=list)
+
+
+class QueryDiagnostics(object):
+    """QueryDiagnostics is a development aid that listens to the engine's cursor events, counts the statements of
+    every request, reports the statement shapes repeated within a request as N+1 suspects and logs the statements
+    slower than the threshold with their bound parameters masked.
+
+    The statements are counted into the counters active in the current context, so the requests of concurrent threads
+    (or tasks) are counted apart. It must not be enabled in production as it keeps every statement of a request.
+    """
+
+    KEY_START_TIMES = "diagnostics_start_times"
+
+    def __init__(self, thresholdMillis: float = 100, nPlusOneThreshold: int = 5, maxReports: int = 100):
+        self.thresholdMillis = thresholdMillis
+        self.nPlusOneThreshold = nPlusOneThreshold
+        self.reports = deque(maxlen=maxReports)
+        self.engines: List[Engine] = []
+        self._counters: ContextVar[Tuple[QueryCounter, ...]] = ContextVar(f"queryCounters{id(self)}", default=())
+
+    def __str__(self):
+        """Returns the string representation of this object"""
+        return (f"{self.__class__.__name__} <thresholdMillis={self.thresholdMillis}, "
+                f"nPlusOneThreshold={self.nPlusOneThreshold}, engines={len(self.engines)}>")
+
+    def __repr__(self):
+        """Returns the string representation of this object"""
+        return str(self)
+
+    def attach(self, engine: Engine) -> "QueryDiagnostics":
+        """Attaches the diagnostics to the engine, an instance may diagnose many engines (i.e. the read-replicas)"""
+        logger.debug(f"+attach({engine}), thresholdMillis={self.thresholdMillis}")
+        event.listen(engine, "before_cursor_execute", self._beforeCursorExecute)
+        event.listen(engine, "after_cursor_execute", self._afterCursorExecute)
+        self.engines.append(engine)
+        logger.debug(f"-attach()")
+        return self
+
+    def detach(self):
+        """Detaches the diagnostics from the engines"""
+        for engine in self.engines:
+            event.remove(engine, "before_cursor_execute", self._beforeCursorExecute)
+            event.remove(engine, "after_cursor_execute", self._afterCursorExecute)
+
+        self.engines = []
+
+    def _beforeCursorExecute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault(self.KEY_START_TIMES, []).append(time.perf_counter())
+
+    def _afterCursorExecute(self, conn, cursor, statement, parameters, context, executemany):
+        startTimes = conn.info.get(self.KEY_START_TIMES)
+        if not startTimes:
+            return
+
+        elapsedMillis = (time.perf_counter() - startTimes.pop()) * 1000
+        counters = self._counters.get()
+        if counters:
+            shape = statementShape(statement)
+            for counter in counters:
+                counter.record(shape, elapsedMillis)
+
+        if elapsedMillis >= self.thresholdMillis:
+            logger.warning(f"Slow query [{elapsedMillis:.2f} ms]: {statement}, "
+                           f"parameters={maskParameters(context, parameters)}")
+
+    @contextmanager
+    def track(self) -> Iterator[QueryCounter]:
+        """Counts the statements executed within the scope (and the current context)"""
+        counter = QueryCounter()
+        token = self._counters.set((*self._counters.get(), counter))
+        try:
+            yield counter
+        finally:
+            self._counters.reset(token)
+
+    def startRequest(self) -> None:
+        counter = QueryCounter()
+        self._counters.set((*self._counters.get(), counter))
+        g.queryCounter = counter
+
+    def endRequest(self, error=None) -> None:
+        counter = g.pop("queryCounter", None)
+        if counter is None:
+            return
+
+        self._counters.set(tuple(active for active in self._counters.get() if active is not counter))
+        report = RequestQueryReport(endpoint=f"{request.method} {request.path}", count=counter.count,
+                                    elapsedMillis=counter.elapsedMillis(),
+                                    suspects=counter.suspects(self.nPlusOneThreshold))
+        self.reports.append(report)
+        logger.debug(f"[{report.endpoint}] executed [{report.count}] statements in {report.elapsedMillis:.2f} ms")
+        for shape, count in report.suspects:
+            logger.warning(f"N+1 suspect on [{report.endpoint}], executed [{count}] times: {shape}")
+
+    def getSuspects(self) -> List[RequestQueryReport]:
+        """Returns the reports of the requests with N+1 suspects"""
+        return [report for report in self.reports if report.suspects]
+
+    def clear(self):
+        """Clears the reports"""
+        self.reports.clear()
+
+
+@contextmanager
+def trackQueries(engine: Engine) -> Iterator[QueryCounter]:
+    """Counts the statements executed on the engine within the scope, i.e. to pin the query budget of an endpoint in
+    a test"""
+    diagnostics = QueryDiagnostics(thresholdMillis=float("inf")).attach(engine)
+    try:
+        with diagnostics.track() as counter:
+            yield counter
+    finally:
+        diagnostics.detach()
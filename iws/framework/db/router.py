@@ -0,0 +1,161 @@
+#
+# Author: Rohtash Lakra
+#
+import logging
+import sqlite3
+import threading
+from contextlib import closing, contextmanager
+from contextvars import ContextVar
+from enum import auto, unique
+from typing import Dict, List, Optional
+
+from sqlalchemy import Engine, event
+
+from framework.enums import AutoLowerCase
+
+logger = logging.getLogger(__name__)
+
+# the read-your-writes pin of the current request/thread, set on the first write
+_pinned: ContextVar[bool] = ContextVar("pinned", default=False)
+# set while a write unit-of-work is in progress
+_writing: ContextVar[bool] = ContextVar("writing", default=False)
+# the replica of the current request, once its reads must see the same one (i.e. the table versions and the rows)
+_replica: ContextVar[Optional[Engine]] = ContextVar("replica", default=None)
+# the statements which do not pin the request to the primary
+READ_ONLY_PREFIXES = ("SELECT", "WITH", "PRAGMA", "EXPLAIN")
+
+
+@unique
+class ReplicaPolicy(AutoLowerCase):
+    """ReplicaPolicy represents how the read engine is selected"""
+    ROUND_ROBIN = auto()
+    LEAST_LOADED = auto()
+
+
+class EngineRouter(object):
+    """EngineRouter routes the read-only queries to the replica engines and everything else to the primary engine.
+
+    - the reads are balanced across the replicas based on the policy (round-robin or least-loaded connections).
+    - the reads inside a write unit-of-work go to the primary.
+    - after a write, the reads of the same request are pinned to the primary (read-your-writes).
+    - 'pinReadEngine()' keeps the rest of the request's reads on one replica.
+    """
+
+    def __init__(self, primary: Engine, replicas: List[Engine] = None,
+                 policy: ReplicaPolicy = ReplicaPolicy.ROUND_ROBIN):
+        self.primary = primary
+        self.replicas = list(replicas) if replicas else []
+        self.policy = policy or ReplicaPolicy.ROUND_ROBIN
+        self._lock = threading.Lock()
+        self._next = 0
+        self.inFlight: Dict[int, int] = {id(engine): 0 for engine in self.replicas}
+
+        # any INSERT/UPDATE/DELETE on the primary pins the rest of the request to it
+        event.listen(self.primary, "after_cursor_execute", self._afterCursorExecute)
+        for replica in self.replicas:
+            event.listen(replica.pool, "checkout", self._checkout(replica))
+            event.listen(replica.pool, "checkin", self._checkin(replica))
+
+    def __str__(self):
+        """Returns the string representation of this object"""
+        return f"{self.__class__.__name__} <primary={self.primary}, replicas={self.replicas}, policy={self.policy}>"
+
+    def __repr__(self):
+        """Returns the string representation of this object"""
+        return str(self)
+
+    def _checkout(self, replica: Engine):
+        def checkout(dbapiConnection, connectionRecord, connectionProxy):
+            with self._lock:
+                self.inFlight[id(replica)] += 1
+
+        return checkout
+
+    def _checkin(self, replica: Engine):
+        def checkin(dbapiConnection, connectionRecord):
+            with self._lock:
+                self.inFlight[id(replica)] = max(0, self.inFlight[id(replica)] - 1)
+
+        return checkin
+
+    def _afterCursorExecute(self, conn, cursor, statement, parameters, context, executemany):
+        if self.isWrite(statement, context):
+            self.pinPrimary()
+
+    @staticmethod
+    def isWrite(statement: str, context) -> bool:
+        """Returns true if the statement modifies the data (compiled or textual SQL)"""
+        if context is not None and (context.isinsert or context.isupdate or context.isdelete):
+            return True
+
+        return not statement.lstrip().upper().startswith(READ_ONLY_PREFIXES)
+
+    @staticmethod
+    def pinPrimary():
+        """Pins the reads of the current request to the primary"""
+        _pinned.set(True)
+
+    @staticmethod
+    def resetPin(exception=None):
+        """Resets the read-your-writes and the replica pins, called at the end of each request"""
+        _pinned.set(False)
+        _replica.set(None)
+
+    @staticmethod
+    def isPinned() -> bool:
+        """Returns true if the reads of the current request are pinned to the primary"""
+        return _pinned.get() or _writing.get()
+
+    @contextmanager
+    def writeUnitOfWork(self):
+        """All the reads inside the block go to the primary and the request is pinned afterward"""
+        token = _writing.set(True)
+        try:
+            yield self.primary
+        finally:
+            _writing.reset(token)
+            self.pinPrimary()
+
+    def writeEngine(self) -> Engine:
+        """Returns the engine of the writes"""
+        return self.primary
+
+    def readEngine(self) -> Engine:
+        """Returns the engine of the read-only queries"""
+        if not self.replicas or self.isPinned():
+            return self.primary
+
+        replica = _replica.get()
+        if replica is not None:
+            return replica
+
+        with self._lock:
+            if self.policy == ReplicaPolicy.LEAST_LOADED:
+                # ties are broken in the round-robin order
+                offset = self._next
+                self._next = (self._next + 1) % len(self.replicas)
+                ordered = self.replicas[offset:] + self.replicas[:offset]
+                return min(ordered, key=lambda replica: self.inFlight[id(replica)])
+
+            replica = self.replicas[self._next]
+            self._next = (self._next + 1) % len(self.replicas)
+            return replica
+
+    def pinReadEngine(self) -> Engine:
+        """Returns the read engine and pins the rest of the request's reads to it, until a write pins the primary"""
+        engine = self.readEngine()
+        if engine is not self.primary:
+            _replica.set(engine)
+
+        return engine
+
+    def syncReplicas(self):
+        """Copies the primary database into each replica (local testing with SQLite files only)"""
+        logger.debug(f"+syncReplicas()")
+        primaryFile = self.primary.url.database
+        for replica in self.replicas:
+            with closing(sqlite3.connect(primaryFile)) as source:
+                with closing(sqlite3.connect(replica.url.database)) as target:
+                    source.backup(target)
+
+        logger.debug(f"-syncReplicas(), replicas={len(self.replicas)}")
@@ -0,0 +1,190 @@
+#
+# Author: Rohtash Lakra
+# Reference:
+# - https://www.sqlite.org/fts5.html#external_content_tables
+# - https://www.sqlite.org/fts5.html#the_bm25_function
+#
+import html
+import logging
+import re
+from enum import auto, unique
+from typing import Dict, Optional, Sequence
+
+from sqlalchemy import Connection, Float, String, Table, TextualSelect, column, event, text
+
+from framework.enums import AutoLowerCase
+
+logger = logging.getLogger(__name__)
+
+# the full-text indexes of the metadata by their tables' names, i.e. for the bulk loads to pause their triggers
+FULL_TEXT_INDEXES = "fullTextIndexes"
+# the terms of a query, the rest (the quotes, the operators and the column filters) is not the user's to write
+QUERY_TERMS = re.compile(r"(\w+)(\*?)")
+# the terms beyond are ignored, every term is one more posting list to intersect
+MAX_QUERY_TERMS = 16
+# the marks of the matched terms in the snippets, replaced after the snippet's text is escaped
+MARK_START, MARK_END = "\x02", "\x03"
+
+
+@unique
+class SearchOrder(AutoLowerCase):
+    """SearchOrder represents the orders of the matches: their relevance (bm25) or the newest first"""
+    RANK = auto()
+    NEWEST = auto()
+
+
+def highlight(snippet: Optional[str]) -> Optional[str]:
+    """Returns the HTML of the snippet, its text is escaped and its matched terms are in '<mark>' tags"""
+    if snippet is None:
+        return None
+
+    return html.escape(snippet).replace(MARK_START, "<mark>").replace(MARK_END, "</mark>")
+
+
+class FullTextIndex(object):
+    """FullTextIndex mirrors the text columns of a table in an SQLite FTS5 'external content' table (the texts are
+    not copied, only their terms are indexed), kept in sync by the triggers of the table's inserts, updates and deletes.
+
+    The index is created by 'MetaData.create_all()' (i.e. 'flask init-db'), after the table, and is built from the
+    table's rows when it's created for a table already having some. The matches are ranked by 'bm25()' with the
+    columns' weights (i.e. a term in the title counts more than one in the content).
+
+    The 'prefix' indexes the first 2 and 3 characters of the terms, so the prefix queries ('data*') are index lookups,
+    not scans of the terms.
+
+    Only SQLite has FTS5, the other dialects skip the index.
+    """
+
+    def __init__(self, table: Table, columns: Sequence[str], weights: Optional[Sequence[float]] = None,
+                 tokenizer: str = "unicode61 remove_diacritics 2", prefix: str = "2 3"):
+        self.table = table
+        self.columns = tuple(columns)
+        self.weights = tuple(weights or [1.0] * len(self.columns))
+        if len(self.weights) != len(self.columns):
+            raise ValueError(f"The weights {self.weights} don't match the columns {self.columns}!")
+
+        self.tokenizer = tokenizer
+        self.prefix = prefix
+        self.name = f"{table.name}_fts"
+        self.key = table.primary_key.columns.values()[0].name
+        event.listen(table.metadata, "after_create", self._afterCreate)
+        table.metadata.info.setdefault(FULL_TEXT_INDEXES, {})[table.name] = self
+
+    def __str__(self):
+        """Returns the string representation of this object"""
+        return (f"{self.__class__.__name__} <name={self.name}, columns={self.columns}, weights={self.weights}, "
+                f"tokenizer={self.tokenizer}, prefix={self.prefix}>")
+
+    def __repr__(self):
+        """Returns the string representation of this object"""
+        return str(self)
+
+    @staticmethod
+    def ofMetadata(metadata) -> Dict[str, "FullTextIndex"]:
+        """Returns the full-text indexes of the metadata by their tables' names"""
+        return metadata.info.get(FULL_TEXT_INDEXES, {})
+
+    @staticmethod
+    def isSupported(connection: Connection) -> bool:
+        return connection.dialect.name == "sqlite"
+
+    def exists(self, connection: Connection) -> bool:
+        return connection.exec_driver_sql("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                          (self.name,)).first() is not None
+
+    def create(self, connection: Connection) -> bool:
+        """Creates the index and its triggers if missing, returns True if the index is created"""
+        if not self.isSupported(connection):
+            return False
+
+        created = not self.exists(connection)
+        if created:
+            columns = ", ".join(self.columns)
+            connection.exec_driver_sql(
+                f"CREATE VIRTUAL TABLE {self.name} USING fts5({columns}, content='{self.table.name}', "
+                f"content_rowid='{self.key}', tokenize='{self.tokenizer}', prefix='{self.prefix}')")
+            # the default ranking of 'ORDER BY rank', it's persisted in the index's config
+            weights = ", ".join(str(float(weight)) for weight in self.weights)
+            connection.exec_driver_sql(f"INSERT INTO {self.name}({self.name}, rank) VALUES ('rank', 'bm25({weights})')")
+            if connection.exec_driver_sql(f"SELECT 1 FROM {self.table.name} LIMIT 1").first() is not None:
+                self.rebuild(connection)
+
+        self.createTriggers(connection)
+        logger.debug(f"create(), index={self}, created={created}")
+        return created
+
+    def createTriggers(self, connection: Connection) -> None:
+        """Creates the triggers keeping the index in sync with the table, an update deletes the old terms first"""
+        table, key = self.table.name, self.key
+        columns = ", ".join(self.columns)
+        newValues = ", ".join(f"new.{column}" for column in self.columns)
+        oldValues = ", ".join(f"old.{column}" for column in self.columns)
+        # the updates of the other columns (i.e. 'updated_at') don't touch the index
+        updated = ", ".join(self.columns)
+        connection.exec_driver_sql(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {self.name}(rowid, {columns}) VALUES (new.{key}, {newValues}); END")
+        connection.exec_driver_sql(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {self.name}({self.name}, rowid, {columns}) VALUES ('delete', old.{key}, {oldValues}); END")
+        connection.exec_driver_sql(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_fts_update AFTER UPDATE OF {updated} ON {table} BEGIN "
+            f"INSERT INTO {self.name}({self.name}, rowid, {columns}) VALUES ('delete', old.{key}, {oldValues}); "
+            f"INSERT INTO {self.name}(rowid, {columns}) VALUES (new.{key}, {newValues}); END")
+
+    def dropTriggers(self, connection: Connection) -> None:
+        """Drops the triggers, i.e. for a bulk load followed by a 'rebuild()'"""
+        for name in ("insert", "delete", "update"):
+            connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {self.table.name}_fts_{name}")
+
+    def rebuild(self, connection: Connection) -> None:
+        """Rebuilds the index from the table's rows"""
+        connection.exec_driver_sql(f"INSERT INTO {self.name}({self.name}) VALUES ('rebuild')")
+
+    def optimize(self, connection: Connection) -> None:
+        """Merges the b-trees of the index into one, the queries read a posting list per term instead of one per
+        b-tree (the segments of every flush)"""
+        connection.exec_driver_sql(f"INSERT INTO {self.name}({self.name}) VALUES ('optimize')")
+
+    def deleteAll(self, connection: Connection) -> None:
+        """Deletes the whole index, i.e. after deleting all the table's rows without the triggers"""
+        connection.exec_driver_sql(f"INSERT INTO {self.name}({self.name}) VALUES ('delete-all')")
+
+    @staticmethod
+    def matchExpression(query: Optional[str]) -> Optional[str]:
+        """Returns the FTS5 expression matching all the query's terms (a trailing '*' matches a prefix), or None
+        without any term.
+
+        The terms are quoted, so the query's text can't use the FTS5 syntax (i.e. 'NEAR', 'OR' or 'title:').
+        """
+        terms = [f'"{term}"{star}' for term, star in QUERY_TERMS.findall(query or "")[:MAX_QUERY_TERMS]]
+        return " ".join(terms) or None
+
+    def searchStatement(self, order: SearchOrder = SearchOrder.RANK, snippetColumn: Optional[str] = None,
+                        snippetTokens: int = 12, candidates: bool = False) -> TextualSelect:
+        """Returns the statement of the table's rows matching ':query', with their 'snippet' (of the matched terms) and
+        their 'rank' (the lower, the better), paged by ':limit' and ':offset'.
+
+        The 'NEWEST' order walks the matches by their descending keys and stops at the page, without their ranks (the
+        'bm25()' weights of the terms count all their matches). The 'RANK' order scores all the matches first, or only
+        the ':candidates' newest ones with 'candidates' (a range of the keys the index seeks to, the cost of a page is
+        bounded whatever the matches of its terms).
+        """
+        # without a column, the snippet is of the column matching the most terms
+        snippetIndex = self.columns.index(snippetColumn) if snippetColumn else -1
+        rank, orderBy = ("fts.rank", "fts.rank") if order == SearchOrder.RANK else ("NULL", "fts.rowid DESC")
+        # the table's columns by their names, the textual columns are matched by their positions (a column added by
+        # 'ALTER TABLE' is the table's last one, not the schema's)
+        columns = ", ".join(f"t.{column.name}" for column in self.table.columns)
+        newest = (f"AND fts.rowid >= (SELECT MIN(rowid) FROM (SELECT rowid FROM {self.name} WHERE {self.name} MATCH "
+                  f":query ORDER BY rowid DESC LIMIT :candidates)) " if candidates and order == SearchOrder.RANK else "")
+        return text(f"SELECT {columns}, snippet({self.name}, {snippetIndex}, '{MARK_START}', '{MARK_END}', '…', "
+                    f"{snippetTokens}) AS snippet, {rank} AS rank "
+                    f"FROM {self.name} AS fts JOIN {self.table.name} AS t ON t.{self.key} = fts.rowid "
+                    f"WHERE {self.name} MATCH :query {newest}ORDER BY {orderBy} LIMIT :limit OFFSET :offset"
+                    ).columns(*self.table.columns, column("snippet", String), column("rank", Float))
+
+    def _afterCreate(self, target, connection: Connection, **kwargs) -> None:
+        # the metadata's event fires on every 'create_all()', the table's own only when the table is created
+        if self.isSupported(connection):
+            self.create(connection)
@@ -0,0 +1,424 @@
+#
+# Author: Rohtash Lakra
+#
+import logging
+import time
+from array import array
+from bisect import bisect
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from itertools import accumulate
+from operator import itemgetter
+from random import Random
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
+
+from sqlalchemy import Connection, Engine, Table, delete, func, insert, select
+
+from framework.db.counter import ChildCounter
+from framework.db.search import FullTextIndex
+from framework.orm.sqlalchemy.schema import BaseSchema
+from framework.security.password import getPasswordHasher
+
+logger = logging.getLogger(__name__)
+
+# the seeded tables in their insert order (the parents first)
+SEEDED_TABLES = ("roles", "permissions", "role_permissions", "users", "user_securities", "user_roles", "addresses",
+                 "companies", "posts", "attachments", "comments")
+
+# every seeded user logs in with this password
+PASSWORD = "Password@123"
+# the seeded rows are dated between 'STARTED_AT' and 'STARTED_AT + PERIOD', not on the clock, to be reproducible
+STARTED_AT = datetime(2023, 1, 1)
+PERIOD = timedelta(days=730)
+# the distinct titles and contents of the posts and the comments
+TEXTS_POOL_SIZE = 4096
+
+FIRST_NAMES = ("James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda", "David", "Elizabeth",
+               "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Charles", "Karen",
+               "Rohtash", "Priya", "Arjun", "Ananya", "Wei", "Mei", "Hiroshi", "Yuki", "Carlos", "Sofia", "Ahmed",
+               "Fatima", "Olga", "Ivan", "Lars", "Ingrid", "Kwame", "Amara", "Diego", "Lucia")
+LAST_NAMES = ("Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
+              "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Martin",
+              "Lakra", "Sharma", "Patel", "Singh", "Wang", "Li", "Tanaka", "Sato", "Silva", "Rossi", "Khan", "Ali",
+              "Ivanova", "Petrov", "Larsen", "Berg", "Mensah", "Okafor", "Ruiz", "Fernandez")
+# (city, state, country)
+CITIES = (("San Francisco", "CA", "United States"), ("New York", "NY", "United States"),
+          ("Austin", "TX", "United States"), ("Seattle", "WA", "United States"), ("Chicago", "IL", "United States"),
+          ("Toronto", "ON", "Canada"), ("Vancouver", "BC", "Canada"), ("London", "England", "United Kingdom"),
+          ("Manchester", "England", "United Kingdom"), ("Berlin", "Berlin", "Germany"),
+          ("Munich", "Bavaria", "Germany"),
+          ("Paris", "Ile-de-France", "France"), ("Bengaluru", "Karnataka", "India"), ("Delhi", "Delhi", "India"),
+          ("Mumbai", "Maharashtra", "India"), ("Tokyo", "Tokyo", "Japan"), ("Sydney", "NSW", "Australia"),
+          ("Sao Paulo", "SP", "Brazil"))
+STREETS = ("Main St", "Oak Ave", "Pine St", "Maple Ave", "Cedar Rd", "Elm St", "Lake View Dr", "Park Ave", "Hill Rd",
+           "Sunset Blvd", "Market St", "Church St")
+WORDS = ("performance", "database", "python", "flask", "cache", "index", "query", "latency", "throughput", "design",
+         "release", "review", "deploy", "metrics", "scaling", "security", "testing", "pattern", "service", "feature",
+         "team", "product", "customer", "update", "journey", "lesson", "weekend", "travel", "recipe", "garden")
+COMPANY_PREFIXES = ("Acme", "Globex", "Initech", "Umbrella", "Stark", "Wayne", "Wonka", "Tyrell", "Cyberdyne",
+                    "Soylent", "Hooli", "Vandelay", "Pied Piper", "Aperture", "Massive Dynamic", "Oscorp")
+COMPANY_SUFFIXES = ("Labs", "Systems", "Industries", "Holdings", "Group", "Technologies", "Partners", "Works")
+ATTACHMENT_TYPES = ("png", "jpg", "pdf", "txt", "csv")
+
+# the roles with their share of the users and their permissions
+ROLES = (("Admin", 0.005, ("users:read", "users:write", "posts:read", "posts:write", "posts:delete", "comments:write",
+                           "comments:delete", "companies:write", "roles:write")),
+         ("Moderator", 0.02, ("users:read", "posts:read", "posts:delete", "comments:write", "comments:delete")),
+         ("Author", 0.2, ("posts:read", "posts:write", "comments:write")),
+         ("Member", 0.7, ("posts:read", "comments:write")),
+         ("Viewer", 0.075, ("posts:read",)))
+PERMISSIONS = ("users:read", "users:write", "posts:read", "posts:write", "posts:delete", "comments:write",
+               "comments:delete", "companies:write", "roles:write")
+
+
+@dataclass
+class SeedOptions:
+    """The size and the shape of the dataset, the same options (and seed) always generate the same rows"""
+    users: int = 1000
+    seed: int = 42
+    batchSize: int = 10_000
+    addressesPerUser: float = 1.0
+    postsPerUser: float = 0.5
+    commentsPerPost: float = 2.0
+    attachmentsPerPost: float = 0.05
+    companies: int = 100
+    branchDepth: int = 6
+
+
+class DatasetGenerator(object):
+    """DatasetGenerator loads a synthetic, referentially consistent dataset (the users with their securities, roles and
+    addresses, the companies with their branch trees, the posts with their comments and attachments).
+
+    The ids are assigned here, so the child rows reference their parents without reading them back, and the rows are
+    streamed to 'executemany()' in batches (a transaction each) without the ORM. On SQLite, the connection skips the
+    'fsync()' of the commits while loading ('synchronous=OFF'), a crash while seeding only loses the seeded rows.
+    """
+
+    def __init__(self, engine: Engine, options: SeedOptions = None):
+        self.engine = engine
+        self.options = options or SeedOptions()
+        self.random = Random(self.options.seed)
+        self.counts: Dict[str, int] = {}
+        # the name's indices of every user, i.e. for the posts' author
+        self._firstNames = array("B")
+        self._lastNames = array("B")
+        # the dates of the period, formatting a 'datetime' per row is slow
+        self._periodSeconds = int(PERIOD.total_seconds())
+        self._days = [str((STARTED_AT + timedelta(days=day)).date()) for day in range(PERIOD.days + 1)]
+
+    def __str__(self):
+        """Returns the string representation of this object"""
+        return f"{self.__class__.__name__} <engine={self.engine}, options={self.options}, counts={self.counts}>"
+
+    def __repr__(self):
+        """Returns the string representation of this object"""
+        return str(self)
+
+    @staticmethod
+    def getTable(name: str) -> Table:
+        """Returns the mapped table of the name, the schemas are registered by importing their modules"""
+        table = BaseSchema.metadata.tables.get(name)
+        if table is None:
+            raise ValueError(f"The table '{name}' is not mapped, import its schema first!")
+
+        return table
+
+    def isEmpty(self) -> bool:
+        """Returns True if none of the seeded tables has any row"""
+        with self.engine.connect() as connection:
+            return not any(connection.execute(select(func.count()).select_from(self.getTable(name))).scalar()
+                           for name in SEEDED_TABLES)
+
+    def getSearchIndexes(self, connection: Connection) -> List[FullTextIndex]:
+        """Returns the full-text indexes of the seeded tables"""
+        if not FullTextIndex.isSupported(connection):
+            return []
+
+        indexes = FullTextIndex.ofMetadata(BaseSchema.metadata)
+        return [indexes[name] for name in SEEDED_TABLES if name in indexes and indexes[name].exists(connection)]
+
+    def getCounters(self, connection: Connection) -> List[ChildCounter]:
+        """Returns the counters of the children of the seeded tables"""
+        if not ChildCounter.isSupported(connection):
+            return []
+
+        return [counter for counter in ChildCounter.ofMetadata(BaseSchema.metadata).values()
+                if counter.child.name in SEEDED_TABLES and counter.exists(connection)]
+
+    def clear(self) -> None:
+        """Deletes the rows of the seeded tables (the children first)"""
+        logger.debug("+clear()")
+        with self.engine.begin() as connection:
+            # the full-text indexes are emptied at once, not by their triggers row by row, and the deleted children
+            # aren't counted down in their parents deleted next
+            searchIndexes = self.getSearchIndexes(connection)
+            counters = self.getCounters(connection)
+            for trigger in searchIndexes + counters:
+                trigger.dropTriggers(connection)
+            for name in reversed(SEEDED_TABLES):
+                connection.execute(delete(self.getTable(name)))
+            for searchIndex in searchIndexes:
+                searchIndex.deleteAll(connection)
+            for trigger in searchIndexes + counters:
+                trigger.createTriggers(connection)
+        logger.debug("-clear()")
+
+    def generate(self) -> Dict[str, int]:
+        """Loads the dataset and returns the rows inserted per table"""
+        logger.debug(f"+generate(), options={self.options}")
+        startedAt = time.perf_counter()
+        with self.engine.connect() as connection:
+            isSQLite = connection.dialect.name == "sqlite"
+            if isSQLite:
+                connection.exec_driver_sql("PRAGMA synchronous=OFF")
+                connection.exec_driver_sql("PRAGMA temp_store=MEMORY")
+                connection.exec_driver_sql("PRAGMA cache_size=-262144")
+                # the rollback journal is kept in memory (a 'wal' database is left as it is, switching is persistent)
+                journalMode = connection.exec_driver_sql("PRAGMA journal_mode").scalar()
+                if journalMode != "wal":
+                    connection.exec_driver_sql("PRAGMA journal_mode=MEMORY")
+            # the secondary indexes are built once after the load, sorting the keys is faster than inserting them
+            # in the b-trees row by row (the unique constraints are kept, they are part of the tables)
+            indexes = [index for name in SEEDED_TABLES for index in self.getTable(name).indexes]
+            for index in indexes:
+                # i.e. an index added to a table created before it
+                index.drop(connection, checkfirst=True)
+            # and the full-text indexes and the children's counters are rebuilt from the loaded rows, not by their
+            # triggers per row
+            searchIndexes = self.getSearchIndexes(connection)
+            counters = self.getCounters(connection)
+            for trigger in searchIndexes + counters:
+                trigger.dropTriggers(connection)
+            connection.commit()
+            try:
+                self._insert(connection, "roles", ("id", "name", "active", "created_at", "updated_at"), self._roles())
+                self._insert(connection, "permissions",
+                             ("id", "name", "description", "active", "created_at", "updated_at"), self._permissions())
+                self._insert(connection, "role_permissions", ("role_id", "permission_id", "created_at", "updated_at"),
+                             self._rolePermissions())
+                self._insert(connection, "users",
+                             ("id", "email", "first_name", "last_name", "birth_date", "avatar_url", "user_name",
+                              "admin", "last_seen", "created_at", "updated_at"), self._users())
+                self._insert(connection, "user_securities",
+                             ("user_id", "platform", "salt", "hashed_auth_token", "created_at", "updated_at"),
+                             self._userSecurities())
+                self._insert(connection, "user_roles", ("role_id", "user_id", "created_at", "updated_at"),
+                             self._userRoles())
+                self._insert(connection, "addresses",
+                             ("id", "user_id", "street1", "street2", "city", "state", "country", "zip", "created_at",
+                              "updated_at"), self._addresses())
+                self._insert(connection, "companies", ("id", "parent_id", "name", "active", "created_at", "updated_at"),
+                             self._companies())
+                self._insert(connection, "posts",
+                             ("id", "user_id", "title", "author", "content", "posted_on", "created_at", "updated_at"),
+                             self._posts())
+                self._insert(connection, "attachments",
+                             ("id", "post_id", "filename", "data", "created_at", "updated_at"), self._attachments())
+                self._insert(connection, "comments",
+                             ("id", "post_id", "user_id", "content", "created_at", "updated_at"), self._comments())
+            finally:
+                if connection.in_transaction():
+                    connection.rollback()
+                for index in indexes:
+                    index.create(connection)
+                for searchIndex in searchIndexes:
+                    searchIndex.rebuild(connection)
+                    searchIndex.optimize(connection)
+                    searchIndex.createTriggers(connection)
+                for counter in counters:
+                    counter.recount(connection)
+                    counter.createTriggers(connection)
+                connection.commit()
+                if isSQLite:
+                    connection.exec_driver_sql("PRAGMA synchronous=FULL")
+                    connection.exec_driver_sql(f"PRAGMA journal_mode={journalMode}")
+
+        logger.debug(f"-generate(), counts={self.counts}, seconds={time.perf_counter() - startedAt:.1f}")
+        return self.counts
+
+    def _insert(self, connection: Connection, name: str, columns: Sequence[str], rows: Iterable[Tuple]) -> None:
+        """Inserts the rows in batches, a transaction each, with the driver's cursor: the values are passed as they
+        are and the engine's events (i.e. the metrics and the diagnostics) are not fired per batch"""
+        # i.e. 'INSERT INTO users (id, email, ...) VALUES (?, ?, ...)' in the paramstyle of the dialect
+        compiled = insert(self.getTable(name)).compile(dialect=connection.dialect, column_keys=list(columns))
+        # the statement lists the columns in the table's order
+        if compiled.positiontup and list(compiled.positiontup) != list(columns):
+            reorder = itemgetter(*[columns.index(column) for column in compiled.positiontup])
+            rows = map(reorder, rows)
+
+        statement = str(compiled)
+        dbapiConnection = connection.connection
+        cursor = dbapiConnection.cursor()
+        count = 0
+        try:
+            for batch in self._batches(rows):
+                cursor.executemany(statement, batch)
+                dbapiConnection.commit()
+                count += len(batch)
+        finally:
+            cursor.close()
+
+        self.counts[name] = count
+        logger.debug(f"Inserted [{count}] rows into '{name}'.")
+
+    def _batches(self, rows: Iterable[Tuple]) -> Iterator[List[Tuple]]:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.options.batchSize:
+                yield batch
+                batch = []
+
+        if batch:
+            yield batch
+
+    def _count(self, parents: int, ratio: float) -> int:
+        return int(parents * ratio)
+
+    def _timestamp(self, fraction: float) -> str:
+        """Returns the timestamp at the fraction of the period (SQLAlchemy's SQLite 'DateTime' format)"""
+        days, seconds = divmod(int(self._periodSeconds * fraction), 86400)
+        hours, seconds = divmod(seconds, 3600)
+        minutes, seconds = divmod(seconds, 60)
+        return f"{self._days[days]} {hours:02d}:{minutes:02d}:{seconds:02d}"
+
+    def _texts(self, minWords: int, maxWords: int) -> List[str]:
+        """Returns a pool of the sentences of 'minWords' to 'maxWords' words, drawing the words of every row is the
+        most of the generation's time"""
+        random = self.random
+        return [" ".join(random.choices(WORDS, k=random.randint(minWords, maxWords))).capitalize()
+                for _ in range(TEXTS_POOL_SIZE)]
+
+    def _roles(self) -> Iterator[Tuple]:
+        createdAt = self._timestamp(0)
+        for roleId, (name, _, _) in enumerate(ROLES, start=1):
+            yield roleId, name, True, createdAt, createdAt
+
+    def _permissions(self) -> Iterator[Tuple]:
+        createdAt = self._timestamp(0)
+        for permissionId, name in enumerate(PERMISSIONS, start=1):
+            yield permissionId, name, f"Allows '{name}'", True, createdAt, createdAt
+
+    def _rolePermissions(self) -> Iterator[Tuple]:
+        createdAt = self._timestamp(0)
+        for roleId, (_, _, permissions) in enumerate(ROLES, start=1):
+            for permission in permissions:
+                yield roleId, PERMISSIONS.index(permission) + 1, createdAt, createdAt
+
+    def _users(self) -> Iterator[Tuple]:
+        # 'random()' is called directly, 'randint()' and 'choice()' are several times slower
+        random = self.random.random
+        users = self.options.users
+        for userId in range(1, users + 1):
+            firstName = int(random() * len(FIRST_NAMES))
+            lastName = int(random() * len(LAST_NAMES))
+            self._firstNames.append(firstName)
+            self._lastNames.append(lastName)
+            first = FIRST_NAMES[firstName]
+            last = LAST_NAMES[lastName]
+            # the users sign up in the order of their ids
+            createdAt = self._timestamp(userId / users)
+            userName = f"{first.lower()}.{last.lower()}{userId}"
+            birthDate = f"{1950 + int(random() * 57)}-{1 + int(random() * 12):02d}-{1 + int(random() * 28):02d}"
+            avatarUrl = f"https://avatars.example.com/{userId}.png" if random() < 0.6 else None
+            yield (userId, f"{userName}@example.com", first, last, birthDate, avatarUrl, userName, userId == 1,
+                   createdAt, createdAt, createdAt)
+
+    def _userSecurities(self) -> Iterator[Tuple]:
+        # a scrypt hash takes tens of milliseconds, the users share the hash of 'PASSWORD'
+        salt = f"{self.random.getrandbits(128):032x}"
+        hashedPassword = getPasswordHasher().hash(PASSWORD, salt)
+        createdAt = self._timestamp(0)
+        for userId in range(1, self.options.users + 1):
+            yield userId, "Seed", salt, hashedPassword, createdAt, createdAt
+
+    def _userRoles(self) -> Iterator[Tuple]:
+        random = self.random.random
+        # the cumulative shares of the roles
+        shares = list(accumulate(share for _, share, _ in ROLES))
+        createdAt = self._timestamp(0)
+        # the first user is the admin
+        yield 1, 1, createdAt, createdAt
+        for userId in range(2, self.options.users + 1):
+            yield min(bisect(shares, random()), len(ROLES) - 1) + 1, userId, createdAt, createdAt
+
+    def _addresses(self) -> Iterator[Tuple]:
+        random = self.random.random
+        users = self.options.users
+        createdAt = self._timestamp(0)
+        for addressId in range(1, self._count(users, self.options.addressesPerUser) + 1):
+            city, state, country = CITIES[int(random() * len(CITIES))]
+            street1 = f"{1 + int(random() * 9999)} {STREETS[int(random() * len(STREETS))]}"
+            street2 = f"Apt {1 + int(random() * 999)}" if random() < 0.3 else None
+            yield (addressId, 1 + int(random() * users), street1, street2, city, state, country,
+                   f"{10000 + int(random() * 90000)}", createdAt, createdAt)
+
+    def _companies(self) -> Iterator[Tuple]:
+        """The companies form trees of up to 'branchDepth' levels, the branches are mostly added to the latest
+        companies, so the trees grow deep rather than wide"""
+        random = self.random
+        companies = self.options.companies
+        depths = array("B")
+        # the companies which can still have branches
+        parents: List[int] = []
+        for companyId in range(1, companies + 1):
+            if not parents or random.random() < 0.05:
+                parentId, depth = None, 1
+            else:
+                parentId = parents[int(len(parents) * (1 - random.random() ** 3))]
+                depth = depths[parentId - 1] + 1
+
+            depths.append(depth)
+            if depth < self.options.branchDepth:
+                parents.append(companyId)
+
+            createdAt = self._timestamp(companyId / companies)
+            name = f"{random.choice(COMPANY_PREFIXES)} {random.choice(COMPANY_SUFFIXES)} {companyId}"
+            yield companyId, parentId, name, random.random() < 0.9, createdAt, createdAt
+
+    def _posts(self) -> Iterator[Tuple]:
+        random = self.random.random
+        users = self.options.users
+        posts = self._count(users, self.options.postsPerUser)
+        titles = self._texts(2, 6)
+        contents = [f"{text}." for text in self._texts(10, 30)]
+        for postId in range(1, posts + 1):
+            # a few users write most of the posts
+            userIndex = int(users * random() ** 2)
+            author = f"{FIRST_NAMES[self._firstNames[userIndex]]} {LAST_NAMES[self._lastNames[userIndex]]}"
+            # the posts are published in the order of their ids
+            postedOn = self._timestamp(postId / posts)
+            yield (postId, userIndex + 1, titles[int(random() * TEXTS_POOL_SIZE)], author,
+                   contents[int(random() * TEXTS_POOL_SIZE)], postedOn, postedOn, postedOn)
+
+    def _attachments(self) -> Iterator[Tuple]:
+        random = self.random
+        posts = self.counts["posts"]
+        createdAt = self._timestamp(1)
+        for attachmentId in range(1, self._count(posts, self.options.attachmentsPerPost) + 1):
+            filename = f"attachment-{attachmentId}.{random.choice(ATTACHMENT_TYPES)}"
+            data = random.randbytes(random.randint(64, 512))
+            yield attachmentId, random.randint(1, posts), filename, data, createdAt, createdAt
+
+    def _comments(self) -> Iterator[Tuple]:
+        random = self.random.random
+        users = self.options.users
+        posts = self.counts["posts"]
+        comments = self._count(posts, self.options.commentsPerPost)
+        contents = [f"{text}." for text in self._texts(4, 20)]
+        for commentId in range(1, comments + 1):
+            # the popular (earlier) posts get most of the comments, always after they are posted
+            postIndex = int(posts * random() ** 1.5)
+            postedOn = (postIndex + 1) / posts
+            createdAt = self._timestamp(postedOn + (1 - postedOn) * random())
+            yield (commentId, postIndex + 1, 1 + int(random() * users), contents[int(random() * TEXTS_POOL_SIZE)],
+                   createdAt, createdAt)
+
+
+def parseCount(value: str) -> int:
+    """Returns the count of a number in any notation, i.e. '1e6' or '1_000_000'"""
+    count = float(value.replace("_", ""))
+    if count < 0 or count != int(count):
+        raise ValueError(f"The count '{value}' is not a positive integer!")
+
+    return int(count)
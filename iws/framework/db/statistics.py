@@ -0,0 +1,63 @@
+#
+# Author: Rohtash Lakra
+#
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from sqlalchemy import Engine, event
+from sqlalchemy.engine.default import CacheStats
+
+logger = logging.getLogger(__name__)
+
+
+class CompiledCacheStats(object):
+    """CompiledCacheStats counts the engine's compiled cache hits/misses of the executed statements.
+
+    SQLAlchemy reuses the compiled SQL of a statement when its cache-key is found in the engine's compiled cache
+    ('[cached since ...]' in the echo logs). This listener exposes the same information as counters.
+    """
+
+    def __init__(self):
+        self.engine: Optional[Engine] = None
+        self._lock = threading.Lock()
+        self.counters = {cacheStat.name: 0 for cacheStat in CacheStats}
+
+    def attach(self, engine: Engine) -> "CompiledCacheStats":
+        """Attaches the stats listener to the engine"""
+        logger.debug(f"+attach({engine})")
+        self.engine = engine
+        event.listen(engine, "after_cursor_execute", self._afterCursorExecute)
+        logger.debug(f"-attach()")
+        return self
+
+    def detach(self):
+        """Detaches the stats listener from the engine"""
+        if self.engine is not None:
+            event.remove(self.engine, "after_cursor_execute", self._afterCursorExecute)
+            self.engine = None
+
+    def _afterCursorExecute(self, conn, cursor, statement, parameters, context, executemany):
+        cacheHit = getattr(context, "cache_hit", None)
+        if cacheHit is not None:
+            with self._lock:
+                self.counters[cacheHit.name] += 1
+
+    def reset(self):
+        """Resets the counters"""
+        with self._lock:
+            for key in self.counters:
+                self.counters[key] = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the compiled cache stats of the engine"""
+        with self._lock:
+            stats = dict(self.counters)
+
+        hits = stats[CacheStats.CACHE_HIT.name]
+        misses = stats[CacheStats.CACHE_MISS.name]
+        stats["hit_ratio"] = round(hits / (hits + misses), 4) if hits + misses else 0.0
+        compiledCache = getattr(self.engine, "_compiled_cache", None) if self.engine is not None else None
+        stats["size"] = len(compiledCache) if compiledCache is not None else 0
+        stats["capacity"] = compiledCache.capacity if compiledCache is not None else 0
+        return stats
@@ -114,10 +114,13 @@ class ValidationException(AbstractException):
 
 
 class TooManyRequestsException(AbstractException):
-    """ Record Validation Exception """
+    """ Too Many Requests Exception, 'retryAfter' is the seconds until the client may retry """
     
-    def __init__(self, messages: List[Optional[str]] = None, **kwargs):
+    def __init__(self, messages: List[Optional[str]] = None, retryAfter: Optional[float] = None,
+                 limit: Optional[int] = None, **kwargs):
         super().__init__(httpStatus=HTTPStatus.TOO_MANY_REQUESTS, messages=messages, kwargs=kwargs)
+        self.retryAfter = retryAfter
+        self.limit = limit
 
 
 class ServerException(AbstractException):
@@ -94,6 +94,7 @@ class HTTPStatus(AutoUpperCase):
     201	Created	- A new resource was created.
     202	Accepted - The request was received, but no modification has been made yet.
     204	No Content - The request was successful, but the response has no content.
+    304	Not Modified - The cached representation of the client (its 'If-None-Match' or 'If-Modified-Since') is current.
     400	Bad Request - The request was malformed.
     401	Unauthorized - The client is not authorized to perform the requested action.
     404	Not Found - The requested resource was not found.
@@ -111,6 +112,7 @@ class HTTPStatus(AutoUpperCase):
     CREATED = (201, 'Created')  # A new resource was created.
     ACCEPTED = (202, 'Accepted')  # The request was received, but no modification has been made yet.
     NO_CONTENT = (204, 'No Content')  # The request was successful, but the response has no content.
+    NOT_MODIFIED = (304, 'Not Modified')  # The client's cached representation is current.
     BAD_REQUEST = (400, 'Bad Request')  # The request was malformed.
     UNAUTHORIZED = (401, 'Unauthorized')  # The client is not authorized to perform the requested action.
     NOT_FOUND = (404, 'Not Found')  # The requested resource was not found.
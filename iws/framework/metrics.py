@@ -0,0 +1,413 @@
+#
+# Author: Rohtash Lakra
+# Reference:
+# - https://prometheus.io/docs/instrumenting/exposition_formats/
+# - https://prometheus.github.io/client_python/multiprocess/
+# - https://docs.sqlalchemy.org/en/20/faq/performance.html#query-profiling
+#
+import bisect
+import fcntl
+import glob
+import json
+import logging
+import os
+import re
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from flask import Blueprint, Flask, Response, request
+from sqlalchemy import Engine, event
+
+logger = logging.getLogger(__name__)
+
+# the latency buckets in seconds, from a cached response to a slow report
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# the statement buckets in seconds
+STATEMENT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+# the operation and the table of a statement, i.e. ('SELECT', 'users') or ('INSERT', 'posts')
+STATEMENT_PATTERN = re.compile(r"^\s*(SELECT|INSERT|UPDATE|DELETE|WITH|PRAGMA|CREATE|DROP|ALTER|BEGIN|COMMIT|ROLLBACK)"
+                               r"(?:(?:(?<=UPDATE)|.*?\b(?:FROM|INTO|TABLE))\s+[\"`]?(\w+))?", re.IGNORECASE | re.DOTALL)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+ARCHIVE_FILE = "archived.json"
+ARCHIVE_LOCK = "archived.lock"
+
+Labels = Tuple[str, ...]
+
+
+class Metric(object):
+    """A named metric of series by their label values, the values of a series are a list of floats (a counter and a
+    gauge have one value, a histogram has a count per bucket, the sum and the count). The registry's lock guards the
+    series."""
+
+    TYPE = None
+
+    def __init__(self, name: str, help: str, labelNames: Iterable[str] = (), lock: threading.Lock = None):
+        self.name = name
+        self.help = help
+        self.labelNames = tuple(labelNames)
+        self.series: Dict[Labels, List[float]] = {}
+        self._lock = lock or threading.Lock()
+
+    def __str__(self):
+        """Returns the string representation of this object"""
+        return f"{self.__class__.__name__} <name={self.name}, series={len(self.series)}>"
+
+    def __repr__(self):
+        """Returns the string representation of this object"""
+        return str(self)
+
+    def size(self) -> int:
+        """Returns the values of a series"""
+        return 1
+
+    def _values(self, labels: Labels) -> List[float]:
+        # called with the lock held
+        values = self.series.get(labels)
+        if values is None:
+            values = self.series[labels] = [0.0] * self.size()
+
+        return values
+
+    def value(self, *labels: str) -> List[float]:
+        """Returns a copy of the values of the series"""
+        with self._lock:
+            return list(self.series.get(labels, [0.0] * self.size()))
+
+    def to_json(self) -> dict:
+        with self._lock:
+            return {"type": self.TYPE, "help": self.help, "labelNames": list(self.labelNames),
+                    "series": [[list(labels), list(values)] for labels, values in self.series.items()]}
+
+    def samples(self, series: Dict[Labels, List[float]]) -> Iterable[Tuple[str, Labels, Tuple, float]]:
+        """Returns the (suffix, labels, extra labels, value) samples of the series"""
+        for labels, values in series.items():
+            yield "", labels, (), values[0]
+
+
+class Counter(Metric):
+    """A monotonic counter, i.e. the requests per status"""
+
+    TYPE = "counter"
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values(labels)[0] += amount
+
+
+class Gauge(Metric):
+    """A value going up and down, i.e. the requests in-flight"""
+
+    TYPE = "gauge"
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values(labels)[0] += amount
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values(labels)[0] -= amount
+
+
+class Histogram(Metric):
+    """The distribution of the observed values in buckets, the counts are cumulated ('le') on the export only"""
+
+    TYPE = "histogram"
+
+    def __init__(self, name: str, help: str, labelNames: Iterable[str] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS, lock: threading.Lock = None):
+        super().__init__(name, help, labelNames, lock)
+        self.buckets = tuple(sorted(buckets))
+
+    def size(self) -> int:
+        # a count per bucket and '+Inf', the sum and the count
+        return len(self.buckets) + 3
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            values = self._values(labels)
+            values[index] += 1
+            values[-2] += value
+            values[-1] += 1
+
+    def to_json(self) -> dict:
+        return {**super().to_json(), "buckets": list(self.buckets)}
+
+    def samples(self, series: Dict[Labels, List[float]]) -> Iterable[Tuple[str, Labels, Tuple, float]]:
+        for labels, values in series.items():
+            cumulative = 0.0
+            for bound, count in zip([*self.buckets, "+Inf"], values):
+                cumulative += count
+                yield "_bucket", labels, (("le", formatValue(bound) if bound != "+Inf" else bound),), cumulative
+
+            yield "_sum", labels, (), values[-2]
+            yield "_count", labels, (), values[-1]
+
+
+def formatValue(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def escapeLabel(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def mergeSeries(target: Dict[Labels, List[float]], series: Iterable[Tuple[List[str], List[float]]]) -> None:
+    """Adds the values of the series to the target's"""
+    for labels, values in series:
+        key = tuple(labels)
+        existing = target.get(key)
+        if existing is None:
+            target[key] = list(values)
+        else:
+            for index, value in enumerate(values):
+                existing[index] += value
+
+
+def writeJson(path: str, data: dict) -> None:
+    """Writes the file atomically, the readers never see a partial file"""
+    tempPath = f"{path}.{os.getpid()}.tmp"
+    with open(tempPath, "w") as file:
+        json.dump(data, file)
+    os.replace(tempPath, path)
+
+
+def readJson(path: str) -> Optional[dict]:
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def clearDirectory(directory: str) -> None:
+    """Removes the snapshots of the previous run (i.e. from gunicorn's 'on_starting')"""
+    for path in glob.glob(os.path.join(directory, "*.json")):
+        os.remove(path)
+
+
+def markProcessDead(directory: str, pid: int) -> None:
+    """Archives the counters and the histograms of the dead worker (i.e. from gunicorn's 'child_exit'), its gauges are
+    dropped, so the totals survive the worker restarts without a file per dead worker"""
+    path = os.path.join(directory, f"{pid}.json")
+    snapshot = readJson(path)
+    if snapshot is None:
+        return
+
+    with open(os.path.join(directory, ARCHIVE_LOCK), "w") as lockFile:
+        fcntl.flock(lockFile, fcntl.LOCK_EX)
+        archived = readJson(os.path.join(directory, ARCHIVE_FILE)) or {"metrics": {}}
+        for name, metric in snapshot["metrics"].items():
+            if metric["type"] == Gauge.TYPE:
+                continue
+
+            archivedMetric = archived["metrics"].setdefault(name, {**metric, "series": []})
+            series = {tuple(labels): values for labels, values in archivedMetric["series"]}
+            mergeSeries(series, metric["series"])
+            archivedMetric["series"] = [[list(labels), values] for labels, values in series.items()]
+
+        writeJson(os.path.join(directory, ARCHIVE_FILE), archived)
+        os.remove(path)
+
+
+class Metrics(object):
+    """Metrics records the requests and the DB statements of a worker and exports them in the Prometheus text format.
+
+    - 'instrument(bp)' times the requests of a blueprint (per endpoint), counts them per status and the in-flight ones.
+    - 'instrumentEngine(engine)' times the statements of an engine (per operation and table).
+    - with a shared 'directory' (i.e. of all the gunicorn workers of a host), each worker writes its snapshot every
+      'flushSeconds' (off the request path) and '/metrics' exports the sum of all the workers' snapshots.
+    """
+
+    def __init__(self, directory: Optional[str] = None, flushSeconds: float = 1.0, enabled: bool = True):
+        self.directory = directory
+        self.flushSeconds = flushSeconds
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._flusher: Optional[threading.Thread] = None
+        self.metrics: Dict[str, Metric] = {}
+        self.requestDuration = self.histogram("http_request_duration_seconds", "The latency of the requests",
+                                              ("endpoint", "method"))
+        self.requests = self.counter("http_requests_total", "The requests served", ("endpoint", "method", "status"))
+        self.inFlight = self.gauge("http_requests_in_flight", "The requests being served")
+        self.statementDuration = self.histogram("db_statement_duration_seconds", "The latency of the DB statements",
+                                                ("operation", "table"), buckets=STATEMENT_BUCKETS)
+
+    def __str__(self):
+        """Returns the string representation of this object"""
+        return (f"{self.__class__.__name__} <directory={self.directory}, enabled={self.enabled}, "
+                f"metrics={list(self.metrics)}>")
+
+    def __repr__(self):
+        """Returns the string representation of this object"""
+        return str(self)
+
+    def counter(self, name: str, help: str, labelNames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelNames, lock=self._lock))
+
+    def gauge(self, name: str, help: str, labelNames: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labelNames, lock=self._lock))
+
+    def histogram(self, name: str, help: str, labelNames: Iterable[str] = (),
+                  buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labelNames, buckets=buckets, lock=self._lock))
+
+    def _register(self, metric: Metric) -> Metric:
+        if metric.name in self.metrics:
+            raise ValueError(f"The metric '{metric.name}' is already registered!")
+
+        self.metrics[metric.name] = metric
+        return metric
+
+    def init_app(self, app: Flask, directory: Optional[str] = None, flushSeconds: Optional[float] = None,
+                 enabled: Optional[bool] = None) -> "Metrics":
+        """Configures the metrics and adds the '/metrics' endpoint to the app"""
+        if directory is not None:
+            self.directory = directory or None
+        if flushSeconds is not None:
+            self.flushSeconds = flushSeconds
+        if enabled is not None:
+            self.enabled = enabled
+
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+        if self.enabled:
+            app.add_url_rule("/metrics", "metrics", self.metricsResponse, methods=["GET"])
+
+        app.extensions["metrics"] = self
+        logger.debug(f"init_app(), metrics={self}")
+        return self
+
+    def instrument(self, blueprint: Blueprint) -> Blueprint:
+        """Records the requests of the blueprint (and its nested blueprints)"""
+        blueprint.before_request(self.beforeRequest)
+        blueprint.after_request(self.afterRequest)
+        blueprint.teardown_request(self.teardownRequest)
+        return blueprint
+
+    def beforeRequest(self) -> None:
+        if self.enabled:
+            self._checkFork()
+            if self.directory and self._flusher is None:
+                self._flusher = threading.Thread(target=self._flushPeriodically, name="MetricsFlusher", daemon=True)
+                self._flusher.start()
+
+            # kept on the request object, each access of the 'request' proxy costs more than the metrics themselves
+            request._get_current_object().metricsStartedAt = time.perf_counter()
+            self.inFlight.inc()
+
+    def afterRequest(self, response: Response) -> Response:
+        currentRequest = request._get_current_object()
+        startedAt = getattr(currentRequest, "metricsStartedAt", None)
+        if startedAt is not None:
+            elapsed = time.perf_counter() - startedAt
+            endpoint, method = currentRequest.endpoint or "", currentRequest.method
+            self.requestDuration.observe(elapsed, endpoint, method)
+            self.requests.inc(endpoint, method, str(response.status_code))
+
+        return response
+
+    def teardownRequest(self, error=None) -> None:
+        # always called, even when the 'after_request' are not
+        if vars(request._get_current_object()).pop("metricsStartedAt", None) is not None:
+            self.inFlight.dec()
+
+    def instrumentEngine(self, engine: Engine) -> Engine:
+        """Times the statements of the engine"""
+        event.listen(engine, "before_cursor_execute", self._beforeCursorExecute)
+        event.listen(engine, "after_cursor_execute", self._afterCursorExecute)
+        return engine
+
+    def _beforeCursorExecute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metricsStartedAt", []).append(time.perf_counter())
+
+    def _afterCursorExecute(self, conn, cursor, statement, parameters, context, executemany):
+        startedAts = conn.info.get("metricsStartedAt")
+        if startedAts and self.enabled:
+            self._checkFork()
+            self.statementDuration.observe(time.perf_counter() - startedAts.pop(), *statementLabels(statement))
+
+    def _checkFork(self) -> None:
+        # a worker forked from the preloaded app starts its own series (and its flusher on its first request)
+        if self._pid != os.getpid():
+            with self._lock:
+                for metric in self.metrics.values():
+                    metric.series.clear()
+            self._pid = os.getpid()
+            self._flusher = None
+
+    def _flushPeriodically(self) -> None:
+        pid = os.getpid()
+        while self._pid == pid:
+            time.sleep(self.flushSeconds)
+            try:
+                self.flush()
+            except Exception as ex:
+                logger.error(f"Error while writing the metrics! Error={ex}")
+
+    def snapshot(self) -> dict:
+        """Returns the metrics of this process"""
+        return {"pid": os.getpid(), "metrics": {name: metric.to_json() for name, metric in self.metrics.items()}}
+
+    def flush(self) -> None:
+        """Writes the snapshot of this process to the shared directory"""
+        if self.directory:
+            writeJson(os.path.join(self.directory, f"{os.getpid()}.json"), self.snapshot())
+
+    def collect(self) -> Dict[str, Dict[Labels, List[float]]]:
+        """Returns the series of the metrics, summed across the workers when shared"""
+        if not self.directory:
+            snapshots = [self.snapshot()]
+        else:
+            self.flush()
+            snapshots = [readJson(path) for path in sorted(glob.glob(os.path.join(self.directory, "*.json")))]
+
+        collected: Dict[str, Dict[Labels, List[float]]] = {name: {} for name in self.metrics}
+        for snapshot in filter(None, snapshots):
+            for name, metric in snapshot["metrics"].items():
+                if name in collected:
+                    mergeSeries(collected[name], metric["series"])
+
+        return collected
+
+    def render(self) -> str:
+        """Returns the metrics in the Prometheus text format"""
+        lines = []
+        for name, series in self.collect().items():
+            metric = self.metrics[name]
+            if not series and not metric.labelNames:
+                # the metric without labels is always exported, i.e. 'http_requests_in_flight 0'
+                series = {(): [0.0] * metric.size()}
+
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.TYPE}")
+            for suffix, labels, extra, value in metric.samples(series):
+                pairs = [*zip(metric.labelNames, labels), *extra]
+                text = ",".join(f'{key}="{escapeLabel(label)}"' for key, label in pairs)
+                lines.append(f"{name}{suffix}{{{text}}} {formatValue(value)}" if text else
+                             f"{name}{suffix} {formatValue(value)}")
+
+        return "\n".join(lines) + "\n"
+
+    def metricsResponse(self) -> Response:
+        return Response(self.render(), mimetype=None, content_type=CONTENT_TYPE)
+
+    def clear(self) -> None:
+        with self._lock:
+            for metric in self.metrics.values():
+                metric.series.clear()
+
+
+@lru_cache(maxsize=1024)
+def statementLabels(statement: str) -> Tuple[str, str]:
+    """Returns the operation and the table of the statement, i.e. ('SELECT', 'users'), the statements of an engine are
+    the same few (cached) texts"""
+    match = STATEMENT_PATTERN.match(statement)
+    if not match:
+        return "OTHER", ""
+
+    return match.group(1).upper(), (match.group(2) or "").lower()
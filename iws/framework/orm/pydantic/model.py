@@ -24,6 +24,7 @@ from typing_extensions import Self
 from framework.enums import BaseEnum
 from framework.exception import (
     AbstractException,
+    BadRequestException,
     ValidationException,
     DuplicateRecordException,
     RecordNotFoundException,
@@ -490,7 +491,7 @@ class ResponseModel(AbstractModel):
     def buildResponseWithException(cls, exception: AbstractException):
         logger.debug(f"+buildResponseWithException() => type={type(exception)}")
         # build response and add errorModel in the list
-        if isinstance(exception, ValidationException):  # check if an AbstractException entity
+        if isinstance(exception, (ValidationException, BadRequestException)):  # check if an AbstractException entity
             logger.debug(f"ValidationException => {isinstance(exception, ValidationException)}")
             response = ResponseModel(status=exception.httpStatus.statusCode)
             for message in exception.messages:
@@ -514,13 +515,11 @@ class ResponseModel(AbstractModel):
         elif isinstance(exception, AbstractException):
             logger.debug(f"isinstance(exception, AbstractException) => {isinstance(exception, AbstractException)}")
             response = ResponseModel(status=exception.httpStatus.statusCode)
-            for message in exception.messages:
+            for message in exception.messages or []:
                 response.addInstance(ErrorModel.buildError(httpStatus=exception.httpStatus, message=message))
-            
-            response = ResponseModel.buildResponse(HTTPStatus.CONFLICT, message=str(exception))
         elif isinstance(exception, Exception):
             logger.debug(f"isinstance(exception, Exception) => {isinstance(exception, Exception)}")
-            response = ResponseModel(status=HTTPStatus.INTERNAL_SERVER_ERROR)
+            response = ResponseModel(status=HTTPStatus.INTERNAL_SERVER_ERROR.statusCode)
             # build errorModel response, if exception is provided
             response.addInstance(ErrorModel.buildError(HTTPStatus.INTERNAL_SERVER_ERROR, message=str(exception)))
         
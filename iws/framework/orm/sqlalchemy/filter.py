@@ -0,0 +1,254 @@
+#
+# Author: Rohtash Lakra
+#
+import logging
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+from enum import auto, unique
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple, Type
+
+from sqlalchemy import Select, bindparam, select
+from werkzeug.datastructures import MultiDict
+
+from framework.enums import AutoLowerCase
+from framework.exception import BadRequestException
+from framework.orm.sqlalchemy.schema import AbstractSchema
+
+logger = logging.getLogger(__name__)
+
+
+@unique
+class FilterOperator(AutoLowerCase):
+    """FilterOperator represents the supported query-param operators (i.e. ?created_at__gte=2024-01-01)"""
+    EQ = auto()
+    NE = auto()
+    GT = auto()
+    GTE = auto()
+    LT = auto()
+    LTE = auto()
+    IN = auto()
+    LIKE = auto()
+
+
+@unique
+class SortOrder(AutoLowerCase):
+    ASC = auto()
+    DESC = auto()
+
+
+class FilterCompiler(object):
+    """FilterCompiler compiles the request's query-params into a typed, parameterized 'select()' statement.
+
+    Only the whitelisted fields of the schema are allowed and the values are converted to the column's python type,
+    so the invalid requests are rejected with 'BadRequestException' before a session is opened.
+
+    The statement shape (fields, operators and sorting) is cached per filter signature, the values are passed as
+    bound parameters, so the same statement (and its compiled SQL) is reused for every request of the same shape.
+
+    Supported syntax:
+    - field=value               => field = :value
+    - field=v1&field=v2         => field IN (:values)
+    - field__<op>=value         => op in (eq, ne, gt, gte, lt, lte, in, like); 'in' also accepts comma separated values
+    - sort=field&order=asc|desc => ORDER BY field ASC|DESC
+    """
+
+    SEPARATOR = "__"
+    KEY_SORT = "sort"
+    KEY_ORDER = "order"
+    TRUE_VALUES = ("true", "yes", "1")
+    FALSE_VALUES = ("false", "no", "0")
+
+    def __init__(self, schema: Type[AbstractSchema], fields: Iterable[str], sortFields: Iterable[str] = None,
+                 maxCacheSize: int = 128):
+        self.schema = schema
+        self.fields: Dict[str, type] = {}
+        for field in fields:
+            column = schema.__table__.columns.get(field)
+            if column is None:
+                raise ValueError(f"'{field}' is not a column of [{schema.__tablename__}]!")
+            self.fields[field] = column.type.python_type
+
+        self.sortFields = tuple(sortFields) if sortFields else tuple(self.fields.keys())
+        self.maxCacheSize = maxCacheSize
+        self._statements: OrderedDict[Tuple, Select] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __str__(self):
+        """Returns the string representation of this object"""
+        return f"{self.__class__.__name__} <schema={self.schema.__name__}, fields={list(self.fields.keys())}>"
+
+    def __repr__(self):
+        """Returns the string representation of this object"""
+        return str(self)
+
+    @staticmethod
+    def _items(filters) -> List[Tuple[str, List[Any]]]:
+        """Returns the (key, values) pairs of the filters"""
+        if filters is None:
+            return []
+        elif isinstance(filters, MultiDict):
+            return list(filters.lists())
+        elif isinstance(filters, Mapping):
+            return [(key, list(value) if isinstance(value, (list, tuple, set)) else [value])
+                    for key, value in filters.items()]
+
+        raise BadRequestException(messages=["The filters must be either dictionary or MultiDict!"])
+
+    def _convert(self, field: str, value: Any) -> Any:
+        """Converts the value to the python type of the field's column"""
+        pythonType = self.fields[field]
+        if value is None or isinstance(value, pythonType):
+            return value
+        elif pythonType is bool:
+            text = str(value).lower()
+            if text in self.TRUE_VALUES:
+                return True
+            elif text in self.FALSE_VALUES:
+                return False
+            raise ValueError(value)
+        elif pythonType is datetime:
+            return datetime.fromisoformat(str(value))
+        elif pythonType is date:
+            return date.fromisoformat(str(value))
+
+        return pythonType(value)
+
+    def parse(self, filters) -> Tuple[Tuple, Dict[str, Any]]:
+        """Validates the filters and returns the statement's signature and the bound parameters"""
+        logger.debug(f"+parse({filters})")
+        errors = []
+        clauses = {}
+        params = {}
+        sortField = None
+        sortOrder = SortOrder.ASC
+        for key, values in self._items(filters):
+            if key == self.KEY_SORT:
+                sortField = values[-1]
+                if sortField not in self.sortFields:
+                    errors.append(f"Sorting by '{sortField}' is not allowed!")
+                continue
+            elif key == self.KEY_ORDER:
+                sortOrder = SortOrder.of_name(str(values[-1]))
+                if sortOrder is None:
+                    errors.append(f"Invalid order '{values[-1]}', allowed values are {list(SortOrder.values())}!")
+                continue
+
+            field, _, operatorName = key.partition(self.SEPARATOR)
+            if field not in self.fields:
+                errors.append(f"Filtering by '{field}' is not allowed!")
+                continue
+
+            if operatorName:
+                operator = FilterOperator.of_name(operatorName)
+                if operator is None:
+                    errors.append(f"Invalid operator '{operatorName}' for '{field}'!")
+                    continue
+            else:
+                # an empty list is an 'IN' matching nothing, i.e. 'bulkDelete([])'
+                operator = FilterOperator.EQ if len(values) == 1 else FilterOperator.IN
+
+            if operator == FilterOperator.IN:
+                # accept the comma separated values, i.e. ?id__in=1,2,3
+                values = [entry for value in values
+                          for entry in (value.split(",") if isinstance(value, str) and operatorName else [value])]
+            elif len(values) != 1:
+                errors.append(f"A single value is required for '{key}'!" if not values
+                              else f"Multiple values are not allowed for '{key}'!")
+                continue
+            elif operator == FilterOperator.LIKE and self.fields[field] is not str:
+                errors.append(f"Operator 'like' is not allowed for '{field}'!")
+                continue
+
+            name = f"{field}_{operator.value}"
+            if name in params:
+                errors.append(f"Duplicate filter '{key}'!")
+                continue
+
+            try:
+                converted = [self._convert(field, value) for value in values]
+            except (TypeError, ValueError):
+                errors.append(f"Invalid value {values} for '{field}', expected '{self.fields[field].__name__}'!")
+                continue
+
+            clauses[name] = (field, operator)
+            params[name] = converted if operator == FilterOperator.IN else converted[0]
+
+        if errors:
+            logger.debug(f"-parse(), errors={errors}")
+            raise BadRequestException(messages=errors)
+
+        signature = (tuple(sorted(clauses.values(), key=lambda clause: clause[0] + clause[1].value)),
+                     sortField, sortOrder if sortField else None)
+        logger.debug(f"-parse(), signature={signature}, params={params}")
+        return signature, params
+
+    def _buildStatement(self, signature: Tuple) -> Select:
+        """Builds the 'select()' statement of the signature with the bound parameters"""
+        clauses, sortField, sortOrder = signature
+        statement = select(self.schema)
+        for field, operator in clauses:
+            column = getattr(self.schema, field)
+            name = f"{field}_{operator.value}"
+            match operator:
+                case FilterOperator.EQ:
+                    statement = statement.where(column == bindparam(name))
+                case FilterOperator.NE:
+                    statement = statement.where(column != bindparam(name))
+                case FilterOperator.GT:
+                    statement = statement.where(column > bindparam(name))
+                case FilterOperator.GTE:
+                    statement = statement.where(column >= bindparam(name))
+                case FilterOperator.LT:
+                    statement = statement.where(column < bindparam(name))
+                case FilterOperator.LTE:
+                    statement = statement.where(column <= bindparam(name))
+                case FilterOperator.IN:
+                    # 'expanding' keeps the same statement for any number of values
+                    statement = statement.where(column.in_(bindparam(name, expanding=True)))
+                case FilterOperator.LIKE:
+                    statement = statement.where(column.like(bindparam(name)))
+
+        if sortField:
+            column = getattr(self.schema, sortField)
+            statement = statement.order_by(column.desc() if sortOrder == SortOrder.DESC else column.asc())
+
+        return statement
+
+    def statement(self, signature: Tuple) -> Select:
+        """Returns the cached statement of the signature, builds it on cache miss"""
+        with self._lock:
+            statement = self._statements.get(signature)
+            if statement is not None:
+                self.hits += 1
+                self._statements.move_to_end(signature)
+                return statement
+
+            self.misses += 1
+
+        statement = self._buildStatement(signature)
+        with self._lock:
+            self._statements[signature] = statement
+            if len(self._statements) > self.maxCacheSize:
+                self._statements.popitem(last=False)
+
+        return statement
+
+    def compile(self, filters) -> Tuple[Select, Dict[str, Any]]:
+        """Returns the statement and the bound parameters of the filters"""
+        signature, params = self.parse(filters)
+        return self.statement(signature), params
+
+    def cacheInfo(self) -> Dict[str, int]:
+        """Returns the statement's cache stats"""
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._statements),
+                "maxSize": self.maxCacheSize}
+
+    def clearCache(self):
+        """Clears the statement's cache"""
+        with self._lock:
+            self._statements.clear()
+            self.hits = 0
+            self.misses = 0
@@ -2,16 +2,20 @@
 # Author: Rohtash Lakra
 #
 import logging
+from contextlib import contextmanager
 from typing import Iterable, Dict, Any
 from typing import List, Optional
 
-from sqlalchemy import text, Engine
+from sqlalchemy import text, Engine, select
 from sqlalchemy.exc import NoResultFound, MultipleResultsFound, SQLAlchemyError
 from sqlalchemy.orm import Session
 from sqlalchemy.orm.mapper import Mapper
 
+from framework.db.router import EngineRouter
 from framework.orm.repository import AbstractRepository
+from framework.orm.sqlalchemy.filter import FilterCompiler
 from framework.orm.sqlalchemy.schema import BaseSchema
+from framework.orm.sqlalchemy.statement import selectAll, selectById
 
 logger = logging.getLogger(__name__)
 
@@ -19,8 +23,38 @@ logger = logging.getLogger(__name__)
 class SqlAlchemyRepository(AbstractRepository):
     """The base repository of all ORM repositories."""
 
-    def __init__(self, engine: Engine):
+    # the whitelisted filters of the repository's schema, shared by all instances to reuse the cached statements.
+    filterCompiler: FilterCompiler = None
+
+    def __init_subclass__(cls, **kwargs):
+        """A repository implementing 'filter()' must define its 'filterCompiler', checked when its class is created"""
+        super().__init_subclass__(**kwargs)
+        if "filter" in cls.__dict__ and cls.filterCompiler is None:
+            raise TypeError(f"{cls.__name__} implements 'filter()' but does not define 'filterCompiler'!")
+
+    def __init__(self, engine: Engine, router: EngineRouter = None):
         super().__init__(engine=engine)
+        self.router = router
+
+    def get_read_engine(self) -> Engine:
+        """Returns the engine of the read-only queries, a replica unless the request is pinned to the primary"""
+        return self.router.readEngine() if self.router else self.get_engine()
+
+    @contextmanager
+    def writeUnitOfWork(self):
+        """The reads inside the block go to the primary (i.e. load the records to update or delete)"""
+        if self.router:
+            with self.router.writeUnitOfWork():
+                yield
+        else:
+            yield
+
+    def compileFilters(self, filters: Dict[str, Any]):
+        """Validates and compiles the filters into a 'select()' statement and its bound parameters.
+
+        Raises 'BadRequestException' for the unknown fields, operators or invalid values.
+        """
+        return self.filterCompiler.compile(filters)
 
     def save(self, instance: BaseSchema) -> BaseSchema:
         """Returns records by filter or empty list"""
@@ -116,9 +150,9 @@ class SqlAlchemyRepository(AbstractRepository):
         - return: Optional[BaseSchema]
         """
         logger.debug(f"+{self.__class__.__name__}.findById({schemaObject}, {id})")
-        with Session(bind=self.get_engine(), expire_on_commit=False) as session:
+        with Session(bind=self.get_read_engine(), expire_on_commit=False) as session:
             try:
-                schemaObject = session.query(schemaObject).filter(schemaObject.id == id).one()
+                schemaObject = session.execute(selectById(schemaObject), {"id": id}).unique().scalar_one()
                 # rows = session.execute(text(query)).fetchall()
                 # results = [row._asdict() for row in rows]
                 logger.debug(f"Loaded a [{type(schemaObject)}] record. schemaObject={schemaObject}")
@@ -164,12 +198,13 @@ class SqlAlchemyRepository(AbstractRepository):
         logger.debug(f"+{self.__class__.__name__}.findAll({schemaObject}, {filters})")
         schemaObjects = None
         # verbose version of what a context manager will do
-        with Session(bind=self.get_engine(), expire_on_commit=False) as session:
+        with Session(bind=self.get_read_engine(), expire_on_commit=False) as session:
             try:
                 if filters:
-                    schemaObjects = session.query(schemaObject).filter_by(**filters).all()
+                    schemaObjects = session.execute(
+                        select(schemaObject).filter_by(**filters)).unique().scalars().all()
                 else:
-                    schemaObjects = session.query(schemaObject).all()
+                    schemaObjects = session.execute(selectAll(schemaObject)).unique().scalars().all()
 
                 logger.debug(f"Loaded [{len(schemaObjects)}] records. schemaObjects={schemaObjects}")
 
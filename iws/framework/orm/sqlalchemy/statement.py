@@ -0,0 +1,49 @@
+#
+# Author: Rohtash Lakra
+#
+import logging
+from functools import lru_cache
+from typing import Dict, Type
+
+from sqlalchemy import Select, bindparam, select
+
+from framework.orm.sqlalchemy.schema import AbstractSchema
+
+logger = logging.getLogger(__name__)
+
+
+# The cached 'select()' templates of the hot query shapes.
+#
+# Each template is built once per schema (and column) and the values are passed as bound parameters at execution time,
+# so the repositories neither rebuild the 'Query' object nor miss the engine's compiled cache on the repeated calls:
+#
+#     session.execute(selectById(UserSchema), {"id": 1}).unique().scalar_one()
+
+
+@lru_cache(maxsize=128)
+def selectAll(schema: Type[AbstractSchema]) -> Select:
+    """Returns the cached 'SELECT * FROM <table>' statement of the schema"""
+    logger.debug(f"selectAll({schema.__name__})")
+    return select(schema)
+
+
+@lru_cache(maxsize=128)
+def selectById(schema: Type[AbstractSchema]) -> Select:
+    """Returns the cached 'SELECT * FROM <table> WHERE id = :id' statement of the schema"""
+    logger.debug(f"selectById({schema.__name__})")
+    return select(schema).where(schema.id == bindparam("id"))
+
+
+@lru_cache(maxsize=256)
+def selectByColumn(schema: Type[AbstractSchema], column: str) -> Select:
+    """Returns the cached 'SELECT * FROM <table> WHERE <column> = :<column>' statement of the schema"""
+    logger.debug(f"selectByColumn({schema.__name__}, {column})")
+    return select(schema).where(getattr(schema, column) == bindparam(column))
+
+
+def cacheInfo() -> Dict[str, Dict[str, int]]:
+    """Returns the cache stats of the statement templates"""
+    return {
+        function.__name__: function.cache_info()._asdict()
+        for function in (selectAll, selectById, selectByColumn)
+    }
@@ -0,0 +1,411 @@
+#
+# Author: Rohtash Lakra
+# Reference:
+# - https://en.wikipedia.org/wiki/Token_bucket
+# - https://blog.cloudflare.com/counting-things-a-lot-of-different-things/
+#
+import functools
+import logging
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from enum import auto, unique
+from typing import Callable, Dict, Optional, Tuple
+
+from flask import Blueprint, Flask, current_app, make_response, request
+
+from framework.enums import AutoLowerCase
+from framework.exception import TooManyRequestsException
+from framework.orm.pydantic.model import ResponseModel
+
+logger = logging.getLogger(__name__)
+
+# the state of a key, i.e. (tokens, updatedAt) of a bucket or (windowStart, count, previousCount) of a window
+State = Tuple[float, float, float]
+
+
+@unique
+class RateLimitAlgorithm(AutoLowerCase):
+    """RateLimitAlgorithm represents how the requests are counted"""
+    TOKEN_BUCKET = auto()
+    SLIDING_WINDOW = auto()
+
+
+@unique
+class RateLimitStoreType(AutoLowerCase):
+    """RateLimitStoreType represents the backend of the rate limits' state"""
+    MEMORY = auto()
+    SQLITE = auto()
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """The 'limit' requests per 'period' seconds, i.e. RateLimit.parse('10/minute')"""
+    limit: int
+    period: float
+
+    PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+    PATTERN = re.compile(r"^\s*(\d+)\s*(?:/|per)\s*(\d*)\s*(second|minute|hour|day)s?\s*$")
+
+    @classmethod
+    @functools.lru_cache(maxsize=64)
+    def parse(cls, text: str) -> "RateLimit":
+        """Parses the 'limit/[count] period' text, i.e. '100/minute', '5 per second' or '1000/12 hours'"""
+        match = cls.PATTERN.match(text.lower()) if text else None
+        if not match:
+            raise ValueError(f"Invalid rate limit '{text}'!")
+
+        limit, count, period = match.groups()
+        return cls(int(limit), int(count or 1) * cls.PERIODS[period])
+
+    def __str__(self):
+        """Returns the string representation of this object"""
+        return f"{self.limit}/{self.period:g}s"
+
+
+@dataclass(frozen=True)
+class RateLimitResult:
+    """The result of a rate limit hit, 'retryAfter' is the seconds until the next request is allowed"""
+    allowed: bool
+    limit: int
+    remaining: int
+    retryAfter: float = 0.0
+
+
+def tokenBucket(state: Optional[State], rateLimit: RateLimit, now: float) -> Tuple[State, RateLimitResult]:
+    """A bucket of 'limit' tokens, refilled at 'limit / period' per second, a request takes a token"""
+    rate = rateLimit.limit / rateLimit.period
+    if state is None:
+        tokens = float(rateLimit.limit)
+    else:
+        tokens = min(float(rateLimit.limit), state[0] + max(0.0, now - state[1]) * rate)
+
+    if tokens >= 1:
+        tokens -= 1
+        return (tokens, now, 0.0), RateLimitResult(True, rateLimit.limit, int(tokens))
+
+    return (tokens, now, 0.0), RateLimitResult(False, rateLimit.limit, 0, (1 - tokens) / rate)
+
+
+def slidingWindow(state: Optional[State], rateLimit: RateLimit, now: float) -> Tuple[State, RateLimitResult]:
+    """The requests of the current window plus the previous window's weighted by its overlap with the last period"""
+    period = rateLimit.period
+    windowStart = now - now % period
+    count, previousCount = 0.0, 0.0
+    if state is not None:
+        if state[0] == windowStart:
+            count, previousCount = state[1], state[2]
+        elif state[0] == windowStart - period:
+            previousCount = state[1]
+
+    weight = 1 - (now - windowStart) / period
+    estimated = previousCount * weight + count
+    if estimated + 1 <= rateLimit.limit:
+        count += 1
+        return (windowStart, count, previousCount), RateLimitResult(True, rateLimit.limit,
+                                                                    int(rateLimit.limit - estimated - 1))
+
+    # when the previous window's share has dropped enough, or else the next window
+    if count + 1 <= rateLimit.limit and previousCount:
+        retryAfter = (estimated + 1 - rateLimit.limit) / previousCount * period
+    else:
+        retryAfter = windowStart + period - now
+
+    return (windowStart, count, previousCount), RateLimitResult(False, rateLimit.limit, 0, retryAfter)
+
+
+ALGORITHMS: Dict[RateLimitAlgorithm, Callable] = {
+    RateLimitAlgorithm.TOKEN_BUCKET: tokenBucket,
+    RateLimitAlgorithm.SLIDING_WINDOW: slidingWindow,
+}
+
+
+class AbstractRateLimitStore(ABC):
+    """The interface of the rate limits' state stores, the 'hit()' reads and updates a key's state atomically"""
+
+    def __str__(self):
+        """Returns the string representation of this object"""
+        return f"{self.__class__.__name__} <size={self.size()}>"
+
+    def __repr__(self):
+        """Returns the string representation of this object"""
+        return str(self)
+
+    @abstractmethod
+    def hit(self, key: str, rateLimit: RateLimit, algorithm: Callable, now: float) -> RateLimitResult:
+        """Applies the algorithm on the key's state and returns its result"""
+        pass
+
+    @abstractmethod
+    def size(self) -> int:
+        """Returns the number of the tracked keys"""
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Removes all the keys"""
+        pass
+
+    def close(self) -> None:
+        """Releases the resources of the store"""
+        pass
+
+
+class MemoryRateLimitStore(AbstractRateLimitStore):
+    """The per-process state, each worker has its own budget (i.e. a single worker or tests)"""
+
+    def __init__(self, maxSize: int = 100000):
+        self.maxSize = maxSize
+        self._lock = threading.Lock()
+        self._states: Dict[str, State] = {}
+
+    def hit(self, key: str, rateLimit: RateLimit, algorithm: Callable, now: float) -> RateLimitResult:
+        with self._lock:
+            state, result = algorithm(self._states.get(key), rateLimit, now)
+            if len(self._states) >= self.maxSize and key not in self._states:
+                # drop the oldest key, a dropped key starts with the full budget
+                self._states.pop(next(iter(self._states)))
+
+            self._states[key] = state
+
+        return result
+
+    def size(self) -> int:
+        return len(self._states)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._states.clear()
+
+
+class SQLiteRateLimitStore(AbstractRateLimitStore):
+    """The state shared by all the workers of a host through a SQLite (WAL) file, so they see one budget.
+
+    Each hit is a short 'BEGIN IMMEDIATE' transaction (read, apply, write) of the key's row, the durability is relaxed
+    ('synchronous=OFF'), a lost update after a crash only resets some budgets.
+    """
+
+    CREATE_TABLE = ("CREATE TABLE IF NOT EXISTS rate_limits ("
+                    "key TEXT PRIMARY KEY, a REAL NOT NULL, b REAL NOT NULL, c REAL NOT NULL, "
+                    "expires_at REAL NOT NULL)")
+
+    def __init__(self, path: str, timeout: float = 5.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(self.CREATE_TABLE)
+
+    def _connection(self) -> sqlite3.Connection:
+        # the connection is created in the thread (and the process) using it, never shared after a fork
+        connection = getattr(self._local, "connection", None)
+        if connection is None or getattr(self._local, "pid", None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None,
+                                         check_same_thread=False)
+            connection.execute("PRAGMA synchronous=OFF")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+
+        return connection
+
+    def hit(self, key: str, rateLimit: RateLimit, algorithm: Callable, now: float) -> RateLimitResult:
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute("SELECT a, b, c FROM rate_limits WHERE key = ?", (key,)).fetchone()
+            state, result = algorithm(row, rateLimit, now)
+            connection.execute("INSERT OR REPLACE INTO rate_limits (key, a, b, c, expires_at) VALUES (?, ?, ?, ?, ?)",
+                               (key, *state, now + 2 * rateLimit.period))
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+        return result
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Removes the idle keys, their budget is full again"""
+        connection = self._connection()
+        return connection.execute("DELETE FROM rate_limits WHERE expires_at <= ?", (now or time.time(),)).rowcount
+
+    def size(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM rate_limits").fetchone()[0]
+
+    def clear(self) -> None:
+        self._connection().execute("DELETE FROM rate_limits")
+
+    def close(self) -> None:
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+
+def clientIp() -> str:
+    """Returns the client's IP, the peer's address or, behind the 'PROXY_FIX_X_FOR' proxies, the one the ProxyFix
+    resolved from the last hops of 'X-Forwarded-For'"""
+    return request.remote_addr or "unknown"
+
+
+class RateLimiter(object):
+    """RateLimiter limits the requests per client of the routes and the blueprints.
+
+    - '@limiter.limit("10/minute")' limits a route (by default of its blueprint's limit and key).
+    - 'limiter.limitBlueprint(bp, "300/minute")' limits all the routes of a blueprint, the routes decorated with
+      '@limiter.limit()' or '@limiter.exempt' are counted by their own limit only.
+
+    A rejected key is remembered in the process until its 'Retry-After', so the next requests of a throttled client are
+    rejected in memory, without touching the store (and never the DB).
+    """
+
+    def __init__(self, store: Optional[AbstractRateLimitStore] = None,
+                 algorithm: RateLimitAlgorithm = RateLimitAlgorithm.TOKEN_BUCKET,
+                 keyFunc: Callable[[], str] = clientIp, enabled: bool = True, maxBlocked: int = 10000):
+        self.store = store
+        self.algorithm = algorithm
+        self.keyFunc = keyFunc
+        self.enabled = enabled
+        self.maxBlocked = maxBlocked
+        self.defaults: Dict[str, Tuple[RateLimit, Callable[[], str]]] = {}
+        self._blocked: Dict[str, float] = {}
+
+    def __str__(self):
+        """Returns the string representation of this object"""
+        return (f"{self.__class__.__name__} <algorithm={self.algorithm}, store={self.store}, "
+                f"enabled={self.enabled}, blueprints={list(self.defaults)}>")
+
+    def __repr__(self):
+        """Returns the string representation of this object"""
+        return str(self)
+
+    def init_app(self, app: Flask, store: Optional[AbstractRateLimitStore] = None,
+                 algorithm: Optional[RateLimitAlgorithm] = None, enabled: Optional[bool] = None) -> "RateLimiter":
+        """Configures the limiter and renders the 'TooManyRequestsException' of the app with the 'Retry-After'"""
+        if store is not None:
+            self.store = store
+        if algorithm is not None:
+            self.algorithm = algorithm
+        if enabled is not None:
+            self.enabled = enabled
+
+        app.register_error_handler(TooManyRequestsException, self.errorResponse)
+        app.extensions["rateLimiter"] = self
+        logger.debug(f"init_app(), limiter={self}")
+        return self
+
+    @staticmethod
+    def errorResponse(exception: TooManyRequestsException):
+        """Returns the 429 response of the exception"""
+        response = ResponseModel.buildResponseWithException(exception)
+        httpResponse = make_response(response.to_json(), response.status)
+        if exception.retryAfter is not None:
+            httpResponse.headers["Retry-After"] = str(max(1, math.ceil(exception.retryAfter)))
+        if exception.limit is not None:
+            httpResponse.headers["X-RateLimit-Limit"] = str(exception.limit)
+            httpResponse.headers["X-RateLimit-Remaining"] = "0"
+
+        return httpResponse
+
+    def hit(self, key: str, rateLimit: RateLimit, now: Optional[float] = None) -> RateLimitResult:
+        """Counts a request of the key and returns the result"""
+        now = time.time() if now is None else now
+        blockedUntil = self._blocked.get(key)
+        if blockedUntil is not None:
+            if now < blockedUntil:
+                return RateLimitResult(False, rateLimit.limit, 0, blockedUntil - now)
+
+            self._blocked.pop(key, None)
+
+        if self.store is None:
+            self.store = MemoryRateLimitStore()
+
+        result = self.store.hit(key, rateLimit, ALGORITHMS[self.algorithm], now)
+        if not result.allowed:
+            if len(self._blocked) >= self.maxBlocked:
+                self._blocked = {blocked: until for blocked, until in self._blocked.items() if until > now}
+            self._blocked[key] = now + result.retryAfter
+
+        return result
+
+    def check(self, rateLimit: RateLimit, keyFunc: Callable[[], str], scope: str) -> None:
+        """Raises the 'TooManyRequestsException' if the request's client has exceeded the limit of the scope"""
+        if not self.enabled:
+            return
+
+        key = f"{scope}:{keyFunc()}"
+        result = self.hit(key, rateLimit)
+        if not result.allowed:
+            logger.warning(f"Rate limit {rateLimit} exceeded by '{key}', retryAfter={result.retryAfter:.2f}s")
+            raise TooManyRequestsException(messages=[f"Rate limit of {rateLimit.limit} requests exceeded!"],
+                                           retryAfter=result.retryAfter, limit=rateLimit.limit)
+
+    def limit(self, rate: Optional[str] = None, key: Optional[Callable[[], str]] = None, scope: Optional[str] = None):
+        """Limits the route with the rate (defaults to its blueprint's rate) per the key (defaults to the client IP)"""
+
+        def _decorator(func):
+            routeScope = scope or f"{func.__module__}.{func.__name__}"
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                rateLimit, keyFunc = self._resolve(rate, key)
+                if rateLimit is not None:
+                    self.check(rateLimit, keyFunc, routeScope)
+
+                return func(*args, **kwargs)
+
+            wrapper.rateLimited = True
+            return wrapper
+
+        return _decorator
+
+    def exempt(self, func):
+        """Excludes the route from its blueprint's limit"""
+        func.rateLimited = True
+        return func
+
+    def _resolve(self, rate: Optional[str], key: Optional[Callable[[], str]]):
+        if rate:
+            return RateLimit.parse(rate), key or self.keyFunc
+
+        # the blueprint's default, the innermost blueprint first (i.e. 'iws.rest.v1.v1_users' of 'v1_users')
+        for name in request.blueprints:
+            default = self.defaults.get(name.rpartition(".")[2])
+            if default is not None:
+                return default[0], key or default[1]
+
+        return None, None
+
+    def limitBlueprint(self, blueprint: Blueprint, rate: Optional[str], key: Optional[Callable[[], str]] = None):
+        """Limits all the routes of the blueprint with the rate per the key, a falsy rate disables it"""
+        if not rate:
+            return
+
+        self.defaults[blueprint.name] = (RateLimit.parse(rate), key or self.keyFunc)
+
+        @blueprint.before_request
+        def _limitBlueprint():
+            view = current_app.view_functions.get(request.endpoint)
+            if view is not None and getattr(view, "rateLimited", False):
+                return None
+
+            rateLimit, keyFunc = self.defaults[blueprint.name]
+            self.check(rateLimit, keyFunc, blueprint.name)
+            return None
+
+
+def createRateLimitStore(storeType: RateLimitStoreType, path: Optional[str] = None) -> AbstractRateLimitStore:
+    """Creates the rate limits' store of the type"""
+    logger.debug(f"+createRateLimitStore({storeType}, {path})")
+    if storeType == RateLimitStoreType.SQLITE:
+        store = SQLiteRateLimitStore(path)
+    else:
+        store = MemoryRateLimitStore()
+
+    logger.debug(f"-createRateLimitStore(), store={store}")
+    return store
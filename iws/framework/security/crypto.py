@@ -3,16 +3,23 @@
 #
 
 import base64
+import binascii
 import json
 import logging
 import secrets
 import string
+import struct
+import threading
+from functools import lru_cache
+from typing import Dict, List, Optional
 
+from cryptography.exceptions import InvalidTag
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 
 logger = logging.getLogger(__name__)
 
 UTF_8 = 'utf-8'
+ALPHA_NUMERIC = string.ascii_letters + string.digits
 
 
 class SecurityException(Exception):
@@ -20,6 +27,238 @@ class SecurityException(Exception):
     pass
 
 
+class TokenGenerator(object):
+    """TokenGenerator generates the random tokens (i.e. invite codes, nonces) of an alphabet in batches.
+
+    One block of 'secrets.token_bytes()' is mapped to the alphabet through a 256 entries translation table. The bytes
+    beyond the largest multiple of the alphabet's size are dropped (not wrapped), so each character is uniform.
+    """
+
+    def __init__(self, length: int = 16, alphabet: str = ALPHA_NUMERIC):
+        if not 1 < len(alphabet) <= 256 or len(set(alphabet)) != len(alphabet):
+            raise ValueError("The alphabet must have 2 to 256 distinct characters!")
+
+        self.length = length
+        self.alphabet = alphabet
+        encoded = alphabet.encode("ascii")
+        self._limit = 256 - 256 % len(encoded)
+        self._table = bytes(encoded[value % len(encoded)] for value in range(256))
+        self._delete = bytes(range(self._limit, 256))
+
+    def __str__(self):
+        """Returns the string representation of this object"""
+        return f"{self.__class__.__name__} <length={self.length}, alphabet={len(self.alphabet)} chars>"
+
+    def __repr__(self):
+        """Returns the string representation of this object"""
+        return str(self)
+
+    def draw(self, count: int) -> str:
+        """Returns the 'count' random characters of the alphabet"""
+        chars = b""
+        while len(chars) < count:
+            # the dropped bytes are expected, the margin avoids a second draw almost always
+            missing = count - len(chars)
+            chars += secrets.token_bytes(missing * 256 // self._limit + 16).translate(self._table, self._delete)
+
+        return chars[:count].decode("ascii")
+
+    def generate(self) -> str:
+        """Returns a random token"""
+        return self.draw(self.length)
+
+    def generate_many(self, n: int) -> List[str]:
+        """Returns 'n' random tokens of one draw"""
+        length = self.length
+        chars = self.draw(n * length)
+        return [chars[index:index + length] for index in range(0, n * length, length)]
+
+
+class PasswordGenerator(TokenGenerator):
+    """PasswordGenerator generates the alphanumeric passwords with at least the lowercase, uppercase and digit counts.
+
+    The required characters are drawn from their classes, the others from the whole alphabet and each password is
+    shuffled, so the constraints hold in one pass (no retry until a random password happens to meet them).
+    """
+
+    def __init__(self, length: int = 10, atLeastDigits: int = 1, atLeastLower: int = 1, atLeastUpper: int = 1):
+        if atLeastDigits + atLeastLower + atLeastUpper > length:
+            raise ValueError(f"The password of length '{length}' can't have the required characters!")
+
+        super().__init__(length, ALPHA_NUMERIC)
+        self._required = [(TokenGenerator(1, string.ascii_lowercase), atLeastLower),
+                          (TokenGenerator(1, string.ascii_uppercase), atLeastUpper),
+                          (TokenGenerator(1, string.digits), atLeastDigits)]
+
+    def generate(self) -> str:
+        """Returns a random password"""
+        return self.generate_many(1)[0]
+
+    def generate_many(self, n: int) -> List[str]:
+        """Returns 'n' random passwords of one draw per characters' class"""
+        length = self.length
+        free = length - sum(count for _, count in self._required)
+        freeChars = self.draw(n * free)
+        requiredChars = [(generator.draw(n * count), count) for generator, count in self._required if count]
+        # the 16-bit random swaps of the Fisher-Yates shuffles, the modulo bias is negligible for the short passwords
+        swaps = memoryview(secrets.token_bytes(n * length * 2)).cast("H")
+        passwords = []
+        for index in range(n):
+            chars = list(freeChars[index * free:(index + 1) * free])
+            for drawnChars, count in requiredChars:
+                chars.extend(drawnChars[index * count:(index + 1) * count])
+
+            offset = index * length
+            for position in range(length - 1, 0, -1):
+                swap = swaps[offset + position] % (position + 1)
+                chars[position], chars[swap] = chars[swap], chars[position]
+
+            passwords.append("".join(chars))
+
+        return passwords
+
+
+@lru_cache(maxsize=16)
+def getTokenGenerator(length: int = 16, alphabet: str = ALPHA_NUMERIC) -> TokenGenerator:
+    """Returns the token generator of the length and alphabet, its translation table is built once"""
+    return TokenGenerator(length, alphabet)
+
+
+@lru_cache(maxsize=16)
+def getPasswordGenerator(length: int = 10, atLeastDigits: int = 1) -> PasswordGenerator:
+    """Returns the password generator of the length and the required digits"""
+    return PasswordGenerator(length, atLeastDigits)
+
+
+@lru_cache(maxsize=16)
+def _aesgcm(key: bytes) -> AESGCM:
+    # the cipher object only holds the key schedule, it's thread-safe and reusable
+    return AESGCM(key)
+
+
+class KeyRing(object):
+    """KeyRing encrypts the tokens with the active AES-GCM key and decrypts them with the key they were sealed with.
+
+    Each token is 'version | keyId | nonce | ciphertext+tag': a random 96-bit nonce per message and the header bound
+    as the associated data. To rotate, add the new key and make it active, the tokens of the older keys are decrypted
+    until their key is removed. The cipher objects are created once per key id.
+    """
+
+    VERSION = 1
+    # version, key id
+    HEADER = struct.Struct("<BB")
+    NONCE_SIZE = 12
+    TAG_SIZE = 16
+
+    def __init__(self, keys: Dict[int, bytes] = None, activeKeyId: Optional[int] = None):
+        self._lock = threading.Lock()
+        self._ciphers: Dict[int, AESGCM] = {}
+        self.activeKeyId = None
+        for keyId, key in (keys or {}).items():
+            self.addKey(keyId, key)
+
+        if activeKeyId is not None:
+            self.activate(activeKeyId)
+        elif self._ciphers:
+            self.activeKeyId = max(self._ciphers)
+
+    def __str__(self):
+        """Returns the string representation of this object"""
+        return f"{self.__class__.__name__} <keyIds={sorted(self._ciphers)}, activeKeyId={self.activeKeyId}>"
+
+    def __repr__(self):
+        """Returns the string representation of this object"""
+        return str(self)
+
+    @classmethod
+    def fromText(cls, keys: str, activeKeyId: Optional[int] = None) -> "KeyRing":
+        """Builds the key-ring from the 'keyId:key' pairs separated by comma (i.e. '1:<32 chars>,2:<32 chars>')"""
+        keyRing = cls()
+        for pair in filter(None, (pair.strip() for pair in (keys or "").split(","))):
+            keyId, _, key = pair.partition(":")
+            keyRing.addKey(int(keyId), key.encode(UTF_8))
+
+        if keyRing._ciphers:
+            keyRing.activate(activeKeyId if activeKeyId is not None else max(keyRing._ciphers))
+
+        return keyRing
+
+    def addKey(self, keyId: int, key: bytes) -> None:
+        """Adds the key (of 16, 24 or 32 bytes) of the id"""
+        if not 0 <= keyId <= 255:
+            raise SecurityException(f"The key id '{keyId}' must be in the range [0, 255]!")
+        if len(key) not in (16, 24, 32):
+            raise SecurityException(f"The key '{keyId}' must be of 16, 24 or 32 bytes!")
+
+        with self._lock:
+            self._ciphers[keyId] = AESGCM(key)
+
+    def activate(self, keyId: int) -> None:
+        """Encrypts the new tokens with the key of the id"""
+        if keyId not in self._ciphers:
+            raise SecurityException(f"The key '{keyId}' does not exist!")
+
+        self.activeKeyId = keyId
+
+    def rotate(self, keyId: int, key: bytes) -> None:
+        """Adds the new key and makes it active, the older keys still decrypt their tokens"""
+        logger.info(f"Rotating the encryption key from '{self.activeKeyId}' to '{keyId}'")
+        self.addKey(keyId, key)
+        self.activate(keyId)
+
+    def removeKey(self, keyId: int) -> None:
+        """Removes the retired key, its tokens are not decrypted anymore"""
+        if keyId == self.activeKeyId:
+            raise SecurityException(f"The active key '{keyId}' can't be removed!")
+
+        with self._lock:
+            self._ciphers.pop(keyId, None)
+
+    def encrypt(self, data: bytes) -> bytes:
+        """Returns the sealed token of the data"""
+        if self.activeKeyId is None:
+            raise SecurityException("The key-ring has no active key!")
+
+        header = self.HEADER.pack(self.VERSION, self.activeKeyId)
+        nonce = secrets.token_bytes(self.NONCE_SIZE)
+        return header + nonce + self._ciphers[self.activeKeyId].encrypt(nonce, data, header)
+
+    def decrypt(self, token: bytes) -> bytes:
+        """Returns the data of the sealed token"""
+        if len(token) < self.HEADER.size + self.NONCE_SIZE + self.TAG_SIZE:
+            raise SecurityException("The token is malformed!")
+
+        version, keyId = self.HEADER.unpack_from(token)
+        cipher = self._ciphers.get(keyId)
+        if version != self.VERSION or cipher is None:
+            raise SecurityException("The token's version or key is not supported!")
+
+        nonceEnd = self.HEADER.size + self.NONCE_SIZE
+        try:
+            return cipher.decrypt(token[self.HEADER.size:nonceEnd], token[nonceEnd:], token[:self.HEADER.size])
+        except InvalidTag:
+            raise SecurityException("The token has been tampered!")
+
+    def encode(self, data: bytes) -> str:
+        """Returns the URL-safe text of the sealed token"""
+        return base64.urlsafe_b64encode(self.encrypt(data)).rstrip(b"=").decode(UTF_8)
+
+    def decode(self, text: str) -> bytes:
+        """Returns the data of the URL-safe text token"""
+        try:
+            token = base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+        except (binascii.Error, TypeError, ValueError):
+            raise SecurityException("The token is malformed!")
+
+        return self.decrypt(token)
+
+
+@lru_cache(maxsize=4)
+def getKeyRing(keys: str, activeKeyId: Optional[int] = None) -> KeyRing:
+    """Returns the key-ring of the configured keys, its ciphers are created once per worker"""
+    return KeyRing.fromText(keys, activeKeyId)
+
+
 class CryptoUtils:
     """"""
 
@@ -39,12 +278,8 @@ class CryptoUtils:
     def nonce_token(length: int):
         """Generates a random nonce token of the provided length."""
         logger.debug(f"+nonce_token({length})")
-        # Use digits only
-        # characters = string.digits
         # Use both lowercase and uppercase letters (string.ascii_letters) as well as digits (string.digits).
-        alpha_numeric = string.ascii_letters + string.digits
-        # Generate the token
-        token = ''.join(secrets.choice(alpha_numeric) for _ in range(length))
+        token = getTokenGenerator(length, ALPHA_NUMERIC).generate()
 
         logger.debug(f"-nonce_token(), token={token}")
         return token
@@ -55,7 +290,7 @@ class CryptoUtils:
         if not (enc_key or enc_nonce):
             raise SecurityException("Either security key or nonce is wrong!")
 
-        aesgcm = AESGCM(enc_key.encode(UTF_8))
+        aesgcm = _aesgcm(enc_key.encode(UTF_8))
         data_bytes = aesgcm.encrypt(enc_nonce.encode(UTF_8), data.encode(UTF_8), CryptoUtils.extra_data)
         encrypted = base64.b64encode(data_bytes).decode(UTF_8)
         logger.debug(f"-encrypt_with_aesgcm(), encrypted={encrypted}")
@@ -67,7 +302,7 @@ class CryptoUtils:
         if not (enc_key or enc_nonce):
             raise SecurityException("Either security key or nonce is wrong!")
 
-        aesgcm = AESGCM(enc_key.encode(UTF_8))
+        aesgcm = _aesgcm(enc_key.encode(UTF_8))
         data_bytes = base64.b64decode(data)
         decrypted = aesgcm.decrypt(enc_nonce.encode(UTF_8), data_bytes, CryptoUtils.extra_data).decode(UTF_8)
         decrypted = json.loads(decrypted)
@@ -79,12 +314,4 @@ class CryptoUtils:
         """
         Generate a ten-character alphanumeric password with at least one lowercase character, at least one uppercase character, and at least three digits:
         """
-        alphabet = string.ascii_letters + string.digits
-        while True:
-            password = ''.join(secrets.choice(alphabet) for i in range(length))
-            if (any(c.islower() for c in password)
-                    and any(c.isupper() for c in password)
-                    and sum(c.isdigit() for c in password) >= atLeastDigits):
-                break
-
-        return password
+        return getPasswordGenerator(length, atLeastDigits).generate()
@@ -30,8 +30,11 @@ class HashUtils(BaseEnum):
         return hashBase64
 
     @classmethod
-    def hashCodeWithSalt(cls, textHashCode, salt: str = Utils.randomUUID()):
-        # salt = Utils.randomUUID()
+    def hashCodeWithSalt(cls, textHashCode, salt: str = None):
+        # a new salt per call, a default argument would be generated once at import time and shared by all the calls
+        if salt is None:
+            salt = Utils.randomUUID()
+
         # saltBytes = bytes(salt, UTF_8)
         saltBytes = salt.encode()
         saltEncoded = hashlib.sha256(saltBytes)
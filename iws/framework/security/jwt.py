@@ -3,23 +3,36 @@
 # Reference:
 # - https://pyjwt.readthedocs.io/en/2.10.1/
 #
+import base64
+import copy
 import json
 import logging
+import struct
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass, asdict
 from datetime import datetime, timezone, timedelta
 from enum import auto, unique
-from typing import Union, Optional, Any, Dict
+from functools import lru_cache
+from typing import Union, Optional, Any, Dict, ClassVar
 
 import jwt
 import requests
+from jwt import PyJWK
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from framework.enums import BaseEnum
-from framework.exception import AuthenticationException, ValidationException
-from framework.http import HTTPStatus
+from framework.exception import AuthenticationException, BadRequestException, ValidationException
 from framework.orm.pydantic.model import AbstractModel, BaseModel
+from framework.security.store import AbstractTokenStore, MemoryTokenStore
 
 logger = logging.getLogger(__name__)
 
+# the refresh tokens expire in 30 days, the token store keeps the user's tokens until then
+REFRESH_EXPIRES_IN_SECONDS = 60 * 60 * 24 * 30
+
 
 @unique
 class JwtAlgoEnum(BaseEnum):
@@ -35,6 +48,7 @@ class JWTEnum(BaseEnum):
     ISSUED_AT = 'iat'
     EXPIRY = 'exp'
     SUBJECT = 'sub'
+    JWT_ID = 'jti'
     TYPE = 'type'
     GRANT_TYPE = 'grant_type'
     CLIENT_ID = 'client_id'
@@ -94,6 +108,8 @@ class TokenPayload:
     sub: str
     email: Optional[str] = None
     type: Optional[str] = None
+    # the unique id of the token, used to revoke it
+    jti: Optional[str] = None
     
     def __str__(self):
         """Converts the dataclass instance to a string."""
@@ -153,6 +169,7 @@ class AuthenticatedUser(BaseModel):
     user_id: Union[int | None] = None
     token_type: TokenTypeEnum
     token: str
+    refresh_token: Optional[str] = None
     user_exists: bool
     # Time since epoch
     exp: Union[float | int | None] = None
@@ -166,18 +183,34 @@ class AuthenticatedUser(BaseModel):
 class AuthModel(AbstractModel):
     """Authentication model object."""
     
+    # the binary payload of the encrypted auth-tokens (user_id, iat, token_version)
+    PAYLOAD: ClassVar[struct.Struct] = struct.Struct("<QQI")
+    
     user_id: int = None
     auth_token: str = None
     iat: int = None
+    # the user's token version at the login, a password change rotates it
+    token_version: int = 0
     
     def to_json(self) -> str:
         """Returns the JSON representation of this object."""
         return self.model_dump_json(exclude=["created_at", "updated_at"])
     
+    def to_bytes(self) -> bytes:
+        """Returns the compact binary payload of this object (the auth_token is never packed)."""
+        return self.PAYLOAD.pack(self.user_id, self.iat, self.token_version or 0)
+    
+    @classmethod
+    def from_bytes(cls, payload: bytes) -> "AuthModel":
+        """Returns the object of the binary payload."""
+        user_id, iat, token_version = cls.PAYLOAD.unpack(payload)
+        # the payload is authenticated and of the packed types, the validation is skipped
+        return cls.model_construct(user_id=user_id, iat=iat, token_version=token_version)
+    
     def __str__(self) -> str:
         """Returns the string representation of this object"""
-        return ("{} <user_id={}, auth_token={}, iat={}>"
-                .format(self.getClassName(), self.user_id, self.auth_token, self.iat))
+        return ("{} <user_id={}, auth_token={}, iat={}, token_version={}>"
+                .format(self.getClassName(), self.user_id, self.auth_token, self.iat, self.token_version))
 
 
 class JWTUtils(object):
@@ -216,14 +249,81 @@ class JWTUtils(object):
     def getIdentity(cls, jwtToken: Union[str | None]):
         """Validates the request contains the JWT token."""
         if jwtToken is None:
-            raise AuthenticationException(HTTPStatus.BAD_REQUEST, "The JWT Token must provide in request!")
+            raise AuthenticationException(messages=["The JWT Token must provide in request!"])
         
         try:
             # Decode the JWT token
             decodedToken = jwt.decode(jwtToken, "secret", algorithms=[JwtAlgoEnum.HS256.name])
             return decodedToken.get('sub')
         except Exception:
-            raise AuthenticationException(HTTPStatus.UNAUTHORIZED, "Invalid or Expired JWT Token!")
+            raise AuthenticationException(messages=["Invalid or Expired JWT Token!"])
+    
+    @classmethod
+    def isJWT(cls, token: Optional[str]) -> bool:
+        """Returns true if the token looks like a compact JWS (header.payload.signature)"""
+        return bool(token) and token.count('.') == 2
+
+
+class AccessTokenVerifier(object):
+    """AccessTokenVerifier verifies the signed JWT access tokens purely in memory.
+
+    The signature, 'exp', 'aud' and 'iss' are validated without touching the database. The signing key is decoded
+    and the decode options are built once per verifier, not on each request.
+    """
+    
+    def __init__(self, clientId: str, clientSecret: str, issuer: str = JWTEnum.DEFAULT_ISSUER.value,
+                 leeway: int = 0, algorithm: str = JwtAlgoEnum.HS256.name):
+        if not clientSecret:
+            raise ValidationException("The 'clientSecret' should provide.")
+        
+        self.audience = clientId
+        self.issuer = issuer
+        self.leeway = leeway
+        self.algorithms = [algorithm]
+        # the prepared (decoded) signing key, reused by all the verifications
+        encodedSecret = base64.urlsafe_b64encode(clientSecret.encode()).rstrip(b'=').decode()
+        self.signingKey = PyJWK({"kty": "oct", "k": encodedSecret}, algorithm=algorithm)
+        # the decoder with the required claims
+        self.decoder = jwt.PyJWT(options=TokenPayload.get_options())
+    
+    def __str__(self):
+        """Returns the string representation of this object"""
+        return f"{self.__class__.__name__} <audience={self.audience}, issuer={self.issuer}, algorithms={self.algorithms}>"
+    
+    def __repr__(self):
+        """Returns the string representation of this object"""
+        return str(self)
+    
+    def verify(self, encodedToken: str, tokenType: TokenTypeEnum = TokenTypeEnum.ACCESS_TOKEN) -> Dict[str, Any]:
+        """Returns the decoded claims of the token, raises 'AuthenticationException' if it's invalid or expired"""
+        if not encodedToken:
+            raise AuthenticationException(messages=["The JWT Token must provide in request!"])
+        
+        try:
+            decodedToken = self.decoder.decode(encodedToken,
+                                               key=self.signingKey,
+                                               algorithms=self.algorithms,
+                                               audience=self.audience,
+                                               issuer=self.issuer,
+                                               leeway=self.leeway)
+        except jwt.ExpiredSignatureError:
+            raise AuthenticationException(messages=["JWT Token has expired!"])
+        except jwt.InvalidTokenError as ex:
+            logger.debug(f"Invalid JWT Token! Error={ex}")
+            raise AuthenticationException(messages=["Invalid JWT Token!"])
+        
+        if decodedToken.get(JWTEnum.TYPE.value) != tokenType.value:
+            raise AuthenticationException(messages=["Invalid JWT Token type!"])
+        
+        return decodedToken
+
+
+@lru_cache(maxsize=8)
+def getAccessTokenVerifier(clientId: str, clientSecret: str,
+                           issuer: str = JWTEnum.DEFAULT_ISSUER.value) -> AccessTokenVerifier:
+    """Returns the cached verifier of the client"""
+    logger.debug(f"getAccessTokenVerifier({clientId}, {issuer})")
+    return AccessTokenVerifier(clientId, clientSecret, issuer=issuer)
 
 
 class TokenManager:
@@ -236,15 +336,58 @@ class TokenManager:
     To handle token expiry in Python, a common approach involves storing the tokens securely and implementing a
     mechanism to check for expiry before making API requests. If the access token has expired, the refresh token is
     used to obtain a new access token and update the stored tokens.
+    
+    The user's tokens are kept in a bounded token store (per-process LRU by default, or a store shared by the workers)
+    until the refresh token expires.
+    
+    The remote refreshes use a pooled keep-alive session with timeouts and retries. Only one refresh per user is in
+    flight, the concurrent callers wait for its result, and the access tokens are refreshed in the background
+    'refreshAheadSeconds' before they expire.
     """
     
-    def __init__(self, clientId, clientSecret, expiresInSeconds: int = None, tokenServiceUrl: str = None):
+    def __init__(self, clientId, clientSecret, expiresInSeconds: int = None, tokenServiceUrl: str = None,
+                 tokenStore: AbstractTokenStore = None, timeout: float = 5.0, retries: int = 2,
+                 refreshAheadSeconds: int = 60, poolSize: int = 10):
         """Initialize the token manager"""
         self.clientId = clientId
         self.clientSecret = clientSecret
         self.expiresInSeconds = expiresInSeconds
         self.tokenServiceUrl = tokenServiceUrl
-        self.tokens: dict[str, UserToken] = dict()
+        self.tokens = tokenStore if tokenStore is not None else MemoryTokenStore(REFRESH_EXPIRES_IN_SECONDS)
+        self.timeout = timeout
+        self.refreshAheadSeconds = refreshAheadSeconds
+        self.session = self.createSession(retries, poolSize) if tokenServiceUrl else None
+        # the in-flight refresh of each user
+        self._lock = threading.Lock()
+        self._refreshes: Dict[str, Future] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+    
+    def __str__(self):
+        """Returns the string representation of this object"""
+        return f"{self.__class__.__name__} <clientId={self.clientId}, tokenServiceUrl={self.tokenServiceUrl}>"
+    
+    def __repr__(self):
+        """Returns the string representation of this object"""
+        return str(self)
+    
+    @staticmethod
+    def createSession(retries: int, poolSize: int) -> requests.Session:
+        """Returns the keep-alive session of the token service, the failed connections and 5xx are retried"""
+        retry = Retry(total=retries, connect=retries, read=0, backoff_factor=0.2, status_forcelist=(502, 503, 504),
+                      allowed_methods=frozenset({"POST"}), raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=poolSize, max_retries=retry)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+    
+    def close(self):
+        """Releases the pooled connections and the background refresh thread"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self.session is not None:
+            self.session.close()
     
     def getIssuedAt(self):
         """Returns current datetime value."""
@@ -254,6 +397,10 @@ class TokenManager:
         """Return access token expiry - By default, access token expires in 15 (60 * 15) minutes"""
         return self.expiresInSeconds if self.expiresInSeconds else (60 * 15)
     
+    def getRefreshExpiresInSeconds(self):
+        """Return refresh token expiry - By default, refresh token expires in 30 days"""
+        return REFRESH_EXPIRES_IN_SECONDS
+    
     def encodeToken(self, tokenPayload: TokenPayload, clientSecret: str,
                     algorithm: str = JwtAlgoEnum.HS256.name) -> str:
         """Encodes the given 'token_payload' using 'clientSecret' and 'algorithm'.
@@ -269,7 +416,9 @@ class TokenManager:
         if not clientSecret:
             raise ValidationException("The 'clientSecret' should provide.")
         
-        encodedToken = jwt.encode(tokenPayload.as_dict(), clientSecret, algorithm=algorithm)
+        # the optional claims are omitted (i.e. a 'null' jti is rejected on decode)
+        claims = {key: value for key, value in tokenPayload.as_dict().items() if value is not None}
+        encodedToken = jwt.encode(claims, clientSecret, algorithm=algorithm)
         logger.debug("-encodeToken(%s), encodedToken=%s", tokenPayload, encodedToken)
         return encodedToken
     
@@ -290,7 +439,7 @@ class TokenManager:
             algorithm: JwtAlgoEnum.HS256.name
         """
         # client_secret_hash = HashUtils.md5_hash(clientSecret)
-        logger.debug("+decodeToken(%s, %s, %s, %s, %s, %s)", encodedToken, issuer, audience, options, algorithm)
+        logger.debug("+decodeToken(%s, %s, %s, %s, %s)", encodedToken, issuer, audience, options, algorithm)
         if not encodedToken:
             raise ValidationException("The 'encodedToken' should provide.")
         
@@ -308,6 +457,10 @@ class TokenManager:
         logger.debug("-decodeToken(%s), decodedToken=%s", encodedToken, decodedToken)
         return decodedToken
     
+    def verifyAccessToken(self, encodedToken: str) -> Dict[str, Any]:
+        """Verifies the access token in memory (signature, 'exp', 'aud' and 'iss') and returns its claims."""
+        return getAccessTokenVerifier(self.clientId, self.clientSecret).verify(encodedToken)
+    
     def generateTokens(self, userId: str) -> UserToken:
         """Generates access and refresh tokens for a given user ID."""
         logger.debug(f"+generateTokens({userId}), tokens => {self.tokens}")
@@ -325,16 +478,19 @@ class TokenManager:
                                           iat=int(issuedAt.timestamp()),
                                           exp=int(expiresAt.timestamp()),
                                           sub=userId,
-                                          type=TokenTypeEnum.ACCESS_TOKEN.value)
+                                          type=TokenTypeEnum.ACCESS_TOKEN.value,
+                                          jti=uuid.uuid4().hex)
         logger.debug("accessTokenPayload=%s", accessTokenPayload)
         
         # refresh token payload and expiry - By default, refresh token expires in 30 days
         refreshTokenPayload = TokenPayload(aud=self.clientId,
                                            iss=JWTEnum.DEFAULT_ISSUER.value,
                                            iat=int(issuedAt.timestamp()),
-                                           exp=int((issuedAt + timedelta(days=30)).timestamp()),
+                                           exp=int((issuedAt + timedelta(
+                                               seconds=self.getRefreshExpiresInSeconds())).timestamp()),
                                            sub=userId,
-                                           type=TokenTypeEnum.REFRESH_TOKEN.value)
+                                           type=TokenTypeEnum.REFRESH_TOKEN.value,
+                                           jti=uuid.uuid4().hex)
         logger.debug("refreshTokenPayload=%s", refreshTokenPayload)
         
         # generate access token
@@ -348,7 +504,7 @@ class TokenManager:
                               expiresAt=int(expiresAt.timestamp()))
         # logger.debug(f"userToken={userToken.model_dump(exclude_defaults=True)}")
         logger.debug("userToken=%s", userToken)
-        self.tokens[userId] = userToken
+        self.tokens.put(userId, userToken)
         logger.debug("-generateTokens(), userToken=%s, tokens=%s", userToken, self.tokens)
         return userToken
     
@@ -356,18 +512,76 @@ class TokenManager:
         """Returns true either if expires_at is None or current time >= expires_at, False otherwise"""
         return expiresAt is None or datetime.now().timestamp() >= expiresAt
     
+    def isExpiring(self, expiresAt: int = None) -> bool:
+        """Returns true if the token expires within 'refreshAheadSeconds'"""
+        return expiresAt is not None and datetime.now().timestamp() + self.refreshAheadSeconds >= expiresAt
+    
+    def refreshInBackground(self, userId: str) -> Future:
+        """Refreshes the user's access token in a background thread (coalesced with any in-flight refresh)"""
+        with self._lock:
+            future = self._refreshes.get(userId)
+            if future is not None:
+                return future
+
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="TokenRefresh")
+
+            logger.debug("Refreshing the access token of user=%s in the background", userId)
+            # registered before the lock is released, the concurrent callers wait for this refresh
+            future = self._executor.submit(self._refreshAccessToken, userId)
+            self._refreshes[userId] = future
+
+        future.add_done_callback(lambda done: self._onRefreshed(userId, done))
+        return future
+
+    def _onRefreshed(self, userId: str, future: Future) -> None:
+        """Drops the finished background refresh of the user and logs its error"""
+        with self._lock:
+            if self._refreshes.get(userId) is future:
+                self._refreshes.pop(userId)
+
+        if not future.cancelled() and future.exception() is not None:
+            logger.error(f"Error while refreshing the access token of user={userId}! Error={future.exception()}")
+
     def refreshAccessToken(self, userId: str, userToken: UserToken = None) -> UserToken:
-        """Refreshes an expired access token for the user_id using a valid refresh token."""
+        """Refreshes an expired access token for the user_id using a valid refresh token.
+
+        The concurrent refreshes of the same user are coalesced (single-flight), the first caller refreshes the token
+        and the others wait for its result.
+        """
+        with self._lock:
+            future = self._refreshes.get(userId)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._refreshes[userId] = future
+
+        if not leader:
+            logger.debug("Waiting for the in-flight refresh of user=%s", userId)
+            return future.result(timeout=self.timeout * 3)
+
+        try:
+            userToken = self._refreshAccessToken(userId, userToken)
+            future.set_result(userToken)
+            return userToken
+        except BaseException as ex:
+            future.set_exception(ex)
+            raise
+        finally:
+            with self._lock:
+                self._refreshes.pop(userId, None)
+
+    def _refreshAccessToken(self, userId: str, userToken: UserToken = None) -> UserToken:
         logger.debug("+refreshAccessToken(%s), userToken=%s, tokens=%s", userId, userToken, self.tokens)
         # check a token already exists for the user
-        if userId in self.tokens.keys() and not userToken:
-            userToken = self.tokens[userId]
+        if not userToken:
+            userToken = self.tokens.get(userId)
             logger.debug("Cached userToken=%s", userToken)
             # validate the existing user's token is not tempered
             if userToken and userToken.userId != userId:
                 raise ValidationException('Tempered refresh token!')
-        elif not userToken:
-            userToken = UserToken(userId=userId)
+            elif not userToken:
+                userToken = UserToken(userId=userId)
         
         # check if the token needs to refresh remotely or locally
         if self.tokenServiceUrl:
@@ -380,7 +594,7 @@ class TokenManager:
             }
             
             # send request to refresh token
-            response = requests.post(self.tokenServiceUrl, data=payload)
+            response = self.session.post(self.tokenServiceUrl, data=payload, timeout=self.timeout)
             response.raise_for_status()
             tokenData = response.json()
             # in case of server request, set issued at after getting the response
@@ -411,7 +625,8 @@ class TokenManager:
                                                 iat=int(issued_at.timestamp()),
                                                 exp=int(expires_at.timestamp()),
                                                 sub=userId,
-                                                type=TokenTypeEnum.ACCESS_TOKEN.value)
+                                                type=TokenTypeEnum.ACCESS_TOKEN.value,
+                                                jti=uuid.uuid4().hex)
             logger.debug(f"access_token_payload={access_token_payload}")
             # new access token using refresh token
             access_token = jwt.encode(access_token_payload.as_dict(), self.clientSecret,
@@ -436,7 +651,7 @@ class TokenManager:
             expiresInSeconds = tokenData.get('expires_in', self.getExpiresInSeconds())
             # access token expiry
             userToken.expiresAt = int((issued_at + timedelta(seconds=expiresInSeconds)).timestamp())
-            self.tokens[userId] = userToken
+            self.tokens.put(userId, userToken)
         
         logger.debug(f"-refreshAccessToken(), userToken={userToken}, tokens={self.tokens}")
         return userToken
@@ -444,24 +659,23 @@ class TokenManager:
     def getAccessToken(self, user_id: str) -> UserToken:
         """Handles refreshing an access_token on expiry."""
         logger.debug("+getAccessToken(%s), tokens=%s", user_id, self.tokens)
-        if user_id in self.tokens.keys():
-            userToken = self.tokens[user_id]
+        userToken = self.tokens.get(user_id)
+        if userToken:
             logger.debug("userToken=%s", userToken)
-            # validate the token already exists
-            if not userToken:
-                raise Exception('The provided token is invalid!')
-            
             # validate the existing user's token is not tempered
             if userToken.userId != user_id:
                 raise Exception('The provided token is either invalid or malformed!')
             
             try:
                 # decode an access token and validate expiry
-                decodedToken = jwt.decode(userToken.accessToken, self.client_secret,
-                                          algorithms=[JwtAlgoEnum.HS256.name])
+                decodedToken = self.decodeToken(encodedToken=userToken.accessToken,
+                                                clientSecret=self.clientSecret,
+                                                issuer=JWTEnum.DEFAULT_ISSUER.value,
+                                                audience=self.clientId,
+                                                options=TokenPayload.get_options())
             except jwt.ExpiredSignatureError as e:
                 logger.error(f"Token signature has expired! Error={str(e)}, type={type(e)}")
-                userToken = self.refreshAccessToken(user_id)
+                userToken = copy.copy(self.refreshAccessToken(user_id))
                 userToken.refreshToken = None
             except jwt.InvalidTokenError as e:
                 logger.error(f"Error decoding access token! Exception={str(e)}, type={type(e)}")
@@ -469,7 +683,7 @@ class TokenManager:
                 logger.debug("decoded access token=%s", decodedToken)
                 if decodedToken:
                     # validate the token is a type of refresh-token
-                    if not TokenTypeEnum.isAccessToken(decoded_access_token):
+                    if not TokenTypeEnum.isAccessToken(decodedToken):
                         raise BadRequestException("The provided token is either invalid or malformed!")
                     
                     # validate if an access-token is expired or not and refresh it
@@ -477,6 +691,9 @@ class TokenManager:
                         userToken = self.refreshAccessToken(user_id)
                         userToken = copy.copy(userToken)
                         userToken.refreshToken = None
+                    elif self.isExpiring(userToken.expiresAt):
+                        # still valid, refresh it in the background before it expires
+                        self.refreshInBackground(user_id)
                 else:
                     logger.warning("Missing decodedToken!")
         else:
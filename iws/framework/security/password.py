@@ -0,0 +1,216 @@
+#
+# Author: Rohtash Lakra
+# Reference:
+# - https://docs.python.org/3/library/hashlib.html#hashlib.scrypt
+# - https://www.rfc-editor.org/rfc/rfc7914
+#
+import base64
+import hashlib
+import hmac
+import logging
+import re
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# the legacy unsalted SHA-256 hex digest of the password (i.e. 'HashUtils.hashCode()')
+LEGACY_SHA256 = re.compile(r"^[0-9a-f]{64}$")
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.b64encode(data).decode().rstrip("=")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+
+class VerifiedPasswordCache(object):
+    """A short-lived cache of the verified (password, hash) pairs, so the repeat logins in a burst skip the KDF.
+
+    The entries are keyed by a keyed BLAKE2b digest of the pair (the key is random per process), the passwords are
+    never held. A changed password has another hash, so its old entries are never hit and expire with their TTL.
+    """
+
+    def __init__(self, ttlSeconds: float = 60, maxSize: int = 1024):
+        self.ttlSeconds = ttlSeconds
+        self.maxSize = maxSize
+        self._key = secrets.token_bytes(32)
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[bytes, float] = OrderedDict()
+
+    def __str__(self):
+        """Returns the string representation of this object"""
+        return f"{self.__class__.__name__} <size={len(self._entries)}, ttlSeconds={self.ttlSeconds}>"
+
+    def __repr__(self):
+        """Returns the string representation of this object"""
+        return str(self)
+
+    def _digest(self, password: str, encoded: str) -> bytes:
+        return hashlib.blake2b(f"{encoded}\0{password}".encode(), key=self._key, digest_size=32).digest()
+
+    def contains(self, password: str, encoded: str) -> bool:
+        """Returns true if the password has been verified against the hash within the TTL"""
+        if self.ttlSeconds <= 0:
+            return False
+
+        digest = self._digest(password, encoded)
+        with self._lock:
+            expiresAt = self._entries.get(digest)
+            if expiresAt is None:
+                return False
+
+            if expiresAt <= time.monotonic():
+                del self._entries[digest]
+                return False
+
+            return True
+
+    def add(self, password: str, encoded: str) -> None:
+        """Remembers the verified pair"""
+        if self.ttlSeconds <= 0:
+            return
+
+        digest = self._digest(password, encoded)
+        with self._lock:
+            self._entries[digest] = time.monotonic() + self.ttlSeconds
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.maxSize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class PasswordHasher(object):
+    """PasswordHasher hashes the passwords with the memory-hard scrypt KDF and a per-user random salt.
+
+    The hashes are self-describing and versioned, i.e. '$scrypt$v=1$n=16384,r=8,p=1$<salt>$<hash>' (base64 without
+    padding), so the cost can be raised without invalidating the stored hashes: the old formats (including the legacy
+    unsalted SHA-256 hex digests) are still verified and 'verifyAndUpdate()' returns the new hash to store on login.
+    """
+
+    ALGORITHM = "scrypt"
+    VERSION = 1
+    PATTERN = re.compile(r"^\$scrypt\$v=(?P<v>\d+)\$n=(?P<n>\d+),r=(?P<r>\d+),p=(?P<p>\d+)"
+                         r"\$(?P<salt>[^$]+)\$(?P<hash>[^$]+)$")
+
+    def __init__(self, n: int = 2 ** 14, r: int = 8, p: int = 1, keyLength: int = 32, saltLength: int = 16,
+                 cache: Optional[VerifiedPasswordCache] = None):
+        if n < 2 or n & (n - 1):
+            raise ValueError(f"The scrypt cost 'n={n}' must be a power of 2!")
+
+        self.n = n
+        self.r = r
+        self.p = p
+        self.keyLength = keyLength
+        self.saltLength = saltLength
+        self.cache = cache
+
+    def __str__(self):
+        """Returns the string representation of this object"""
+        return f"{self.__class__.__name__} <n={self.n}, r={self.r}, p={self.p}, cache={self.cache}>"
+
+    def __repr__(self):
+        """Returns the string representation of this object"""
+        return str(self)
+
+    def generateSalt(self) -> str:
+        """Returns a new random salt as hex (i.e. for the 'user_securities.salt' column)"""
+        return secrets.token_hex(self.saltLength)
+
+    @staticmethod
+    def _derive(password: str, salt: bytes, n: int, r: int, p: int, keyLength: int) -> bytes:
+        # scrypt needs 128 * r * n bytes, OpenSSL's default limit (32 MB) is too low for the higher costs
+        return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, dklen=keyLength,
+                              maxmem=128 * r * (n + p + 2) + 1024 * 1024)
+
+    def hash(self, password: str, salt: Optional[str] = None) -> str:
+        """Returns the versioned scrypt hash of the password with the hex salt (a new random salt by default)"""
+        saltBytes = bytes.fromhex(salt) if salt else secrets.token_bytes(self.saltLength)
+        derived = self._derive(password, saltBytes, self.n, self.r, self.p, self.keyLength)
+        return (f"${self.ALGORITHM}$v={self.VERSION}$n={self.n},r={self.r},p={self.p}"
+                f"${_b64encode(saltBytes)}${_b64encode(derived)}")
+
+    def parse(self, encoded: str) -> Optional[Dict[str, int]]:
+        """Returns the version and the cost parameters of the scrypt hash or None for the legacy hashes"""
+        match = self.PATTERN.match(encoded or "")
+        if not match:
+            return None
+
+        return {key: int(match.group(key)) for key in ("v", "n", "r", "p")}
+
+    def verify(self, password: str, encoded: str) -> bool:
+        """Returns true if the password matches the hash (of any supported version)"""
+        if not password or not encoded:
+            return False
+
+        if self.cache is not None and self.cache.contains(password, encoded):
+            return True
+
+        match = self.PATTERN.match(encoded)
+        if match:
+            expected = _b64decode(match.group("hash"))
+            derived = self._derive(password, _b64decode(match.group("salt")), int(match.group("n")),
+                                   int(match.group("r")), int(match.group("p")), len(expected))
+            verified = hmac.compare_digest(derived, expected)
+        elif LEGACY_SHA256.match(encoded):
+            verified = hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), encoded)
+        else:
+            logger.warning(f"Unsupported password hash format '{encoded[:16]}...'")
+            verified = False
+
+        if verified and self.cache is not None:
+            self.cache.add(password, encoded)
+
+        return verified
+
+    def needsRehash(self, encoded: str) -> bool:
+        """Returns true if the hash is not of the current version and cost"""
+        params = self.parse(encoded)
+        return params is None or params != {"v": self.VERSION, "n": self.n, "r": self.r, "p": self.p}
+
+    def verifyAndUpdate(self, password: str, encoded: str, salt: Optional[str] = None) -> Tuple[bool, Optional[str]]:
+        """Verifies the password and returns the new hash (of the hex salt) to store if the stored one is outdated"""
+        if not self.verify(password, encoded):
+            return False, None
+
+        return True, self.hash(password, salt) if self.needsRehash(encoded) else None
+
+    @classmethod
+    def benchmark(cls, targetSeconds: float = 0.1, r: int = 8, p: int = 1, maxN: int = 2 ** 20,
+                  rounds: int = 3) -> Dict[str, float]:
+        """Returns the highest scrypt cost 'n' whose hash takes at most 'targetSeconds' on this host"""
+        logger.debug(f"+benchmark({targetSeconds}, r={r}, p={p})")
+        salt = secrets.token_bytes(16)
+        # the best of the rounds, the scheduling noise only makes a round slower
+        n, seconds = 2 ** 10, min(cls._timed(2 ** 10, r, p, salt) for _ in range(rounds))
+        while n * 2 <= maxN:
+            elapsed = min(cls._timed(n * 2, r, p, salt) for _ in range(rounds))
+            if elapsed > targetSeconds:
+                break
+
+            n, seconds = n * 2, elapsed
+
+        result = {"n": n, "r": r, "p": p, "seconds": seconds}
+        logger.debug(f"-benchmark(), result={result}")
+        return result
+
+    @classmethod
+    def _timed(cls, n: int, r: int, p: int, salt: bytes) -> float:
+        startedAt = time.perf_counter()
+        cls._derive("benchmark", salt, n, r, p, 32)
+        return time.perf_counter() - startedAt
+
+
+@lru_cache(maxsize=4)
+def getPasswordHasher(n: int = 2 ** 14, r: int = 8, p: int = 1, cacheSeconds: float = 60) -> PasswordHasher:
+    """Returns the password hasher of the worker, its verified password cache is created once"""
+    return PasswordHasher(n=n, r=r, p=p, cache=VerifiedPasswordCache(ttlSeconds=cacheSeconds))
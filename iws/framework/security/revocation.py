@@ -0,0 +1,251 @@
+#
+# Author: Rohtash Lakra
+# Reference:
+# - https://en.wikipedia.org/wiki/Bloom_filter
+#
+import logging
+import math
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Callable, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter(object):
+    """A fixed-size Bloom filter over a (shared) memory buffer.
+
+    The membership test has no false negatives and a false positive rate of 'errorRate' at 'capacity' entries, so a
+    miss is final and a hit must be confirmed. The memory is constant, it does not grow with the added entries.
+    """
+
+    def __init__(self, buffer, bits: int, hashes: int, offset: int = 0):
+        self.buffer = buffer
+        self.bits = bits
+        self.hashes = hashes
+        self.offset = offset
+
+    def __str__(self):
+        """Returns the string representation of this object"""
+        return f"{self.__class__.__name__} <bits={self.bits}, hashes={self.hashes}>"
+
+    def __repr__(self):
+        """Returns the string representation of this object"""
+        return str(self)
+
+    @staticmethod
+    def optimalSize(capacity: int, errorRate: float) -> tuple[int, int]:
+        """Returns the number of bits and hashes for the capacity and the false positive rate"""
+        bits = math.ceil(-capacity * math.log(errorRate) / (math.log(2) ** 2))
+        # round to the whole bytes
+        bits = (bits + 7) // 8 * 8
+        hashes = max(1, round(bits / capacity * math.log(2)))
+        return bits, hashes
+
+    @staticmethod
+    def _digest(key: str) -> tuple[int, int]:
+        # double hashing (Kirsch-Mitzenmacher), the keys (jti) are random UUIDs, so a CRC-32 and its multiplicative
+        # (Fibonacci) hash as the step are enough and several times cheaper than a cryptographic digest.
+        position = zlib.crc32(key.encode())
+        return position, ((position * 0x9E3779B97F4A7C15) >> 32) | 1
+
+    def add(self, key: str) -> None:
+        """Adds the key in the filter"""
+        buffer, offset, bits = self.buffer, self.offset, self.bits
+        position, step = self._digest(key)
+        for _ in range(self.hashes):
+            index = position % bits
+            buffer[offset + (index >> 3)] |= 1 << (index & 7)
+            position += step
+
+    def __contains__(self, key: str) -> bool:
+        buffer, offset, bits = self.buffer, self.offset, self.bits
+        position, step = self._digest(key)
+        for _ in range(self.hashes):
+            index = position % bits
+            if not buffer[offset + (index >> 3)] & (1 << (index & 7)):
+                return False
+            position += step
+
+        return True
+
+
+class RevocationList(object):
+    """RevocationList tells if a token's 'jti' has been revoked without a DB lookup per request.
+
+    The revoked 'jti's are held in a Bloom filter, mapped from a file shared by all the workers of the host:
+    - a revocation sets the bits in the shared mapping, so it's visible to the other workers immediately.
+    - a filter miss (almost all the requests) is final, only a filter hit is confirmed with 'confirm(jti)' (i.e. a
+      'revoked_tokens' table lookup) and the confirmed 'jti's are cached.
+    - 'rebuild(jtis)' writes a new filter (i.e. of the not expired revoked tokens) and atomically replaces the file,
+      the other workers remap it within 'reloadSeconds'.
+    """
+
+    MAGIC = b"JTIB"
+    VERSION = 1
+    # magic, version, hashes, bits
+    HEADER = struct.Struct("<4sHHQ")
+
+    def __init__(self, path: str, capacity: int = 100000, errorRate: float = 0.001,
+                 confirm: Callable[[str], bool] = None, reloadSeconds: float = 5.0, maxConfirmed: int = 10000):
+        self.path = path
+        self.capacity = capacity
+        self.errorRate = errorRate
+        self.confirm = confirm
+        self.reloadSeconds = reloadSeconds
+        self.maxConfirmed = maxConfirmed
+        self.bits, self.hashes = BloomFilter.optimalSize(capacity, errorRate)
+        self._lock = threading.Lock()
+        self._confirmed: OrderedDict[str, bool] = OrderedDict()
+        self._mmap: Optional[mmap.mmap] = None
+        self._inode = None
+        self._nextCheck = 0.0
+        self.filter: Optional[BloomFilter] = None
+        self.open()
+
+    def __str__(self):
+        """Returns the string representation of this object"""
+        return f"{self.__class__.__name__} <path={self.path}, capacity={self.capacity}, filter={self.filter}>"
+
+    def __repr__(self):
+        """Returns the string representation of this object"""
+        return str(self)
+
+    def size(self) -> int:
+        """Returns the size of the filter's file in bytes"""
+        return self.HEADER.size + self.bits // 8
+
+    def _createFile(self, path: str) -> None:
+        with open(path, "wb") as file:
+            file.write(self.HEADER.pack(self.MAGIC, self.VERSION, self.hashes, self.bits))
+            file.truncate(self.size())
+
+    def open(self) -> None:
+        """Maps the filter's file (creates an empty filter if missing)"""
+        logger.debug(f"+open({self.path})")
+        with self._lock:
+            if not os.path.exists(self.path):
+                # create it aside and move it, a concurrent worker never sees a partial file
+                directory = os.path.dirname(os.path.abspath(self.path))
+                fd, tempPath = tempfile.mkstemp(dir=directory, suffix=".tmp")
+                os.close(fd)
+                self._createFile(tempPath)
+                try:
+                    os.link(tempPath, self.path)
+                except FileExistsError:
+                    pass
+                finally:
+                    os.remove(tempPath)
+
+            self._map()
+
+        logger.debug(f"-open(), filter={self.filter}")
+
+    def _map(self) -> None:
+        # the mapping keeps its own file descriptor, the file is closed right away
+        with open(self.path, "r+b") as file:
+            mapping = mmap.mmap(file.fileno(), 0)
+            inode = os.fstat(file.fileno()).st_ino
+
+        magic, version, hashes, bits = self.HEADER.unpack_from(mapping, 0)
+        if magic != self.MAGIC or version != self.VERSION or (hashes, bits) != (self.hashes, self.bits):
+            mapping.close()
+            raise ValueError(f"The revocation filter '{self.path}' does not match the configured capacity!")
+
+        # the previous mapping is released once the in-flight checks drop their reference
+        self._mmap = mapping
+        self._inode = inode
+        self._nextCheck = time.monotonic() + self.reloadSeconds
+        self.filter = BloomFilter(mapping, bits, hashes, offset=self.HEADER.size)
+
+    def _reloadIfReplaced(self) -> None:
+        now = time.monotonic()
+        if now < self._nextCheck:
+            return
+
+        self._nextCheck = now + self.reloadSeconds
+        try:
+            if os.stat(self.path).st_ino != self._inode:
+                logger.debug(f"The revocation filter '{self.path}' has been rebuilt, remapping it.")
+                with self._lock:
+                    self._map()
+        except FileNotFoundError:
+            self.open()
+
+    def add(self, jti: str) -> None:
+        """Marks the 'jti' as revoked in the shared filter (the caller persists it for the exact confirmation)"""
+        if jti:
+            self._reloadIfReplaced()
+            self.filter.add(jti)
+            self._remember(jti)
+
+    def _remember(self, jti: str) -> None:
+        with self._lock:
+            self._confirmed[jti] = True
+            self._confirmed.move_to_end(jti)
+            while len(self._confirmed) > self.maxConfirmed:
+                self._confirmed.popitem(last=False)
+
+    def mightBeRevoked(self, jti: str) -> bool:
+        """Returns false if the 'jti' is not revoked for sure, true if it might be"""
+        self._reloadIfReplaced()
+        return jti in self.filter
+
+    def isRevoked(self, jti: Optional[str]) -> bool:
+        """Returns true if the 'jti' has been revoked"""
+        if not jti or not self.mightBeRevoked(jti):
+            return False
+
+        if jti in self._confirmed:
+            return True
+
+        # a filter hit, confirm it exactly (the false positives are not cached, they might be revoked later)
+        revoked = self.confirm(jti) if self.confirm else True
+        if revoked:
+            self._remember(jti)
+
+        return revoked
+
+    def rebuild(self, jtis: Iterable[str]) -> int:
+        """Rebuilds the filter of the 'jti's and atomically replaces the shared file, returns the count of 'jti's"""
+        logger.debug(f"+rebuild({self.path})")
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tempPath = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        os.close(fd)
+        count = 0
+        try:
+            self._createFile(tempPath)
+            with open(tempPath, "r+b") as file:
+                with mmap.mmap(file.fileno(), 0) as mapping:
+                    bloomFilter = BloomFilter(mapping, self.bits, self.hashes, offset=self.HEADER.size)
+                    for jti in jtis:
+                        bloomFilter.add(jti)
+                        count += 1
+
+                    mapping.flush()
+
+            os.replace(tempPath, self.path)
+        except Exception:
+            if os.path.exists(tempPath):
+                os.remove(tempPath)
+            raise
+
+        with self._lock:
+            self._confirmed.clear()
+            self._map()
+
+        logger.debug(f"-rebuild(), count={count}")
+        return count
+
+    def close(self) -> None:
+        """Unmaps the filter's file"""
+        self.filter = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
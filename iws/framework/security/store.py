@@ -0,0 +1,253 @@
+#
+# Author: Rohtash Lakra
+#
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from enum import auto, unique
+from typing import Optional, Tuple, Type
+
+from pydantic import BaseModel
+
+from framework.enums import AutoLowerCase
+
+logger = logging.getLogger(__name__)
+
+
+@unique
+class TokenStoreType(AutoLowerCase):
+    """TokenStoreType represents the backend of the token store"""
+    MEMORY = auto()
+    SQLITE = auto()
+
+
+class AbstractTokenStore(ABC):
+    """The interface of the token stores (i.e. in-memory, SQLite or a Redis client) of the pydantic models.
+
+    Each entry expires after its TTL, the expired entries are never returned and are removed by 'sweep()'.
+    """
+
+    def __init__(self, ttlSeconds: int):
+        self.ttlSeconds = ttlSeconds
+
+    def __str__(self):
+        """Returns the string representation of this object"""
+        return f"{self.__class__.__name__} <size={self.size()}, ttlSeconds={self.ttlSeconds}>"
+
+    def __repr__(self):
+        """Returns the string representation of this object"""
+        return str(self)
+
+    def __len__(self) -> int:
+        return self.size()
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def expiresAt(self, ttlSeconds: Optional[int] = None) -> float:
+        """Returns the expiry time of an entry put now"""
+        return time.time() + (ttlSeconds if ttlSeconds is not None else self.ttlSeconds)
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[BaseModel]:
+        """Returns the token of the key or None if it does not exist or has expired"""
+        pass
+
+    @abstractmethod
+    def put(self, key: str, model: BaseModel, ttlSeconds: Optional[int] = None) -> None:
+        """Stores the token of the key for 'ttlSeconds' (defaults to the store's TTL)"""
+        pass
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Removes the token of the key"""
+        pass
+
+    @abstractmethod
+    def sweep(self) -> int:
+        """Removes the expired entries and returns their count"""
+        pass
+
+    @abstractmethod
+    def size(self) -> int:
+        """Returns the number of the stored entries (including the not yet swept expired entries)"""
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Removes all the entries"""
+        pass
+
+    def close(self) -> None:
+        """Releases the resources of the store"""
+        pass
+
+
+class MemoryTokenStore(AbstractTokenStore):
+    """The per-process LRU token store, bounded by 'maxSize' and the TTL of the entries"""
+
+    def __init__(self, ttlSeconds: int, maxSize: int = 10000):
+        super().__init__(ttlSeconds)
+        self.maxSize = maxSize
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, Tuple[float, BaseModel]] = OrderedDict()
+
+    def get(self, key: str) -> Optional[BaseModel]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expiresAt, model = entry
+            if expiresAt <= time.time():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return model
+
+    def put(self, key: str, model: BaseModel, ttlSeconds: Optional[int] = None) -> None:
+        with self._lock:
+            self._entries[key] = (self.expiresAt(ttlSeconds), model)
+            self._entries.move_to_end(key)
+            # evict the least recently used entries
+            while len(self._entries) > self.maxSize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def sweep(self) -> int:
+        now = time.time()
+        with self._lock:
+            expiredKeys = [key for key, (expiresAt, _) in self._entries.items() if expiresAt <= now]
+            for key in expiredKeys:
+                del self._entries[key]
+
+        return len(expiredKeys)
+
+    def size(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteTokenStore(AbstractTokenStore):
+    """The token store shared by all the workers of a host through a SQLite (WAL) file.
+
+    Each thread has its own connection, the file is the only shared state, so the tokens issued by one worker are
+    visible to the others and the memory of the workers does not grow with the number of users.
+    """
+
+    CREATE_TABLE = ("CREATE TABLE IF NOT EXISTS user_tokens ("
+                    "key TEXT PRIMARY KEY, token TEXT NOT NULL, expires_at REAL NOT NULL)")
+    CREATE_INDEX = "CREATE INDEX IF NOT EXISTS ix_user_tokens_expires_at ON user_tokens (expires_at)"
+
+    def __init__(self, path: str, ttlSeconds: int, modelType: Type[BaseModel], timeout: float = 5.0):
+        super().__init__(ttlSeconds)
+        self.path = path
+        self.modelType = modelType
+        self.timeout = timeout
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(self.CREATE_TABLE)
+            connection.execute(self.CREATE_INDEX)
+
+    def _connection(self) -> sqlite3.Connection:
+        # the connection is created in the thread (and the process) using it, never shared after a fork
+        connection = getattr(self._local, "connection", None)
+        if connection is None or getattr(self._local, "pid", None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+
+        return connection
+
+    def get(self, key: str) -> Optional[BaseModel]:
+        row = self._connection().execute("SELECT token FROM user_tokens WHERE key = ? AND expires_at > ?",
+                                         (key, time.time())).fetchone()
+        return self.modelType.model_validate_json(row[0]) if row else None
+
+    def put(self, key: str, model: BaseModel, ttlSeconds: Optional[int] = None) -> None:
+        with self._connection() as connection:
+            connection.execute("INSERT OR REPLACE INTO user_tokens (key, token, expires_at) VALUES (?, ?, ?)",
+                               (key, model.model_dump_json(), self.expiresAt(ttlSeconds)))
+
+    def delete(self, key: str) -> None:
+        with self._connection() as connection:
+            connection.execute("DELETE FROM user_tokens WHERE key = ?", (key,))
+
+    def sweep(self) -> int:
+        with self._connection() as connection:
+            return connection.execute("DELETE FROM user_tokens WHERE expires_at <= ?", (time.time(),)).rowcount
+
+    def size(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM user_tokens").fetchone()[0]
+
+    def clear(self) -> None:
+        with self._connection() as connection:
+            connection.execute("DELETE FROM user_tokens")
+
+    def close(self) -> None:
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+
+class TokenStoreSweeper(object):
+    """Removes the expired entries of the store periodically in a daemon thread"""
+
+    def __init__(self, store: AbstractTokenStore, intervalSeconds: float = 60):
+        self.store = store
+        self.intervalSeconds = intervalSeconds
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "TokenStoreSweeper":
+        """Starts the sweeper thread"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name="TokenStoreSweeper", daemon=True)
+            self._thread.start()
+
+        return self
+
+    def stop(self):
+        """Stops the sweeper thread"""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.intervalSeconds)
+            self._thread = None
+
+    def _run(self):
+        while not self._stopped.wait(self.intervalSeconds):
+            try:
+                count = self.store.sweep()
+                if count:
+                    logger.debug(f"Swept [{count}] expired tokens of {self.store}")
+            except Exception as ex:
+                logger.error(f"Error while sweeping the expired tokens! Error={ex}")
+
+
+def createTokenStore(storeType: TokenStoreType, ttlSeconds: int, modelType: Type[BaseModel], maxSize: int = 10000,
+                     path: Optional[str] = None) -> AbstractTokenStore:
+    """Creates the token store of the type"""
+    logger.debug(f"+createTokenStore({storeType}, {ttlSeconds}, {modelType.__name__}, {maxSize}, {path})")
+    if storeType == TokenStoreType.SQLITE:
+        store = SQLiteTokenStore(path, ttlSeconds, modelType)
+    else:
+        store = MemoryTokenStore(ttlSeconds, maxSize=maxSize)
+
+    logger.debug(f"-createTokenStore(), store={store}")
+    return store
@@ -0,0 +1,97 @@
+#
+# Author: Rohtash Lakra
+# Reference:
+# - https://docs.python.org/3/using/cmdline.html#cmdoption-X (importtime)
+# - https://docs.gunicorn.org/en/stable/settings.html#preload-app
+#
+import logging
+import re
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# i.e. 'import time:       310 |     120054 |     flask'
+IMPORT_TIME_LINE = re.compile(r"^import time:\s+(?P<self>\d+) \|\s+(?P<cumulative>\d+) \|(?P<indent>\s*)(?P<module>\S+)$")
+
+
+class StartupProfiler(object):
+    """Measures the phases of the app's startup (i.e. 'config', 'db', 'blueprints.rest') in milliseconds"""
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+
+    def __str__(self):
+        """Returns the string representation of this object"""
+        return f"{self.__class__.__name__} <{self.summary()}>"
+
+    def __repr__(self):
+        """Returns the string representation of this object"""
+        return str(self)
+
+    @contextmanager
+    def phase(self, name: str):
+        """Measures the block as the phase, the repeated phases are added up"""
+        startedAt = time.perf_counter()
+        try:
+            yield self
+        finally:
+            elapsed = (time.perf_counter() - startedAt) * 1000
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed
+
+    def total(self) -> float:
+        """Returns the total of the phases in milliseconds"""
+        return sum(self.phases.values())
+
+    def summary(self) -> str:
+        """Returns the total and the phases as text"""
+        phases = ", ".join(f"{name}={millis:.1f}ms" for name, millis in self.phases.items())
+        return f"total={self.total():.1f}ms ({phases})"
+
+
+class ImportTime(NamedTuple):
+    """The import time of a module, as reported by 'python -X importtime'"""
+    module: str
+    selfMicros: int
+    cumulativeMicros: int
+    depth: int
+
+
+def parseImportTimes(text: str) -> List[ImportTime]:
+    """Returns the import times of the 'python -X importtime' output (the lines of any other output are skipped)"""
+    importTimes = []
+    for line in text.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            importTimes.append(ImportTime(match.group("module"), int(match.group("self")),
+                                          int(match.group("cumulative")), len(match.group("indent")) // 2))
+
+    return importTimes
+
+
+def measureImportTimes(module: str, cwd: Optional[str] = None, env: Optional[Dict[str, str]] = None) -> List[ImportTime]:
+    """Imports the module in a new interpreter with '-X importtime' and returns the import times of its modules"""
+    logger.debug(f"+measureImportTimes({module}, cwd={cwd})")
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=cwd, env=env,
+                               capture_output=True, text=True)
+    if completed.returncode:
+        raise RuntimeError(f"Error while importing '{module}'! Error={completed.stderr.strip().splitlines()[-1:]}")
+
+    importTimes = parseImportTimes(completed.stderr)
+    logger.debug(f"-measureImportTimes(), modules={len(importTimes)}")
+    return importTimes
+
+
+def checkImportBudget(module: str, budgetMillis: float, top: int = 10, cwd: Optional[str] = None,
+                      env: Optional[Dict[str, str]] = None) -> Tuple[bool, float, List[ImportTime]]:
+    """Returns true if the module imports within the budget, its import time in milliseconds and its slowest modules
+    (by their own time)"""
+    importTimes = measureImportTimes(module, cwd=cwd, env=env)
+    # the module's own line is the last one, its cumulative time includes all its imports
+    millis = next((importTime.cumulativeMicros for importTime in reversed(importTimes)
+                   if importTime.module == module), 0) / 1000
+    slowest = sorted(importTimes, key=lambda importTime: importTime.selfMicros, reverse=True)[:top]
+    return millis <= budgetMillis, millis, slowest
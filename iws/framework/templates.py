@@ -0,0 +1,126 @@
+#
+# Author: Rohtash Lakra
+# Reference:
+# - https://jinja.palletsprojects.com/en/3.1.x/api/#bytecode-cache
+# - https://flask.palletsprojects.com/en/3.0.x/api/#flask.template_rendered
+#
+import functools
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Optional, Union
+
+import click
+from flask import Flask, before_render_template, current_app, g, template_rendered
+from jinja2 import FileSystemBytecodeCache
+
+logger = logging.getLogger(__name__)
+
+# the format of the 'strftime' filter without one
+DEFAULT_DATETIME_FORMAT = "%b %d, %Y at %I:%M%p"
+
+
+@functools.lru_cache(maxsize=4096)
+def formatTimestamp(timestamp: str, datetimeFormat: str = DEFAULT_DATETIME_FORMAT) -> str:
+    """Formats the ISO timestamp (i.e. '2024-10-13T00:20:27.466337'), the pages repeat the same timestamps, so their
+    texts are memoised"""
+    return datetime.fromisoformat(timestamp).replace(tzinfo=None).strftime(datetimeFormat)
+
+
+def formatDateTime(value: Union[str, datetime, None], datetimeFormat: Optional[str] = None) -> str:
+    """The 'strftime' filter of the templates, formats a datetime or an ISO timestamp"""
+    if value is None or value == "":
+        return ""
+
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None).strftime(datetimeFormat or DEFAULT_DATETIME_FORMAT)
+
+    return formatTimestamp(value, datetimeFormat or DEFAULT_DATETIME_FORMAT)
+
+
+@click.command('compile-templates')
+def compile_templates_command():
+    """Compiles all the templates into the bytecode cache (once per deployment), the workers load them from it."""
+    compiled = current_app.extensions["templates"].precompile(current_app)
+    click.echo(f"Compiled {compiled} templates into the '{current_app.jinja_env.bytecode_cache.directory}' cache.")
+
+
+class Templates(object):
+    """Templates configures the Jinja environment of the app for serving, not editing, its pages.
+
+    - the compiled templates are kept in a 'FileSystemBytecodeCache' directory shared by the workers (and the restarts),
+      so a template is compiled once per deployment (see 'flask compile-templates'), not per worker.
+    - 'autoReload' checks the templates' files for changes on every render, it's only on in development.
+    - 'precompile()' loads all the templates, i.e. in the preloaded master of gunicorn before it forks its workers.
+    - the 'template_render_duration_seconds' metric times the renders per template.
+    """
+
+    def __init__(self, cacheDir: Optional[str] = None, autoReload: bool = False, enabled: bool = True):
+        self.cacheDir = cacheDir
+        self.autoReload = autoReload
+        self.enabled = enabled
+        self.app: Optional[Flask] = None
+        self.renderDuration = None
+
+    def __str__(self):
+        """Returns the string representation of this object"""
+        return (f"{self.__class__.__name__} <cacheDir={self.cacheDir}, autoReload={self.autoReload}, "
+                f"enabled={self.enabled}>")
+
+    def __repr__(self):
+        """Returns the string representation of this object"""
+        return str(self)
+
+    def init_app(self, app: Flask, cacheDir: Optional[str] = None, autoReload: Optional[bool] = None, metrics=None,
+                 enabled: Optional[bool] = None) -> "Templates":
+        if cacheDir is not None:
+            self.cacheDir = cacheDir or None
+        if autoReload is not None:
+            self.autoReload = autoReload
+        if enabled is not None:
+            self.enabled = enabled
+
+        app.config["TEMPLATES_AUTO_RELOAD"] = self.autoReload
+        app.jinja_env.auto_reload = self.autoReload
+        if self.enabled:
+            if self.cacheDir:
+                os.makedirs(self.cacheDir, exist_ok=True)
+            # without a directory, the user's '_jinja2-cache' of the temp directory
+            app.jinja_env.bytecode_cache = FileSystemBytecodeCache(self.cacheDir, pattern="iws-%s.cache")
+
+        app.add_template_filter(formatDateTime, "strftime")
+        app.cli.add_command(compile_templates_command)
+        if metrics is not None and self.renderDuration is None:
+            self.renderDuration = metrics.histogram("template_render_duration_seconds", "The latency of the renders",
+                                                    ("template",))
+        if self.renderDuration is not None:
+            before_render_template.connect(self._beforeRender, app)
+            template_rendered.connect(self._afterRender, app)
+
+        self.app = app
+        app.extensions["templates"] = self
+        logger.debug(f"init_app(), templates={self}")
+        return self
+
+    def precompile(self, app: Optional[Flask] = None) -> int:
+        """Loads (and compiles, unless in the bytecode cache) all the templates of the app (defaults to the last
+        initialized), returns their number"""
+        app = app or self.app
+        logger.debug(f"+precompile({app.name})")
+        startedAt = time.perf_counter()
+        names = app.jinja_env.list_templates(filter_func=lambda name: name.endswith(".html"))
+        for name in names:
+            app.jinja_env.get_template(name)
+
+        logger.info(f"Compiled {len(names)} templates in {(time.perf_counter() - startedAt) * 1000:.1f}ms")
+        logger.debug(f"-precompile()")
+        return len(names)
+
+    def _beforeRender(self, sender: Flask, template, context, **kwargs) -> None:
+        g.setdefault("templateStartedAts", []).append(time.perf_counter())
+
+    def _afterRender(self, sender: Flask, template, context, **kwargs) -> None:
+        startedAts = g.get("templateStartedAts")
+        if startedAts:
+            self.renderDuration.observe(time.perf_counter() - startedAts.pop(), template.name or "")
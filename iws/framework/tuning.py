@@ -0,0 +1,189 @@
+#
+# Author: Rohtash Lakra
+# Reference:
+# - https://docs.gunicorn.org/en/stable/design.html#how-many-workers
+# - https://docs.gunicorn.org/en/stable/settings.html#max-requests-jitter
+# - https://docs.kernel.org/admin-guide/cgroup-v2.html
+#
+import importlib.util
+import logging
+import math
+import os
+from dataclasses import asdict, dataclass
+from enum import auto, unique
+from typing import Optional
+
+from framework.enums import AutoLowerCase
+
+logger = logging.getLogger(__name__)
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+MEMINFO_PATH = "/proc/meminfo"
+# the share of the available memory the workers may use, the rest is left to the OS' page cache (i.e. SQLite's pages)
+MEMORY_SHARE = 0.8
+# the DB drivers blocking an async worker's event-loop, their C calls can't yield to the other greenlets, so a query
+# stalls every request of the worker
+BLOCKING_DB_DRIVERS = ("sqlite3",)
+# the DB driver of the app's SQLite engines
+DB_DRIVER = "sqlite3"
+
+
+@unique
+class WorkerMode(AutoLowerCase):
+    """WorkerMode represents the gunicorn worker class, the async modes need their optional packages and a DB driver
+    which doesn't block their event-loop"""
+    GTHREAD = auto()
+    GEVENT = auto()
+    EVENTLET = auto()
+
+    def workerClass(self) -> str:
+        """Returns the gunicorn 'worker_class' of the mode"""
+        return self.value
+
+    def isAsync(self) -> bool:
+        """Returns true if a worker serves the requests on an event-loop (greenlets)"""
+        return self != WorkerMode.GTHREAD
+
+    def isAvailable(self) -> bool:
+        """Returns true if the mode's package is installed"""
+        return self == WorkerMode.GTHREAD or importlib.util.find_spec(self.value) is not None
+
+    def isSupported(self, dbDriver: Optional[str]) -> bool:
+        """Returns true if the mode's workers can serve the requests with the DB driver"""
+        return not self.isAsync() or dbDriver not in BLOCKING_DB_DRIVERS
+
+
+@unique
+class PoolProfile(AutoLowerCase):
+    """PoolProfile represents how much of a request is spent waiting on the DB (and other I/O), it sizes the threads
+    (or the greenlets) of a worker and its DB pool"""
+    CPU_BOUND = auto()
+    MIXED = auto()
+    IO_BOUND = auto()
+
+    def threads(self) -> int:
+        """Returns the threads of a 'gthread' worker, each holds a DB connection while it serves a request"""
+        return {PoolProfile.CPU_BOUND: 2, PoolProfile.MIXED: 4, PoolProfile.IO_BOUND: 8}[self]
+
+    def connections(self) -> int:
+        """Returns the concurrent clients of an async worker"""
+        return {PoolProfile.CPU_BOUND: 100, PoolProfile.MIXED: 500, PoolProfile.IO_BOUND: 1000}[self]
+
+
+@dataclass(frozen=True)
+class WorkerPlan:
+    """The sizes of the workers, their threads and their DB pools, 'limitedBy' is the resource capping the workers"""
+    mode: WorkerMode
+    workers: int
+    threads: int
+    workerConnections: int
+    dbPoolSize: int
+    dbMaxOverflow: int
+    maxRequests: int
+    maxRequestsJitter: int
+    limitedBy: str
+
+    def workerClass(self) -> str:
+        return self.mode.workerClass()
+
+    def dbConnections(self) -> int:
+        """Returns the most DB connections all the workers can open"""
+        return self.workers * (self.dbPoolSize + self.dbMaxOverflow)
+
+    def to_json(self) -> dict:
+        return {**asdict(self), "mode": self.mode.value, "workerClass": self.workerClass()}
+
+
+def _readText(path: str) -> Optional[str]:
+    try:
+        with open(path) as file:
+            return file.read().strip()
+    except OSError:
+        return None
+
+
+def cpuCount(cgroupRoot: str = CGROUP_ROOT) -> int:
+    """Returns the CPUs of the process, the cgroup's (i.e. container's) quota if any, or else its affinity"""
+    count = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    # i.e. '200000 100000' (2 CPUs) or 'max 100000'
+    cpuMax = _readText(os.path.join(cgroupRoot, "cpu.max"))
+    if cpuMax and not cpuMax.startswith("max"):
+        quota, period = (int(value) for value in cpuMax.split()[:2])
+        count = min(count, max(1, math.ceil(quota / period)))
+
+    return count
+
+
+def availableMemory(cgroupRoot: str = CGROUP_ROOT, meminfoPath: str = MEMINFO_PATH) -> Optional[int]:
+    """Returns the available memory in bytes, within the cgroup's limit if any, or None if unknown"""
+    available = None
+    meminfo = _readText(meminfoPath)
+    if meminfo:
+        for line in meminfo.splitlines():
+            if line.startswith("MemAvailable:"):
+                available = int(line.split()[1]) * 1024
+                break
+
+    memoryMax = _readText(os.path.join(cgroupRoot, "memory.max"))
+    if memoryMax and memoryMax != "max":
+        limit = int(memoryMax) - int(_readText(os.path.join(cgroupRoot, "memory.current")) or 0)
+        available = limit if available is None else min(available, limit)
+
+    return available
+
+
+def resolveWorkerMode(name: Optional[str], dbDriver: Optional[str] = DB_DRIVER) -> WorkerMode:
+    """Returns the worker mode of the name, or 'gthread' when its package is not installed or the DB driver would
+    block its event-loop"""
+    mode = WorkerMode.of_name(name) if name else WorkerMode.GTHREAD
+    if mode is None:
+        raise ValueError(f"Unknown worker mode '{name}', expected one of {[mode.value for mode in WorkerMode]}!")
+
+    if not mode.isAvailable():
+        logger.warning(f"The worker mode '{mode.value}' is not installed, using '{WorkerMode.GTHREAD.value}'!")
+        mode = WorkerMode.GTHREAD
+    elif not mode.isSupported(dbDriver):
+        logger.warning(f"The worker mode '{mode.value}' is blocked by the DB driver '{dbDriver}', using "
+                       f"'{WorkerMode.GTHREAD.value}'!")
+        mode = WorkerMode.GTHREAD
+
+    return mode
+
+
+def planWorkers(cpus: int, memoryBytes: Optional[int], mode: WorkerMode = WorkerMode.GTHREAD,
+                profile: PoolProfile = PoolProfile.MIXED, workerMemoryBytes: int = 150 * 1024 * 1024,
+                dbMaxConnections: int = 100, maxRequests: int = 1000, jitterPercent: int = 10) -> WorkerPlan:
+    """Sizes the workers, their threads and their DB pools together.
+
+    - the 'gthread' workers are '2 * cpus + 1' with a thread (and a pooled DB connection) per concurrent request.
+    - the async workers are one per CPU, each serves many clients on an event-loop over a shared DB pool.
+    - the workers are capped by the available memory and by the DB's connections.
+    - each worker is restarted after 'maxRequests' (plus a random jitter, so they are not restarted together).
+    """
+    logger.debug(f"+planWorkers({cpus}, {memoryBytes}, {mode}, {profile})")
+    if mode.isAsync():
+        cpuWorkers, threads, workerConnections = cpus, 1, profile.connections()
+        dbPoolSize, dbMaxOverflow = profile.threads() * 2, profile.threads() * 2
+    else:
+        # the idle keep-alive connections are parked outside of the threads, gunicorn's default
+        cpuWorkers, threads, workerConnections = 2 * cpus + 1, profile.threads(), 1000
+        # a connection per thread, the overflow only serves the background work (i.e. the token refreshes)
+        dbPoolSize, dbMaxOverflow = threads, 2
+
+    limits = {
+        "cpu": cpuWorkers,
+        "memory": int(memoryBytes * MEMORY_SHARE // workerMemoryBytes) if memoryBytes else cpuWorkers,
+        "db": dbMaxConnections // (dbPoolSize + dbMaxOverflow),
+    }
+    limitedBy = min(limits, key=limits.get)
+    plan = WorkerPlan(mode=mode,
+                      workers=max(1, limits[limitedBy]),
+                      threads=threads,
+                      workerConnections=workerConnections,
+                      dbPoolSize=dbPoolSize,
+                      dbMaxOverflow=dbMaxOverflow,
+                      maxRequests=maxRequests,
+                      maxRequestsJitter=maxRequests * jitterPercent // 100,
+                      limitedBy=limitedBy)
+    logger.debug(f"-planWorkers(), plan={plan}")
+    return plan
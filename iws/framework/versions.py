@@ -0,0 +1,239 @@
+#
+# Author: Rohtash Lakra
+# Reference:
+# - https://www.rfc-editor.org/rfc/rfc9110#name-conditional-requests
+# - https://docs.sqlalchemy.org/en/20/orm/events.html#sqlalchemy.orm.SessionEvents.after_flush
+#
+import functools
+import hashlib
+import logging
+import time
+from datetime import datetime, timezone
+from itertools import chain
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from flask import Flask, current_app, g, has_request_context, make_response, request
+from sqlalchemy import Column, Connection, Engine, Float, Integer, String, Table, event, insert, select, update
+from sqlalchemy.dialects.sqlite import insert as sqliteInsert
+from sqlalchemy.orm import ORMExecuteState, Session, object_mapper
+
+from framework.db.router import EngineRouter
+from framework.http import HTTPStatus
+from framework.orm.sqlalchemy.schema import BaseSchema
+
+logger = logging.getLogger(__name__)
+
+# the version of every table, bumped in the transaction changing its rows, so all the workers see it with the rows
+TABLE_VERSIONS = Table("table_versions", BaseSchema.metadata,
+                       Column("name", String(64), primary_key=True),
+                       Column("version", Integer, nullable=False),
+                       # the time of the last bump (seconds since epoch)
+                       Column("updated_at", Float, nullable=False))
+
+
+class TableVersions(object):
+    """TableVersions counts the changes of the tables, the ORM's flushes and bulk statements of the sessions bound to
+    the attached engines bump the versions of the tables they write (in the same transaction).
+
+    The read routes decorated with 'conditional()' answer the conditional GETs of their polling clients: their weak
+    'ETag' is derived from the versions of the tables they read and the request's path and query, a matching
+    'If-None-Match' is answered with '304 Not Modified' after a primary-key lookup, without running the route's query
+    or building its 'ResponseModel'.
+
+    The versions are read on the request's read engine before the route's rows, and the request's reads are pinned to
+    that engine, so a response is never tagged with a version newer (or older) than its rows: the versions are bumped
+    in the transactions writing the rows and replicated with them. A request which has already written reads both on
+    the primary.
+
+    The callbacks of 'onCommit()' are called with the names of the tables bumped by a session once its transaction is
+    committed (i.e. the response cache evicts their entries).
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.engines: List[Engine] = []
+        self.router: Optional[EngineRouter] = None
+        self.callbacks: List[Callable[[Set[str]], None]] = []
+
+    def __str__(self):
+        """Returns the string representation of this object"""
+        return f"{self.__class__.__name__} <enabled={self.enabled}, engines={self.engines}>"
+
+    def __repr__(self):
+        """Returns the string representation of this object"""
+        return str(self)
+
+    def init_app(self, app: Flask, enabled: Optional[bool] = None) -> "TableVersions":
+        if enabled is not None:
+            self.enabled = enabled
+
+        app.extensions["versions"] = self
+        logger.debug(f"init_app(), versions={self}")
+        return self
+
+    def attach(self, engine: Engine, router: Optional[EngineRouter] = None) -> "TableVersions":
+        """Bumps the versions of the tables written by the sessions of the engine, the engine (or the router's read
+        engine of the request) reads the versions.
+
+        The 'table_versions' table is created with the others (by 'flask init-db' or Liquibase), not on the startup.
+        """
+        if not self.engines:
+            event.listen(Session, "after_flush", self._afterFlush)
+            event.listen(Session, "do_orm_execute", self._doOrmExecute)
+            event.listen(Session, "after_commit", self._afterCommit)
+            event.listen(Session, "after_rollback", self._afterRollback)
+
+        if engine not in self.engines:
+            self.engines.append(engine)
+        if router is not None:
+            self.router = router
+
+        return self
+
+    def detach(self) -> None:
+        if self.engines:
+            event.remove(Session, "after_flush", self._afterFlush)
+            event.remove(Session, "do_orm_execute", self._doOrmExecute)
+            event.remove(Session, "after_commit", self._afterCommit)
+            event.remove(Session, "after_rollback", self._afterRollback)
+            self.engines.clear()
+            self.router = None
+
+    def onCommit(self, callback: Callable[[Set[str]], None]) -> None:
+        """Calls the callback with the names of the tables of every committed transaction changing them"""
+        if callback not in self.callbacks:
+            self.callbacks.append(callback)
+
+    def _afterFlush(self, session: Session, flushContext) -> None:
+        # the 'new', 'dirty' and 'deleted' instances are still the flushed ones
+        connection = session.connection()
+        if connection.engine in self.engines:
+            names = {table.name for instance in chain(session.new, session.dirty, session.deleted)
+                     for table in object_mapper(instance).tables}
+            self.bump(connection, names)
+            session.info.setdefault(self, set()).update(names)
+
+    def _doOrmExecute(self, executeState: ORMExecuteState) -> None:
+        # i.e. 'session.execute(delete(RoleSchema).where(...))', not flushed
+        if executeState.is_insert or executeState.is_update or executeState.is_delete:
+            connection = executeState.session.connection(bind_arguments=executeState.bind_arguments)
+            if connection.engine in self.engines:
+                name = executeState.statement.table.name
+                self.bump(connection, [name])
+                executeState.session.info.setdefault(self, set()).add(name)
+
+    def _afterCommit(self, session: Session) -> None:
+        # the names of the tables bumped by the transaction, kept in the session's 'info' per instance
+        names = session.info.pop(self, None)
+        if names:
+            for callback in self.callbacks:
+                try:
+                    callback(names)
+                except Exception as ex:
+                    # the transaction is committed, a failing callback must not fail the request
+                    logger.error(f"The commit callback {callback} failed for {names}: {ex}")
+
+    def _afterRollback(self, session: Session) -> None:
+        session.info.pop(self, None)
+
+    @staticmethod
+    def bump(connection: Connection, names: Iterable[str]) -> None:
+        """Increments the versions of the tables in the connection's transaction"""
+        rows = [{"name": name, "version": 1, "updated_at": time.time()} for name in sorted(set(names))]
+        if not rows:
+            return
+
+        if connection.dialect.name == "sqlite":
+            # one statement for all the tables
+            statement = sqliteInsert(TABLE_VERSIONS)
+            connection.execute(statement.on_conflict_do_update(
+                index_elements=[TABLE_VERSIONS.c.name],
+                set_={"version": TABLE_VERSIONS.c.version + 1, "updated_at": statement.excluded.updated_at}), rows)
+        else:
+            for row in rows:
+                result = connection.execute(update(TABLE_VERSIONS).where(TABLE_VERSIONS.c.name == row["name"])
+                                            .values(version=TABLE_VERSIONS.c.version + 1,
+                                                    updated_at=row["updated_at"]))
+                if not result.rowcount:
+                    connection.execute(insert(TABLE_VERSIONS), row)
+
+    def getVersions(self, names: Iterable[str],
+                    engine: Optional[Engine] = None) -> Dict[str, Tuple[int, Optional[float]]]:
+        """Returns the version and the time of the last bump of the tables, a table never bumped is at '0'"""
+        names = sorted(set(names))
+        with (engine or self.engines[0]).connect() as connection:
+            rows = connection.execute(select(TABLE_VERSIONS.c.name, TABLE_VERSIONS.c.version,
+                                             TABLE_VERSIONS.c.updated_at)
+                                      .where(TABLE_VERSIONS.c.name.in_(names))).all()
+
+        versions = {name: (0, None) for name in names}
+        versions.update({name: (version, updatedAt) for name, version, updatedAt in rows})
+        return versions
+
+    def getRequestVersions(self, names: Iterable[str]) -> Dict[str, Tuple[int, Optional[float]]]:
+        """Returns the versions of the tables read once per request (i.e. by 'conditional()' and the response cache),
+        the request's reads are pinned to the read engine of the versions"""
+        names = tuple(sorted(set(names)))
+        if not has_request_context():
+            return self.getVersions(names)
+
+        requestVersions = g.setdefault("tableVersions", {})
+        if names not in requestVersions:
+            engine = self.router.pinReadEngine() if self.router else None
+            requestVersions[names] = self.getVersions(names, engine)
+
+        return requestVersions[names]
+
+    def getValidators(self, names: Iterable[str]) -> Tuple[str, Optional[datetime]]:
+        """Returns the 'ETag' and the 'Last-Modified' of the request's response on the tables"""
+        versions = self.getRequestVersions(names)
+        signature = f"{request.path}?{sorted(request.args.items(multi=True))}|{sorted(versions.items())}"
+        etag = hashlib.blake2b(signature.encode(), digest_size=12).hexdigest()
+
+        # a table bumped within the last second might change again in the same second (the resolution of the header),
+        # so its time is only sent once it's older
+        bumpedAt = max((updatedAt for _, updatedAt in versions.values() if updatedAt is not None), default=None)
+        lastModified = None
+        if bumpedAt is not None and time.time() - bumpedAt >= 1:
+            lastModified = datetime.fromtimestamp(int(bumpedAt), tz=timezone.utc)
+
+        return etag, lastModified
+
+    @staticmethod
+    def isNotModified(etag: str, lastModified: Optional[datetime]) -> bool:
+        """Returns True if the client's cached representation is current, 'If-None-Match' has the precedence"""
+        if request.if_none_match:
+            return request.if_none_match.contains_weak(etag)
+
+        if request.if_modified_since and lastModified:
+            return lastModified <= request.if_modified_since
+
+        return False
+
+    def conditional(self, *names: str):
+        """Answers the conditional GETs of the route reading the tables of the names with '304 Not Modified'"""
+
+        def _decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled or not self.engines or request.method not in ("GET", "HEAD"):
+                    return func(*args, **kwargs)
+
+                etag, lastModified = self.getValidators(names)
+                if self.isNotModified(etag, lastModified):
+                    response = current_app.response_class(status=HTTPStatus.NOT_MODIFIED.statusCode)
+                else:
+                    response = make_response(func(*args, **kwargs))
+                    if response.status_code != HTTPStatus.OK.statusCode:
+                        return response
+
+                response.set_etag(etag, weak=True)
+                if lastModified:
+                    response.last_modified = lastModified
+                # the clients keep the response, but revalidate it on every use
+                response.cache_control.no_cache = True
+                return response
+
+            return wrapper
+
+        return _decorator
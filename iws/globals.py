@@ -1,7 +1,25 @@
 #
 # Author: Rohtash Lakra
 #
+from framework.cache import ResponseCache
+from framework.compression import Compressor
 from framework.db.connector import SQLite3Connector
+from framework.metrics import Metrics
+from framework.ratelimit import RateLimiter
+from framework.templates import Templates
+from framework.versions import TableVersions
 
 # global connector object
 connector = SQLite3Connector()
+# global rate limiter, its store is configured by the app
+limiter = RateLimiter()
+# global metrics, the requests and the statements of the worker
+metrics = Metrics()
+# global tables' versions, the validators of the conditional GETs
+versions = TableVersions()
+# global compressor of the responses
+compressor = Compressor()
+# global response cache of the read routes, its store is configured by the app
+responseCache = ResponseCache()
+# global templates' configuration, their bytecode cache is shared by the workers
+templates = Templates()
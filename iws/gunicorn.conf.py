@@ -1,15 +1,17 @@
+import gc
 import ipaddress
 import json
 import os
-from multiprocessing import cpu_count
+import tempfile
 
 from dotenv import load_dotenv
 
+from framework.tuning import PoolProfile, WorkerMode, availableMemory, cpuCount, planWorkers, resolveWorkerMode
+
 load_dotenv()
 
 # https://docs.gunicorn.org/en/stable/settings.html
-# gunicorn -c webapp/gunicorn.conf.py webapp:app
-# gunicorn -c gunicorn.conf.py wsgi:app
+# gunicorn -c gunicorn.conf.py
 
 
 def is_localhost(host) -> bool:
@@ -22,26 +24,55 @@ def is_localhost(host) -> bool:
         return host.lower() in ("localhost", "127.0.0.1", "::1")
 
 
-default_pool_size = int(os.getenv('DEFAULT_POOL_SIZE', 1))
-rds_pool_size = int(os.getenv('RDS_POOL_SIZE', 1))
-rds_pool_size += default_pool_size
-# validate the pool size
-if (rds_pool_size - default_pool_size) < 1:
-    raise Exception('Threads has to be higher that 0.')
-
 # The socket to bind.
 host = os.getenv('HOST', '0.0.0.0')
 port = os.getenv('PORT', '8080')
 bind = "{}:{}".format(host, port)
 
+# The workers, their threads and their DB pools are sized together from the CPUs and the available memory of the host
+# (or its container), the DB's connections and the pool profile ('cpu_bound', 'mixed' or 'io_bound'). The gevent and
+# eventlet modes fall back to 'gthread', the 'sqlite3' driver's queries would block their event-loops.
+worker_mode = resolveWorkerMode(os.getenv('WORKER_MODE', WorkerMode.GTHREAD.value))
+plan = planWorkers(cpuCount(), availableMemory(),
+                   mode=worker_mode,
+                   profile=PoolProfile.of_name(os.getenv('POOL_PROFILE', PoolProfile.MIXED.value)) or PoolProfile.MIXED,
+                   workerMemoryBytes=int(os.getenv('WORKER_MEMORY_MB', 150)) * 1024 * 1024,
+                   dbMaxConnections=int(os.getenv('DB_MAX_CONNECTIONS', 100)),
+                   maxRequests=int(os.getenv('MAX_REQUESTS', 1000)))
+
 # The number of worker processes for handling requests.
-workers = (cpu_count() * 2) + 1 if not is_localhost(host) else 1
+workers = int(os.getenv('WORKERS', plan.workers if not is_localhost(host) else 1))
 
-# The type of workers to use.
-worker_class = 'gthread'
+# The type of workers to use ('gthread', 'gevent' or 'eventlet').
+worker_class = plan.workerClass()
 
 # The number of worker threads for handling requests.
-threads = rds_pool_size - default_pool_size
+threads = int(os.getenv('THREADS', plan.threads))
+
+# The maximum number of simultaneous clients of an async (gevent/eventlet) worker.
+worker_connections = plan.workerConnections
+
+# The workers are restarted after serving this many requests (plus a random jitter, so they do not restart together)
+# to contain the leaks, 0 disables the restarts.
+max_requests = plan.maxRequests
+max_requests_jitter = plan.maxRequestsJitter
+
+# The app served by the workers.
+wsgi_app = 'wsgi:app'
+
+# The app's DB pool of a worker, read by the 'Config' when the app is loaded.
+os.environ.setdefault('DB_POOL_SIZE', str(plan.dbPoolSize))
+os.environ.setdefault('DB_MAX_OVERFLOW', str(plan.dbMaxOverflow))
+
+# The workers' metrics are summed through their snapshots in a shared directory.
+metrics_dir = os.environ.setdefault('METRICS_DIR', os.path.join(tempfile.gettempdir(), f"iws-metrics-{port}"))
+# The workers load the compiled templates from a shared bytecode cache.
+templates_cache_dir = os.environ.setdefault('TEMPLATES_CACHE_DIR', os.path.join(tempfile.gettempdir(), "iws-templates"))
+
+# Load the app in the master before forking the workers, so they start warm (the imports, the config and the routes
+# are done once) and share its memory pages. The 'init-db' command creates the tables, not the workers. The gevent and
+# eventlet workers patch the stdlib when they start, after a preloaded app would have used it, so they load their own.
+preload_app = os.getenv("PRELOAD_APP", str(worker_mode == WorkerMode.GTHREAD)).lower() in ("yes", "true", "1")
 
 # A base to use with setproctitle for process naming.
 proc_name = "gunicorn"
@@ -61,20 +92,65 @@ use_errorlog = errorlog_var or None
 errorlog = use_errorlog
 
 # The granularity of log outputs.
-loglevel = 'debug'
+loglevel = os.getenv('LOG_LEVEL', 'info')
 
 # Redirect stdout/stderr to specified file in errorlog.
 capture_output = True
 
+
+def on_starting(server):
+    """Called just before the master is initialized, the metrics of the previous run are removed"""
+    from framework.metrics import clearDirectory
+    os.makedirs(metrics_dir, exist_ok=True)
+    clearDirectory(metrics_dir)
+
+
+def when_ready(server):
+    """Called just after the server is started, compiles the preloaded app's templates (the workers inherit them and the
+    bytecode cache) and moves its objects out of the GC's reach, so the collections in the workers do not write to (and
+    copy) the shared pages."""
+    if server.cfg.preload_app:
+        from globals import templates
+        templates.precompile()
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    """Called just after a worker has been forked, the DB connections of the preloaded app are never shared"""
+    if server.cfg.preload_app:
+        from globals import connector
+        connector.dispose()
+
+
+def worker_exit(server, worker):
+    """Called in a worker just before it exits, its last metrics are written"""
+    from globals import metrics
+    metrics.flush()
+
+
+def child_exit(server, worker):
+    """Called in the master after a worker has exited, its counters and histograms are archived"""
+    from framework.metrics import markProcessDead
+    markProcessDead(metrics_dir, worker.pid)
+
+
 # data to log as json
 log_data = {
     "loglevel": loglevel,
     "bind": bind,
+    "worker_class": worker_class,
     "workers": workers,
     "threads": threads,
+    "worker_connections": worker_connections,
+    "max_requests": max_requests,
+    "max_requests_jitter": max_requests_jitter,
     "timeout": timeout,
+    "preload_app": preload_app,
     "errorlog": errorlog,
     "accesslog": accesslog,
+    "metrics_dir": metrics_dir,
+    "templates_cache_dir": templates_cache_dir,
     # Additional, non-gunicorn variables
+    "plan": plan.to_json(),
 }
 print(json.dumps(log_data))
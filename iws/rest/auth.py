@@ -1,12 +1,12 @@
 import functools
 import logging
 
-from flask import request, make_response, Response
+from flask import request, make_response, Response, g
 
 from framework.exception import AuthenticationException
 from framework.http import HTTPStatus
 from framework.orm.pydantic.model import ResponseModel
-from framework.security.jwt import TokenTypeEnum
+from framework.security.jwt import JWTUtils, TokenTypeEnum
 from rest.user.service import UserService
 
 logger = logging.getLogger(__name__)
@@ -14,12 +14,11 @@ logger = logging.getLogger(__name__)
 
 def authErrorResponse(message: str = None) -> Response:
     logger.error(f'httpStatus={HTTPStatus.UNAUTHORIZED}, message={message}')
-    authException = AuthenticationException(HTTPStatus.UNAUTHORIZED, messages=[message])
+    authException = AuthenticationException(messages=[message])
     response = ResponseModel.buildResponseWithException(authException)
     return make_response(response.to_json(), response.status)
 
 
-# TODO- validate token expiry
 def auth(func_name=None, role=None):
     assert callable(func_name) or func_name is None
 
@@ -37,11 +36,18 @@ def auth(func_name=None, role=None):
             except ValueError as ex:
                 return authErrorResponse("Invalid Token!")
 
-            userService = UserService()
-            userObject = userService.authenticate(TokenTypeEnum.AUTH, auth_token)
+            # the signed JWT access tokens are verified in memory, the encrypted auth-tokens are looked-up in DB
+            tokenType = TokenTypeEnum.JWT if JWTUtils.isJWT(auth_token) else TokenTypeEnum.AUTH
+            try:
+                userService = UserService()
+                userObject = userService.authenticate(tokenType, auth_token)
+            except AuthenticationException as ex:
+                return authErrorResponse(ex.messages[-1] if ex.messages else HTTPStatus.UNAUTHORIZED.name)
+
             logger.debug(f"userObject={userObject}")
             if userObject and userObject.isAuthenticated():
                 logger.debug(f"AUTH userObject={userObject}")
+                g.user = userObject
                 return func(*args, **kwargs)
 
             # if reaches here, always throw an error
@@ -8,6 +8,7 @@ from sqlalchemy import update, func
 from sqlalchemy.exc import NoResultFound, MultipleResultsFound
 from sqlalchemy.orm import Session
 
+from framework.orm.sqlalchemy.filter import FilterCompiler
 from framework.orm.sqlalchemy.repository import SqlAlchemyRepository
 from globals import connector
 from rest.company.schema import CompanySchema
@@ -18,20 +19,21 @@ logger = logging.getLogger(__name__)
 class CompanyRepository(SqlAlchemyRepository):
     """The RoleRepository handles a schema-centric database persistence for roles."""
 
+    filterCompiler = FilterCompiler(CompanySchema, fields=("id", "name", "parent_id", "active", "created_at", "updated_at"))
+
     def __init__(self):
-        super().__init__(engine=connector.engine)
+        super().__init__(engine=connector.engine, router=connector.router)
 
     # @override
     def filter(self, filters: Dict[str, Any]) -> List[Optional[CompanySchema]]:
         """Returns records by filter or empty list"""
         logger.debug(f"+findByFilter({filters})")
+        # validate and compile the filters before opening a session
+        statement, params = self.compileFilters(filters)
         # verbose version of what a context manager will do
-        with Session(bind=self.get_engine(), expire_on_commit=False) as session:
+        with Session(bind=self.get_read_engine(), expire_on_commit=False) as session:
             try:
-                if filters:
-                    companySchemas = session.query(CompanySchema).filter_by(**filters).all()
-                else:
-                    companySchemas = session.query(CompanySchema).all()
+                companySchemas = session.execute(statement, params).unique().scalars().all()
 
                 logger.debug(f"Loaded [{len(companySchemas)}] rows => companySchemas={companySchemas}")
 
@@ -101,9 +103,11 @@ class CompanyRepository(SqlAlchemyRepository):
 
     def delete(self, filters: Dict[str, Any]) -> None:
         logger.debug(f"+delete({filters})")
+        # validate and compile the filters before opening a session
+        statement, params = self.compileFilters(filters)
         with Session(bind=self.get_engine(), expire_on_commit=False) as session:
             try:
-                companySchema = session.query(CompanySchema).filter_by(**filters).one()
+                companySchema = session.execute(statement, params).unique().scalar_one()
                 logger.debug(f"Deleting companySchema={companySchema}")
                 session.delete(companySchema)
                 logger.debug("Record is successfully deleted.")
@@ -127,7 +131,8 @@ class CompanyRepository(SqlAlchemyRepository):
         logger.debug(f"+bulkDelete({ids})")
         with Session(bind=self.get_engine(), expire_on_commit=False) as session:
             try:
-                companySchemas = self.filter({"id": ids})
+                with self.writeUnitOfWork():
+                    companySchemas = self.filter({"id": ids})
                 for companySchema in companySchemas:
                     logger.debug(f"Deleting role with id=[{companySchema.id}]")
                     session.delete(companySchema)
@@ -8,16 +8,21 @@ import logging
 
 from flask import make_response, request
 
-from framework.exception import DuplicateRecordException, ValidationException, RecordNotFoundException
+from common.config import Config
+from framework.exception import BadRequestException, DuplicateRecordException, ValidationException, RecordNotFoundException
 from framework.http import HTTPStatus
 from framework.orm.pydantic.model import ResponseModel
 from framework.orm.sqlalchemy.schema import SchemaOperation
+from globals import limiter, responseCache, versions
 from rest.company.model import Company
 from rest.company.service import CompanyService
 from rest.company.v1 import bp as bp_company_v1
 
 logger = logging.getLogger(__name__)
 
+# the companies' routes are limited per client
+limiter.limitBlueprint(bp_company_v1, Config.RATE_LIMIT_DEFAULT)
+
 
 @bp_company_v1.post("/")
 def create():
@@ -86,6 +91,8 @@ def bulkCreate():
 
 
 @bp_company_v1.get("/")
+@versions.conditional("companies")
+@responseCache.cached("companies", ttl=300)
 def get():
     logger.debug(f"+get() => request={request}, args={request.args}, is_json:{request.is_json}")
     try:
@@ -102,6 +109,8 @@ def get():
             response.addInstances(companies)
         else:
             response.message = "No Records Exist!"
+    except BadRequestException as ex:
+        response = ResponseModel.buildResponseWithException(ex)
     except Exception as ex:
         response = ResponseModel.buildResponse(HTTPStatus.INTERNAL_SERVER_ERROR, message=str(ex), exception=ex)
 
@@ -18,7 +18,7 @@ class CompanySchema(NamedSchema):
 
     # foreign key to "companies.id" is added
     # not Optional[], therefore will be NOT NULL except for the parent entity
-    parent_id: Mapped[Optional[int]] = mapped_column(ForeignKey("companies.id"))
+    parent_id: Mapped[Optional[int]] = mapped_column(ForeignKey("companies.id"), index=True)
 
     # not Optional[], therefore will be NOT NULL
     # the parent and its immediate child collection or reference can be populated from a single SQL statement
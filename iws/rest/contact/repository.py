@@ -8,6 +8,7 @@ from sqlalchemy import update, func
 from sqlalchemy.exc import NoResultFound, MultipleResultsFound
 from sqlalchemy.orm import Session
 
+from framework.orm.sqlalchemy.filter import FilterCompiler
 from framework.orm.sqlalchemy.repository import SqlAlchemyRepository
 from globals import connector
 from rest.contact.schema import ContactSchema
@@ -18,22 +19,23 @@ logger = logging.getLogger(__name__)
 class ContactRepository(SqlAlchemyRepository):
     """The ContactRepository handles a schema-centric database persistence for contacts."""
 
+    filterCompiler = FilterCompiler(ContactSchema, fields=("id", "first_name", "last_name", "country", "subject",
+                                                           "created_at", "updated_at"))
+
     def __init__(self):
-        super().__init__(engine=connector.engine)
+        super().__init__(engine=connector.engine, router=connector.router)
 
     # @override
     def filter(self, filters: Dict[str, Any]) -> List[Optional[ContactSchema]]:
         """Returns records by filter or empty list"""
         logger.debug(f"+findByFilter({filters})")
         contactSchemas = None
+        # validate and compile the filters before opening a session
+        statement, params = self.compileFilters(filters)
         # verbose version of what a context manager will do
-        with Session(bind=self.get_engine(), expire_on_commit=False) as session:
-            # session.begin()
+        with Session(bind=self.get_read_engine(), expire_on_commit=False) as session:
             try:
-                if filters:
-                    contactSchemas = session.query(ContactSchema).filter_by(**filters).all()
-                else:
-                    contactSchemas = session.query(ContactSchema).all()
+                contactSchemas = session.execute(statement, params).unique().scalars().all()
 
                 logger.debug(f"Loaded [{len(contactSchemas)}] rows => contactSchemas={contactSchemas}")
 
@@ -103,9 +105,11 @@ class ContactRepository(SqlAlchemyRepository):
 
     def delete(self, filters: Dict[str, Any]) -> None:
         logger.debug(f"+delete({filters})")
+        # validate and compile the filters before opening a session
+        statement, params = self.compileFilters(filters)
         with Session(bind=self.get_engine(), expire_on_commit=False) as session:
             try:
-                contactSchema = session.query(ContactSchema).filter_by(**filters).one()
+                contactSchema = session.execute(statement, params).unique().scalar_one()
                 logger.debug(f"contactSchema={contactSchema}")
                 session.delete(contactSchema)
                 logger.debug("Record is successfully deleted.")
@@ -129,7 +133,8 @@ class ContactRepository(SqlAlchemyRepository):
         logger.debug(f"+bulkDelete({ids})")
         with Session(bind=self.get_engine(), expire_on_commit=False) as session:
             try:
-                contactSchemas = self.filter({"id": ids})
+                with self.writeUnitOfWork():
+                    contactSchemas = self.filter({"id": ids})
                 for contactSchema in contactSchemas:
                     logger.debug(f"Deleting role with id=[{contactSchema.id}]")
                     session.delete(contactSchema)
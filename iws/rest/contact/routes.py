@@ -8,16 +8,21 @@ import logging
 
 from flask import make_response, request
 
-from framework.exception import DuplicateRecordException, ValidationException, RecordNotFoundException
+from common.config import Config
+from framework.exception import BadRequestException, DuplicateRecordException, ValidationException, RecordNotFoundException
 from framework.http import HTTPStatus
 from framework.orm.pydantic.model import ResponseModel
 from framework.orm.sqlalchemy.schema import SchemaOperation
+from globals import limiter, versions
 from rest.contact.model import Contact
 from rest.contact.service import ContactService
 from rest.contact.v1 import bp as bp_contact_v1
 
 logger = logging.getLogger(__name__)
 
+# the contacts' routes are limited per client
+limiter.limitBlueprint(bp_contact_v1, Config.RATE_LIMIT_DEFAULT)
+
 
 @bp_contact_v1.post("/")
 def create():
@@ -89,6 +94,7 @@ def bulkCreate():
 
 
 @bp_contact_v1.get("/")
+@versions.conditional("contacts")
 def get():
     logger.debug(f"+get() => request={request}, args={request.args}, is_json:{request.is_json}")
     try:
@@ -101,6 +107,8 @@ def get():
             response.addInstances(roles)
         else:
             response.message = "No Records Exist!"
+    except BadRequestException as ex:
+        response = ResponseModel.buildResponseWithException(ex)
     except Exception as ex:
         response = ResponseModel.buildResponse(HTTPStatus.INTERNAL_SERVER_ERROR, message=str(ex), exception=ex)
 
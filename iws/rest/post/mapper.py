@@ -0,0 +1,86 @@
+#
+# Author: Rohtash Lakra
+#
+import logging
+
+from sqlalchemy import Row
+
+from framework.db.search import highlight
+from framework.orm.mapper import Mapper
+from framework.orm.pydantic.model import BaseModel
+from framework.orm.sqlalchemy.schema import BaseSchema
+from rest.post.model import Comment, Post, PostMatch
+from rest.post.schema import CommentSchema, PostSchema
+
+logger = logging.getLogger(__name__)
+
+
+# the fields of a post counted by the database and its loaded comments, a client doesn't write them
+COUNTED_FIELDS = {"comment_count", "last_comment_at", "comments"}
+
+
+class PostMapper(Mapper):
+
+    @classmethod
+    # @override
+    def fromSchema(cls, schemaObject: PostSchema) -> Post:
+        return Post(id=schemaObject.id, user_id=schemaObject.user_id, title=schemaObject.title,
+                    author=schemaObject.author, content=schemaObject.content, posted_on=schemaObject.posted_on,
+                    comment_count=schemaObject.comment_count or 0, last_comment_at=schemaObject.last_comment_at,
+                    created_at=schemaObject.created_at, updated_at=schemaObject.updated_at)
+
+    @classmethod
+    # @override
+    def fromModel(cls, modelObject: Post) -> PostSchema:
+        return PostSchema(**modelObject.model_dump(exclude_none=True, exclude=COUNTED_FIELDS))
+
+    @classmethod
+    def fromSchemas(cls, schemaObjects: list[BaseSchema]) -> list[BaseModel]:
+        return [PostMapper.fromSchema(schemaObject) for schemaObject in schemaObjects]
+
+    @classmethod
+    def fromModels(cls, modelObjects: list[BaseModel]) -> list[BaseSchema]:
+        return [PostMapper.fromModel(modelObject) for modelObject in modelObjects]
+
+    @classmethod
+    def fromRow(cls, row: Row) -> Post:
+        """Returns the post of a row of the feed"""
+        mapping = row._mapping
+        return Post(**{field: mapping[field] for field in Post.model_fields if field in mapping})
+
+    @classmethod
+    def fromMatch(cls, row: Row) -> PostMatch:
+        """Returns the post of a row of a search, its snippet is the escaped HTML of the matched terms"""
+        mapping = row._mapping
+        values = {field: mapping[field] for field in PostMatch.model_fields if field in mapping}
+        values["snippet"] = highlight(values.get("snippet"))
+        return PostMatch(**values)
+
+
+class CommentMapper(Mapper):
+
+    @classmethod
+    # @override
+    def fromSchema(cls, schemaObject: CommentSchema) -> Comment:
+        return Comment(id=schemaObject.id, post_id=schemaObject.post_id, user_id=schemaObject.user_id,
+                       content=schemaObject.content, created_at=schemaObject.created_at,
+                       updated_at=schemaObject.updated_at)
+
+    @classmethod
+    # @override
+    def fromModel(cls, modelObject: Comment) -> CommentSchema:
+        return CommentSchema(**modelObject.model_dump(exclude_none=True))
+
+    @classmethod
+    def fromSchemas(cls, schemaObjects: list[BaseSchema]) -> list[BaseModel]:
+        return [CommentMapper.fromSchema(schemaObject) for schemaObject in schemaObjects]
+
+    @classmethod
+    def fromModels(cls, modelObjects: list[BaseModel]) -> list[BaseSchema]:
+        return [CommentMapper.fromModel(modelObject) for modelObject in modelObjects]
+
+    @classmethod
+    def fromRow(cls, row: Row) -> Comment:
+        """Returns the comment of a row of a page or of the previews of some posts"""
+        mapping = row._mapping
+        return Comment(**{field: mapping[field] for field in Comment.model_fields if field in mapping})
@@ -0,0 +1,87 @@
+#
+# Author: Rohtash Lakra
+#
+
+import logging
+from datetime import datetime
+from typing import List, Optional
+
+from framework.orm.pydantic.model import BaseModel
+
+logger = logging.getLogger(__name__)
+
+
+class Comment(BaseModel):
+    """Comment contains properties specific to this object."""
+
+    # not Optional[], therefore will be NOT NULL
+    post_id: int
+    # not Optional[], therefore will be NOT NULL
+    user_id: int
+    # Optional[], therefore will be NULL
+    content: Optional[str] = None
+
+    def to_json(self) -> str:
+        """Returns the JSON representation of this object."""
+        logger.debug(f"{self.getClassName()} => type={type(self)}, object={str(self)}")
+        return self.model_dump_json()
+
+    def __str__(self) -> str:
+        """Returns the string representation of this object"""
+        return ("{} <id={}, post_id={}, user_id={}, {}>"
+                .format(self.getClassName(), self.id, self.post_id, self.user_id, self._auditable()))
+
+    def __repr__(self) -> str:
+        """Returns the string representation of this object"""
+        return str(self)
+
+
+class Post(BaseModel):
+    """Post contains properties specific to this object."""
+
+    # not Optional[], therefore will be NOT NULL
+    user_id: int
+    # not Optional[], therefore will be NOT NULL
+    title: str
+    # not Optional[], therefore will be NOT NULL
+    author: str
+    # Optional[], therefore will be NULL
+    content: Optional[str] = None
+    # defaults to the time of the insert
+    posted_on: Optional[datetime] = None
+    # counted by the triggers of the comments, not written by the clients
+    comment_count: int = 0
+    last_comment_at: Optional[datetime] = None
+    # the newest comments of the post, when the page of posts asks for them
+    comments: Optional[List[Comment]] = None
+
+    def to_json(self) -> str:
+        """Returns the JSON representation of this object."""
+        logger.debug(f"{self.getClassName()} => type={type(self)}, object={str(self)}")
+        return self.model_dump_json()
+
+    def __str__(self) -> str:
+        """Returns the string representation of this object"""
+        return ("{} <id={}, user_id={}, title={}, author={}, posted_on={}, comment_count={}, {}>"
+                .format(self.getClassName(), self.id, self.user_id, self.title, self.author, self.posted_on,
+                        self.comment_count, self._auditable()))
+
+    def __repr__(self) -> str:
+        """Returns the string representation of this object"""
+        return str(self)
+
+
+class PostMatch(Post):
+    """PostMatch is a post matching a search, with the HTML snippet of its matched terms and, in the 'rank' order, its
+    rank (the lower, the more relevant)."""
+
+    snippet: Optional[str] = None
+    rank: Optional[float] = None
+
+    def __str__(self) -> str:
+        """Returns the string representation of this object"""
+        return f"{self.getClassName()} <id={self.id}, title={self.title}, rank={self.rank}>"
+
+    def __repr__(self) -> str:
+        """Returns the string representation of this object"""
+        return str(self)
@@ -0,0 +1,190 @@
+#
+# Author: Rohtash Lakra
+#
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import Engine, Row, Select, String, bindparam, select, tuple_, type_coerce
+from sqlalchemy.orm import Session, aliased
+
+from framework.db.search import SearchOrder
+from framework.orm.sqlalchemy.filter import FilterCompiler
+from framework.orm.sqlalchemy.repository import SqlAlchemyRepository
+from globals import connector
+from rest.post.schema import POSTS_SEARCH_INDEX, CommentSchema, PostSchema
+
+logger = logging.getLogger(__name__)
+
+# the 'posted_on' as stored, the feed's cursors compare it as is (the seeded and the defaulted timestamps don't have the
+# microseconds of the ORM's ones)
+POSTED_KEY = type_coerce(PostSchema.posted_on, String)
+# the 'created_at' as stored, the cursors of the comments' pages compare it as is
+COMMENTED_KEY = type_coerce(CommentSchema.created_at, String)
+# the comments of the correlated subquery of the newest comments of a post
+LATEST_COMMENT = aliased(CommentSchema, name="latest_comments")
+
+
+class PostRepository(SqlAlchemyRepository):
+    """The PostRepository handles a schema-centric database persistence for posts."""
+
+    filterCompiler = FilterCompiler(PostSchema, fields=("id", "author", "posted_on", "created_at", "updated_at"))
+    # the columns of the feed, without the relationships (the comments and the attachments of a post are its own page)
+    feedColumns = (PostSchema.id, PostSchema.user_id, PostSchema.title, PostSchema.author, PostSchema.content,
+                   PostSchema.posted_on, PostSchema.comment_count, PostSchema.last_comment_at, PostSchema.created_at,
+                   PostSchema.updated_at, POSTED_KEY.label("posted_key"))
+    # the search statements by their order and their bound candidates, they are the same for all the queries
+    searchStatements = {(order, candidates): POSTS_SEARCH_INDEX.searchStatement(order, candidates=candidates)
+                        for order in SearchOrder for candidates in (False, True)}
+
+    def __init__(self, engine: Optional[Engine] = None):
+        # the app's database and its replicas, unless another engine is given (i.e. the benchmarks' database)
+        super().__init__(engine=engine or connector.engine, router=None if engine else connector.router)
+
+    def filter(self, filters: Dict[str, Any]) -> List[Optional[PostSchema]]:
+        """Returns records by filter or empty list, without their comments (see 'CommentRepository')"""
+        logger.debug(f"+filter({filters})")
+        # validate and compile the filters before opening a session
+        statement, params = self.compileFilters(filters)
+        with Session(bind=self.get_read_engine(), expire_on_commit=False) as session:
+            try:
+                postSchemas = session.execute(statement, params).unique().scalars().all()
+                session.commit()
+            except Exception as ex:
+                logger.error(f"Exception while loading records! Error={ex}")
+                session.rollback()
+                raise ex
+
+        logger.debug(f"-filter(), rows={len(postSchemas)}")
+        return postSchemas
+
+    def feed(self, before: Optional[Tuple[str, int]] = None, limit: int = 20) -> List[Row]:
+        """Returns the newest posts, posted before the (posted_on, id) key of the last post of the previous page.
+
+        The pages are ranges of the 'ix_posts_posted_on_id' index, a page costs the same at any depth (an 'OFFSET'
+        reads and skips all the rows of the previous pages).
+        """
+        logger.debug(f"+feed({before}, {limit})")
+        statement = (select(*self.feedColumns)
+                     .order_by(PostSchema.posted_on.desc(), PostSchema.id.desc())
+                     .limit(limit))
+        if before is not None:
+            statement = statement.where(tuple_(POSTED_KEY, PostSchema.id) < tuple_(*before))
+
+        with Session(bind=self.get_read_engine()) as session:
+            try:
+                rows = session.execute(statement).all()
+                session.commit()
+            except Exception as ex:
+                logger.error(f"Exception while loading the feed! Error={ex}")
+                session.rollback()
+                raise ex
+
+        logger.debug(f"-feed(), rows={len(rows)}")
+        return rows
+
+    def search(self, expression: str, order: SearchOrder = SearchOrder.RANK, limit: int = 20, offset: int = 0,
+               candidates: int = 0) -> List[Row]:
+        """Returns the posts matching the FTS5 expression, with their snippets and ranks, the 'RANK' order scores the
+        newest 'candidates' matches only (all of them with 0)"""
+        logger.debug(f"+search({expression}, {order}, {limit}, {offset}, {candidates})")
+        params = {"query": expression, "limit": limit, "offset": offset, "candidates": candidates}
+        with Session(bind=self.get_read_engine()) as session:
+            try:
+                rows = session.execute(self.searchStatements[(order, candidates > 0)], params).all()
+                session.commit()
+            except Exception as ex:
+                logger.error(f"Exception while searching the posts! Error={ex}")
+                session.rollback()
+                raise ex
+
+        logger.debug(f"-search(), rows={len(rows)}")
+        return rows
+
+
+class CommentRepository(SqlAlchemyRepository):
+    """The CommentRepository handles a schema-centric database persistence for the comments of the posts."""
+
+    filterCompiler = FilterCompiler(CommentSchema, fields=("id", "created_at", "updated_at"))
+    # the columns of the comments, without the post
+    commentColumns = (CommentSchema.id, CommentSchema.post_id, CommentSchema.user_id, CommentSchema.content,
+                      CommentSchema.created_at, CommentSchema.updated_at, COMMENTED_KEY.label("commented_key"))
+    # the newest first, the order of the 'ix_comments_post_id_created_at_id' index walked backwards
+    newestFirst = (CommentSchema.created_at.desc(), CommentSchema.id.desc())
+
+    def __init__(self, engine: Optional[Engine] = None):
+        # the app's database and its replicas, unless another engine is given (i.e. the benchmarks' database)
+        super().__init__(engine=engine or connector.engine, router=None if engine else connector.router)
+
+    def filter(self, filters: Dict[str, Any]) -> List[Optional[CommentSchema]]:
+        """Returns records by filter or empty list"""
+        logger.debug(f"+filter({filters})")
+        # validate and compile the filters before opening a session
+        statement, params = self.compileFilters(filters)
+        with Session(bind=self.get_read_engine(), expire_on_commit=False) as session:
+            try:
+                commentSchemas = session.execute(statement, params).scalars().all()
+                session.commit()
+            except Exception as ex:
+                logger.error(f"Exception while loading records! Error={ex}")
+                session.rollback()
+                raise ex
+
+        logger.debug(f"-filter(), rows={len(commentSchemas)}")
+        return commentSchemas
+
+    def _execute(self, statement, params=None) -> List[Row]:
+        with Session(bind=self.get_read_engine()) as session:
+            try:
+                rows = session.execute(statement, params).all()
+                session.commit()
+            except Exception as ex:
+                logger.error(f"Exception while loading the comments! Error={ex}")
+                session.rollback()
+                raise ex
+
+        return rows
+
+    def latest(self, postIds: List[int], perPost: int = 3) -> List[Row]:
+        """Returns the newest 'perPost' comments of every post of the ids, by post and the newest first, in a single
+        query for a page of posts.
+
+        The comments of a post are the ids of a correlated 'LIMIT' subquery, a range of 'perPost' keys of the
+        'ix_comments_post_id_created_at_id' index per post: a page costs the same whatever the comments of its posts.
+        A 'row_number()' window partitioned by post would number (and read) all the comments of the posts first,
+        SQLite doesn't push its filter down into the partitions.
+        """
+        logger.debug(f"+latest({postIds}, {perPost})")
+        if not postIds or perPost < 1:
+            return []
+
+        statement = self.latestStatement(perPost)
+        rows = self._execute(statement, {"postIds": list(postIds)})
+        logger.debug(f"-latest(), rows={len(rows)}")
+        return rows
+
+    def latestStatement(self, perPost: int) -> Select:
+        """Returns the statement of the newest 'perPost' comments of the posts of the ':postIds'"""
+        newest = (select(LATEST_COMMENT.id)
+                  .where(LATEST_COMMENT.post_id == PostSchema.id)
+                  .order_by(LATEST_COMMENT.created_at.desc(), LATEST_COMMENT.id.desc())
+                  .limit(perPost))
+        return (select(*self.commentColumns)
+                .select_from(PostSchema)
+                .join(CommentSchema, CommentSchema.id.in_(newest))
+                .where(PostSchema.id.in_(bindparam("postIds", expanding=True)))
+                .order_by(CommentSchema.post_id, *self.newestFirst))
+
+    def page(self, postId: int, before: Optional[Tuple[str, int]] = None, limit: int = 20) -> List[Row]:
+        """Returns the newest comments of the post, created before the (created_at, id) key of the last comment of
+        the previous page, a range of the 'ix_comments_post_id_created_at_id' index per page."""
+        logger.debug(f"+page({postId}, {before}, {limit})")
+        statement = (select(*self.commentColumns)
+                     .where(CommentSchema.post_id == postId)
+                     .order_by(*self.newestFirst)
+                     .limit(limit))
+        if before is not None:
+            statement = statement.where(tuple_(COMMENTED_KEY, CommentSchema.id) < tuple_(*before))
+
+        rows = self._execute(statement)
+        logger.debug(f"-page(), rows={len(rows)}")
+        return rows
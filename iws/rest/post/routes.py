@@ -4,69 +4,141 @@
 # - https://realpython.com/flask-blueprint/
 # - https://flask.palletsprojects.com/en/2.3.x/tutorial/views/#require-authentication-in-other-views
 #
+import logging
 
-from flask import request, current_app
+from flask import make_response, request
 
-from rest.post.schema import PostSchema
+from common.config import Config
+from framework.exception import BadRequestException, RecordNotFoundException, ValidationException
+from framework.http import HTTPStatus
+from framework.orm.pydantic.model import ResponseModel
+from framework.orm.sqlalchemy.schema import SchemaOperation
+from globals import limiter, responseCache, versions
+from rest.post.model import Comment, Post
+from rest.post.service import CommentService, PostService
 from rest.post.v1 import bp as bp_post_v1
 
+logger = logging.getLogger(__name__)
 
-# post's service
+# the posts' and the comments' routes are limited per client
+limiter.limitBlueprint(bp_post_v1, Config.RATE_LIMIT_DEFAULT)
 
 
 @bp_post_v1.post("/")
 def create():
-    current_app.logger.debug(f"create => {request}")
-    role = None
-    if request.is_json:
-        body = request.get_json()
-        current_app.logger.debug(f"body: {body}")
-        name = body.get('name', None)
-        active = body.get('active', False)
-        role = PostSchema.create(name=name, active=active)
-
-    # # errors = roleService.validate(role)
-    # # current_app.logger.debug(f"errors: {json.dumps(errors)}")
-    # # if not errors:
-    # #     try:
-    # #         role = roleService.create(role)
-    # #         current_app.logger.debug(f"role: {role}")
-    # #         response = ResponseModel.jsonResponse(HTTPStatus.CREATED, entity=role,
-    # #                                               message="Role is successfully created.")
-    # #     except DuplicateRecordException as ex:
-    # #         message = f"Role={role.name} is already created! ex:{ex}"
-    # #         error = ErrorModel.error(HTTPStatus.INTERNAL_SERVER_ERROR, message, exception=ex)
-    # #         response = ResponseModel.jsonResponse(HTTPStatus.INTERNAL_SERVER_ERROR, error, exception=ex)
-    # #     except Exception as ex:
-    # #         error = ErrorModel.error(HTTPStatus.INTERNAL_SERVER_ERROR, str(ex), exception=ex)
-    # #         response = ResponseModel.jsonResponse(HTTPStatus.INTERNAL_SERVER_ERROR, error, exception=ex)
-    # # else:
-    # #     response = errors
-    #
-    # current_app.logger.debug(f"response: {response}")
-    # return make_response(jsonify(response))
-    return role
-    # return make_response(response)
-    # TODO: REDIRECT TO LOGIN PAGE
-    # return redirect(url_for("iws.webapp.contact"))
+    logger.debug(f"+create() => request={request}, args={request.args}, is_json:{request.is_json}")
+    try:
+        post = Post(**request.get_json()) if request.is_json else None
+        postService = PostService()
+        postService.validate(SchemaOperation.CREATE, post)
+        post = postService.create(post)
+        logger.debug(f"post={post}")
+        # build success response
+        response = ResponseModel(status=HTTPStatus.CREATED.statusCode, message="Post is successfully created.")
+        response.addInstance(post)
+    except ValidationException as ex:
+        response = ResponseModel.buildResponseWithException(ex)
+    except Exception as ex:
+        response = ResponseModel.buildResponse(HTTPStatus.INTERNAL_SERVER_ERROR, message=str(ex), exception=ex)
+
+    logger.debug(f"-create() <= response={response}")
+    return make_response(response.to_json(), response.status)
 
 
 @bp_post_v1.get("/")
+@versions.conditional("posts", "comments")
+@responseCache.cached("posts", "comments")
 def get():
-    current_app.logger.debug(f"get => {request}, request.args={request.args}, is_json:{request.is_json}")
-    params = request.args
-    # body = request.get_json() if request.is_json else {}
-    # current_app.logger.debug(f"body={body}")
-    # try:
-    #     roles = roleService.find_all(params)
-    #     current_app.logger.debug(f"roles={roles}")
-    #     response = ResponseModel.buildResponse(HTTPStatus.OK)
-    #     response.addInstance(roles)
-    #     current_app.logger.debug(f"response={response}")
-    #     return make_response(response.to_json(), response.status)
-    # except Exception as ex:
-    #     current_app.logger.error(f"Error={ex}, stack_trace={Utils.stack_trace(ex)}")
-    #     error = ErrorModel.error(HTTPStatus.NOT_FOUND, message='No round found with ID!', exception=ex)
-    #     response = ResponseModel.buildResponse(HTTPStatus.NOT_FOUND, error)
-    #     return abort(response.to_json(), response.status)
-    return None
+    """The feed of the newest posts, a page per 'cursor' (the 'next' of the previous page), with the newest
+    'comments' of every post"""
+    logger.debug(f"+get() => request={request}, args={request.args}, is_json:{request.is_json}")
+    nextCursor = None
+    try:
+        posts, nextCursor = PostService().feed(request.args.get("cursor"), request.args.get("limit"),
+                                               request.args.get("comments"))
+        # build success response
+        response = ResponseModel.buildResponse(HTTPStatus.OK)
+        if posts:
+            response.addInstances(posts)
+        else:
+            response.message = "No Records Exist!"
+    except BadRequestException as ex:
+        response = ResponseModel.buildResponseWithException(ex)
+    except Exception as ex:
+        response = ResponseModel.buildResponse(HTTPStatus.INTERNAL_SERVER_ERROR, message=str(ex), exception=ex)
+
+    logger.debug(f"-get() <= response={response}, nextCursor={nextCursor}")
+    return make_response(dict(response.to_json(), next=nextCursor), response.status)
+
+
+@bp_post_v1.get("/search")
+@versions.conditional("posts", "comments")
+@responseCache.cached("posts", "comments")
+def search():
+    """The posts matching all the words of 'q', by their relevance ('order=rank') or the newest first
+    ('order=newest'), with the snippets of their matched words"""
+    logger.debug(f"+search() => request={request}, args={request.args}")
+    nextOffset = None
+    try:
+        posts, nextOffset = PostService().search(request.args.get("q"), request.args.get("order"),
+                                                 request.args.get("limit"), request.args.get("offset"))
+        # build success response
+        response = ResponseModel.buildResponse(HTTPStatus.OK)
+        if posts:
+            response.addInstances(posts)
+        else:
+            response.message = "No Records Exist!"
+    except BadRequestException as ex:
+        response = ResponseModel.buildResponseWithException(ex)
+    except Exception as ex:
+        response = ResponseModel.buildResponse(HTTPStatus.INTERNAL_SERVER_ERROR, message=str(ex), exception=ex)
+
+    logger.debug(f"-search() <= response={response}, nextOffset={nextOffset}")
+    return make_response(dict(response.to_json(), next=nextOffset), response.status)
+
+
+@bp_post_v1.post("/<int:postId>/comments")
+def createComment(postId: int):
+    logger.debug(f"+createComment({postId}) => request={request}, is_json:{request.is_json}")
+    try:
+        comment = Comment(**dict(request.get_json(), post_id=postId)) if request.is_json else None
+        if not PostService().existsByFilter({"id": postId}):
+            raise RecordNotFoundException(messages=[f"The post '{postId}' doesn't exist!"])
+
+        commentService = CommentService()
+        commentService.validate(SchemaOperation.CREATE, comment)
+        comment = commentService.create(comment)
+        # build success response
+        response = ResponseModel(status=HTTPStatus.CREATED.statusCode, message="Comment is successfully created.")
+        response.addInstance(comment)
+    except (RecordNotFoundException, ValidationException) as ex:
+        response = ResponseModel.buildResponseWithException(ex)
+    except Exception as ex:
+        response = ResponseModel.buildResponse(HTTPStatus.INTERNAL_SERVER_ERROR, message=str(ex), exception=ex)
+
+    logger.debug(f"-createComment() <= response={response}")
+    return make_response(response.to_json(), response.status)
+
+
+@bp_post_v1.get("/<int:postId>/comments")
+@versions.conditional("comments")
+@responseCache.cached("comments")
+def getComments(postId: int):
+    """The comments of the post, the newest first, a page per 'cursor' (the 'next' of the previous page)"""
+    logger.debug(f"+getComments({postId}) => request={request}, args={request.args}")
+    nextCursor = None
+    try:
+        comments, nextCursor = CommentService().page(postId, request.args.get("cursor"), request.args.get("limit"))
+        # build success response
+        response = ResponseModel.buildResponse(HTTPStatus.OK)
+        if comments:
+            response.addInstances(comments)
+        else:
+            response.message = "No Records Exist!"
+    except BadRequestException as ex:
+        response = ResponseModel.buildResponseWithException(ex)
+    except Exception as ex:
+        response = ResponseModel.buildResponse(HTTPStatus.INTERNAL_SERVER_ERROR, message=str(ex), exception=ex)
+
+    logger.debug(f"-getComments() <= response={response}, nextCursor={nextCursor}")
+    return make_response(dict(response.to_json(), next=nextCursor), response.status)
@@ -5,10 +5,12 @@
 from datetime import datetime
 from typing import Optional, List
 
-from sqlalchemy import String, ForeignKey, func
+from sqlalchemy import String, ForeignKey, func, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.types import LargeBinary
 
+from framework.db.counter import ChildCounter
+from framework.db.search import FullTextIndex
 from framework.orm.sqlalchemy.schema import BaseSchema
 
 
@@ -16,10 +18,12 @@ class PostSchema(BaseSchema):
     """ PostSchema represents [posts] Table """
 
     __tablename__ = "posts"
+    # the feed pages walk 'ix_posts_posted_on_id' backwards from their cursor, a range of the index per page
+    __table_args__ = (Index("ix_posts_created_at", "created_at"), Index("ix_posts_posted_on_id", "posted_on", "id"))
 
     # foreign key to "users.id" is added
     # not Optional[], therefore will be NOT NULL
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False, index=True)
     # Define the many-to-one relationship
     # user: Mapped["UserSchema"] = relationship(back_populates="posts")
 
@@ -31,6 +35,11 @@ class PostSchema(BaseSchema):
     content: Mapped[Optional[str]] = mapped_column(String(255))
     # not Optional[], therefore will be NOT NULL
     posted_on: Mapped[datetime] = mapped_column(insert_default=func.now())
+    # the post's comments and the time of the latest one, counted by the triggers of the comments (see
+    # 'POSTS_COMMENTS_COUNTER'), a page of posts shows them without reading the comments
+    comment_count: Mapped[int] = mapped_column(server_default=text("0"))
+    # Optional[], therefore will be NULL
+    last_comment_at: Mapped[Optional[datetime]] = mapped_column()
 
     # Other variants of 'Mapped' are available, most commonly the 'relationship()' construct indicated above.
     # In contrast to the column-based attributes, 'relationship()' denotes a linkage between two ORM classes.
@@ -43,7 +52,8 @@ class PostSchema(BaseSchema):
     # In contrast to the column-based attributes, 'relationship()' denotes a linkage between two ORM classes.
     # attachments: Mapped[List["Attachment"]] = relationship(back_populates="post", cascade="all, delete-orphan")
     # Optional[], therefore will be NULL
-    comments: Mapped[Optional[List["CommentSchema"]]] = relationship(back_populates="post", lazy="joined",
+    # the comments are loaded when they are read, not with every post (a page of the comments is 'CommentRepository')
+    comments: Mapped[Optional[List["CommentSchema"]]] = relationship(back_populates="post", lazy="select",
                                                                      cascade="all, delete-orphan")
 
     def addAttachment(self, attachment):
@@ -51,15 +61,20 @@ class PostSchema(BaseSchema):
 
     def __str__(self) -> str:
         """Returns the string representation of this object"""
-        return ("{} <id={}, user_id={}, title={}, author={}, content={}, posted_on={}, {}, attachments={}>"
-                .format(self.getClassName(), self.id, self.user_id, self.title, self.author, self.content,
-                        self.posted_on, self.auditable(), self.attachments))
+        return ("{} <id={}, user_id={}, title={}, author={}, content={}, posted_on={}, comment_count={}, {}, "
+                "attachments={}>".format(self.getClassName(), self.id, self.user_id, self.title, self.author,
+                                         self.content, self.posted_on, self.comment_count, self.auditable(),
+                                         self.attachments))
 
     def __repr__(self) -> str:
         """Returns the string representation of this object"""
         return str(self)
 
 
+# the searched texts of the posts, a term of the title ranks the post higher than one of the author and the content
+POSTS_SEARCH_INDEX = FullTextIndex(PostSchema.__table__, ("title", "author", "content"), weights=(10.0, 5.0, 1.0))
+
+
 class AttachmentSchema(BaseSchema):
     """ AttachmentSchema represents [attachments] Table """
 
@@ -67,7 +82,7 @@ class AttachmentSchema(BaseSchema):
 
     # foreign key to "posts.id" is added
     # not Optional[], therefore will be NOT NULL
-    post_id: Mapped[int] = mapped_column(ForeignKey("posts.id"), nullable=False)
+    post_id: Mapped[int] = mapped_column(ForeignKey("posts.id"), nullable=False, index=True)
     # not Optional[], therefore will be NOT NULL
     # Define the many-to-one relationship
     post: Mapped["PostSchema"] = relationship(back_populates="attachments")
@@ -92,17 +107,20 @@ class CommentSchema(BaseSchema):
     """ CommentSchema represents [comments] Table """
 
     __tablename__ = "comments"
+    # the newest comments of a post are a range of 'ix_comments_post_id_created_at_id' (the previews of a page of posts,
+    # the pages of a post's comments and the latest time recounted by a delete)
+    __table_args__ = (Index("ix_comments_post_id_created_at_id", "post_id", "created_at", "id"),)
 
     # foreign key to "posts.id" is added
     # not Optional[], therefore will be NOT NULL
-    post_id: Mapped[int] = mapped_column(ForeignKey("posts.id"), nullable=False)
+    post_id: Mapped[int] = mapped_column(ForeignKey("posts.id"), nullable=False, index=True)
     # not Optional[], therefore will be NOT NULL
     # Define the many-to-one relationship
     post: Mapped["PostSchema"] = relationship(back_populates="comments")
 
     # foreign key to "users.id" is added
     # not Optional[], therefore will be NOT NULL
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False, index=True)
     # Define the many-to-one relationship
     # user: Mapped["UserSchema"] = relationship(back_populates="comments")
 
@@ -123,6 +141,11 @@ class CommentSchema(BaseSchema):
         return str(self)
 
 
+# the comments of the posts, counted in the posts' 'comment_count' and 'last_comment_at'
+POSTS_COMMENTS_COUNTER = ChildCounter(PostSchema.__table__, CommentSchema.__table__, "post_id", "comment_count",
+                                      "last_comment_at")
+
+
 class Document(BaseSchema):
     """ DocumentSchema represents [documents] Table """
 
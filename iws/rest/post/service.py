@@ -0,0 +1,246 @@
+#
+# Author: Rohtash Lakra
+#
+import base64
+import binascii
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from common.config import Config
+from framework.db.search import FullTextIndex, SearchOrder
+from framework.exception import BadRequestException, ValidationException
+from framework.http import HTTPStatus
+from framework.orm.pydantic.model import BaseModel
+from framework.orm.sqlalchemy.schema import SchemaOperation
+from framework.service import AbstractService
+from rest.post.mapper import CommentMapper, PostMapper
+from rest.post.model import Comment, Post, PostMatch
+from rest.post.repository import CommentRepository, PostRepository
+
+logger = logging.getLogger(__name__)
+
+# the posts of a page, unless the request asks for fewer
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+# the search pages are offsets of the ranked matches, the deep ones score all the matches for a few more rows
+MAX_SEARCH_OFFSET = 1000
+# the newest comments shown with every post of a page, when the page asks for them (3 on the web pages)
+PREVIEW_COMMENTS = 3
+MAX_PREVIEW_COMMENTS = 10
+
+
+def encodeCursor(key: str, id: int) -> str:
+    """Returns the opaque cursor of the page after the row of the (time, id) key (i.e. a post's 'posted_on')"""
+    return base64.urlsafe_b64encode(f"{key}|{id}".encode()).decode().rstrip("=")
+
+
+def decodeCursor(cursor: str) -> Tuple[str, int]:
+    """Returns the (time, id) key of the cursor, raises 'BadRequestException' for a malformed one"""
+    try:
+        key, id = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode().rsplit("|", 1)
+        return key, int(id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as ex:
+        raise BadRequestException(messages=[f"The cursor '{cursor}' is invalid!"]) from ex
+
+
+def parseLimit(limit: Any) -> int:
+    """Returns the page's size, raises 'BadRequestException' unless it's between 1 and 'MAX_PAGE_SIZE'"""
+    if limit is None or limit == "":
+        return DEFAULT_PAGE_SIZE
+
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        limit = 0
+
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise BadRequestException(messages=[f"The 'limit' must be between 1 and {MAX_PAGE_SIZE}!"])
+
+    return limit
+
+
+def parseComments(comments: Any) -> int:
+    """Returns the newest comments to show per post, raises 'BadRequestException' unless it's between 0 and
+    'MAX_PREVIEW_COMMENTS'"""
+    try:
+        comments = int(comments or 0)
+    except (TypeError, ValueError):
+        comments = -1
+
+    if not 0 <= comments <= MAX_PREVIEW_COMMENTS:
+        raise BadRequestException(messages=[f"The 'comments' must be between 0 and {MAX_PREVIEW_COMMENTS}!"])
+
+    return comments
+
+
+class PostService(AbstractService):
+
+    def __init__(self, repository: Optional[PostRepository] = None, candidates: Optional[int] = None,
+                 commentService: Optional["CommentService"] = None):
+        logger.debug("PostService()")
+        super().__init__()
+        self.repository = repository or PostRepository()
+        # the newest matches ranked by a search
+        self.candidates = Config.POSTS_SEARCH_CANDIDATES if candidates is None else candidates
+        # the comments of the posts' database (i.e. the benchmarks' one, given without the app's replicas)
+        self.commentService = commentService or CommentService(
+            CommentRepository(self.repository.get_engine()) if self.repository.router is None else None)
+
+    def validate(self, operation: SchemaOperation, post: Post) -> None:
+        logger.debug(f"+validate({operation}, {post})")
+        error_messages = []
+
+        # validate the object
+        if not post:
+            error_messages.append("'Post' is not fully defined!")
+        elif operation == SchemaOperation.CREATE:
+            # validate the required fields
+            if not post.title:
+                error_messages.append("Post 'title' is required!")
+            if not post.author:
+                error_messages.append("Post 'author' is required!")
+
+        # throw an error if any validation error
+        if error_messages:
+            error = ValidationException(httpStatus=HTTPStatus.INVALID_DATA, messages=error_messages)
+            logger.debug(f"{type(error)} = exception={error}")
+            raise error
+
+        logger.debug(f"-validate()")
+
+    # @override
+    def findByFilter(self, filters: Dict[str, Any]) -> List[Optional[BaseModel]]:
+        logger.debug(f"+findByFilter({filters})")
+        posts = PostMapper.fromSchemas(self.repository.filter(filters))
+        logger.debug(f"-findByFilter(), posts={posts}")
+        return posts
+
+    # @override
+    def existsByFilter(self, filters: Dict[str, Any]) -> bool:
+        """Returns True if the records exist by filter otherwise False"""
+        return True if self.repository.filter(filters) else False
+
+    def create(self, post: Post) -> Post:
+        """Crates a new post, the triggers of the table add it to the search index"""
+        logger.debug(f"+create({post})")
+        postSchema = self.repository.save(PostMapper.fromModel(post))
+        post = PostMapper.fromSchema(postSchema)
+        logger.debug(f"-create(), post={post}")
+        return post
+
+    def feed(self, cursor: Optional[str] = None, limit: Any = None,
+             comments: Any = None) -> Tuple[List[Post], Optional[str]]:
+        """Returns a page of the newest posts, with their newest 'comments' each (none by default), and the cursor of
+        the next page (None on the last one)"""
+        logger.debug(f"+feed({cursor}, {limit}, {comments})")
+        limit = parseLimit(limit)
+        comments = parseComments(comments)
+        # one more row tells if there's a next page
+        rows = self.repository.feed(decodeCursor(cursor) if cursor else None, limit + 1)
+        nextCursor = encodeCursor(rows[limit - 1].posted_key, rows[limit - 1].id) if len(rows) > limit else None
+        posts = [PostMapper.fromRow(row) for row in rows[:limit]]
+        if comments:
+            self.commentService.attachLatest(posts, comments)
+        logger.debug(f"-feed(), posts={len(posts)}, nextCursor={nextCursor}")
+        return posts, nextCursor
+
+    def search(self, query: Optional[str], order: Optional[str] = None, limit: Any = None,
+               offset: Any = None) -> Tuple[List[PostMatch], Optional[int]]:
+        """Returns a page of the posts matching all the query's terms and the offset of the next page (None on the
+        last one), the 'rank' order ranks the newest 'candidates' matches (all of them with 0)"""
+        logger.debug(f"+search({query}, {order}, {limit}, {offset})")
+        expression = FullTextIndex.matchExpression(query)
+        if expression is None:
+            raise BadRequestException(messages=["The search query 'q' must have some words!"])
+
+        searchOrder = SearchOrder.of_name(order) if order else SearchOrder.RANK
+        if searchOrder is None:
+            raise BadRequestException(messages=[f"The 'order' must be one of {SearchOrder.values()}!"])
+
+        limit = parseLimit(limit)
+        try:
+            offset = int(offset or 0)
+        except ValueError:
+            offset = -1
+        if not 0 <= offset <= MAX_SEARCH_OFFSET:
+            raise BadRequestException(messages=[f"The 'offset' must be between 0 and {MAX_SEARCH_OFFSET}!"])
+
+        rows = self.repository.search(expression, searchOrder, limit + 1, offset, self.candidates)
+        nextOffset = offset + limit if len(rows) > limit and offset + limit <= MAX_SEARCH_OFFSET else None
+        posts = [PostMapper.fromMatch(row) for row in rows[:limit]]
+        logger.debug(f"-search(), posts={len(posts)}, nextOffset={nextOffset}")
+        return posts, nextOffset
+
+
+class CommentService(AbstractService):
+
+    def __init__(self, repository: Optional[CommentRepository] = None):
+        logger.debug("CommentService()")
+        super().__init__()
+        self.repository = repository or CommentRepository()
+
+    def validate(self, operation: SchemaOperation, comment: Comment) -> None:
+        logger.debug(f"+validate({operation}, {comment})")
+        error_messages = []
+
+        # validate the object
+        if not comment:
+            error_messages.append("'Comment' is not fully defined!")
+        elif operation == SchemaOperation.CREATE:
+            # validate the required fields
+            if not comment.content:
+                error_messages.append("Comment 'content' is required!")
+
+        # throw an error if any validation error
+        if error_messages:
+            error = ValidationException(httpStatus=HTTPStatus.INVALID_DATA, messages=error_messages)
+            logger.debug(f"{type(error)} = exception={error}")
+            raise error
+
+        logger.debug(f"-validate()")
+
+    # @override
+    def findByFilter(self, filters: Dict[str, Any]) -> List[Optional[BaseModel]]:
+        logger.debug(f"+findByFilter({filters})")
+        comments = CommentMapper.fromSchemas(self.repository.filter(filters))
+        logger.debug(f"-findByFilter(), comments={comments}")
+        return comments
+
+    # @override
+    def existsByFilter(self, filters: Dict[str, Any]) -> bool:
+        """Returns True if the records exist by filter otherwise False"""
+        return True if self.repository.filter(filters) else False
+
+    def create(self, comment: Comment) -> Comment:
+        """Creates a new comment, the triggers of the table count it in its post's 'comment_count' and
+        'last_comment_at' in the same transaction"""
+        logger.debug(f"+create({comment})")
+        commentSchema = self.repository.save(CommentMapper.fromModel(comment))
+        comment = CommentMapper.fromSchema(commentSchema)
+        logger.debug(f"-create(), comment={comment}")
+        return comment
+
+    def page(self, postId: int, cursor: Optional[str] = None, limit: Any = None) -> Tuple[List[Comment], Optional[str]]:
+        """Returns a page of the newest comments of the post and the cursor of the next page (None on the last one)"""
+        logger.debug(f"+page({postId}, {cursor}, {limit})")
+        limit = parseLimit(limit)
+        # one more row tells if there's a next page
+        rows = self.repository.page(postId, decodeCursor(cursor) if cursor else None, limit + 1)
+        nextCursor = encodeCursor(rows[limit - 1].commented_key, rows[limit - 1].id) if len(rows) > limit else None
+        comments = [CommentMapper.fromRow(row) for row in rows[:limit]]
+        logger.debug(f"-page(), comments={len(comments)}, nextCursor={nextCursor}")
+        return comments, nextCursor
+
+    def attachLatest(self, posts: List[Post], perPost: int = 3) -> List[Post]:
+        """Sets the 'comments' of the posts to their newest 'perPost' ones, loaded by a single query for all the
+        posts (the posts without any comment aren't looked up)"""
+        logger.debug(f"+attachLatest({len(posts)}, {perPost})")
+        commented = {post.id: post for post in posts if post.comment_count}
+        for post in posts:
+            post.comments = []
+
+        for row in self.repository.latest(list(commented), perPost):
+            commented[row.post_id].comments.append(CommentMapper.fromRow(row))
+
+        logger.debug(f"-attachLatest(), commented={len(commented)}")
+        return posts
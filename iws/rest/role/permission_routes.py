@@ -9,10 +9,12 @@ import logging
 
 from flask import make_response, request
 
+from common.config import Config
 from framework.blueprint import AbstractBlueprint
-from framework.exception import DuplicateRecordException, ValidationException, RecordNotFoundException
+from framework.exception import BadRequestException, DuplicateRecordException, ValidationException, RecordNotFoundException
 from framework.http import HTTPStatus
 from framework.orm.pydantic.model import ResponseModel
+from globals import limiter, responseCache, versions
 from rest.role.model import Permission
 from rest.role.service import PermissionService
 
@@ -25,6 +27,9 @@ class PermissionBlueprint(AbstractBlueprint):
 
 bp = PermissionBlueprint("permissions", __name__, url_prefix="/permissions")
 
+# the permissions' routes are limited per client
+limiter.limitBlueprint(bp, Config.RATE_LIMIT_DEFAULT)
+
 
 @bp.post("/")
 def create():
@@ -90,6 +95,8 @@ def bulkCreate():
 
 
 @bp.get("/")
+@versions.conditional("permissions")
+@responseCache.cached("permissions", ttl=300)
 def get():
     logger.debug(f"+get() => request={request}, args={request.args}, is_json:{request.is_json}")
     try:
@@ -101,6 +108,8 @@ def get():
             response.addInstances(modelObjects)
         else:
             response.message = "No Records Exist!"
+    except BadRequestException as ex:
+        response = ResponseModel.buildResponseWithException(ex)
     except Exception as ex:
         response = ResponseModel.buildResponse(HTTPStatus.INTERNAL_SERVER_ERROR, message=str(ex), exception=ex)
 
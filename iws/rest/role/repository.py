@@ -8,7 +8,9 @@ from sqlalchemy import update, func
 from sqlalchemy.exc import NoResultFound, MultipleResultsFound
 from sqlalchemy.orm import Session
 
+from framework.orm.sqlalchemy.filter import FilterCompiler
 from framework.orm.sqlalchemy.repository import SqlAlchemyRepository
+from framework.orm.sqlalchemy.statement import selectByColumn
 from framework.orm.sqlalchemy.schema import BaseSchema
 from globals import connector
 from rest.role.schema import RoleSchema, PermissionSchema
@@ -19,26 +21,22 @@ logger = logging.getLogger(__name__)
 class RoleRepository(SqlAlchemyRepository):
     """The RoleRepository handles a schema-centric database persistence for roles."""
 
+    filterCompiler = FilterCompiler(RoleSchema, fields=("id", "name", "active", "created_at", "updated_at"))
+
     def __init__(self):
-        super().__init__(engine=connector.engine)
+        super().__init__(engine=connector.engine, router=connector.router)
 
     # @override
     def filter(self, filters: Dict[str, Any]) -> List[Optional[RoleSchema]]:
         """Returns records by filter or empty list"""
         logger.debug(f"+findByFilter({filters})")
         schemaObjects = None
+        # validate and compile the filters before opening a session
+        statement, params = self.compileFilters(filters)
         # verbose version of what a context manager will do
-        with Session(bind=self.get_engine(), expire_on_commit=False) as session:
-            # session.begin()
+        with Session(bind=self.get_read_engine(), expire_on_commit=False) as session:
             try:
-                if filters and filters is not None:
-                    if len(filters) == 1 and "id" in filters.keys() and isinstance(filters.get("id"), list):
-                        schemaObjects = session.query(RoleSchema).filter(RoleSchema.id.in_(filters.get("id"))).all()
-                    else:
-                        logger.debug(f"filters={filters}, filters={filters.keys()}")
-                        schemaObjects = session.query(RoleSchema).filter_by(**filters).all()
-                else:
-                    schemaObjects = session.query(RoleSchema).all()
+                schemaObjects = session.execute(statement, params).unique().scalars().all()
 
                 logger.debug(f"Loaded [{len(schemaObjects)}] roles. schemaObjects={schemaObjects}")
 
@@ -81,9 +79,9 @@ class RoleRepository(SqlAlchemyRepository):
     def findByName(self, name: str) -> RoleSchema:
         logger.debug(f"+findByName({name})")
         results = List[Optional[RoleSchema]]
-        with Session(self.get_engine()) as session:
+        with Session(bind=self.get_read_engine(), expire_on_commit=False) as session:
             try:
-                results = session.query(RoleSchema).filter(RoleSchema.name == name).all()
+                results = session.execute(selectByColumn(RoleSchema, "name"), {"name": name}).unique().scalars().all()
                 logger.debug(f"Loaded [{len(results)}] roles => results={results}")
             except NoResultFound as ex:
                 logger.error(f"NoResultFound while loading role by name! Error={ex}")
@@ -136,9 +134,11 @@ class RoleRepository(SqlAlchemyRepository):
 
     def delete(self, filters: Dict[str, Any]) -> None:
         logger.debug(f"+delete({filters})")
+        # validate and compile the filters before opening a session
+        statement, params = self.compileFilters(filters)
         with Session(bind=self.get_engine(), expire_on_commit=False) as session:
             try:
-                roleSchema = session.query(RoleSchema).filter_by(**filters).one()
+                roleSchema = session.execute(statement, params).unique().scalar_one()
                 logger.debug(f"Deleting roleSchema={roleSchema}")
                 session.delete(roleSchema)
                 logger.info("Role is successfully deleted.")
@@ -162,7 +162,8 @@ class RoleRepository(SqlAlchemyRepository):
         logger.debug(f"+bulkDelete({ids})")
         with Session(bind=self.get_engine(), expire_on_commit=False) as session:
             try:
-                schemaObjects = self.filter({"id": ids})
+                with self.writeUnitOfWork():
+                    schemaObjects = self.filter({"id": ids})
                 for schemaObject in schemaObjects:
                     logger.debug(f"Deleting role with id=[{schemaObject.id}]")
                     session.delete(schemaObject)
@@ -188,25 +189,22 @@ class RoleRepository(SqlAlchemyRepository):
 class PermissionRepository(SqlAlchemyRepository):
     """The PermissionRepository handles a schema-centric database persistence for permissions."""
 
+    filterCompiler = FilterCompiler(PermissionSchema, fields=("id", "name", "active", "created_at", "updated_at"))
+
     def __init__(self):
-        super().__init__(engine=connector.engine)
+        super().__init__(engine=connector.engine, router=connector.router)
 
     # @override
     def filter(self, filters: Dict[str, Any]) -> List[Optional[PermissionSchema]]:
         """Returns records by filter or empty list"""
         logger.debug(f"+findByFilter({filters})")
         schemaObjects = None
+        # validate and compile the filters before opening a session
+        statement, params = self.compileFilters(filters)
         # verbose version of what a context manager will do
-        with Session(bind=self.get_engine(), expire_on_commit=False) as session:
+        with Session(bind=self.get_read_engine(), expire_on_commit=False) as session:
             try:
-                if filters:
-                    if len(filters) == 1 and "id" in filters.keys() and isinstance(filters.get("id"), list):
-                        schemaObjects = session.query(PermissionSchema).filter(
-                            PermissionSchema.id.in_(filters.get("id"))).all()
-                    else:
-                        schemaObjects = session.query(PermissionSchema).filter_by(**filters).all()
-                else:
-                    schemaObjects = session.query(PermissionSchema).all()
+                schemaObjects = session.execute(statement, params).unique().scalars().all()
 
                 logger.debug(f"Loaded [{len(schemaObjects)}] permissions. schemaObjects={schemaObjects}")
 
@@ -277,9 +275,11 @@ class PermissionRepository(SqlAlchemyRepository):
 
     def delete(self, filters: Dict[str, Any]) -> None:
         logger.debug(f"+delete({filters})")
+        # validate and compile the filters before opening a session
+        statement, params = self.compileFilters(filters)
         with Session(bind=self.get_engine(), expire_on_commit=False) as session:
             try:
-                permissionSchema = session.query(PermissionSchema).filter_by(**filters).one()
+                permissionSchema = session.execute(statement, params).unique().scalar_one()
                 logger.debug(f"Deleting permissionSchema={permissionSchema}")
                 session.delete(permissionSchema)
                 logger.info("Permission is successfully deleted.")
@@ -303,7 +303,8 @@ class PermissionRepository(SqlAlchemyRepository):
         logger.debug(f"+bulkDelete({ids})")
         with Session(bind=self.get_engine(), expire_on_commit=False) as session:
             try:
-                schemaObjects = self.filter({"id": ids})
+                with self.writeUnitOfWork():
+                    schemaObjects = self.filter({"id": ids})
                 for schemaObject in schemaObjects:
                     logger.debug(f"Deleting permission with id=[{schemaObject.id}]")
                     session.delete(schemaObject)
@@ -8,16 +8,21 @@ import logging
 
 from flask import make_response, request
 
-from framework.exception import DuplicateRecordException, ValidationException, RecordNotFoundException
+from common.config import Config
+from framework.exception import BadRequestException, DuplicateRecordException, ValidationException, RecordNotFoundException
 from framework.http import HTTPStatus
 from framework.orm.pydantic.model import ResponseModel
 from framework.orm.sqlalchemy.schema import SchemaOperation
+from globals import limiter, responseCache, versions
 from rest.role.model import Role, RoleAssignPermission
 from rest.role.service import RoleService
 from rest.role.v1 import bp as bp_role_v1
 
 logger = logging.getLogger(__name__)
 
+# the roles' routes are limited per client
+limiter.limitBlueprint(bp_role_v1, Config.RATE_LIMIT_DEFAULT)
+
 
 # class RoleController:
 #
@@ -94,6 +99,8 @@ def bulkCreate():
 
 
 @bp_role_v1.get("/")
+@versions.conditional("roles", "permissions", "role_permissions")
+@responseCache.cached("roles", "permissions", "role_permissions", ttl=300)
 def get():
     logger.debug(f"+get() => request={request}, args={request.args}, is_json:{request.is_json}")
     try:
@@ -106,6 +113,8 @@ def get():
             response.addInstances(roles)
         else:
             response.message = "No Records Exist!"
+    except BadRequestException as ex:
+        response = ResponseModel.buildResponseWithException(ex)
     except Exception as ex:
         response = ResponseModel.buildResponse(HTTPStatus.INTERNAL_SERVER_ERROR, message=str(ex), exception=ex)
 
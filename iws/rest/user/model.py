@@ -70,6 +70,8 @@ class LoginUser(AbstractModel):
     email: str = None
     user_name: str = None
     password: str = None
+    # 'jwt' to issue the stateless JWT access/refresh tokens, the encrypted auth-token otherwise
+    token_type: str = None
 
 
 class UserSecurity(AbstractModel):
@@ -5,13 +5,15 @@
 import logging
 from typing import List, Optional, Dict, Any
 
-from sqlalchemy import update, func
+from sqlalchemy import update, func, select, delete
 from sqlalchemy.exc import NoResultFound, MultipleResultsFound
 from sqlalchemy.orm import Session
 
+from framework.orm.sqlalchemy.filter import FilterCompiler
 from framework.orm.sqlalchemy.repository import SqlAlchemyRepository
+from framework.orm.sqlalchemy.statement import selectByColumn
 from globals import connector
-from rest.user.schema import UserSchema, UserSecuritySchema, AddressSchema
+from rest.user.schema import UserSchema, UserSecuritySchema, AddressSchema, RevokedTokenSchema
 
 logger = logging.getLogger(__name__)
 
@@ -19,21 +21,23 @@ logger = logging.getLogger(__name__)
 class UserRepository(SqlAlchemyRepository):
     """The UserRepository handles a schema-centric database persistence for users."""
 
+    filterCompiler = FilterCompiler(UserSchema, fields=("id", "email", "user_name", "first_name", "last_name", "birth_date",
+                                                        "admin", "last_seen", "created_at", "updated_at"))
+
     def __init__(self):
-        super().__init__(engine=connector.engine)
+        super().__init__(engine=connector.engine, router=connector.router)
 
     # @override
     def filter(self, filters: Dict[str, Any]) -> List[Optional[UserSchema]]:
         """Returns records by filter or empty list"""
         logger.debug(f"+{self.__class__.__name__}.filter({filters})")
         schemaObjects = None
+        # validate and compile the filters before opening a session
+        statement, params = self.compileFilters(filters)
         # verbose version of what a context manager will do
-        with Session(bind=self.get_engine(), expire_on_commit=False) as session:
+        with Session(bind=self.get_read_engine(), expire_on_commit=False) as session:
             try:
-                if filters:
-                    schemaObjects = session.query(UserSchema).filter_by(**filters).all()
-                else:
-                    schemaObjects = session.query(UserSchema).all()
+                schemaObjects = session.execute(statement, params).unique().scalars().all()
 
                 logger.debug(f"Loaded [{len(schemaObjects)}] user(s), schemaObjects={schemaObjects}")
 
@@ -75,9 +79,10 @@ class UserRepository(SqlAlchemyRepository):
     def findByUsername(self, userName: str) -> UserSchema:
         logger.debug(f"+findByUsername({userName})")
         schemaObjects = List[Optional[UserSchema]]
-        with Session(self.get_engine()) as session:
+        with Session(bind=self.get_read_engine(), expire_on_commit=False) as session:
             try:
-                schemaObjects = session.query(UserSchema).filter(UserSchema.name == userName).all()
+                schemaObjects = session.execute(selectByColumn(UserSchema, "user_name"),
+                                                {"user_name": userName}).unique().scalars().all()
                 logger.debug(f"Loaded [{len(schemaObjects)}] user(s), schemaObjects={schemaObjects}")
             except NoResultFound as ex:
                 logger.error(f"NoResultFound while loading user by name! Error={ex}")
@@ -123,9 +128,11 @@ class UserRepository(SqlAlchemyRepository):
 
     def delete(self, filters: Dict[str, Any]) -> None:
         logger.debug(f"+delete({filters})")
+        # validate and compile the filters before opening a session
+        statement, params = self.compileFilters(filters)
         with Session(bind=self.get_engine(), expire_on_commit=False) as session:
             try:
-                schemaObject = session.query(UserSchema).filter_by(**filters).one()
+                schemaObject = session.execute(statement, params).unique().scalar_one()
                 logger.debug(f"Deleting schemaObject={schemaObject}")
                 session.delete(schemaObject)
                 logger.debug("User is successfully deleted.")
@@ -149,7 +156,8 @@ class UserRepository(SqlAlchemyRepository):
         logger.debug(f"+bulkDelete({ids})")
         with Session(bind=self.get_engine(), expire_on_commit=False) as session:
             try:
-                schemaObjects = self.filter({"id": ids})
+                with self.writeUnitOfWork():
+                    schemaObjects = self.filter({"id": ids})
                 for schemaObject in schemaObjects:
                     logger.debug(f"Deleting record with id=[{schemaObject.id}]")
                     session.delete(schemaObject)
@@ -175,21 +183,22 @@ class UserRepository(SqlAlchemyRepository):
 class UserSecurityRepository(SqlAlchemyRepository):
     """The UserSecurityRepository handles a schema-centric database persistence for users."""
 
+    filterCompiler = FilterCompiler(UserSecuritySchema, fields=("user_id", "platform", "created_at", "updated_at"))
+
     def __init__(self):
-        super().__init__(engine=connector.engine)
+        super().__init__(engine=connector.engine, router=connector.router)
 
     # @override
     def filter(self, filters: Dict[str, Any]) -> List[Optional[UserSecuritySchema]]:
         """Returns records by filter or empty list"""
         logger.debug(f"+{self.__class__.__name__}.findByFilter({filters})")
         schemaObjects = None
+        # validate and compile the filters before opening a session
+        statement, params = self.compileFilters(filters)
         # verbose version of what a context manager will do
-        with Session(bind=self.get_engine(), expire_on_commit=False) as session:
+        with Session(bind=self.get_read_engine(), expire_on_commit=False) as session:
             try:
-                if filters:
-                    schemaObjects = session.query(UserSecuritySchema).filter_by(**filters).all()
-                else:
-                    schemaObjects = session.query(UserSecuritySchema).all()
+                schemaObjects = session.execute(statement, params).unique().scalars().all()
 
                 logger.debug(f"Loaded [{len(schemaObjects)}] user's security record(s). schemaObjects={schemaObjects}")
 
@@ -257,11 +266,39 @@ class UserSecurityRepository(SqlAlchemyRepository):
         logger.info(f"-{self.__class__.__name__}.update(), results={results}")
         return results
 
+    def updateHashedAuthToken(self, userId: int, hashedAuthToken: str, salt: str, rotateTokens: bool = False) -> int:
+        """Replaces the user's password hash (i.e. rehashed on login with the current cost), a new password rotates
+        the token version of the user, so the auth-tokens issued before are rejected"""
+        logger.debug(f"+{self.__class__.__name__}.updateHashedAuthToken({userId}, {rotateTokens})")
+        values = dict(hashed_auth_token=hashedAuthToken, salt=salt, updated_at=func.now())
+        if rotateTokens:
+            values["token_version"] = UserSecuritySchema.token_version + 1
+
+        with Session(bind=self.get_engine(), expire_on_commit=False) as session:
+            try:
+                results = session.execute(
+                    update(UserSecuritySchema)
+                    .values(**values)
+                    .where(UserSecuritySchema.user_id == userId)
+                ).rowcount
+                logger.debug(f"Updated [{results}] user's security record(s).")
+
+                session.commit()
+            except Exception as ex:
+                logger.error(f"Exception while updating user's password hash! Error={ex}")
+                session.rollback()
+                raise ex
+
+        logger.debug(f"-{self.__class__.__name__}.updateHashedAuthToken(), results={results}")
+        return results
+
     def delete(self, filters: Dict[str, Any]) -> None:
         logger.debug(f"+{self.__class__.__name__}.delete({filters})")
+        # validate and compile the filters before opening a session
+        statement, params = self.compileFilters(filters)
         with Session(bind=self.get_engine(), expire_on_commit=False) as session:
             try:
-                schemaObject = session.query(UserSecuritySchema).filter_by(**filters).one()
+                schemaObject = session.execute(statement, params).unique().scalar_one()
                 logger.debug(f"Deleting schemaObject={schemaObject}")
                 session.delete(schemaObject)
                 logger.debug(f"UserSecuritySchema is successfully deleted.")
@@ -285,7 +322,8 @@ class UserSecurityRepository(SqlAlchemyRepository):
         logger.debug(f"+{self.__class__.__name__}.bulkDelete({ids})")
         with Session(bind=self.get_engine(), expire_on_commit=False) as session:
             try:
-                schemaObjects = self.filter({"id": ids})
+                with self.writeUnitOfWork():
+                    schemaObjects = self.filter({"id": ids})
                 for schemaObject in schemaObjects:
                     logger.debug(f"Deleting record with id=[{schemaObject.id}]")
                     session.delete(schemaObject)
@@ -311,21 +349,23 @@ class UserSecurityRepository(SqlAlchemyRepository):
 class AddressRepository(SqlAlchemyRepository):
     """The AddressRepository handles a schema-centric database persistence for addresses."""
 
+    filterCompiler = FilterCompiler(AddressSchema, fields=("id", "user_id", "city", "state", "country", "zip",
+                                                           "created_at", "updated_at"))
+
     def __init__(self):
-        super().__init__(engine=connector.engine)
+        super().__init__(engine=connector.engine, router=connector.router)
 
     # @override
     def filter(self, filters: Dict[str, Any]) -> List[Optional[AddressSchema]]:
         """Returns records by filter or empty list"""
         logger.debug(f"+findByFilter({filters})")
         addressSchemas = None
+        # validate and compile the filters before opening a session
+        statement, params = self.compileFilters(filters)
         # verbose version of what a context manager will do
-        with Session(bind=self.get_engine(), expire_on_commit=False) as session:
+        with Session(bind=self.get_read_engine(), expire_on_commit=False) as session:
             try:
-                if filters:
-                    addressSchemas = session.query(AddressSchema).filter_by(**filters).all()
-                else:
-                    addressSchemas = session.query(AddressSchema).all()
+                addressSchemas = session.execute(statement, params).unique().scalars().all()
 
                 logger.debug(f"Loaded [{len(addressSchemas)}] addresses => addressSchemas={addressSchemas}")
 
@@ -396,9 +436,11 @@ class AddressRepository(SqlAlchemyRepository):
 
     def delete(self, filters: Dict[str, Any]) -> None:
         logger.debug(f"+delete({filters})")
+        # validate and compile the filters before opening a session
+        statement, params = self.compileFilters(filters)
         with Session(bind=self.get_engine(), expire_on_commit=False) as session:
             try:
-                addressSchema = session.query(AddressSchema).filter_by(**filters).one()
+                addressSchema = session.execute(statement, params).unique().scalar_one()
                 logger.debug(f"Deleting addressSchema={addressSchema}")
                 session.delete(addressSchema)
                 logger.info("Address is successfully deleted.")
@@ -422,7 +464,8 @@ class AddressRepository(SqlAlchemyRepository):
         logger.debug(f"+bulkDelete({ids})")
         with Session(bind=self.get_engine(), expire_on_commit=False) as session:
             try:
-                addressSchemas = self.filter({"id": ids})
+                with self.writeUnitOfWork():
+                    addressSchemas = self.filter({"id": ids})
                 for addressSchema in addressSchemas:
                     logger.debug(f"Deleting address with id=[{addressSchema.id}]")
                     session.delete(addressSchema)
@@ -443,3 +486,53 @@ class AddressRepository(SqlAlchemyRepository):
                 raise ex
 
         logger.info(f"-bulkDelete()")
+
+
+class RevokedTokenRepository(SqlAlchemyRepository):
+    """The RevokedTokenRepository handles a schema-centric database persistence for the revoked JWT tokens."""
+
+    def __init__(self):
+        super().__init__(engine=connector.engine, router=connector.router)
+
+    def existsByJti(self, jti: str) -> bool:
+        """Returns True if the 'jti' is revoked, the exact confirmation of a revocation filter hit"""
+        logger.debug(f"+existsByJti({jti})")
+        with Session(bind=self.get_read_engine(), expire_on_commit=False) as session:
+            try:
+                schemaObject = session.execute(selectByColumn(RevokedTokenSchema, "jti"),
+                                               {"jti": jti}).scalars().first()
+            except Exception as ex:
+                logger.error(f"Exception while loading revoked token! Error={ex}")
+                raise ex
+
+        logger.debug(f"-existsByJti(), exists={schemaObject is not None}")
+        return schemaObject is not None
+
+    def findActiveJtis(self, now: int) -> List[str]:
+        """Returns the 'jti's of the revoked tokens which are not expired yet"""
+        logger.debug(f"+findActiveJtis({now})")
+        with Session(bind=self.get_read_engine(), expire_on_commit=False) as session:
+            try:
+                jtis = session.execute(select(RevokedTokenSchema.jti).where(RevokedTokenSchema.expires_at > now)
+                                       ).scalars().all()
+            except Exception as ex:
+                logger.error(f"Exception while loading revoked tokens! Error={ex}")
+                raise ex
+
+        logger.debug(f"-findActiveJtis(), jtis={len(jtis)}")
+        return jtis
+
+    def deleteExpired(self, now: int) -> int:
+        """Deletes the revoked tokens which have expired and returns their count"""
+        logger.debug(f"+deleteExpired({now})")
+        with Session(bind=self.get_engine(), expire_on_commit=False) as session:
+            try:
+                result = session.execute(delete(RevokedTokenSchema).where(RevokedTokenSchema.expires_at <= now))
+                session.commit()
+            except Exception as ex:
+                logger.error(f"Exception while deleting revoked tokens! Error={ex}")
+                session.rollback()
+                raise ex
+
+        logger.debug(f"-deleteExpired(), count={result.rowcount}")
+        return result.rowcount
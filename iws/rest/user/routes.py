@@ -9,17 +9,22 @@ import logging
 from flask import make_response, request
 from flask import session, g
 
-from framework.exception import DuplicateRecordException, ValidationException, RecordNotFoundException
+from common.config import Config
+from framework.exception import BadRequestException, DuplicateRecordException, ValidationException, RecordNotFoundException
 from framework.http import HTTPStatus
 from framework.orm.pydantic.model import ResponseModel
 from framework.orm.sqlalchemy.schema import SchemaOperation
-from rest.auth import auth
+from rest.auth import auth, parse_bearer_token
 from rest.user.model import User, LoginUser
 from rest.user.service import UserService
+from globals import limiter, versions
 from rest.user.v1 import bp as bp_user_v1
 
 logger = logging.getLogger(__name__)
 
+# the user's routes are limited per client, the credentials' routes by the stricter login limit
+limiter.limitBlueprint(bp_user_v1, Config.RATE_LIMIT_DEFAULT)
+
 
 @bp_user_v1.before_app_request
 def getLoggedInUser():
@@ -84,6 +89,7 @@ def register():
 
 
 @bp_user_v1.post("/login")
+@limiter.limit(Config.RATE_LIMIT_LOGIN)
 def login():
     """Login User"""
     logger.debug(f"+login() => request={request}, is_json:{request.is_json}")
@@ -106,12 +112,39 @@ def login():
     return make_response(response.to_json(), response.status)
 
 
+@bp_user_v1.post("/refresh")
+@limiter.limit(Config.RATE_LIMIT_LOGIN)
+def refresh():
+    """Refresh User's JWT Access Token"""
+    logger.debug(f"+refresh() => request={request}, is_json:{request.is_json}")
+    try:
+        body = request.get_json()
+        userService = UserService()
+        authUser = userService.refreshToken(body.get("refresh_token") if body else None)
+
+        # build success response
+        response = ResponseModel(status=HTTPStatus.CREATED.statusCode, message="Access token is refreshed successfully.")
+        response.addInstance(authUser)
+    except Exception as ex:
+        response = ResponseModel.buildResponseWithException(ex)
+
+    logger.debug(f"-refresh() <= response={response}")
+    return make_response(response.to_json(), response.status)
+
+
 @bp_user_v1.post("/logout")
 def logout():
     """Logout User"""
     logger.debug(f"+logout() => request={request}, args={request.args}, is_json:{request.is_json}")
     # session.clear()
     try:
+        # revoke the JWT access (bearer) and refresh tokens, if any
+        body = request.get_json(silent=True) or {}
+        authorization = request.headers.get('Authorization')
+        accessToken = parse_bearer_token(authorization) if authorization else None
+        userService = UserService()
+        userService.revokeTokens(accessToken, body.get("refresh_token"))
+
         # build success response
         response = ResponseModel(status=HTTPStatus.OK.statusCode, message="User is logged-out successfully.")
     except Exception as ex:
@@ -122,6 +155,7 @@ def logout():
 
 
 @bp_user_v1.post("/forgot-password")
+@limiter.limit(Config.RATE_LIMIT_LOGIN)
 def forgotPassword():
     """Forgot User's Password"""
     logger.debug(f"+forgotPassword() => request={request}, args={request.args}, is_json:{request.is_json}")
@@ -173,6 +207,7 @@ def bulkCreate():
 
 @bp_user_v1.get("/")
 @auth
+@versions.conditional("users", "addresses")
 def findByFilter():
     """Find User's by Filter"""
     logger.debug(f"+findByFilter) => request={request}, args={request.args}, is_json:{request.is_json}")
@@ -186,6 +221,8 @@ def findByFilter():
             response.addInstances(userObjects)
         else:
             response.message = "No Records Exist!"
+    except BadRequestException as ex:
+        response = ResponseModel.buildResponseWithException(ex)
     except Exception as ex:
         response = ResponseModel.buildResponse(HTTPStatus.INTERNAL_SERVER_ERROR, message=str(ex), exception=ex)
 
@@ -4,7 +4,7 @@
 from datetime import datetime
 from typing import Optional, List
 
-from sqlalchemy import String, ForeignKey, func, PickleType, JSON, Boolean
+from sqlalchemy import String, ForeignKey, func, PickleType, JSON, Boolean, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from framework.orm.sqlalchemy.schema import AbstractSchema, BaseSchema
@@ -37,6 +37,8 @@ class UserSchema(PersonSchema):
     """ UserSchema represents [users] Table """
 
     __tablename__ = "users"
+    # 'email' and 'user_name' are unique and therefore already indexed
+    __table_args__ = (Index("ix_users_created_at", "created_at"),)
 
     # not Optional[], therefore will be NOT NULL
     user_name: Mapped[str] = mapped_column(String(64), unique=True)
@@ -100,14 +102,18 @@ class UserSecuritySchema(AbstractSchema):
     # Optional[], therefore will be NULL
     expire_at: Mapped[Optional[str]] = mapped_column(String(64))
 
+    # the version of the user's auth-tokens, a password change increments it and the older tokens are rejected
+    token_version: Mapped[int] = mapped_column(server_default=text("0"))
+
     # Optional[], therefore will be NULL
     meta_data: Mapped[Optional[PickleType]] = mapped_column(JSON)
 
     def __str__(self) -> str:
         """Returns the string representation of this object"""
-        return ("{} <user_id={}, platform={}, salt={}, hashed_auth_token={}, expire_at={}, meta_data={}, {}>"
+        return ("{} <user_id={}, platform={}, salt={}, hashed_auth_token={}, expire_at={}, token_version={}, "
+                "meta_data={}, {}>"
                 .format(self.getClassName(), self.user_id, self.platform, self.salt, self.hashed_auth_token,
-                        self.expire_at, self.meta_data, self.auditable()))
+                        self.expire_at, self.token_version, self.meta_data, self.auditable()))
 
 
 class UserRoleSchema(AbstractSchema):
@@ -119,7 +125,7 @@ class UserRoleSchema(AbstractSchema):
     # not Optional[], therefore will be NOT NULL
     role_id: Mapped[int] = mapped_column(ForeignKey("roles.id"), primary_key=True)
     # not Optional[], therefore will be NOT NULL
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True, index=True)
 
     # Define the many-to-one relationship
     role: Mapped["RoleSchema"] = relationship("RoleSchema")
@@ -138,7 +144,7 @@ class AddressSchema(BaseSchema):
 
     # foreign key to "users.id" is added
     # not Optional[], therefore will be NOT NULL
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False, index=True)
     # Define the many-to-one relationship
     user: Mapped["UserSchema"] = relationship(back_populates="addresses")
 
@@ -160,3 +166,22 @@ class AddressSchema(BaseSchema):
         return ("{} <id={}, user_id={}, street1={}, street2={}, city={}, state={}, country={}, zip={}, {}>"
                 .format(self.getClassName(), self.id, self.user_id, self.street1, self.street2, self.city,
                         self.state, self.country, self.zip, self.auditable()))
+
+
+class RevokedTokenSchema(BaseSchema):
+    """ RevokedTokenSchema represents [revoked_tokens] Table """
+
+    __tablename__ = "revoked_tokens"
+
+    # not Optional[], therefore will be NOT NULL
+    jti: Mapped[str] = mapped_column(String(64), unique=True)
+    # not Optional[], therefore will be NOT NULL
+    user_id: Mapped[int] = mapped_column(index=True)
+    # the token's expiry (time since epoch), the expired rows are purged on the filter's rebuild
+    # not Optional[], therefore will be NOT NULL
+    expires_at: Mapped[int] = mapped_column(index=True)
+
+    def __str__(self) -> str:
+        """Returns the string representation of this object"""
+        return ("{} <id={}, jti={}, user_id={}, expires_at={}, {}>"
+                .format(self.getClassName(), self.id, self.jti, self.user_id, self.expires_at, self.auditable()))
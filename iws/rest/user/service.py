@@ -2,9 +2,13 @@
 # Author: Rohtash Lakra
 #
 import logging
+import os
 from datetime import datetime, timezone
+from functools import lru_cache
 from typing import List, Optional, Dict, Any
 
+import jwt
+
 from common.config import Config
 from framework.exception import (
     DuplicateRecordException,
@@ -15,20 +19,61 @@ from framework.exception import (
 from framework.http import HTTPStatus
 from framework.orm.pydantic.model import BaseModel
 from framework.orm.sqlalchemy.schema import SchemaOperation
-from framework.security.crypto import CryptoUtils
-from framework.security.crypto import SecurityException
-from framework.security.hash import HashUtils
-from framework.security.jwt import AuthModel, AuthenticatedUser, TokenTypeEnum
+from framework.security.crypto import KeyRing, SecurityException, getKeyRing
+from framework.security.jwt import (
+    AuthModel,
+    AuthenticatedUser,
+    TokenTypeEnum,
+    TokenManager,
+    JWTEnum,
+    REFRESH_EXPIRES_IN_SECONDS,
+    UserToken,
+    getAccessTokenVerifier
+)
+from framework.security.password import PasswordHasher, getPasswordHasher
+from framework.security.revocation import RevocationList
+from framework.security.store import TokenStoreSweeper, TokenStoreType, createTokenStore
 from framework.service import AbstractService
 from framework.utils import Utils
 from rest.user.mapper import UserMapper
 from rest.user.model import User, LoginUser
-from rest.user.repository import UserRepository, UserSecurityRepository
-from rest.user.schema import UserSecuritySchema
+from rest.user.repository import UserRepository, UserSecurityRepository, RevokedTokenRepository
+from rest.user.schema import UserSecuritySchema, RevokedTokenSchema
 
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=4)
+def getTokenManager(clientId: str, clientSecret: str, expiresInSeconds: int) -> TokenManager:
+    """Returns the token manager of the worker, its token store and the store's sweeper are created once"""
+    logger.debug(f"+getTokenManager({clientId}, {expiresInSeconds})")
+    tokenStore = createTokenStore(TokenStoreType.of_name(Config.TOKEN_STORE),
+                                  REFRESH_EXPIRES_IN_SECONDS,
+                                  UserToken,
+                                  maxSize=Config.TOKEN_STORE_MAX_SIZE,
+                                  path=Config.TOKEN_STORE_PATH)
+    tokenManager = TokenManager(clientId, clientSecret, expiresInSeconds=expiresInSeconds, tokenStore=tokenStore)
+    TokenStoreSweeper(tokenStore, Config.TOKEN_STORE_SWEEP_SECONDS).start()
+    logger.debug(f"-getTokenManager(), tokenManager={tokenManager}")
+    return tokenManager
+
+
+@lru_cache(maxsize=4)
+def getRevocationList(path: str, capacity: int, errorRate: float) -> RevocationList:
+    """Returns the revoked JWT 'jti's filter of the worker, a filter hit is confirmed in the 'revoked_tokens' table"""
+    logger.debug(f"+getRevocationList({path}, {capacity}, {errorRate})")
+    rebuild = not os.path.exists(path)
+    revokedTokenRepository = RevokedTokenRepository()
+    revocationList = RevocationList(path, capacity=capacity, errorRate=errorRate,
+                                    confirm=revokedTokenRepository.existsByJti)
+    # a new host's filter is built from the table
+    if rebuild:
+        revocationList.rebuild(revokedTokenRepository.findActiveJtis(int(datetime.now(timezone.utc).timestamp())))
+
+    logger.debug(f"-getRevocationList(), revocationList={revocationList}")
+    return revocationList
+
+
 class UserService(AbstractService):
     
     def __init__(self):
@@ -132,14 +177,12 @@ class UserService(AbstractService):
         schemaObject = UserMapper.fromModel(modelObject)
         schemaObject = self.userRepository.save(schemaObject)
         
-        # persist user's security
-        passwordHashCode = HashUtils.hashCode(modelObject.password)
-        logger.debug(f"modelObject.password={modelObject.password}, passwordHashCode={passwordHashCode}")
-        # saltHashCode, hashCode = HashUtils.hashCodeWithSalt(passwordHashCode)
-        # logger.debug(f"saltHashCode={saltHashCode}, hashCode={hashCode}")
+        # persist user's security (the scrypt hash of the password with a per-user salt)
+        passwordHasher = self.getPasswordHasher()
+        salt = passwordHasher.generateSalt()
         # TODO: Capture platform value form user-agent
-        userSecuritySchema = UserSecuritySchema(platform="Service", salt=Utils.randomUUID(),
-                                                hashed_auth_token=passwordHashCode)
+        userSecuritySchema = UserSecuritySchema(platform="Service", salt=salt,
+                                                hashed_auth_token=passwordHasher.hash(modelObject.password, salt))
         logger.debug(f"userSecuritySchema={userSecuritySchema}")
         schemaObject.user_security = userSecuritySchema
         userSecuritySchema = self.userRepository.save(userSecuritySchema)
@@ -173,45 +216,140 @@ class UserService(AbstractService):
         """Authenticates the token"""
         logger.debug(f"+authenticate({token_type}, {auth_token})")
         try:
-            # JWT Based Authentication
-            if TokenTypeEnum.JWT == TokenTypeEnum:
-                raise AuthenticationException(HTTPStatus.UNAUTHORIZED, "Not yet supported!")
+            # JWT Based Authentication (stateless, verified in memory without a DB round-trip)
+            if TokenTypeEnum.JWT == token_type:
+                claims = getAccessTokenVerifier(Config.CLIENT_ID, Config.CLIENT_SECRET).verify(auth_token)
+                if self.getRevocationList().isRevoked(claims.get(JWTEnum.JWT_ID.value)):
+                    raise AuthenticationException(messages=["JWT Token has been revoked!"])
+
+                userObject = User(id=int(claims[JWTEnum.SUBJECT.value]), authenticated=True)
             else:
+                # the sealed (AES-GCM) token can't be forged without the key, its age and version are verified
                 try:
-                    authModelDecrypted = CryptoUtils.decrypt_with_aesgcm(Config.ENC_KEY, Config.ENC_NONCE, auth_token)
+                    authModel = AuthModel.from_bytes(self.getKeyRing().decode(auth_token))
                 except SecurityException as ex:
-                    raise AuthenticationException(HTTPStatus.INTERNAL_SERVER_ERROR, messages=[str(ex)])
+                    raise AuthenticationException(messages=[str(ex)])
                 
-                logger.debug(f"type={type(authModelDecrypted)}, authModelDecrypted={authModelDecrypted}")
-                authModel = AuthModel(**authModelDecrypted)
+                logger.debug(f"authModel={authModel}")
+                now = int(datetime.now(timezone.utc).timestamp())
+                if now - authModel.iat > Config.AUTH_TOKEN_MAX_AGE_SECONDS:
+                    raise AuthenticationException(messages=["Auth token has expired!"])
                 
-                # TODO: Time comparison with iat and expiry max
                 userSecuritySchema = self.userSecurityRepository.filter({"user_id": authModel.user_id})[0]
                 if userSecuritySchema:
-                    passwordHashCode = HashUtils.hashCode(authModel.auth_token)
-                    if userSecuritySchema.hashed_auth_token != passwordHashCode:
-                        raise AuthenticationException(HTTPStatus.UNAUTHORIZED, "Invalid Token!")
+                    if userSecuritySchema.expire_at and userSecuritySchema.expire_at < now:
+                        raise AuthenticationException(messages=["Auth token has expired!"])
                     
-                    if userSecuritySchema.expire_at and userSecuritySchema.expire_at < int(
-                            datetime.now(timezone.utc).timestamp()):
-                        raise AuthenticationException(HTTPStatus.UNAUTHORIZED, "Auth token has expired!")
-                    
-                    saltHashCode, hashCode = HashUtils.hashCodeWithSalt(passwordHashCode, userSecuritySchema.salt)
-                    if not HashUtils.checkHashCode(authModel.auth_token, saltHashCode, hashCode):
-                        raise AuthenticationException(HTTPStatus.UNAUTHORIZED, "Invalid Token!")
+                    # the password has changed since the token was issued
+                    if authModel.token_version != userSecuritySchema.token_version:
+                        raise AuthenticationException(messages=["Auth token has been revoked!"])
                     
                     # load authenticated user
                     schemaObject = self.userRepository.filter({"id": authModel.user_id})[0]
                     userObject = UserMapper.fromSchema(schemaObject)
                     userObject.authenticated = True
         
+        except AuthenticationException as ex:
+            logger.error(f"Auth token {auth_token} is invalid!, Error:{ex.messages}")
+            raise ex
         except Exception as e:
             logger.error(f"Auth token {auth_token} seems to have been tampered!, Error:{e}")
-            raise AuthenticationException(HTTPStatus.UNAUTHORIZED, str(e))
+            raise AuthenticationException(messages=[str(e)])
         
         logger.debug(f"-authenticate(), userObject={userObject}")
         return userObject
     
+    def getTokenManager(self) -> TokenManager:
+        """Returns the token manager of the JWT access/refresh tokens"""
+        return getTokenManager(Config.CLIENT_ID, Config.CLIENT_SECRET, Config.JWT_EXPIRES_IN_SECONDS)
+    
+    def getKeyRing(self) -> KeyRing:
+        """Returns the key-ring of the auth-tokens"""
+        keys = Config.ENC_KEYS or (f"1:{Config.ENC_KEY}" if Config.ENC_KEY else "")
+        return getKeyRing(keys, int(Config.ENC_KEY_ID) if Config.ENC_KEY_ID else None)
+
+    def getPasswordHasher(self) -> PasswordHasher:
+        """Returns the password hasher of the configured scrypt cost"""
+        return getPasswordHasher(Config.PASSWORD_SCRYPT_N, Config.PASSWORD_SCRYPT_R, Config.PASSWORD_SCRYPT_P,
+                                 Config.PASSWORD_CACHE_SECONDS)
+
+    def getRevocationList(self) -> RevocationList:
+        """Returns the revocation list of the JWT tokens"""
+        return getRevocationList(Config.REVOCATION_LIST_PATH, Config.REVOCATION_LIST_CAPACITY,
+                                 Config.REVOCATION_LIST_ERROR_RATE)
+
+    def revokeTokens(self, *encodedTokens: Optional[str]) -> int:
+        """Revokes the JWT access/refresh tokens (i.e. on logout or compromise) and returns the count of revoked"""
+        logger.debug(f"+{self.__class__.__name__}.revokeTokens()")
+        verifier = getAccessTokenVerifier(Config.CLIENT_ID, Config.CLIENT_SECRET)
+        revokedTokens = []
+        for encodedToken in filter(None, encodedTokens):
+            tokenType = TokenTypeEnum.REFRESH_TOKEN if TokenTypeEnum.isRefreshToken(
+                self.peekClaims(encodedToken)) else TokenTypeEnum.ACCESS_TOKEN
+            try:
+                claims = verifier.verify(encodedToken, tokenType)
+            except AuthenticationException as ex:
+                # the expired or invalid tokens are not accepted anyway
+                logger.debug(f"Skipping revocation of the token! Error={ex.messages}")
+                continue
+
+            if claims.get(JWTEnum.JWT_ID.value):
+                revokedTokens.append(RevokedTokenSchema(jti=claims[JWTEnum.JWT_ID.value],
+                                                        user_id=int(claims[JWTEnum.SUBJECT.value]),
+                                                        expires_at=claims[JWTEnum.EXPIRY.value]))
+
+        if revokedTokens:
+            # persist first, a filter hit is always confirmed in the table
+            RevokedTokenRepository().save_all(revokedTokens)
+            revocationList = self.getRevocationList()
+            for revokedToken in revokedTokens:
+                revocationList.add(revokedToken.jti)
+
+        logger.debug(f"-{self.__class__.__name__}.revokeTokens(), revoked={len(revokedTokens)}")
+        return len(revokedTokens)
+
+    @staticmethod
+    def peekClaims(encodedToken: str) -> Dict[str, Any]:
+        """Returns the unverified claims of the token (only to pick the verification rules)"""
+        try:
+            return jwt.decode(encodedToken, options={"verify_signature": False})
+        except jwt.InvalidTokenError:
+            return {}
+
+    def rebuildRevocationList(self) -> int:
+        """Purges the expired revoked tokens and rebuilds the shared filter from the table"""
+        logger.debug(f"+{self.__class__.__name__}.rebuildRevocationList()")
+        now = int(datetime.now(timezone.utc).timestamp())
+        revokedTokenRepository = RevokedTokenRepository()
+        revokedTokenRepository.deleteExpired(now)
+        count = self.getRevocationList().rebuild(revokedTokenRepository.findActiveJtis(now))
+        logger.debug(f"-{self.__class__.__name__}.rebuildRevocationList(), count={count}")
+        return count
+
+    def refreshToken(self, refreshToken: str) -> AuthenticatedUser:
+        """Issues a new JWT access token for the refresh token, the only JWT path that consults the database"""
+        logger.debug(f"+{self.__class__.__name__}.refreshToken()")
+        claims = getAccessTokenVerifier(Config.CLIENT_ID, Config.CLIENT_SECRET).verify(refreshToken,
+                                                                                       TokenTypeEnum.REFRESH_TOKEN)
+        if self.getRevocationList().isRevoked(claims.get(JWTEnum.JWT_ID.value)):
+            raise AuthenticationException(messages=["Refresh token has been revoked!"])
+
+        userId = claims[JWTEnum.SUBJECT.value]
+        # the user might have been deleted since the refresh token was issued
+        if not self.existsByFilter({"id": int(userId)}):
+            raise AuthenticationException(messages=["User is not registered!"])
+        
+        userToken = self.getTokenManager().refreshAccessToken(userId, UserToken(userId=userId,
+                                                                                refreshToken=refreshToken))
+        authUser = AuthenticatedUser(user_id=int(userId),
+                                     token_type=TokenTypeEnum.JWT.value,
+                                     token=userToken.accessToken,
+                                     refresh_token=userToken.refreshToken,
+                                     user_exists=True,
+                                     exp=userToken.expiresAt)
+        logger.debug(f"-{self.__class__.__name__}.refreshToken(), authUser={authUser}")
+        return authUser
+    
     def login(self, loginUser: LoginUser) -> AuthenticatedUser:
         """Login a registered user"""
         logger.debug(f"+{self.__class__.__name__}.login({loginUser})")
@@ -238,7 +376,7 @@ class UserService(AbstractService):
         
         # validate user exists either by email or username
         if not (userObjects and len(userObjects) > 0):
-            raise RecordNotFoundException(HTTPStatus.NOT_FOUND, messages=["User is not registered!"])
+            raise RecordNotFoundException(messages=["User is not registered!"])
         
         # authenticate user by loading user's credentials
         userObject = userObjects[0]
@@ -246,29 +384,40 @@ class UserService(AbstractService):
         logger.debug(f"userSecuritySchema={userSecuritySchema}")
         
         # validate password
-        passwordHashCode = HashUtils.hashCode(loginUser.password)
-        logger.debug(f"loginUser.password={loginUser.password}, passwordHashCode={passwordHashCode}")
-        # check the hashed-auth-token and password-auth-token are same
-        if userSecuritySchema.hashed_auth_token != passwordHashCode:
-            raise AuthenticationException(HTTPStatus.UNAUTHORIZED, messages=["Either username or password is wrong!"])
-        
-        # check other patterns
-        saltHashCode, hashCode = HashUtils.hashCodeWithSalt(passwordHashCode, userSecuritySchema.salt)
-        userObject.authenticated = HashUtils.checkHashCode(loginUser.password, saltHashCode, hashCode)
+        passwordHasher = self.getPasswordHasher()
+        salt = passwordHasher.generateSalt()
+        userObject.authenticated, rehashedAuthToken = passwordHasher.verifyAndUpdate(
+            loginUser.password, userSecuritySchema.hashed_auth_token, salt)
         logger.debug(f"userObject={userObject}")
         if not userObject.isAuthenticated():
-            raise AuthenticationException(HTTPStatus.UNAUTHORIZED, messages=["Either username or password is wrong!"])
+            raise AuthenticationException(messages=["Either username or password is wrong!"])
+        
+        # upgrade the legacy or the outdated cost's hash transparently
+        if rehashedAuthToken:
+            logger.info(f"Rehashing the password of user={userObject.id} with {passwordHasher}")
+            self.userSecurityRepository.updateHashedAuthToken(userObject.id, rehashedAuthToken, salt)
+        
+        # issue the stateless JWT access/refresh tokens
+        if TokenTypeEnum.JWT.value == loginUser.token_type:
+            userToken = self.getTokenManager().generateTokens(str(userObject.id))
+            authUser = AuthenticatedUser(user_id=userObject.id,
+                                         token_type=TokenTypeEnum.JWT.value,
+                                         token=userToken.accessToken,
+                                         refresh_token=userToken.refreshToken,
+                                         user_exists=True,
+                                         exp=userToken.expiresAt)
+            logger.debug(f"-{self.__class__.__name__}.login(), authUser={authUser}")
+            return authUser
         
         # build auth-token model
-        authModel = AuthModel(user_id=userObject.id,
-                              auth_token=loginUser.password,
-                              iat=int(datetime.now(timezone.utc).timestamp()))
+        authModel = AuthModel(user_id=userObject.id, iat=int(datetime.now(timezone.utc).timestamp()),
+                              token_version=userSecuritySchema.token_version)
         
-        # encrypt authModel for security purpose
+        # encrypt authModel's binary payload with a random nonce and the active key
         try:
-            authModelEncrypted = CryptoUtils.encrypt_with_aesgcm(Config.ENC_KEY, Config.ENC_NONCE, authModel.to_json())
+            authModelEncrypted = self.getKeyRing().encode(authModel.to_bytes())
         except SecurityException as ex:
-            raise AuthenticationException(HTTPStatus.INTERNAL_SERVER_ERROR, messages=[str(ex)])
+            raise AuthenticationException(messages=[str(ex)])
         
         logger.debug(f"authModelEncrypted={authModelEncrypted}")
         # build authenticate user object model
@@ -280,6 +429,20 @@ class UserService(AbstractService):
         logger.debug(f"-{self.__class__.__name__}.login(), authUser={authUser}")
         return authUser
     
+    def changePassword(self, userId: int, password: str) -> None:
+        """Replaces the user's password, the auth-tokens issued with the old one are rejected"""
+        logger.debug(f"+{self.__class__.__name__}.changePassword({userId})")
+        if not password:
+            raise ValidationException(httpStatus=HTTPStatus.INVALID_DATA, messages=["The password is required!"])
+        
+        passwordHasher = self.getPasswordHasher()
+        salt = passwordHasher.generateSalt()
+        if not self.userSecurityRepository.updateHashedAuthToken(userId, passwordHasher.hash(password, salt), salt,
+                                                                 rotateTokens=True):
+            raise RecordNotFoundException(messages=["User is not registered!"])
+        
+        logger.debug(f"-{self.__class__.__name__}.changePassword()")
+    
     def update(self, user: User) -> User:
         """Updates the user"""
         logger.debug(f"+update({user})")
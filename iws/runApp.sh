@@ -2,10 +2,12 @@
 # Author: Rohtash Lakra
 echo
 #if [ $# -gt 0 ]; then
-if [ "$1" == "prod" ]; then
-  gunicorn -c gunicorn.conf.py wsgi:app
+if [ "$1" == "init-db" ]; then
+  python -m flask --app wsgi init-db
+elif [ "$1" == "prod" ]; then
+  gunicorn -c gunicorn.conf.py
 else
+  python -m flask --app wsgi init-db
   python -m flask --app wsgi run --port 8080 --debug
 fi
 echo
-
@@ -3,8 +3,13 @@
 #
 import json
 import unittest
+from contextlib import contextmanager
+
+from sqlalchemy import Engine
 
 from framework.datetime import nowMillis
+from framework.db.diagnostics import trackQueries
+from globals import connector
 from tests import app
 
 
@@ -89,3 +94,17 @@ class AbstractTestCase(unittest.TestCase):
 
     def getTestEmail(self, isAdmin: bool = False):
         return f"{'admin' if isAdmin else 'user'}{nowMillis()}@lakra.com"
+
+    @contextmanager
+    def assertMaxQueries(self, maxQueries: int, engine: Engine = None):
+        """Fails if the scope executes more than 'maxQueries' statements, pins the query budget of an endpoint:
+
+            with self.assertMaxQueries(2):
+                self.client.get("/rest/v1/roles/")
+        """
+        with trackQueries(engine or connector.engine) as counter:
+            yield counter
+
+        if counter.count > maxQueries:
+            shapes = "\n".join(f"  {count}x {shape}" for shape, count in counter.shapes().most_common())
+            self.fail(f"Executed [{counter.count}] statements, expected at most [{maxQueries}]:\n{shapes}")
@@ -0,0 +1,58 @@
+#
+# Author: Rohtash Lakra
+#
+import json
+import logging
+import os
+import tempfile
+import unittest
+
+from benchmarks.compare import Measure, compare, main, readMeasures
+from tests.base import AbstractTestCase
+
+logger = logging.getLogger(__name__)
+
+
+class CompareTest(AbstractTestCase):
+    """Unit-tests for the benchmarks' comparison"""
+
+    def test_compare(self):
+        logger.debug("+test_compare()")
+        baselines = {"hash": Measure("hash", 40.0, "us"),
+                     "roles.rps": Measure("roles.rps", 100.0, "rps", higherIsBetter=True),
+                     "removed": Measure("removed", 1.0, "us")}
+        currents = {"hash": Measure("hash", 46.0, "us"),
+                    "roles.rps": Measure("roles.rps", 95.0, "rps", higherIsBetter=True)}
+        comparisons = {comparison.name: comparison for comparison in compare(baselines, currents, 10)}
+        logger.debug(f"comparisons={comparisons}")
+        self.assertEqual((15.0, True), (comparisons["hash"].changePercent, comparisons["hash"].regressed))
+        # a lower throughput is worse
+        self.assertEqual((5.0, False), (comparisons["roles.rps"].changePercent, comparisons["roles.rps"].regressed))
+        self.assertNotIn("removed", comparisons)
+        logger.debug("-test_compare()")
+        print()
+
+    def test_main(self):
+        logger.debug("+test_main()")
+        with tempfile.TemporaryDirectory() as tempDir:
+            # the results of 'pytest-benchmark' in seconds
+            currentPath = os.path.join(tempDir, "micro.json")
+            with open(currentPath, "w") as file:
+                json.dump({"benchmarks": [{"name": "test_hash_code", "stats": {"median": 0.00004}}]}, file)
+
+            baselinePath = os.path.join(tempDir, "baseline.json")
+            self.assertEqual(0, main([baselinePath, currentPath]))
+            self.assertAlmostEqual(40.0, readMeasures(baselinePath)["test_hash_code"].value)
+            self.assertEqual(0, main([baselinePath, currentPath, "--threshold", "5"]))
+
+            with open(currentPath, "w") as file:
+                json.dump({"benchmarks": [{"name": "test_hash_code", "stats": {"median": 0.00005}}]}, file)
+            self.assertEqual(1, main([baselinePath, currentPath]))
+            self.assertEqual(0, main([baselinePath, currentPath, "--threshold", "30"]))
+        logger.debug("-test_main()")
+        print()
+
+
+# Starting point
+if __name__ == 'unittest':
+    unittest.main(exit=False)
@@ -0,0 +1,92 @@
+#
+# Author: Rohtash Lakra
+#
+import logging
+import unittest
+
+from sqlalchemy import create_engine, text
+
+from framework.db.advisor import QueryPlanAdvisor
+from rest.post.schema import PostSchema, CommentSchema
+from rest.user.schema import AddressSchema
+from tests.base import AbstractTestCase
+
+logger = logging.getLogger(__name__)
+
+
+class QueryPlanAdvisorTest(AbstractTestCase):
+    """Unit-tests for QueryPlanAdvisor"""
+
+    def setUp(self):
+        logger.debug("+setUp()")
+        self.engine = create_engine("sqlite://")
+        with self.engine.begin() as connection:
+            connection.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT, owner_id INTEGER)"))
+            connection.execute(text("CREATE INDEX ix_items_owner_id ON items (owner_id)"))
+
+        # threshold=0 captures the plan of every statement
+        self.advisor = QueryPlanAdvisor(thresholdMillis=0).attach(self.engine)
+        logger.debug("-setUp()")
+
+    def tearDown(self):
+        logger.debug("+tearDown()")
+        self.advisor.detach()
+        self.engine.dispose()
+        logger.debug("-tearDown()")
+
+    def test_full_scan(self):
+        logger.debug("+test_full_scan()")
+        with self.engine.connect() as connection:
+            connection.execute(text("SELECT * FROM items WHERE name = :name"), {"name": "test"}).fetchall()
+
+        self.assertEqual(1, len(self.advisor.reports))
+        self.assertTrue(self.advisor.reports[0].hasFullScan())
+        self.assertEqual(1, len(self.advisor.getFullScans()))
+        logger.debug("-test_full_scan()")
+        print()
+
+    def test_index_search(self):
+        logger.debug("+test_index_search()")
+        with self.engine.connect() as connection:
+            connection.execute(text("SELECT * FROM items WHERE owner_id = :owner_id"), {"owner_id": 1}).fetchall()
+            connection.execute(text("SELECT * FROM items WHERE id = :id"), {"id": 1}).fetchall()
+
+        self.assertEqual(2, len(self.advisor.reports))
+        self.assertEqual([], self.advisor.getFullScans())
+        logger.debug("-test_index_search()")
+        print()
+
+    def test_threshold(self):
+        logger.debug("+test_threshold()")
+        self.advisor.thresholdMillis = 60_000
+        with self.engine.connect() as connection:
+            connection.execute(text("SELECT * FROM items WHERE name = :name"), {"name": "test"}).fetchall()
+
+        self.assertEqual(0, len(self.advisor.reports))
+        logger.debug("-test_threshold()")
+        print()
+
+    def test_is_full_scan(self):
+        logger.debug("+test_is_full_scan()")
+        self.assertTrue(QueryPlanAdvisor.isFullScan("SCAN items"))
+        self.assertTrue(QueryPlanAdvisor.isFullScan("SCAN TABLE items"))
+        self.assertFalse(QueryPlanAdvisor.isFullScan("SCAN items USING COVERING INDEX ix_items_owner_id"))
+        self.assertFalse(QueryPlanAdvisor.isFullScan("SEARCH items USING INDEX ix_items_owner_id (owner_id=?)"))
+        self.assertFalse(QueryPlanAdvisor.isFullScan("SCAN CONSTANT ROW"))
+        logger.debug("-test_is_full_scan()")
+        print()
+
+    def test_foreign_keys_indexed(self):
+        logger.debug("+test_foreign_keys_indexed()")
+        self.assertTrue(PostSchema.__table__.c.user_id.index)
+        self.assertTrue(CommentSchema.__table__.c.post_id.index)
+        self.assertTrue(AddressSchema.__table__.c.user_id.index)
+        indexNames = [index.name for index in PostSchema.__table__.indexes]
+        self.assertIn("ix_posts_created_at", indexNames)
+        logger.debug("-test_foreign_keys_indexed()")
+        print()
+
+
+# Starting point
+if __name__ == 'unittest':
+    unittest.main(exit=False)
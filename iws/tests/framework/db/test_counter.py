@@ -0,0 +1,107 @@
+#
+# Author: Rohtash Lakra
+#
+import logging
+import unittest
+
+from sqlalchemy import create_engine, text
+
+from framework.db.counter import ChildCounter
+from framework.orm.sqlalchemy.schema import BaseSchema
+from rest.post.schema import POSTS_COMMENTS_COUNTER, CommentSchema, PostSchema
+from tests.base import AbstractTestCase
+
+logger = logging.getLogger(__name__)
+
+
+class ChildCounterTest(AbstractTestCase):
+    """Unit-tests for ChildCounter"""
+
+    def setUp(self):
+        logger.debug("+setUp()")
+        self.engine = create_engine("sqlite://")
+        BaseSchema.metadata.create_all(self.engine)
+        with self.engine.begin() as connection:
+            for id in (1, 2):
+                connection.execute(text("INSERT INTO posts (id, user_id, title, author, posted_on, created_at, "
+                                        "updated_at) VALUES (:id, 1, 'Title', 'Rohtash Lakra', '2024-10-13 00:20:27', "
+                                        "'2024-10-13 00:20:27', '2024-10-13 00:20:27')"), {"id": id})
+        logger.debug("-setUp()")
+
+    def tearDown(self):
+        logger.debug("+tearDown()")
+        self.engine.dispose()
+        logger.debug("-tearDown()")
+
+    def insertComment(self, connection, id: int, postId: int, createdAt: str):
+        connection.execute(text("INSERT INTO comments (id, post_id, user_id, content, created_at, updated_at) "
+                                "VALUES (:id, :postId, 1, 'Nice!', :createdAt, :createdAt)"),
+                           {"id": id, "postId": postId, "createdAt": createdAt})
+
+    def counts(self):
+        with self.engine.connect() as connection:
+            return connection.execute(text("SELECT id, comment_count, last_comment_at FROM posts ORDER BY id")).all()
+
+    def test_triggers(self):
+        logger.debug("+test_triggers()")
+        self.assertEqual([(1, 0, None), (2, 0, None)], self.counts())
+        with self.engine.begin() as connection:
+            self.insertComment(connection, 1, 1, "2024-10-14 10:00:00")
+            self.insertComment(connection, 2, 1, "2024-10-15 10:00:00")
+            # an older comment doesn't move the latest time back
+            self.insertComment(connection, 3, 1, "2024-10-14 12:00:00")
+        self.assertEqual([(1, 3, "2024-10-15 10:00:00"), (2, 0, None)], self.counts())
+
+        with self.engine.begin() as connection:
+            connection.execute(text("DELETE FROM comments WHERE id = 2"))
+            connection.execute(text("UPDATE comments SET post_id = 2 WHERE id = 1"))
+        self.assertEqual([(1, 1, "2024-10-14 12:00:00"), (2, 1, "2024-10-14 10:00:00")], self.counts())
+
+        # the counters are written in the comments' transaction, a rollback reverts both
+        with self.assertRaises(RuntimeError):
+            with self.engine.begin() as connection:
+                connection.execute(text("DELETE FROM comments"))
+                raise RuntimeError("rolled back")
+        self.assertEqual([(1, 1, "2024-10-14 12:00:00"), (2, 1, "2024-10-14 10:00:00")], self.counts())
+
+        with self.engine.begin() as connection:
+            connection.execute(text("DELETE FROM comments"))
+        self.assertEqual([(1, 0, None), (2, 0, None)], self.counts())
+        logger.debug("-test_triggers()")
+        print()
+
+    def test_create(self):
+        logger.debug("+test_create()")
+        with self.engine.begin() as connection:
+            self.assertFalse(POSTS_COMMENTS_COUNTER.create(connection))
+            POSTS_COMMENTS_COUNTER.dropTriggers(connection)
+            self.insertComment(connection, 1, 2, "2024-10-14 10:00:00")
+            self.insertComment(connection, 2, 2, "2024-10-16 10:00:00")
+        self.assertEqual([(1, 0, None), (2, 0, None)], self.counts())
+
+        # the counters created for the existing comments count them
+        BaseSchema.metadata.create_all(self.engine)
+        self.assertEqual([(1, 0, None), (2, 2, "2024-10-16 10:00:00")], self.counts())
+        with self.engine.connect() as connection:
+            triggers = connection.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'trigger' "
+                                                  "AND tbl_name = 'comments' ORDER BY name").scalars().all()
+        self.assertEqual(["comments_comment_count_delete", "comments_comment_count_insert",
+                          "comments_comment_count_update"], triggers)
+
+        # the columns missing in the posts created before the counter are added and counted
+        with self.engine.begin() as connection:
+            POSTS_COMMENTS_COUNTER.dropTriggers(connection)
+            connection.exec_driver_sql("ALTER TABLE posts DROP COLUMN comment_count")
+            connection.exec_driver_sql("ALTER TABLE posts DROP COLUMN last_comment_at")
+        BaseSchema.metadata.create_all(self.engine)
+        self.assertEqual([(1, 0, None), (2, 2, "2024-10-16 10:00:00")], self.counts())
+        self.assertIn(POSTS_COMMENTS_COUNTER, ChildCounter.ofMetadata(BaseSchema.metadata).values())
+        with self.assertRaises(ValueError):
+            ChildCounter(PostSchema.__table__, CommentSchema.__table__, "post_id", "reply_count")
+        logger.debug("-test_create()")
+        print()
+
+
+# Starting point
+if __name__ == 'unittest':
+    unittest.main(exit=False)
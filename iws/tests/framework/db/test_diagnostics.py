@@ -0,0 +1,122 @@
+#
+# Author: Rohtash Lakra
+#
+import logging
+import unittest
+
+from flask import Flask
+from sqlalchemy import create_engine, text
+
+from framework.db.diagnostics import MASK, QueryDiagnostics, maskParameters, statementShape
+from tests.base import AbstractTestCase
+
+logger = logging.getLogger(__name__)
+
+
+class QueryDiagnosticsTest(AbstractTestCase):
+    """Unit-tests for QueryDiagnostics"""
+
+    def setUp(self):
+        logger.debug("+setUp()")
+        self.engine = create_engine("sqlite://")
+        with self.engine.begin() as connection:
+            connection.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, email TEXT, owner_id INTEGER)"))
+
+        self.diagnostics = QueryDiagnostics(thresholdMillis=60_000, nPlusOneThreshold=3).attach(self.engine)
+        logger.debug("-setUp()")
+
+    def tearDown(self):
+        logger.debug("+tearDown()")
+        self.diagnostics.detach()
+        self.engine.dispose()
+        logger.debug("-tearDown()")
+
+    def test_statement_shape(self):
+        logger.debug("+test_statement_shape()")
+        self.assertEqual("SELECT * FROM items WHERE id IN (?) AND email = ?",
+                         statementShape("SELECT *\n  FROM items WHERE id IN (?, ?, ?) AND email = 'a@b.com'"))
+        self.assertEqual(statementShape("SELECT * FROM items WHERE id = 1"),
+                         statementShape("SELECT * FROM items WHERE id = 42"))
+        self.assertEqual("SELECT * FROM items_2 WHERE id = ?", statementShape("SELECT * FROM items_2 WHERE id = ?"))
+        logger.debug("-test_statement_shape()")
+        print()
+
+    def test_n_plus_one(self):
+        logger.debug("+test_n_plus_one()")
+        with self.diagnostics.track() as counter:
+            with self.engine.connect() as connection:
+                connection.execute(text("SELECT owner_id FROM items")).fetchall()
+                # a query per owner
+                for ownerId in range(4):
+                    connection.execute(text("SELECT * FROM items WHERE owner_id = :owner_id"), {"owner_id": ownerId})
+
+        logger.debug(f"shapes={counter.shapes()}")
+        self.assertEqual(5, counter.count)
+        self.assertEqual([("SELECT * FROM items WHERE owner_id = ?", 4)], counter.suspects(3))
+        # not counted outside the scope
+        with self.engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        self.assertEqual(5, counter.count)
+        logger.debug("-test_n_plus_one()")
+        print()
+
+    def test_request_reports(self):
+        logger.debug("+test_request_reports()")
+        testApp = Flask(__name__)
+        testApp.before_request(self.diagnostics.startRequest)
+        testApp.teardown_request(self.diagnostics.endRequest)
+
+        @testApp.get("/items")
+        def items():
+            with self.engine.connect() as connection:
+                for ownerId in range(3):
+                    connection.execute(text("SELECT * FROM items WHERE owner_id = :owner_id"), {"owner_id": ownerId})
+            return "ok"
+
+        self.assertEqual(200, testApp.test_client().get("/items").status_code)
+        logger.debug(f"reports={self.diagnostics.reports}")
+        report = self.diagnostics.reports[-1]
+        self.assertEqual(("GET /items", 3), (report.endpoint, report.count))
+        self.assertEqual([report], self.diagnostics.getSuspects())
+        self.diagnostics.clear()
+        self.assertEqual([], self.diagnostics.getSuspects())
+        logger.debug("-test_request_reports()")
+        print()
+
+    def test_slow_query_masked(self):
+        logger.debug("+test_slow_query_masked()")
+        self.diagnostics.thresholdMillis = 0
+        with self.assertLogs("framework.db.diagnostics", level=logging.WARNING) as logs:
+            with self.engine.begin() as connection:
+                connection.execute(text("INSERT INTO items (email, owner_id) VALUES (:email, :owner_id)"),
+                                   {"email": "roh@lakra.com", "owner_id": 7})
+
+        logger.debug(f"logs={logs.output}")
+        self.assertIn("Slow query", logs.output[0])
+        self.assertNotIn("roh@lakra.com", "".join(logs.output))
+        self.assertIn(f"'email': '{MASK}'", logs.output[0])
+        self.assertIn("'owner_id': 7", logs.output[0])
+        # the values of the unknown names are all masked
+        self.assertEqual([MASK, MASK], maskParameters(None, ("roh@lakra.com", 7)))
+        logger.debug("-test_slow_query_masked()")
+        print()
+
+    def test_assert_max_queries(self):
+        logger.debug("+test_assert_max_queries()")
+        with self.assertMaxQueries(2, self.engine) as counter:
+            with self.engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+
+        self.assertEqual(1, counter.count)
+        with self.assertRaises(AssertionError):
+            with self.assertMaxQueries(1, self.engine):
+                with self.engine.connect() as connection:
+                    connection.execute(text("SELECT 1"))
+                    connection.execute(text("SELECT 2"))
+        logger.debug("-test_assert_max_queries()")
+        print()
+
+
+# Starting point
+if __name__ == 'unittest':
+    unittest.main(exit=False)
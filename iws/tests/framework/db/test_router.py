@@ -0,0 +1,123 @@
+#
+# Author: Rohtash Lakra
+#
+import logging
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine, text
+
+from framework.db.router import EngineRouter, ReplicaPolicy
+from tests.base import AbstractTestCase
+
+logger = logging.getLogger(__name__)
+
+
+class EngineRouterTest(AbstractTestCase):
+    """Unit-tests for EngineRouter"""
+
+    def setUp(self):
+        logger.debug("+setUp()")
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.primary = create_engine(f"sqlite:///{os.path.join(self.tempDir.name, 'primary.db')}")
+        self.replicas = [create_engine(f"sqlite:///{os.path.join(self.tempDir.name, f'replica{index}.db')}")
+                         for index in range(2)]
+        with self.primary.begin() as connection:
+            connection.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)"))
+
+        self.router = EngineRouter(self.primary, self.replicas)
+        EngineRouter.resetPin()
+        logger.debug("-setUp()")
+
+    def tearDown(self):
+        logger.debug("+tearDown()")
+        EngineRouter.resetPin()
+        for engine in [self.primary] + self.replicas:
+            engine.dispose()
+        self.tempDir.cleanup()
+        logger.debug("-tearDown()")
+
+    def test_round_robin(self):
+        logger.debug("+test_round_robin()")
+        engines = [self.router.readEngine() for _ in range(4)]
+        self.assertEqual(self.replicas + self.replicas, engines)
+        self.assertIs(self.primary, self.router.writeEngine())
+        logger.debug("-test_round_robin()")
+        print()
+
+    def test_least_loaded(self):
+        logger.debug("+test_least_loaded()")
+        router = EngineRouter(self.primary, self.replicas, ReplicaPolicy.LEAST_LOADED)
+        connection = self.replicas[0].connect()
+        try:
+            self.assertEqual(1, router.inFlight[id(self.replicas[0])])
+            self.assertIs(self.replicas[1], router.readEngine())
+            self.assertIs(self.replicas[1], router.readEngine())
+        finally:
+            connection.close()
+
+        self.assertEqual(0, router.inFlight[id(self.replicas[0])])
+        logger.debug("-test_least_loaded()")
+        print()
+
+    def test_read_your_writes(self):
+        logger.debug("+test_read_your_writes()")
+        self.assertFalse(EngineRouter.isPinned())
+        with self.primary.begin() as connection:
+            connection.execute(text("INSERT INTO items (name) VALUES ('first')"))
+
+        # pinned to primary after a write
+        self.assertTrue(EngineRouter.isPinned())
+        self.assertIs(self.primary, self.router.readEngine())
+
+        # the next request reads from the replicas again
+        EngineRouter.resetPin()
+        self.assertIn(self.router.readEngine(), self.replicas)
+        logger.debug("-test_read_your_writes()")
+        print()
+
+    def test_write_unit_of_work(self):
+        logger.debug("+test_write_unit_of_work()")
+        with self.router.writeUnitOfWork() as engine:
+            self.assertIs(self.primary, engine)
+            self.assertIs(self.primary, self.router.readEngine())
+
+        self.assertTrue(EngineRouter.isPinned())
+        logger.debug("-test_write_unit_of_work()")
+        print()
+
+    def test_pin_read_engine(self):
+        logger.debug("+test_pin_read_engine()")
+        replica = self.router.pinReadEngine()
+        self.assertIn(replica, self.replicas)
+        self.assertEqual([replica] * 3, [self.router.readEngine() for _ in range(3)])
+
+        # a write still pins the rest of the request to the primary
+        with self.primary.begin() as connection:
+            connection.execute(text("INSERT INTO items (name) VALUES ('first')"))
+        self.assertIs(self.primary, self.router.readEngine())
+        self.assertIs(self.primary, self.router.pinReadEngine())
+
+        # the next request is balanced again
+        EngineRouter.resetPin()
+        self.assertEqual(2, len({self.router.readEngine() for _ in range(2)}))
+        logger.debug("-test_pin_read_engine()")
+        print()
+
+    def test_sync_replicas(self):
+        logger.debug("+test_sync_replicas()")
+        with self.primary.begin() as connection:
+            connection.execute(text("INSERT INTO items (name) VALUES ('synced')"))
+
+        self.router.syncReplicas()
+        for replica in self.replicas:
+            with replica.connect() as connection:
+                self.assertEqual("synced", connection.execute(text("SELECT name FROM items")).scalar_one())
+        logger.debug("-test_sync_replicas()")
+        print()
+
+
+# Starting point
+if __name__ == 'unittest':
+    unittest.main(exit=False)
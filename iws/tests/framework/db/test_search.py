@@ -0,0 +1,99 @@
+#
+# Author: Rohtash Lakra
+#
+import logging
+import unittest
+
+from sqlalchemy import create_engine, text
+
+from framework.db.search import FullTextIndex, SearchOrder, highlight
+from framework.orm.sqlalchemy.schema import BaseSchema
+from rest.post.schema import POSTS_SEARCH_INDEX
+from tests.base import AbstractTestCase
+
+logger = logging.getLogger(__name__)
+
+
+class FullTextIndexTest(AbstractTestCase):
+    """Unit-tests for FullTextIndex"""
+
+    def setUp(self):
+        logger.debug("+setUp()")
+        self.engine = create_engine("sqlite://")
+        BaseSchema.metadata.create_all(self.engine)
+        logger.debug("-setUp()")
+
+    def tearDown(self):
+        logger.debug("+tearDown()")
+        self.engine.dispose()
+        logger.debug("-tearDown()")
+
+    def insertPost(self, connection, id: int, title: str, content: str, author: str = "Rohtash Lakra"):
+        connection.execute(text("INSERT INTO posts (id, user_id, title, author, content, posted_on, created_at, "
+                                "updated_at) VALUES (:id, 1, :title, :author, :content, '2024-10-13 00:20:27', "
+                                "'2024-10-13 00:20:27', '2024-10-13 00:20:27')"),
+                           {"id": id, "title": title, "author": author, "content": content})
+
+    def search(self, query: str, order: SearchOrder = SearchOrder.RANK):
+        with self.engine.connect() as connection:
+            return connection.execute(POSTS_SEARCH_INDEX.searchStatement(order, "content"),
+                                      {"query": FullTextIndex.matchExpression(query), "limit": 10,
+                                       "offset": 0}).all()
+
+    def test_match_expression(self):
+        logger.debug("+test_match_expression()")
+        self.assertEqual('"Flask" "cache"', FullTextIndex.matchExpression("Flask cache"))
+        self.assertEqual('"data"*', FullTextIndex.matchExpression("data*"))
+        # the FTS5 syntax is quoted away
+        self.assertEqual('"title" "NEAR" "a" "b" "OR" "c"', FullTextIndex.matchExpression('title:NEAR(a b) OR "c'))
+        self.assertIsNone(FullTextIndex.matchExpression(" -*- "))
+        self.assertIsNone(FullTextIndex.matchExpression(None))
+        self.assertEqual(16, len(FullTextIndex.matchExpression("word " * 50).split()))
+        self.assertEqual("a <mark>&lt;b&gt;</mark> c", highlight("a \x02<b>\x03 c"))
+        logger.debug("-test_match_expression()")
+        print()
+
+    def test_triggers(self):
+        logger.debug("+test_triggers()")
+        with self.engine.begin() as connection:
+            self.insertPost(connection, 1, "Caching in Flask", "The responses are cached per route.")
+            self.insertPost(connection, 2, "Database indexes", "Flask apps query the database.")
+            self.insertPost(connection, 3, "Travel", "A weekend in the garden.")
+
+        # the title's terms rank higher than the content's
+        self.assertEqual([1, 2], [row.id for row in self.search("flask")])
+        self.assertEqual([2, 1], [row.id for row in self.search("flask", SearchOrder.NEWEST)])
+        self.assertEqual("<mark>Flask</mark> apps query the database.", highlight(self.search("flask")[1].snippet))
+        self.assertEqual([1], [row.id for row in self.search("cach*")])
+
+        with self.engine.begin() as connection:
+            connection.execute(text("UPDATE posts SET title = 'Gardening' WHERE id = 3"))
+            connection.execute(text("DELETE FROM posts WHERE id = 1"))
+        self.assertEqual([2], [row.id for row in self.search("flask")])
+        self.assertEqual([3], [row.id for row in self.search("gardening")])
+        self.assertEqual([], self.search("travel"))
+        logger.debug("-test_triggers()")
+        print()
+
+    def test_create(self):
+        logger.debug("+test_create()")
+        with self.engine.begin() as connection:
+            self.assertFalse(POSTS_SEARCH_INDEX.create(connection))
+            POSTS_SEARCH_INDEX.dropTriggers(connection)
+            connection.exec_driver_sql("DROP TABLE posts_fts")
+            self.insertPost(connection, 1, "Scaling the feed", "Keyset pagination of the posts.")
+
+        # an index created for the existing rows is built from them
+        BaseSchema.metadata.create_all(self.engine)
+        self.assertEqual([1], [row.id for row in self.search("keyset")])
+        with self.engine.connect() as connection:
+            triggers = connection.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'trigger' "
+                                                  "AND tbl_name = 'posts' ORDER BY name").scalars().all()
+        self.assertEqual(["posts_fts_delete", "posts_fts_insert", "posts_fts_update"], triggers)
+        logger.debug("-test_create()")
+        print()
+
+
+# Starting point
+if __name__ == 'unittest':
+    unittest.main(exit=False)
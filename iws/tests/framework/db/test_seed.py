@@ -0,0 +1,130 @@
+#
+# Author: Rohtash Lakra
+#
+import logging
+import unittest
+
+from sqlalchemy import create_engine, inspect, text
+
+from framework.db.seed import PASSWORD, DatasetGenerator, SeedOptions, parseCount
+from framework.orm.sqlalchemy.schema import BaseSchema
+from framework.security.password import getPasswordHasher
+from tests.base import AbstractTestCase
+
+logger = logging.getLogger(__name__)
+
+
+class DatasetGeneratorTest(AbstractTestCase):
+    """Unit-tests for DatasetGenerator"""
+
+    def setUp(self):
+        logger.debug("+setUp()")
+        self.engines = []
+        self.options = SeedOptions(users=200, batchSize=64, companies=60, branchDepth=4)
+        logger.debug("-setUp()")
+
+    def tearDown(self):
+        logger.debug("+tearDown()")
+        for engine in self.engines:
+            engine.dispose()
+        logger.debug("-tearDown()")
+
+    def newEngine(self):
+        engine = create_engine("sqlite://")
+        BaseSchema.metadata.create_all(engine)
+        self.engines.append(engine)
+        return engine
+
+    def fetchAll(self, engine, statement: str):
+        with engine.connect() as connection:
+            return connection.execute(text(statement)).fetchall()
+
+    def test_generate(self):
+        logger.debug("+test_generate()")
+        engine = self.newEngine()
+        generator = DatasetGenerator(engine, self.options)
+        self.assertTrue(generator.isEmpty())
+        counts = generator.generate()
+        logger.debug(f"counts={counts}")
+        self.assertEqual(200, counts["users"])
+        self.assertEqual(200, counts["user_securities"])
+        self.assertEqual(100, counts["posts"])
+        self.assertEqual(200, counts["comments"])
+        self.assertFalse(generator.isEmpty())
+
+        # referentially consistent
+        orphans = self.fetchAll(engine, """
+            SELECT (SELECT COUNT(*) FROM comments WHERE post_id NOT IN (SELECT id FROM posts)
+                                                     OR user_id NOT IN (SELECT id FROM users)),
+                   (SELECT COUNT(*) FROM posts WHERE user_id NOT IN (SELECT id FROM users)),
+                   (SELECT COUNT(*) FROM addresses WHERE user_id NOT IN (SELECT id FROM users)),
+                   (SELECT COUNT(*) FROM user_roles WHERE role_id NOT IN (SELECT id FROM roles)),
+                   (SELECT COUNT(*) FROM companies WHERE parent_id NOT IN (SELECT id FROM companies))""")
+        self.assertEqual([(0, 0, 0, 0, 0)], orphans)
+        # the comments are posted after their posts
+        self.assertEqual([(0,)], self.fetchAll(engine, "SELECT COUNT(*) FROM comments c JOIN posts p "
+                                                       "ON p.id = c.post_id WHERE c.created_at < p.posted_on"))
+
+        # the branch trees are deep, but not deeper than the option
+        depths = self.fetchAll(engine, """
+            WITH RECURSIVE tree(id, depth) AS (
+                SELECT id, 1 FROM companies WHERE parent_id IS NULL
+                UNION ALL
+                SELECT companies.id, tree.depth + 1 FROM companies JOIN tree ON companies.parent_id = tree.id)
+            SELECT MAX(depth), COUNT(*) FROM tree""")
+        logger.debug(f"depths={depths}")
+        self.assertEqual([(4, 60)], depths)
+
+        # the deferred indexes are created again
+        self.assertIn("ix_comments_post_id", [index["name"] for index in inspect(engine).get_indexes("comments")])
+        # the seeded users log in with the same password
+        hashedPassword = self.fetchAll(engine, "SELECT hashed_auth_token FROM user_securities WHERE user_id = 7")
+        self.assertTrue(getPasswordHasher().verify(PASSWORD, hashedPassword[0][0]))
+
+        # the search index is rebuilt from the loaded posts, its triggers are back
+        searched = "SELECT COUNT(*) FROM posts_fts WHERE posts_fts MATCH 'python'"
+        self.assertEqual(self.fetchAll(engine, "SELECT COUNT(*) FROM posts WHERE title LIKE '%python%' "
+                                               "OR content LIKE '%python%'"), self.fetchAll(engine, searched))
+        # and so are the posts' comment counters
+        self.assertEqual([(6,)], self.fetchAll(engine, "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger'"))
+        self.assertEqual([(0,)], self.fetchAll(engine, """
+            SELECT COUNT(*) FROM posts p WHERE comment_count != (SELECT COUNT(*) FROM comments WHERE post_id = p.id)
+                OR last_comment_at IS NOT (SELECT MAX(created_at) FROM comments WHERE post_id = p.id)"""))
+        self.assertEqual([(200,)], self.fetchAll(engine, "SELECT SUM(comment_count) FROM posts"))
+
+        generator.clear()
+        self.assertTrue(generator.isEmpty())
+        self.assertEqual([(0,)], self.fetchAll(engine, searched))
+        logger.debug("-test_generate()")
+        print()
+
+    def test_deterministic(self):
+        logger.debug("+test_deterministic()")
+        statement = "SELECT * FROM users JOIN posts ON posts.user_id = users.id ORDER BY posts.id"
+        datasets = []
+        for seed in (7, 7, 8):
+            engine = self.newEngine()
+            self.options.seed = seed
+            DatasetGenerator(engine, self.options).generate()
+            datasets.append(self.fetchAll(engine, statement) + self.fetchAll(engine, "SELECT * FROM comments"))
+
+        self.assertEqual(datasets[0], datasets[1])
+        self.assertNotEqual(datasets[0], datasets[2])
+        logger.debug("-test_deterministic()")
+        print()
+
+    def test_parse_count(self):
+        logger.debug("+test_parse_count()")
+        self.assertEqual(1_000_000, parseCount("1e6"))
+        self.assertEqual(2_500, parseCount("2.5e3"))
+        self.assertEqual(10_000, parseCount("10_000"))
+        for value in ("1.5", "-1", "many"):
+            with self.assertRaises(ValueError):
+                parseCount(value)
+        logger.debug("-test_parse_count()")
+        print()
+
+
+# Starting point
+if __name__ == 'unittest':
+    unittest.main(exit=False)
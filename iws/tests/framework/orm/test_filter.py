@@ -0,0 +1,124 @@
+#
+# Author: Rohtash Lakra
+#
+import logging
+import unittest
+from datetime import datetime
+
+from werkzeug.datastructures import MultiDict
+
+from framework.exception import BadRequestException
+from framework.orm.sqlalchemy.filter import FilterCompiler, FilterOperator, SortOrder
+from rest.company.repository import CompanyRepository
+from rest.company.schema import CompanySchema
+from tests.base import AbstractTestCase
+
+logger = logging.getLogger(__name__)
+
+
+class FilterCompilerTest(AbstractTestCase):
+    """Unit-tests for FilterCompiler"""
+
+    def setUp(self):
+        logger.debug("+setUp()")
+        self.filterCompiler = FilterCompiler(CompanySchema, fields=("id", "name", "parent_id", "active", "created_at"))
+        logger.debug("-setUp()")
+
+    def tearDown(self):
+        logger.debug("+tearDown()")
+        self.filterCompiler = None
+        logger.debug("-tearDown()")
+
+    def test_invalid_field(self):
+        logger.debug("+test_invalid_field()")
+        with self.assertRaises(ValueError):
+            FilterCompiler(CompanySchema, fields=("id", "unknown"))
+        logger.debug("-test_invalid_field()")
+        print()
+
+    def test_parse(self):
+        logger.debug("+test_parse()")
+        filters = MultiDict([("id", "1"), ("id", "2"), ("active", "true"), ("created_at__gte", "2024-01-01T10:00:00"),
+                             ("name__like", "Lakra%"), ("sort", "name"), ("order", "desc")])
+        signature, params = self.filterCompiler.parse(filters)
+        logger.debug(f"signature={signature}, params={params}")
+        self.assertEqual({"id_in": [1, 2], "active_eq": True, "created_at_gte": datetime(2024, 1, 1, 10),
+                          "name_like": "Lakra%"}, params)
+        self.assertEqual("name", signature[1])
+        self.assertEqual(SortOrder.DESC, signature[2])
+        self.assertIn(("id", FilterOperator.IN), signature[0])
+        logger.debug("-test_parse()")
+        print()
+
+    def test_parse_mapping(self):
+        logger.debug("+test_parse_mapping()")
+        signature, params = self.filterCompiler.parse({"id": [3, 4], "name": "Lakra"})
+        self.assertEqual({"id_in": [3, 4], "name_eq": "Lakra"}, params)
+        signature, params = self.filterCompiler.parse({"id__in": "5,6"})
+        self.assertEqual({"id_in": [5, 6]}, params)
+        signature, params = self.filterCompiler.parse(None)
+        self.assertEqual(((), None, None), signature)
+        logger.debug("-test_parse_mapping()")
+        print()
+
+    def test_parse_errors(self):
+        logger.debug("+test_parse_errors()")
+        filters = MultiDict([("password", "secret"), ("id__between", "1"), ("id", "abc"), ("active__like", "t%"),
+                             ("sort", "password"), ("order", "up")])
+        with self.assertRaises(BadRequestException) as context:
+            self.filterCompiler.parse(filters)
+
+        logger.debug(f"messages={context.exception.messages}")
+        self.assertEqual(6, len(context.exception.messages))
+        logger.debug("-test_parse_errors()")
+        print()
+
+    def test_parse_empty_list(self):
+        logger.debug("+test_parse_empty_list()")
+        signature, params = self.filterCompiler.parse({"id": []})
+        self.assertEqual({"id_in": []}, params)
+        self.assertIn(("id", FilterOperator.IN), signature[0])
+        with self.assertRaises(BadRequestException):
+            self.filterCompiler.parse({"id__eq": []})
+        logger.debug("-test_parse_empty_list()")
+        print()
+
+    def test_statement_cache(self):
+        logger.debug("+test_statement_cache()")
+        statement, params = self.filterCompiler.compile({"name": "Lakra", "id": [1, 2]})
+        self.assertEqual({"hits": 0, "misses": 1, "size": 1, "maxSize": 128}, self.filterCompiler.cacheInfo())
+
+        # same shape, different values and order => same statement
+        otherStatement, otherParams = self.filterCompiler.compile({"id": [1, 2, 3], "name": "Rohtash"})
+        self.assertIs(statement, otherStatement)
+        self.assertEqual({"id_in": [1, 2, 3], "name_eq": "Rohtash"}, otherParams)
+        self.assertEqual(1, self.filterCompiler.cacheInfo()["hits"])
+
+        self.filterCompiler.compile({"name__like": "Lak%"})
+        self.assertEqual(2, self.filterCompiler.cacheInfo()["misses"])
+        logger.debug("-test_statement_cache()")
+        print()
+
+    def test_repository_filter(self):
+        logger.debug("+test_repository_filter()")
+        companyRepository = CompanyRepository()
+        companyName = f"Filter Inc-{datetime.now().timestamp()}"
+        companySchema = companyRepository.save(CompanySchema(name=companyName, active=True))
+        companySchemas = companyRepository.filter(MultiDict([("name__like", "Filter Inc-%"), ("active", "1"),
+                                                             ("sort", "id"), ("order", "desc")]))
+        self.assertTrue(len(companySchemas) > 0)
+        self.assertEqual(companySchema.id, companySchemas[0].id)
+
+        companySchemas = companyRepository.filter({"id": [companySchema.id]})
+        self.assertEqual(1, len(companySchemas))
+        self.assertEqual([], companyRepository.filter({"id": []}))
+
+        with self.assertRaises(BadRequestException):
+            companyRepository.filter({"unknown": "value"})
+        logger.debug("-test_repository_filter()")
+        print()
+
+
+# Starting point
+if __name__ == 'unittest':
+    unittest.main(exit=False)
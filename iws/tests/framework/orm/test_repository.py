@@ -47,6 +47,20 @@ class RepositoryTest(unittest.TestCase):
         self.assertIsNone(result)
         logger.debug("-test_sql_alchemy_repository()")
 
+    def test_filter_compiler_required(self):
+        logger.debug("+test_filter_compiler_required()")
+        with self.assertRaises(TypeError):
+            class NoFilterCompilerRepository(SqlAlchemyRepository):
+                def filter(self, filters):
+                    return self.compileFilters(filters)
+
+        # the repositories not implementing 'filter()' don't need one
+        class NoFilterRepository(SqlAlchemyRepository):
+            pass
+
+        self.assertIsNone(NoFilterRepository.filterCompiler)
+        logger.debug("-test_filter_compiler_required()")
+
 
 # Starting point
 if __name__ == 'main':
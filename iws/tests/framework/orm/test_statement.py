@@ -0,0 +1,70 @@
+#
+# Author: Rohtash Lakra
+#
+import logging
+import unittest
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from framework.db.statistics import CompiledCacheStats
+from framework.orm.sqlalchemy.schema import BaseSchema
+from framework.orm.sqlalchemy.statement import selectAll, selectById, selectByColumn, cacheInfo
+from rest.role.schema import RoleSchema
+from tests.base import AbstractTestCase
+
+logger = logging.getLogger(__name__)
+
+
+class StatementTest(AbstractTestCase):
+    """Unit-tests for the cached statement templates"""
+
+    def setUp(self):
+        logger.debug("+setUp()")
+        self.engine = create_engine("sqlite://")
+        BaseSchema.metadata.create_all(bind=self.engine)
+        self.cacheStats = CompiledCacheStats().attach(self.engine)
+        logger.debug("-setUp()")
+
+    def tearDown(self):
+        logger.debug("+tearDown()")
+        self.cacheStats.detach()
+        self.engine.dispose()
+        logger.debug("-tearDown()")
+
+    def test_templates(self):
+        logger.debug("+test_templates()")
+        self.assertIs(selectAll(RoleSchema), selectAll(RoleSchema))
+        self.assertIs(selectById(RoleSchema), selectById(RoleSchema))
+        self.assertIs(selectByColumn(RoleSchema, "name"), selectByColumn(RoleSchema, "name"))
+        self.assertIsNot(selectByColumn(RoleSchema, "name"), selectByColumn(RoleSchema, "active"))
+        self.assertTrue(cacheInfo()["selectById"]["hits"] > 0)
+        logger.debug("-test_templates()")
+        print()
+
+    def test_compiled_cache_stats(self):
+        logger.debug("+test_compiled_cache_stats()")
+        with Session(bind=self.engine, expire_on_commit=False) as session:
+            session.add_all([RoleSchema(name="Reader"), RoleSchema(name="Writer")])
+            session.commit()
+
+        self.cacheStats.reset()
+        with Session(bind=self.engine) as session:
+            for id in (1, 2, 1, 2):
+                roleSchema = session.execute(selectById(RoleSchema), {"id": id}).unique().scalar_one()
+                self.assertEqual(id, roleSchema.id)
+
+        stats = self.cacheStats.stats()
+        logger.debug(f"stats={stats}")
+        # compiled once, reused for the rest of the calls
+        self.assertEqual(3, stats["CACHE_HIT"])
+        self.assertEqual(1, stats["CACHE_MISS"])
+        self.assertEqual(0.75, stats["hit_ratio"])
+        self.assertTrue(stats["size"] > 0)
+        logger.debug("-test_compiled_cache_stats()")
+        print()
+
+
+# Starting point
+if __name__ == 'unittest':
+    unittest.main(exit=False)
@@ -0,0 +1,157 @@
+#
+# Author: Rohtash Lakra
+#
+import logging
+import string
+import unittest
+from collections import Counter
+
+from framework.security.crypto import (
+    CryptoUtils,
+    KeyRing,
+    PasswordGenerator,
+    SecurityException,
+    TokenGenerator,
+    getKeyRing
+)
+from framework.security.jwt import AuthModel
+from tests.base import AbstractTestCase
+
+logger = logging.getLogger(__name__)
+
+
+class KeyRingTest(AbstractTestCase):
+    """Unit-tests for the KeyRing class"""
+
+    oldKey = b"12345678123456781234567812345678"
+    newKey = b"87654321876543218765432187654321"
+
+    def test_encode_decode(self):
+        logger.debug("+test_encode_decode()")
+        keyRing = KeyRing({1: self.oldKey})
+        logger.debug(f"keyRing={keyRing}")
+        self.assertEqual(1, keyRing.activeKeyId)
+        authModel = AuthModel(user_id=42, iat=1735689600, token_version=3)
+        token = keyRing.encode(authModel.to_bytes())
+        logger.debug(f"token={token}")
+        # version, key id, nonce, payload and tag
+        self.assertEqual(2 + 12 + 20 + 16, len(keyRing.encrypt(authModel.to_bytes())))
+        self.assertNotIn("=", token)
+
+        decoded = AuthModel.from_bytes(keyRing.decode(token))
+        self.assertEqual(42, decoded.user_id)
+        self.assertEqual(1735689600, decoded.iat)
+        self.assertEqual(3, decoded.token_version)
+        self.assertIsNone(decoded.auth_token)
+        # a random nonce per token
+        self.assertNotEqual(token, keyRing.encode(authModel.to_bytes()))
+        logger.debug("-test_encode_decode()")
+        print()
+
+    def test_tampered_token(self):
+        logger.debug("+test_tampered_token()")
+        keyRing = KeyRing({1: self.oldKey})
+        sealed = bytearray(keyRing.encrypt(b"payload"))
+        sealed[-1] ^= 1
+        with self.assertRaises(SecurityException):
+            keyRing.decrypt(bytes(sealed))
+
+        # the header is bound to the ciphertext
+        sealed = bytearray(keyRing.encrypt(b"payload"))
+        sealed[0] = 2
+        with self.assertRaises(SecurityException):
+            keyRing.decrypt(bytes(sealed))
+
+        for token in ("", "short", "not base64!"):
+            with self.assertRaises(SecurityException):
+                keyRing.decode(token)
+
+        with self.assertRaises(SecurityException):
+            KeyRing().encrypt(b"payload")
+        with self.assertRaises(SecurityException):
+            KeyRing({1: b"short"})
+        logger.debug("-test_tampered_token()")
+        print()
+
+    def test_rotate(self):
+        logger.debug("+test_rotate()")
+        keyRing = KeyRing.fromText(f"1:{self.oldKey.decode()}")
+        oldToken = keyRing.encode(b"old")
+        keyRing.rotate(2, self.newKey)
+        logger.debug(f"keyRing={keyRing}")
+        self.assertEqual(2, keyRing.activeKeyId)
+        newToken = keyRing.encode(b"new")
+        # the tokens of the older key are still decrypted
+        self.assertEqual(b"old", keyRing.decode(oldToken))
+        self.assertEqual(b"new", keyRing.decode(newToken))
+
+        # another worker, configured with both keys, the newest is active
+        otherRing = getKeyRing(f"1:{self.oldKey.decode()}, 2:{self.newKey.decode()}")
+        self.assertIs(otherRing, getKeyRing(f"1:{self.oldKey.decode()}, 2:{self.newKey.decode()}"))
+        self.assertEqual(2, otherRing.activeKeyId)
+        self.assertEqual(b"old", otherRing.decode(oldToken))
+
+        # the retired key's tokens are rejected
+        with self.assertRaises(SecurityException):
+            keyRing.removeKey(2)
+        keyRing.removeKey(1)
+        with self.assertRaises(SecurityException):
+            keyRing.decode(oldToken)
+        self.assertEqual(b"new", keyRing.decode(newToken))
+        logger.debug("-test_rotate()")
+        print()
+
+
+class TokenGeneratorTest(AbstractTestCase):
+    """Unit-tests for the token and password generators"""
+
+    def test_generate_many(self):
+        logger.debug("+test_generate_many()")
+        tokenGenerator = TokenGenerator(length=12)
+        tokens = tokenGenerator.generate_many(10000)
+        logger.debug(f"tokenGenerator={tokenGenerator}, tokens={tokens[:3]}")
+        self.assertEqual(10000, len(tokens))
+        self.assertEqual(10000, len(set(tokens)))
+        self.assertTrue(all(len(token) == 12 and token.isalnum() and token.isascii() for token in tokens))
+        self.assertEqual(12, len(tokenGenerator.generate()))
+        self.assertEqual(8, len(CryptoUtils.nonce_token(8)))
+
+        # the dropped bytes keep the characters uniform (62 is not a divisor of 256)
+        counts = Counter("".join(tokens))
+        self.assertEqual(62, len(counts))
+        expected = 120000 / 62
+        self.assertLess(max(counts.values()), expected * 1.2)
+        self.assertGreater(min(counts.values()), expected * 0.8)
+
+        # the alphabets of a power of 2 size drop nothing
+        hexTokens = TokenGenerator(length=32, alphabet="0123456789abcdef").generate_many(10)
+        self.assertTrue(all(len(bytes.fromhex(token)) == 16 for token in hexTokens))
+        with self.assertRaises(ValueError):
+            TokenGenerator(alphabet="aa")
+        logger.debug("-test_generate_many()")
+        print()
+
+    def test_passwords(self):
+        logger.debug("+test_passwords()")
+        passwordGenerator = PasswordGenerator(length=8, atLeastDigits=3)
+        passwords = passwordGenerator.generate_many(5000)
+        logger.debug(f"passwords={passwords[:3]}")
+        for password in passwords:
+            self.assertEqual(8, len(password))
+            self.assertTrue(any(char in string.ascii_lowercase for char in password))
+            self.assertTrue(any(char in string.ascii_uppercase for char in password))
+            self.assertGreaterEqual(sum(char.isdigit() for char in password), 3)
+
+        # the required characters are shuffled, not at fixed positions
+        shortPasswords = PasswordGenerator(length=3, atLeastDigits=1).generate_many(300)
+        self.assertEqual({0, 1, 2}, {[char.isdigit() for char in password].index(True) for password in shortPasswords})
+        self.assertEqual(10, len(CryptoUtils.random_password()))
+        with self.assertRaises(ValueError):
+            PasswordGenerator(length=2, atLeastDigits=2)
+        logger.debug("-test_passwords()")
+        print()
+
+
+# Starting point
+if __name__ == 'unittest':
+    unittest.main(exit=False)
@@ -2,8 +2,19 @@
 # Author: Rohtash Lakra
 #
 import logging
+from datetime import timedelta
 
-from framework.security.jwt import AuthModel, TokenManager
+from framework.exception import AuthenticationException
+from framework.security.jwt import (
+    AuthModel,
+    TokenManager,
+    TokenPayload,
+    TokenTypeEnum,
+    JWTEnum,
+    JWTUtils,
+    AccessTokenVerifier,
+    getAccessTokenVerifier
+)
 from framework.utils import Utils
 from tests.base import AbstractTestCase
 
@@ -104,3 +115,65 @@ class JWTTest(AbstractTestCase):
         self.assertIsNotNone(token.expiresAt)
         logger.debug("-test_refreshAccessToken()")
         print()
+    
+    def test_verifyAccessToken(self):
+        logger.debug("+test_verifyAccessToken()")
+        userId = Utils.randomUUID()
+        clientSecret = "a79387fed978428e9ced80fb1db9125d"
+        token_manager = TokenManager("posts-iws", clientSecret)
+        token = token_manager.generateTokens(userId)
+        self.assertTrue(JWTUtils.isJWT(token.accessToken))
+        self.assertFalse(JWTUtils.isJWT("12341234123412341234123412341234"))
+        
+        claims = token_manager.verifyAccessToken(token.accessToken)
+        logger.debug(f"claims={claims}")
+        self.assertEqual(userId, claims[JWTEnum.SUBJECT.value])
+        self.assertEqual("posts-iws", claims[JWTEnum.AUDIENCE.value])
+        self.assertEqual(JWTEnum.DEFAULT_ISSUER.value, claims[JWTEnum.ISSUER.value])
+        
+        # the refresh token is not accepted as an access token
+        with self.assertRaises(AuthenticationException):
+            token_manager.verifyAccessToken(token.refreshToken)
+        
+        # tampered signature
+        with self.assertRaises(AuthenticationException):
+            token_manager.verifyAccessToken(token.accessToken[:-2] + "xx")
+        
+        logger.debug("-test_verifyAccessToken()")
+        print()
+    
+    def test_verifyAccessToken_claims(self):
+        logger.debug("+test_verifyAccessToken_claims()")
+        clientSecret = "a79387fed978428e9ced80fb1db9125d"
+        token_manager = TokenManager("posts-iws", clientSecret)
+        verifier = AccessTokenVerifier("posts-iws", clientSecret)
+        issuedAt = token_manager.getIssuedAt()
+        
+        def encode(aud="posts-iws", iss=JWTEnum.DEFAULT_ISSUER.value, exp=issuedAt + timedelta(minutes=5)):
+            payload = TokenPayload(aud=aud, iss=iss, iat=int(issuedAt.timestamp()), exp=int(exp.timestamp()),
+                                   sub="1", type=TokenTypeEnum.ACCESS_TOKEN.value)
+            return token_manager.encodeToken(payload, clientSecret)
+        
+        self.assertEqual("1", verifier.verify(encode())[JWTEnum.SUBJECT.value])
+        # expired, wrong audience and wrong issuer
+        for encodedToken in (encode(exp=issuedAt - timedelta(minutes=1)), encode(aud="other"), encode(iss="other")):
+            with self.assertRaises(AuthenticationException):
+                verifier.verify(encodedToken)
+        
+        # wrong secret
+        with self.assertRaises(AuthenticationException):
+            AccessTokenVerifier("posts-iws", "b79387fed978428e9ced80fb1db9125d").verify(encode())
+        
+        logger.debug("-test_verifyAccessToken_claims()")
+        print()
+    
+    def test_getAccessTokenVerifier(self):
+        logger.debug("+test_getAccessTokenVerifier()")
+        clientSecret = "a79387fed978428e9ced80fb1db9125d"
+        verifier = getAccessTokenVerifier("posts-iws", clientSecret)
+        logger.debug(f"verifier={verifier}")
+        # the signing key and the options are prepared once per client
+        self.assertIs(verifier, getAccessTokenVerifier("posts-iws", clientSecret))
+        self.assertIsNot(verifier, getAccessTokenVerifier("other", clientSecret))
+        logger.debug("-test_getAccessTokenVerifier()")
+        print()
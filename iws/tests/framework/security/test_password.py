@@ -0,0 +1,123 @@
+#
+# Author: Rohtash Lakra
+#
+import hashlib
+import logging
+import unittest
+
+from framework.security.hash import HashUtils
+from framework.security.password import PasswordHasher, VerifiedPasswordCache, getPasswordHasher
+from tests.base import AbstractTestCase
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHasherTest(AbstractTestCase):
+    """Unit-tests for the password hasher"""
+
+    def setUp(self):
+        """The setUp() method of the TestCase class is automatically invoked before each test, so it's an ideal place
+        to insert common logic that applies to all the tests in the class"""
+        logger.debug("+setUp()")
+        super().setUp()
+        # a low cost keeps the tests fast
+        self.passwordHasher = PasswordHasher(n=2 ** 10)
+        logger.debug("-setUp()")
+        print()
+
+    def test_hash(self):
+        logger.debug("+test_hash()")
+        encoded = self.passwordHasher.hash("password")
+        logger.debug(f"encoded={encoded}")
+        self.assertTrue(encoded.startswith("$scrypt$v=1$n=1024,r=8,p=1$"))
+        self.assertLessEqual(len(encoded), 128)
+        # the salts are random per hash
+        self.assertNotEqual(encoded, self.passwordHasher.hash("password"))
+        salt = self.passwordHasher.generateSalt()
+        self.assertEqual(32, len(salt))
+        self.assertEqual(self.passwordHasher.hash("password", salt), self.passwordHasher.hash("password", salt))
+
+        self.assertTrue(self.passwordHasher.verify("password", encoded))
+        self.assertFalse(self.passwordHasher.verify("Password", encoded))
+        self.assertFalse(self.passwordHasher.verify("password", "$argon2id$v=19$unsupported"))
+        self.assertFalse(self.passwordHasher.verify(None, encoded))
+        with self.assertRaises(ValueError):
+            PasswordHasher(n=1000)
+
+        logger.debug("-test_hash()")
+        print()
+
+    def test_rehash(self):
+        logger.debug("+test_rehash()")
+        # the legacy unsalted SHA-256 hashes are verified and upgraded
+        legacy = HashUtils.hashCode("password")
+        self.assertTrue(self.passwordHasher.needsRehash(legacy))
+        verified, rehashed = self.passwordHasher.verifyAndUpdate("password", legacy)
+        logger.debug(f"verified={verified}, rehashed={rehashed}")
+        self.assertTrue(verified)
+        self.assertFalse(self.passwordHasher.needsRehash(rehashed))
+        self.assertEqual((False, None), self.passwordHasher.verifyAndUpdate("wrong", legacy))
+
+        # a raised cost rehashes the older hashes, the current hashes are kept
+        strongerHasher = PasswordHasher(n=2 ** 11)
+        self.assertEqual({"v": 1, "n": 1024, "r": 8, "p": 1}, strongerHasher.parse(rehashed))
+        verified, strongerHash = strongerHasher.verifyAndUpdate("password", rehashed)
+        self.assertTrue(verified)
+        self.assertIn("$n=2048,", strongerHash)
+        self.assertEqual((True, None), strongerHasher.verifyAndUpdate("password", strongerHash))
+        logger.debug("-test_rehash()")
+        print()
+
+    def test_verified_password_cache(self):
+        logger.debug("+test_verified_password_cache()")
+        cache = VerifiedPasswordCache(ttlSeconds=60, maxSize=2)
+        passwordHasher = PasswordHasher(n=2 ** 10, cache=cache)
+        encoded = passwordHasher.hash("password")
+        self.assertFalse(cache.contains("password", encoded))
+        self.assertTrue(passwordHasher.verify("password", encoded))
+        self.assertTrue(cache.contains("password", encoded))
+        # the failures are never cached
+        self.assertFalse(passwordHasher.verify("wrong", encoded))
+        self.assertFalse(cache.contains("wrong", encoded))
+        # a changed password has another hash
+        self.assertFalse(cache.contains("password", passwordHasher.hash("password")))
+        logger.debug(f"cache={cache}")
+
+        # bounded by the max size
+        cache.add("one", encoded)
+        cache.add("two", encoded)
+        self.assertFalse(cache.contains("password", encoded))
+        # expired by the TTL
+        expiredCache = VerifiedPasswordCache(ttlSeconds=0)
+        expiredCache.add("password", encoded)
+        self.assertFalse(expiredCache.contains("password", encoded))
+        logger.debug("-test_verified_password_cache()")
+        print()
+
+    def test_benchmark(self):
+        logger.debug("+test_benchmark()")
+        result = PasswordHasher.benchmark(targetSeconds=0.0, maxN=2 ** 11, rounds=1)
+        logger.debug(f"result={result}")
+        # never below the minimum cost
+        self.assertEqual(2 ** 10, result["n"])
+        result = PasswordHasher.benchmark(targetSeconds=10, maxN=2 ** 11, rounds=1)
+        self.assertEqual(2 ** 11, result["n"])
+        self.assertGreater(result["seconds"], 0)
+        self.assertIs(getPasswordHasher(2 ** 10, 8, 1, 60), getPasswordHasher(2 ** 10, 8, 1, 60))
+        logger.debug("-test_benchmark()")
+        print()
+
+    def test_hashCodeWithSalt_default_salt(self):
+        logger.debug("+test_hashCodeWithSalt_default_salt()")
+        passwordHashCode = HashUtils.hashCode("password")
+        self.assertEqual(hashlib.sha256(b"password").hexdigest(), passwordHashCode)
+        # a new salt per call
+        self.assertNotEqual(HashUtils.hashCodeWithSalt(passwordHashCode)[0],
+                            HashUtils.hashCodeWithSalt(passwordHashCode)[0])
+        logger.debug("-test_hashCodeWithSalt_default_salt()")
+        print()
+
+
+# Starting point
+if __name__ == 'unittest':
+    unittest.main(exit=False)
@@ -0,0 +1,111 @@
+#
+# Author: Rohtash Lakra
+#
+import logging
+import mmap
+import os
+import tempfile
+import unittest
+import uuid
+
+from framework.security.revocation import BloomFilter, RevocationList
+from tests.base import AbstractTestCase
+
+logger = logging.getLogger(__name__)
+
+
+class RevocationListTest(AbstractTestCase):
+    """Unit-tests for the revocation list"""
+
+    def setUp(self):
+        """The setUp() method of the TestCase class is automatically invoked before each test, so it's an ideal place
+        to insert common logic that applies to all the tests in the class"""
+        logger.debug("+setUp()")
+        super().setUp()
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tempDir.name, "revoked-tokens.bin")
+        self.confirmed = []
+        logger.debug("-setUp()")
+        print()
+
+    def tearDown(self):
+        """The tearDown() method of the TestCase class is automatically invoked after each test, so it's an ideal place
+        to insert common logic that applies to all the tests in the class"""
+        logger.debug("+tearDown()")
+        self.tempDir.cleanup()
+        super().tearDown()
+        logger.debug("-tearDown()")
+        print()
+
+    def confirm(self, jti: str) -> bool:
+        self.confirmed.append(jti)
+        return False
+
+    def test_bloom_filter(self):
+        logger.debug("+test_bloom_filter()")
+        capacity, errorRate = 10000, 0.01
+        bits, hashes = BloomFilter.optimalSize(capacity, errorRate)
+        logger.debug(f"bits={bits}, hashes={hashes}")
+        self.assertEqual(0, bits % 8)
+        self.assertEqual(7, hashes)
+        bloomFilter = BloomFilter(mmap.mmap(-1, bits // 8), bits, hashes)
+        keys = [uuid.uuid4().hex for _ in range(capacity)]
+        for key in keys:
+            bloomFilter.add(key)
+
+        # no false negatives and the false positives are close to the error rate
+        self.assertTrue(all(key in bloomFilter for key in keys))
+        falsePositives = sum(uuid.uuid4().hex in bloomFilter for _ in range(capacity))
+        logger.debug(f"falsePositives={falsePositives}")
+        self.assertLess(falsePositives, capacity * errorRate * 2)
+        logger.debug("-test_bloom_filter()")
+        print()
+
+    def test_shared_between_workers(self):
+        logger.debug("+test_shared_between_workers()")
+        revocationList = RevocationList(self.path, capacity=1000, confirm=self.confirm)
+        # another worker maps the same file
+        otherList = RevocationList(self.path, capacity=1000, confirm=lambda jti: True)
+        logger.debug(f"revocationList={revocationList}")
+        self.assertEqual(revocationList.size(), os.path.getsize(self.path))
+
+        jti = uuid.uuid4().hex
+        self.assertFalse(otherList.isRevoked(jti))
+        revocationList.add(jti)
+        self.assertTrue(revocationList.isRevoked(jti))
+        # visible to the other worker, confirmed exactly on the filter hit
+        self.assertTrue(otherList.isRevoked(jti))
+
+        # the misses are never confirmed
+        self.assertFalse(revocationList.isRevoked(uuid.uuid4().hex))
+        self.assertFalse(revocationList.isRevoked(None))
+        self.assertEqual([], self.confirmed)
+        logger.debug("-test_shared_between_workers()")
+        print()
+
+    def test_rebuild(self):
+        logger.debug("+test_rebuild()")
+        revocationList = RevocationList(self.path, capacity=1000, confirm=lambda jti: True)
+        otherList = RevocationList(self.path, capacity=1000, confirm=lambda jti: True, reloadSeconds=0)
+        expiredJti, activeJti = uuid.uuid4().hex, uuid.uuid4().hex
+        revocationList.add(expiredJti)
+        self.assertEqual(1, revocationList.rebuild([activeJti]))
+        self.assertFalse(revocationList.mightBeRevoked(expiredJti))
+        self.assertTrue(revocationList.isRevoked(activeJti))
+        # the other worker remaps the rebuilt file
+        self.assertFalse(otherList.mightBeRevoked(expiredJti))
+        self.assertTrue(otherList.isRevoked(activeJti))
+
+        # the file of another capacity is rejected
+        with self.assertRaises(ValueError):
+            RevocationList(self.path, capacity=10)
+
+        revocationList.close()
+        otherList.close()
+        logger.debug("-test_rebuild()")
+        print()
+
+
+# Starting point
+if __name__ == 'unittest':
+    unittest.main(exit=False)
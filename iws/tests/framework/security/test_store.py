@@ -0,0 +1,131 @@
+#
+# Author: Rohtash Lakra
+#
+import logging
+import os
+import tempfile
+import time
+import unittest
+
+from framework.security.jwt import TokenManager, UserToken
+from framework.security.store import (
+    MemoryTokenStore,
+    SQLiteTokenStore,
+    TokenStoreSweeper,
+    TokenStoreType,
+    createTokenStore
+)
+from tests.base import AbstractTestCase
+
+logger = logging.getLogger(__name__)
+
+
+class TokenStoreTest(AbstractTestCase):
+    """Unit-tests for the token stores"""
+
+    def setUp(self):
+        """The setUp() method of the TestCase class is automatically invoked before each test, so it's an ideal place
+        to insert common logic that applies to all the tests in the class"""
+        logger.debug("+setUp()")
+        super().setUp()
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tempDir.name, "tokens.db")
+        logger.debug("-setUp()")
+        print()
+
+    def tearDown(self):
+        """The tearDown() method of the TestCase class is automatically invoked after each test, so it's an ideal place
+        to insert common logic that applies to all the tests in the class"""
+        logger.debug("+tearDown()")
+        self.tempDir.cleanup()
+        super().tearDown()
+        logger.debug("-tearDown()")
+        print()
+
+    def test_memory_store_lru(self):
+        logger.debug("+test_memory_store_lru()")
+        store = MemoryTokenStore(ttlSeconds=60, maxSize=2)
+        store.put("1", UserToken(userId="1"))
+        store.put("2", UserToken(userId="2"))
+        # touch '1', so '2' is the least recently used
+        self.assertEqual("1", store.get("1").userId)
+        store.put("3", UserToken(userId="3"))
+        logger.debug(f"store={store}")
+        self.assertEqual(2, len(store))
+        self.assertIn("1", store)
+        self.assertNotIn("2", store)
+        self.assertIn("3", store)
+        store.delete("1")
+        self.assertIsNone(store.get("1"))
+        logger.debug("-test_memory_store_lru()")
+        print()
+
+    def test_memory_store_ttl(self):
+        logger.debug("+test_memory_store_ttl()")
+        store = MemoryTokenStore(ttlSeconds=60)
+        store.put("1", UserToken(userId="1"), ttlSeconds=0)
+        store.put("2", UserToken(userId="2"), ttlSeconds=0)
+        store.put("3", UserToken(userId="3"))
+        self.assertIsNone(store.get("1"))
+        # '2' is expired but not yet swept
+        self.assertEqual(2, store.size())
+        self.assertEqual(1, store.sweep())
+        self.assertEqual(1, store.size())
+        logger.debug("-test_memory_store_ttl()")
+        print()
+
+    def test_sqlite_store_shared(self):
+        logger.debug("+test_sqlite_store_shared()")
+        # two stores of the same file, like two gunicorn workers
+        store = createTokenStore(TokenStoreType.SQLITE, 60, UserToken, path=self.path)
+        otherStore = SQLiteTokenStore(self.path, 60, UserToken)
+        self.assertIsInstance(store, SQLiteTokenStore)
+        store.put("1", UserToken(userId="1", accessToken="access", expiresAt=1))
+        store.put("2", UserToken(userId="2"), ttlSeconds=0)
+        userToken = otherStore.get("1")
+        logger.debug(f"userToken={userToken}")
+        self.assertEqual("access", userToken.accessToken)
+        self.assertIsNone(otherStore.get("2"))
+        self.assertEqual(1, otherStore.sweep())
+        self.assertEqual(1, store.size())
+        otherStore.delete("1")
+        self.assertNotIn("1", store)
+        store.close()
+        otherStore.close()
+        logger.debug("-test_sqlite_store_shared()")
+        print()
+
+    def test_token_manager_with_shared_store(self):
+        logger.debug("+test_token_manager_with_shared_store()")
+        clientSecret = "a79387fed978428e9ced80fb1db9125d"
+        tokenManager = TokenManager("posts-iws", clientSecret, tokenStore=SQLiteTokenStore(self.path, 60, UserToken))
+        otherManager = TokenManager("posts-iws", clientSecret, tokenStore=SQLiteTokenStore(self.path, 60, UserToken))
+        userToken = tokenManager.generateTokens("1")
+        # the refresh token issued by one worker is known to the other
+        refreshedToken = otherManager.refreshAccessToken("1")
+        logger.debug(f"refreshedToken={refreshedToken}")
+        self.assertEqual(userToken.refreshToken, refreshedToken.refreshToken)
+        self.assertEqual("1", otherManager.getAccessToken("1").userId)
+        logger.debug("-test_token_manager_with_shared_store()")
+        print()
+
+    def test_sweeper(self):
+        logger.debug("+test_sweeper()")
+        store = MemoryTokenStore(ttlSeconds=0)
+        store.put("1", UserToken(userId="1"))
+        sweeper = TokenStoreSweeper(store, intervalSeconds=0.01).start()
+        try:
+            deadline = time.time() + 2
+            while store.size() and time.time() < deadline:
+                time.sleep(0.01)
+        finally:
+            sweeper.stop()
+
+        self.assertEqual(0, store.size())
+        logger.debug("-test_sweeper()")
+        print()
+
+
+# Starting point
+if __name__ == 'unittest':
+    unittest.main(exit=False)
@@ -0,0 +1,151 @@
+#
+# Author: Rohtash Lakra
+#
+import json
+import logging
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from framework.security.jwt import TokenManager, UserToken, TokenTypeEnum
+from tests.base import AbstractTestCase
+
+logger = logging.getLogger(__name__)
+
+
+class StubTokenServer(ThreadingHTTPServer):
+    """A local token service, it returns a new access token for each refresh request after 'delay' seconds"""
+
+    daemon_threads = True
+
+    def __init__(self, delay: float = 0.0, expiresIn: int = 900):
+        super().__init__(("127.0.0.1", 0), StubTokenHandler)
+        self.delay = delay
+        self.expiresIn = expiresIn
+        self.requests = []
+        self.connections = set()
+        self._lock = threading.Lock()
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/oauth/token"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
+
+
+class StubTokenHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        server = self.server
+        payload = parse_qs(self.rfile.read(int(self.headers["Content-Length"])).decode())
+        with server._lock:
+            server.requests.append(payload)
+            server.connections.add(self.client_address)
+            count = len(server.requests)
+
+        time.sleep(server.delay)
+        body = json.dumps({TokenTypeEnum.ACCESS_TOKEN.value: f"access-{count}", "expires_in": server.expiresIn}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+
+class TokenRefreshTest(AbstractTestCase):
+    """Unit-tests for the remote token refresh of the TokenManager"""
+
+    clientSecret = "a79387fed978428e9ced80fb1db9125d"
+
+    def test_remote_refresh(self):
+        logger.debug("+test_remote_refresh()")
+        with StubTokenServer() as server:
+            tokenManager = TokenManager("posts-iws", self.clientSecret, tokenServiceUrl=server.url)
+            logger.debug(f"tokenManager={tokenManager}")
+            for _ in range(3):
+                userToken = tokenManager.refreshAccessToken("1", UserToken(userId="1", refreshToken="refresh"))
+
+            tokenManager.close()
+
+        logger.debug(f"userToken={userToken}, requests={server.requests}")
+        self.assertEqual("access-3", userToken.accessToken)
+        self.assertEqual("refresh", userToken.refreshToken)
+        self.assertEqual(["refresh_token"], server.requests[0]["grant_type"])
+        self.assertEqual(["posts-iws"], server.requests[0]["client_id"])
+        # the keep-alive connection is reused
+        self.assertEqual(1, len(server.connections))
+        logger.debug("-test_remote_refresh()")
+        print()
+
+    def test_single_flight(self):
+        logger.debug("+test_single_flight()")
+        with StubTokenServer(delay=0.3) as server:
+            tokenManager = TokenManager("posts-iws", self.clientSecret, tokenServiceUrl=server.url)
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                userTokens = list(executor.map(lambda _: tokenManager.refreshAccessToken("1"), range(8)))
+
+            tokenManager.close()
+
+        # only one refresh is sent, all the callers get its result
+        self.assertEqual(1, len(server.requests))
+        self.assertEqual({"access-1"}, {userToken.accessToken for userToken in userTokens})
+        logger.debug("-test_single_flight()")
+        print()
+
+    def test_refresh_ahead(self):
+        logger.debug("+test_refresh_ahead()")
+        with StubTokenServer() as server:
+            # the local access token expires in 30 seconds, within the refresh-ahead window
+            tokenManager = TokenManager("posts-iws", self.clientSecret, expiresInSeconds=30,
+                                        tokenServiceUrl=server.url, refreshAheadSeconds=60)
+            userToken = tokenManager.generateTokens("1")
+            self.assertTrue(tokenManager.isExpiring(userToken.expiresAt))
+            # the current token is returned right away, the refresh runs in the background
+            self.assertEqual(userToken.accessToken, tokenManager.getAccessToken("1").accessToken)
+            tokenManager.close()
+
+        self.assertEqual(1, len(server.requests))
+        self.assertEqual("access-1", tokenManager.tokens.get("1").accessToken)
+        self.assertFalse(tokenManager.isExpiring(tokenManager.tokens.get("1").expiresAt))
+        logger.debug("-test_refresh_ahead()")
+        print()
+
+    def test_refresh_in_background_single_flight(self):
+        logger.debug("+test_refresh_in_background_single_flight()")
+        with StubTokenServer(delay=0.3) as server:
+            tokenManager = TokenManager("posts-iws", self.clientSecret, expiresInSeconds=30,
+                                        tokenServiceUrl=server.url, refreshAheadSeconds=60)
+            userToken = tokenManager.generateTokens("1")
+            # the concurrent readers in the refresh-ahead window share one background refresh
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                accessTokens = list(executor.map(lambda _: tokenManager.getAccessToken("1").accessToken, range(8)))
+                futures = list(executor.map(lambda _: tokenManager.refreshInBackground("1"), range(8)))
+
+            self.assertEqual({userToken.accessToken}, set(accessTokens))
+            self.assertEqual({"access-1"}, {future.result().accessToken for future in futures})
+            tokenManager.close()
+
+        self.assertEqual(1, len(server.requests))
+        self.assertEqual({}, tokenManager._refreshes)
+        logger.debug("-test_refresh_in_background_single_flight()")
+        print()
+
+
+
+# Starting point
+if __name__ == 'unittest':
+    unittest.main(exit=False)
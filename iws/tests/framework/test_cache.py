@@ -0,0 +1,155 @@
+#
+# Author: Rohtash Lakra
+#
+import logging
+import os
+import tempfile
+import time
+import unittest
+
+from flask import Flask, g
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from framework.cache import (CachedResponse, MemoryResponseCacheStore, ResponseCache, SQLiteResponseCacheStore,
+                             principalScope)
+from framework.orm.sqlalchemy.schema import BaseSchema
+from framework.versions import TableVersions
+from rest.role.schema import RoleSchema
+from rest.user.model import User
+from tests import app
+from tests.base import AbstractTestCase
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCacheTest(AbstractTestCase):
+    """Unit-tests for ResponseCache"""
+
+    def setUp(self):
+        logger.debug("+setUp()")
+        self.engine = create_engine("sqlite://")
+        BaseSchema.metadata.create_all(self.engine)
+        self.versions = TableVersions().attach(self.engine)
+        self.directory = tempfile.TemporaryDirectory()
+        logger.debug("-setUp()")
+
+    def tearDown(self):
+        logger.debug("+tearDown()")
+        self.versions.detach()
+        self.engine.dispose()
+        self.directory.cleanup()
+        logger.debug("-tearDown()")
+
+    def newResponse(self, *tables: str, ttl: float = 60) -> CachedResponse:
+        return CachedResponse(200, "application/json", b'{"data": []}', frozenset(tables), time.time() + ttl)
+
+    def test_stores(self):
+        logger.debug("+test_stores()")
+        for store in (MemoryResponseCacheStore(maxSize=2),
+                      SQLiteResponseCacheStore(os.path.join(self.directory.name, "cache.db"), maxSize=2,
+                                               sweepEvery=1)):
+            logger.debug(f"store={store}")
+            store.set("roles", self.newResponse("roles", "permissions"))
+            store.set("companies", self.newResponse("companies", ttl=30))
+            self.assertEqual(b'{"data": []}', store.get("roles").body)
+            self.assertEqual(frozenset({"roles", "permissions"}), store.get("roles").tables)
+
+            # the least recently used (or soonest expiring) is dropped above the size
+            store.set("permissions", self.newResponse("permissions", ttl=120))
+            self.assertEqual(2, store.size())
+            self.assertIsNone(store.get("companies"))
+
+            # the responses of any of the tables are evicted, 'role_permissions' is not 'permissions'
+            self.assertEqual(0, store.invalidate(["role_permissions"]))
+            self.assertEqual(2, store.invalidate(["permissions", "users"]))
+            self.assertEqual(0, store.size())
+
+            store.set("expired", self.newResponse("roles", ttl=-1))
+            self.assertIsNone(store.get("expired"))
+            store.clear()
+            store.close()
+
+        logger.debug("-test_stores()")
+        print()
+
+    def test_cached(self):
+        logger.debug("+test_cached()")
+        testApp = Flask(__name__)
+        cache = ResponseCache(MemoryResponseCacheStore()).init_app(testApp, versions=self.versions)
+        calls = []
+
+        @testApp.get("/roles")
+        @cache.cached("roles", ttl=60)
+        def roles():
+            calls.append(1)
+            with Session(self.engine) as session:
+                return {"data": [role.name for role in session.query(RoleSchema).order_by(RoleSchema.name)]}
+
+        client = testApp.test_client()
+        response = client.get("/roles")
+        self.assertEqual(("MISS", {"data": []}), (response.headers["X-Cache"], response.json))
+        response = client.get("/roles")
+        self.assertEqual(("HIT", "application/json"), (response.headers["X-Cache"], response.content_type))
+        self.assertEqual(1, len(calls))
+        # the normalised query is part of the key
+        self.assertEqual("MISS", client.get("/roles?b=2&a=1").headers["X-Cache"])
+        self.assertEqual("HIT", client.get("/roles?a=1&b=2").headers["X-Cache"])
+
+        # the commit evicts the responses of its tables
+        with Session(self.engine) as session:
+            session.add(RoleSchema(name="Admin", active=True))
+            session.commit()
+        self.assertEqual(0, cache.store.size())
+        response = client.get("/roles")
+        self.assertEqual(("MISS", {"data": ["Admin"]}), (response.headers["X-Cache"], response.json))
+
+        # a rolled back change does not evict
+        with Session(self.engine) as session:
+            session.add(RoleSchema(name="Member", active=True))
+            session.flush()
+            session.rollback()
+        self.assertEqual("HIT", client.get("/roles").headers["X-Cache"])
+
+        # the commit of another worker changes the versions of the key
+        with self.engine.begin() as connection:
+            TableVersions.bump(connection, ["roles"])
+        self.assertEqual(1, cache.store.size())
+        self.assertEqual("MISS", client.get("/roles").headers["X-Cache"])
+
+        stats = cache.stats()
+        logger.debug(f"stats={stats}")
+        self.assertEqual((3, 4, 4, 2), (stats["hits"], stats["misses"], stats["stores"], stats["invalidations"]))
+        self.assertEqual(3, stats["routes"][f"{__name__}.roles"]["hits"])
+        logger.debug("-test_cached()")
+        print()
+
+    def test_principal_scope(self):
+        logger.debug("+test_principal_scope()")
+        with app.test_request_context("/"):
+            self.assertEqual("anonymous", principalScope())
+            g.user = User(id=1, admin=False)
+            self.assertEqual("user", principalScope())
+            g.user = User(id=1, admin=True)
+            self.assertEqual("admin", principalScope())
+        logger.debug("-test_principal_scope()")
+        print()
+
+    def test_routes(self):
+        logger.debug("+test_routes()")
+        client = app.test_client()
+        client.get("/rest/v1/permissions/")
+        response = client.get("/rest/v1/permissions/")
+        self.assertEqual(("HIT", 200), (response.headers["X-Cache"], response.status_code))
+        # the conditional GET still validates the cached response
+        etag, weak = response.get_etag()
+        self.assertTrue(weak)
+        self.assertEqual(304, client.get("/rest/v1/permissions/", headers={"If-None-Match": f'W/"{etag}"'})
+                         .status_code)
+        logger.debug("-test_routes()")
+        print()
+
+
+# Starting point
+if __name__ == 'unittest':
+    unittest.main(exit=False)
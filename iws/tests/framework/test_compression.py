@@ -0,0 +1,122 @@
+#
+# Author: Rohtash Lakra
+#
+import gzip
+import logging
+import os
+import tempfile
+import unittest
+
+import brotli
+from flask import Flask
+
+from framework.cache import MemoryResponseCacheStore, ResponseCache, SQLiteResponseCacheStore
+from framework.compression import Compressor, ContentEncoding
+from framework.metrics import Metrics
+from tests.base import AbstractTestCase
+
+logger = logging.getLogger(__name__)
+
+
+class CompressorTest(AbstractTestCase):
+    """Unit-tests for Compressor"""
+
+    def setUp(self):
+        logger.debug("+setUp()")
+        self.testApp = Flask(__name__)
+        self.metrics = Metrics()
+        self.compressor = Compressor(minSize=256).init_app(self.testApp, metrics=self.metrics)
+        self.rows = [{"id": index, "created_at": "2025-01-31T10:15:30", "updated_at": "2025-02-01T08:00:00"}
+                     for index in range(50)]
+
+        @self.testApp.get("/rows")
+        def rows():
+            return {"data": self.rows}
+
+        @self.testApp.get("/small")
+        def small():
+            return {"data": []}
+
+        @self.testApp.get("/image")
+        def image():
+            return self.testApp.response_class(b"\x89PNG" * 1024, content_type="image/png")
+
+        self.client = self.testApp.test_client()
+        logger.debug("-setUp()")
+
+    def test_negotiate(self):
+        logger.debug("+test_negotiate()")
+        for acceptEncoding, expected in [("gzip, deflate, br", ContentEncoding.BR),
+                                         ("gzip", ContentEncoding.GZIP),
+                                         ("br;q=0.5, gzip", ContentEncoding.GZIP),
+                                         ("*", ContentEncoding.BR),
+                                         ("br;q=0, gzip;q=0", None),
+                                         ("identity", None),
+                                         ("", None)]:
+            with self.testApp.test_request_context("/", headers={"Accept-Encoding": acceptEncoding}):
+                self.assertEqual(expected, self.compressor.negotiate(), acceptEncoding)
+        logger.debug("-test_negotiate()")
+        print()
+
+    def test_after_request(self):
+        logger.debug("+test_after_request()")
+        identity = self.client.get("/rows")
+        self.assertNotIn("Content-Encoding", identity.headers)
+        self.assertEqual("Accept-Encoding", identity.headers["Vary"])
+
+        response = self.client.get("/rows", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual("gzip", response.headers["Content-Encoding"])
+        self.assertEqual(identity.data, gzip.decompress(response.data))
+        self.assertEqual(len(response.data), response.content_length)
+        logger.debug(f"identity={len(identity.data)}, gzip={len(response.data)}")
+        self.assertLess(len(response.data) * 5, len(identity.data))
+
+        response = self.client.get("/rows", headers={"Accept-Encoding": "br, gzip"})
+        self.assertEqual(("br", identity.data), (response.headers["Content-Encoding"], brotli.decompress(response.data)))
+
+        # below the min size or not compressible
+        self.assertNotIn("Content-Encoding", self.client.get("/small", headers={"Accept-Encoding": "gzip"}).headers)
+        self.assertNotIn("Content-Encoding", self.client.get("/image", headers={"Accept-Encoding": "gzip"}).headers)
+
+        # the bytes on the wire per encoding
+        rendered = self.metrics.render()
+        self.assertIn('http_response_bytes_total{encoding="gzip"}', rendered)
+        self.assertIn('http_compression_cpu_seconds_count{encoding="br"} 1', rendered)
+        logger.debug("-test_after_request()")
+        print()
+
+    def test_cached_variants(self):
+        logger.debug("+test_cached_variants()")
+        compressions = []
+        compress = self.compressor.compress
+        self.compressor.compress = lambda body, encoding: compressions.append(encoding) or compress(body, encoding)
+        tempDir = tempfile.TemporaryDirectory()
+        stores = {"memory": MemoryResponseCacheStore(),
+                  "sqlite": SQLiteResponseCacheStore(os.path.join(tempDir.name, "cache.db"))}
+        for name, store in stores.items():
+            cache = ResponseCache(store).init_app(self.testApp, compressor=self.compressor)
+            self.testApp.add_url_rule(f"/cached/{name}", f"cached_{name}",
+                                      cache.cached("rows")(lambda: {"data": self.rows}))
+
+        for name, store in stores.items():
+            compressions.clear()
+            for acceptEncoding in ("gzip", "gzip", "br", "br", "gzip", "", ""):
+                response = self.client.get(f"/cached/{name}", headers={"Accept-Encoding": acceptEncoding})
+                self.assertEqual(acceptEncoding or None, response.headers.get("Content-Encoding"))
+
+            self.assertEqual("HIT", response.headers["X-Cache"])
+            self.assertEqual(self.rows, response.json["data"])
+            # a hot response is compressed once per encoding
+            self.assertEqual([ContentEncoding.GZIP, ContentEncoding.BR], compressions, name)
+            self.assertEqual(3, store.size())
+            self.assertEqual(3, store.invalidate(["rows"]))
+            store.close()
+
+        tempDir.cleanup()
+        logger.debug("-test_cached_variants()")
+        print()
+
+
+# Starting point
+if __name__ == 'unittest':
+    unittest.main(exit=False)
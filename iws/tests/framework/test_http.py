@@ -53,13 +53,14 @@ class HttpTest(AbstractTestCase):
         self.assertEqual("<enum 'HTTPStatus'>", str(HTTPStatus))
         
         logger.debug(f"HTTPStatus names={HTTPStatus.names()}")
-        expected = ('OK', 'CREATED', 'ACCEPTED', 'NO_CONTENT', 'BAD_REQUEST', 'UNAUTHORIZED', 'NOT_FOUND', 'CONFLICT',
-                    'UNSUPPORTED_MEDIA_TYPE', 'INVALID_DATA', 'TOO_MANY_REQUESTS', 'INTERNAL_SERVER_ERROR',
+        expected = ('OK', 'CREATED', 'ACCEPTED', 'NO_CONTENT', 'NOT_MODIFIED', 'BAD_REQUEST', 'UNAUTHORIZED', 'NOT_FOUND',
+                    'CONFLICT', 'UNSUPPORTED_MEDIA_TYPE', 'INVALID_DATA', 'TOO_MANY_REQUESTS', 'INTERNAL_SERVER_ERROR',
                     'NOT_IMPLEMENTED', 'SERVICE_UNAVAILABLE', 'GATEWAY_TIMEOUT')
         self.assertEqual(expected, HTTPStatus.names())
         
         logger.debug(f"HTTPStatus values={HTTPStatus.values()}")
-        expected = ((200, 'OK'), (201, 'Created'), (202, 'Accepted'), (204, 'No Content'), (400, 'Bad Request'),
+        expected = ((200, 'OK'), (201, 'Created'), (202, 'Accepted'), (204, 'No Content'), (304, 'Not Modified'),
+                    (400, 'Bad Request'),
                     (401, 'Unauthorized'), (404, 'Not Found'), (409, 'Conflict'), (415, 'Unsupported Media Type'),
                     (422, 'Unprocessable Entity'), (429, 'Too Many Requests'), (500, 'Internal Server Error'),
                     (501, 'Not Implemented'), (503, 'Service Unavailable'), (504, 'Gateway Timeout'))
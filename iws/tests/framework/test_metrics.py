@@ -0,0 +1,129 @@
+#
+# Author: Rohtash Lakra
+#
+import logging
+import os
+import tempfile
+import time
+import unittest
+
+from framework.metrics import Metrics, clearDirectory, markProcessDead, statementLabels, writeJson
+from globals import metrics
+from tests import app
+from tests.base import AbstractTestCase
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsTest(AbstractTestCase):
+    """Unit-tests for the metrics"""
+
+    def test_histogram(self):
+        logger.debug("+test_histogram()")
+        localMetrics = Metrics()
+        histogram = localMetrics.histogram("latency_seconds", "The latency", ("endpoint",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe(value, "home")
+
+        # the 'le' buckets are inclusive
+        self.assertEqual([2, 1, 1, 2.65, 4], histogram.value("home"))
+        text = localMetrics.render()
+        logger.debug(f"text={text}")
+        self.assertIn("# TYPE latency_seconds histogram", text)
+        self.assertIn('latency_seconds_bucket{endpoint="home",le="0.1"} 2', text)
+        self.assertIn('latency_seconds_bucket{endpoint="home",le="1"} 3', text)
+        self.assertIn('latency_seconds_bucket{endpoint="home",le="+Inf"} 4', text)
+        self.assertIn('latency_seconds_count{endpoint="home"} 4', text)
+        self.assertIn("http_requests_in_flight 0", text)
+        with self.assertRaises(ValueError):
+            localMetrics.counter("latency_seconds", "The same name")
+        logger.debug("-test_histogram()")
+        print()
+
+    def test_statement_labels(self):
+        logger.debug("+test_statement_labels()")
+        self.assertEqual(("SELECT", "users"), statementLabels('SELECT users.id FROM "users" WHERE users.id = ?'))
+        self.assertEqual(("INSERT", "posts"), statementLabels("INSERT INTO posts (title) VALUES (?)"))
+        self.assertEqual(("UPDATE", "roles"), statementLabels("update roles set active = ?"))
+        self.assertEqual(("DELETE", "comments"), statementLabels("DELETE FROM comments WHERE id = ?"))
+        self.assertEqual(("OTHER", ""), statementLabels("VACUUM"))
+        logger.debug("-test_statement_labels()")
+        print()
+
+    def test_workers_aggregation(self):
+        """The metrics of the workers sharing a directory are summed, a dead worker's gauges are dropped"""
+        logger.debug("+test_workers_aggregation()")
+        with tempfile.TemporaryDirectory() as directory:
+            first, second = Metrics(directory), Metrics(directory)
+            first.requests.inc("home", "GET", "200")
+            first.inFlight.inc()
+            second.requests.inc("home", "GET", "200", amount=2)
+            second.requestDuration.observe(0.002, "home", "GET")
+            # the second worker's snapshot as if written by another process
+            writeJson(os.path.join(directory, "1.json"), {**second.snapshot(), "pid": 1})
+
+            collected = first.collect()
+            logger.debug(f"collected={collected}")
+            self.assertEqual([3], collected["http_requests_total"][("home", "GET", "200")])
+            self.assertEqual([1], collected["http_requests_in_flight"][()])
+            self.assertEqual(1, collected["http_request_duration_seconds"][("home", "GET")][-1])
+
+            second.inFlight.inc()
+            writeJson(os.path.join(directory, "1.json"), {**second.snapshot(), "pid": 1})
+            markProcessDead(directory, 1)
+            self.assertFalse(os.path.exists(os.path.join(directory, "1.json")))
+            collected = first.collect()
+            # the archived counters survive the dead worker, its gauges do not
+            self.assertEqual([3], collected["http_requests_total"][("home", "GET", "200")])
+            self.assertEqual([1], collected["http_requests_in_flight"][()])
+            self.assertEqual(1, collected["http_request_duration_seconds"][("home", "GET")][-1])
+
+            clearDirectory(directory)
+            self.assertEqual(["archived.lock"], os.listdir(directory))
+        logger.debug("-test_workers_aggregation()")
+        print()
+
+    def test_metrics_endpoint(self):
+        logger.debug("+test_metrics_endpoint()")
+        metrics.clear()
+        client = app.test_client()
+        self.assertEqual(200, client.get("/health-check/").status_code)
+        client.get("/rest/v1/roles/")
+        response = client.get("/metrics")
+        text = response.get_data(as_text=True)
+        logger.debug(f"text={text}")
+        self.assertEqual(200, response.status_code)
+        self.assertTrue(response.content_type.startswith("text/plain; version=0.0.4"))
+        self.assertIn('http_requests_total{endpoint="iws.webapp.health_check",method="GET",status="200"} 1', text)
+        self.assertIn('http_request_duration_seconds_count{endpoint="iws.webapp.health_check",method="GET"} 1', text)
+        self.assertIn('db_statement_duration_seconds_count{operation="SELECT",table="roles"}', text)
+        # the metrics' own request is not done yet
+        self.assertIn("http_requests_in_flight 0", text)
+        logger.debug("-test_metrics_endpoint()")
+        print()
+
+    def test_request_overhead(self):
+        """The hooks of a request cost a few micro-seconds"""
+        logger.debug("+test_request_overhead()")
+        localMetrics = Metrics()
+        rounds = 2000
+        response = app.response_class()
+        with app.test_request_context("/health-check/"):
+            startedAt = time.perf_counter()
+            for _ in range(rounds):
+                localMetrics.beforeRequest()
+                localMetrics.afterRequest(response)
+                localMetrics.teardownRequest()
+            micros = (time.perf_counter() - startedAt) * 1_000_000 / rounds
+
+        logger.info(f"The metrics' hooks take {micros:.1f} µs per request")
+        self.assertEqual(rounds, localMetrics.requestDuration.value("iws.webapp.health_check", "GET")[-1])
+        # generous for the slower CI hosts
+        self.assertLess(micros, 50)
+        logger.debug("-test_request_overhead()")
+        print()
+
+
+# Starting point
+if __name__ == 'unittest':
+    unittest.main(exit=False)
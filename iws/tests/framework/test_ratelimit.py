@@ -0,0 +1,242 @@
+#
+# Author: Rohtash Lakra
+#
+import logging
+import os
+import tempfile
+import time
+import unittest
+
+from flask import Blueprint, Flask
+from sqlalchemy import event
+
+from framework.exception import TooManyRequestsException
+from framework.ratelimit import (
+    MemoryRateLimitStore,
+    RateLimit,
+    RateLimitAlgorithm,
+    RateLimiter,
+    SQLiteRateLimitStore,
+    slidingWindow,
+    tokenBucket
+)
+from globals import connector
+from tests.base import AbstractTestCase
+
+logger = logging.getLogger(__name__)
+
+
+class CountingStore(MemoryRateLimitStore):
+    """The memory store, counting the hits reaching it"""
+
+    def __init__(self):
+        super().__init__()
+        self.hits = 0
+
+    def hit(self, key, rateLimit, algorithm, now):
+        self.hits += 1
+        return super().hit(key, rateLimit, algorithm, now)
+
+
+class RateLimiterTest(AbstractTestCase):
+    """Unit-tests for the rate limiter"""
+
+    def test_parse(self):
+        logger.debug("+test_parse()")
+        self.assertEqual(RateLimit(10, 60), RateLimit.parse("10/minute"))
+        self.assertEqual(RateLimit(5, 1), RateLimit.parse("5 per second"))
+        self.assertEqual(RateLimit(1000, 12 * 3600), RateLimit.parse("1000/12 hours"))
+        self.assertEqual("10/60s", str(RateLimit.parse("10/minute")))
+        for text in (None, "", "10", "ten/minute", "10/fortnight"):
+            with self.assertRaises(ValueError):
+                RateLimit.parse(text)
+
+        logger.debug("-test_parse()")
+        print()
+
+    def test_token_bucket(self):
+        logger.debug("+test_token_bucket()")
+        rateLimit = RateLimit(2, 10)
+        state, result = tokenBucket(None, rateLimit, 100.0)
+        self.assertEqual((True, 1), (result.allowed, result.remaining))
+        state, result = tokenBucket(state, rateLimit, 100.0)
+        self.assertEqual((True, 0), (result.allowed, result.remaining))
+        state, result = tokenBucket(state, rateLimit, 101.0)
+        logger.debug(f"state={state}, result={result}")
+        # a token per 5 seconds, 1 second passed
+        self.assertFalse(result.allowed)
+        self.assertAlmostEqual(4.0, result.retryAfter)
+        state, result = tokenBucket(state, rateLimit, 105.0)
+        self.assertTrue(result.allowed)
+        logger.debug("-test_token_bucket()")
+        print()
+
+    def test_sliding_window(self):
+        logger.debug("+test_sliding_window()")
+        rateLimit = RateLimit(2, 10)
+        state = None
+        for now in (100.0, 101.0):
+            state, result = slidingWindow(state, rateLimit, now)
+            self.assertTrue(result.allowed)
+
+        state, result = slidingWindow(state, rateLimit, 102.0)
+        self.assertFalse(result.allowed)
+        self.assertAlmostEqual(8.0, result.retryAfter)
+        # the previous window's requests weigh 3/4 at 2.5 seconds of the next window
+        state, result = slidingWindow(state, rateLimit, 112.5)
+        logger.debug(f"state={state}, result={result}")
+        self.assertFalse(result.allowed)
+        self.assertAlmostEqual(2.5, result.retryAfter)
+        state, result = slidingWindow(state, rateLimit, 115.0)
+        self.assertTrue(result.allowed)
+        logger.debug("-test_sliding_window()")
+        print()
+
+    def test_shared_sqlite_store(self):
+        logger.debug("+test_shared_sqlite_store()")
+        with tempfile.TemporaryDirectory() as tempDir:
+            path = os.path.join(tempDir, "rate-limits.db")
+            # two workers of a host
+            limiter = RateLimiter(store=SQLiteRateLimitStore(path))
+            otherLimiter = RateLimiter(store=SQLiteRateLimitStore(path),
+                                       algorithm=RateLimitAlgorithm.TOKEN_BUCKET)
+            rateLimit = RateLimit(3, 60)
+            results = [limiter.hit("ip:10.0.0.1", rateLimit), otherLimiter.hit("ip:10.0.0.1", rateLimit),
+                       limiter.hit("ip:10.0.0.1", rateLimit), otherLimiter.hit("ip:10.0.0.1", rateLimit)]
+            logger.debug(f"results={results}")
+            self.assertEqual([True, True, True, False], [result.allowed for result in results])
+            self.assertEqual([2, 1, 0, 0], [result.remaining for result in results])
+            self.assertTrue(limiter.hit("ip:10.0.0.2", rateLimit).allowed)
+            self.assertEqual(2, limiter.store.size())
+            self.assertEqual(2, limiter.store.sweep(time.time() + 3600))
+            limiter.store.close()
+            otherLimiter.store.close()
+
+        logger.debug("-test_shared_sqlite_store()")
+        print()
+
+    def test_routes(self):
+        logger.debug("+test_routes()")
+        app = Flask(__name__)
+        blueprint = Blueprint("limited", __name__, url_prefix="/limited")
+        limiter = RateLimiter(store=MemoryRateLimitStore(), algorithm=RateLimitAlgorithm.SLIDING_WINDOW)
+        limiter.limitBlueprint(blueprint, "2/minute")
+
+        @blueprint.get("/")
+        def index():
+            return "index"
+
+        @blueprint.post("/login")
+        @limiter.limit("1/minute", key=lambda: "user:1")
+        def login():
+            return "login"
+
+        @blueprint.get("/health")
+        @limiter.exempt
+        def health():
+            return "health"
+
+        @blueprint.get("/default")
+        @limiter.limit()
+        def default():
+            return "default"
+
+        app.register_blueprint(blueprint)
+        limiter.init_app(app)
+        client = app.test_client()
+        self.assertEqual([200, 200, 429], [client.get("/limited/").status_code for _ in range(3)])
+        response = client.get("/limited/")
+        logger.debug(f"headers={response.headers}, json={response.json}")
+        self.assertEqual(429, response.json["status"])
+        self.assertEqual(429, response.json["errors"][0]["status"])
+        self.assertTrue(1 <= int(response.headers["Retry-After"]) <= 60)
+        self.assertEqual("2", response.headers["X-RateLimit-Limit"])
+
+        # the route's own limit and key, not the blueprint's
+        self.assertEqual([200, 429], [client.post("/limited/login").status_code for _ in range(2)])
+        self.assertEqual([200] * 5, [client.get("/limited/health").status_code for _ in range(5)])
+        # the blueprint's rate in the route's own scope
+        self.assertEqual([200, 200, 429], [client.get("/limited/default").status_code for _ in range(3)])
+
+        limiter.enabled = False
+        self.assertEqual(200, client.get("/limited/").status_code)
+        logger.debug("-test_routes()")
+        print()
+
+    def test_rejected_without_db(self):
+        """The load test of a throttled client, the rejections never reach the store or the DB"""
+        logger.debug("+test_rejected_without_db()")
+        store = CountingStore()
+        limiter = RateLimiter(store=store)
+        rateLimit = RateLimit(5, 60)
+        self.assertEqual(5, sum(limiter.hit("ip:10.0.0.3", rateLimit).allowed for _ in range(6)))
+        self.assertEqual(6, store.hits)
+
+        count = 100000
+        startedAt = time.perf_counter()
+        for _ in range(count):
+            limiter.hit("ip:10.0.0.3", rateLimit)
+
+        micros = (time.perf_counter() - startedAt) / count * 1_000_000
+        logger.info(f"Rejected {count} requests in {micros:.2f} µs per request")
+        self.assertEqual(6, store.hits)
+        self.assertLess(micros, 50)
+        with self.assertRaises(TooManyRequestsException) as context:
+            limiter.check(rateLimit, lambda: "10.0.0.3", "ip")
+        self.assertGreater(context.exception.retryAfter, 0)
+        logger.debug("-test_rejected_without_db()")
+        print()
+
+    def test_login_rejected_without_db(self):
+        """The throttled logins of a client are rejected by the app without a DB statement"""
+        logger.debug("+test_login_rejected_without_db()")
+        statements = []
+
+        def countStatement(*args):
+            statements.append(args[2])
+
+        environ = {"REMOTE_ADDR": "10.0.0.4"}
+        body = {"user_name": "unknown", "password": "password"}
+        responses = [self.client.post("/rest/v1/users/login", json=body, environ_base=environ) for _ in range(10)]
+        self.assertNotIn(429, [response.status_code for response in responses])
+        event.listen(connector.engine, "before_cursor_execute", countStatement)
+        try:
+            responses = [self.client.post("/rest/v1/users/login", json=body, environ_base=environ)
+                         for _ in range(100)]
+        finally:
+            event.remove(connector.engine, "before_cursor_execute", countStatement)
+
+        logger.debug(f"statements={statements}")
+        self.assertEqual({429}, {response.status_code for response in responses})
+        self.assertIn("Retry-After", responses[-1].headers)
+        self.assertEqual([], statements)
+        logger.debug("-test_login_rejected_without_db()")
+        print()
+
+    def test_login_forwarded_for_ignored(self):
+        """Without a proxy, a new 'X-Forwarded-For' of each login doesn't get a new budget"""
+        logger.debug("+test_login_forwarded_for_ignored()")
+        self.assertEqual(0, self.app.config["PROXY_FIX_X_FOR"])
+        environ = {"REMOTE_ADDR": "10.0.0.5"}
+        body = {"user_name": "unknown", "password": "password"}
+        responses = [self.client.post("/rest/v1/users/login", json=body, environ_base=environ,
+                                      headers={"X-Forwarded-For": f"192.0.2.{index}"}) for index in range(20)]
+        self.assertIn(429, [response.status_code for response in responses])
+        logger.debug("-test_login_forwarded_for_ignored()")
+        print()
+
+    def test_rest_blueprints_limited(self):
+        logger.debug("+test_rest_blueprints_limited()")
+        limiter = self.app.extensions["rateLimiter"]
+        logger.debug(f"limiter={limiter}")
+        for name in ("v1_users", "roles", "permissions", "companies", "contacts", "posts"):
+            self.assertIn(name, limiter.defaults)
+        self.assertIsInstance(limiter.store, MemoryRateLimitStore)
+        logger.debug("-test_rest_blueprints_limited()")
+        print()
+
+
+
+# Starting point
+if __name__ == 'unittest':
+    unittest.main(exit=False)
@@ -0,0 +1,129 @@
+#
+# Author: Rohtash Lakra
+#
+import logging
+import time
+import unittest
+
+from common.config import AppConfig, Config, loadAppConfigs
+from framework.startup import StartupProfiler, checkImportBudget, measureImportTimes, parseImportTimes
+from tests import app
+from tests.base import AbstractTestCase
+from webapp import WebApp
+
+logger = logging.getLogger(__name__)
+
+# the import of the app's factory, generous for the slower CI hosts
+IMPORT_BUDGET_MILLIS = 3000
+
+
+class StartupTest(AbstractTestCase):
+    """Unit-tests for the app's startup"""
+
+    def test_profiler(self):
+        logger.debug("+test_profiler()")
+        profiler = StartupProfiler()
+        with profiler.phase("config"):
+            time.sleep(0.01)
+        with profiler.phase("db"):
+            pass
+        with profiler.phase("config"):
+            time.sleep(0.01)
+
+        logger.debug(f"profiler={profiler}")
+        self.assertEqual(["config", "db"], list(profiler.phases))
+        self.assertGreaterEqual(profiler.phases["config"], 20)
+        self.assertAlmostEqual(profiler.total(), sum(profiler.phases.values()))
+        self.assertIn("config=", profiler.summary())
+        # the test app's phases
+        self.assertIn("db", app.extensions["startup"].phases)
+        self.assertIn("blueprints.rest", app.extensions["startup"].phases)
+        logger.debug("-test_profiler()")
+        print()
+
+    def test_parse_import_times(self):
+        logger.debug("+test_parse_import_times()")
+        text = "\n".join(["import time: self [us] | cumulative | imported package",
+                          "import time:       120 |        120 |     framework.enums",
+                          "import time:       310 |      12054 |   flask",
+                          "Traceback (most recent call last):",
+                          "import time:       618 |      55647 | webapp"])
+        importTimes = parseImportTimes(text)
+        logger.debug(f"importTimes={importTimes}")
+        self.assertEqual(["framework.enums", "flask", "webapp"], [importTime.module for importTime in importTimes])
+        self.assertEqual((618, 55647, 0), importTimes[-1][1:])
+        self.assertEqual(2, importTimes[0].depth)
+        logger.debug("-test_parse_import_times()")
+        print()
+
+    def test_import_budget(self):
+        """The app's factory imports within the budget and without the route modules"""
+        logger.debug("+test_import_budget()")
+        withinBudget, millis, slowest = checkImportBudget("webapp", IMPORT_BUDGET_MILLIS)
+        logger.info(f"Imported 'webapp' in {millis:.1f} ms, slowest={slowest[:3]}")
+        self.assertTrue(withinBudget, f"The import of 'webapp' took {millis:.1f} ms!")
+        self.assertGreater(millis, 0)
+        modules = {importTime.module for importTime in measureImportTimes("webapp")}
+        self.assertIn("framework.startup", modules)
+        self.assertFalse({"rest", "api", "webapp.routes"} & modules)
+        logger.debug("-test_import_budget()")
+        print()
+
+    def test_lazy_blueprints(self):
+        logger.debug("+test_lazy_blueprints()")
+
+        class WebAppConfig(Config):
+            BLUEPRINTS = "webapp"
+
+        webApp = WebApp()
+        webAppOnly = webApp.create_app(config_class=WebAppConfig, test_mode=True)
+        logger.debug(f"startup={webApp.startup}")
+        rules = {rule.rule for rule in webAppOnly.url_map.iter_rules()}
+        self.assertIn("/health-check/", rules)
+        self.assertFalse([rule for rule in rules if rule.startswith("/rest/") or rule.startswith("/api/")])
+        self.assertNotIn("blueprints.rest", webApp.startup.phases)
+
+        class UnknownConfig(Config):
+            BLUEPRINTS = "rest,admin"
+
+        with self.assertRaises(ValueError):
+            WebApp().create_app(config_class=UnknownConfig, test_mode=True)
+
+        # the global connector and limiter on a full app again
+        WebApp().create_app(test_mode=True)
+        logger.debug("-test_lazy_blueprints()")
+        print()
+
+    def test_init_db_command(self):
+        logger.debug("+test_init_db_command()")
+        result = app.test_cli_runner().invoke(args=["init-db"])
+        logger.debug(f"output={result.output}")
+        self.assertEqual(0, result.exit_code, result.output)
+        self.assertIn("Database is successfully initialized.", result.output)
+        self.assertFalse(Config.DB_ECHO)
+        logger.debug("-test_init_db_command()")
+        print()
+
+    def test_app_config(self):
+        logger.debug("+test_app_config()")
+        encKey = AppConfig("SECURITY_CONFIGS", "ENCRYPTION_CONFIGS", "ENC_KEY")
+
+        class LazyConfig(object):
+            ENC_KEY = encKey
+            MISSING = AppConfig("SECURITY_CONFIGS", "ENC_KEY", "MISSING")
+
+        loadAppConfigs.cache_clear()
+        self.assertEqual(0, loadAppConfigs.cache_info().currsize)
+        self.assertEqual(32, len(LazyConfig.ENC_KEY))
+        self.assertIsNone(LazyConfig.MISSING)
+        # the file is read once
+        self.assertEqual(1, loadAppConfigs.cache_info().misses)
+        self.assertEqual(LazyConfig.ENC_KEY, LazyConfig.ENC_KEY)
+        self.assertEqual(1, loadAppConfigs.cache_info().misses)
+        logger.debug("-test_app_config()")
+        print()
+
+
+# Starting point
+if __name__ == 'unittest':
+    unittest.main(exit=False)
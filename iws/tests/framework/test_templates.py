@@ -0,0 +1,104 @@
+#
+# Author: Rohtash Lakra
+#
+import logging
+import os
+import tempfile
+import unittest
+from datetime import datetime, timezone
+
+from flask import Flask, render_template, render_template_string
+
+from framework.metrics import Metrics
+from framework.templates import Templates, formatDateTime, formatTimestamp
+from tests.base import AbstractTestCase
+
+logger = logging.getLogger(__name__)
+
+
+class TemplatesTest(AbstractTestCase):
+    """Unit-tests for Templates"""
+
+    def setUp(self):
+        logger.debug("+setUp()")
+        self.directory = tempfile.TemporaryDirectory()
+        self.testApp = Flask(__name__, template_folder=os.path.join(os.path.dirname(__file__), "../../webapp/templates"))
+        self.metrics = Metrics()
+        self.templates = Templates().init_app(self.testApp, cacheDir=self.directory.name, autoReload=False,
+                                              metrics=self.metrics)
+        logger.debug("-setUp()")
+
+    def tearDown(self):
+        logger.debug("+tearDown()")
+        self.directory.cleanup()
+        logger.debug("-tearDown()")
+
+    def test_format_date_time(self):
+        logger.debug("+test_format_date_time()")
+        self.assertEqual("Oct 13, 2024 at 12:20AM", formatDateTime("2024-10-13T00:20:27.466337"))
+        self.assertEqual("2024-10-13", formatDateTime("2024-10-13T00:20:27.466337", "%Y-%m-%d"))
+        # the datetimes are formatted directly, without their zone
+        self.assertEqual("13/10/2024 00:20", formatDateTime(datetime(2024, 10, 13, 0, 20, tzinfo=timezone.utc),
+                                                            "%d/%m/%Y %H:%M"))
+        self.assertEqual("", formatDateTime(None))
+        with self.assertRaises(ValueError):
+            formatDateTime("yesterday")
+
+        # the timestamps are memoised
+        formatTimestamp.cache_clear()
+        for _ in range(3):
+            formatDateTime("2024-10-23T00:40:21.466337")
+        self.assertEqual((2, 1), (formatTimestamp.cache_info().hits, formatTimestamp.cache_info().misses))
+        with self.testApp.app_context():
+            self.assertEqual("Oct 23, 2024", render_template_string("{{ posted_on|strftime('%b %d, %Y') }}",
+                                                                    posted_on="2024-10-23T00:40:21.466337"))
+        logger.debug("-test_format_date_time()")
+        print()
+
+    def test_precompile(self):
+        logger.debug("+test_precompile()")
+        self.assertFalse(self.testApp.jinja_env.auto_reload)
+        compiled = self.templates.precompile()
+        cached = os.listdir(self.directory.name)
+        logger.debug(f"compiled={compiled}, cached={len(cached)}")
+        self.assertGreater(compiled, 10)
+        self.assertEqual(compiled, len(cached))
+
+        # a new worker loads the templates from the bytecode cache
+        worker = Flask(__name__, template_folder=self.testApp.template_folder)
+        Templates().init_app(worker, cacheDir=self.directory.name)
+        compiles = []
+        compile = worker.jinja_env.compile
+        worker.jinja_env.compile = lambda *args, **kwargs: compiles.append(args) or compile(*args, **kwargs)
+        worker.jinja_env.get_template("blog/index.html")
+        self.assertEqual([], compiles)
+
+        result = self.testApp.test_cli_runner().invoke(args=["compile-templates"])
+        self.assertIn(f"Compiled {compiled} templates", result.output)
+        logger.debug("-test_precompile()")
+        print()
+
+    def test_render_duration(self):
+        logger.debug("+test_render_duration()")
+        templateDir = os.path.join(self.directory.name, "templates")
+        os.makedirs(templateDir)
+        with open(os.path.join(templateDir, "post.html"), "w") as file:
+            file.write("Posted on {{ posted_on|strftime }}")
+
+        testApp = Flask(__name__, template_folder=templateDir)
+        self.templates.init_app(testApp)
+
+        @testApp.get("/post")
+        def post():
+            return render_template("post.html", posted_on=datetime(2024, 10, 13, 0, 20))
+
+        response = testApp.test_client().get("/post")
+        self.assertEqual((200, b"Posted on Oct 13, 2024 at 12:20AM"), (response.status_code, response.data))
+        self.assertIn('template_render_duration_seconds_count{template="post.html"} 1', self.metrics.render())
+        logger.debug("-test_render_duration()")
+        print()
+
+
+# Starting point
+if __name__ == 'unittest':
+    unittest.main(exit=False)
@@ -0,0 +1,126 @@
+#
+# Author: Rohtash Lakra
+#
+import logging
+import os
+import runpy
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from framework.tuning import (
+    PoolProfile,
+    WorkerMode,
+    availableMemory,
+    cpuCount,
+    planWorkers,
+    resolveWorkerMode
+)
+from tests.base import AbstractTestCase
+
+logger = logging.getLogger(__name__)
+
+GB = 1024 * 1024 * 1024
+
+
+class TuningTest(AbstractTestCase):
+    """Unit-tests for the workers' auto-tuning"""
+
+    def test_plan_gthread(self):
+        logger.debug("+test_plan_gthread()")
+        plan = planWorkers(4, 16 * GB)
+        logger.debug(f"plan={plan}")
+        self.assertEqual(("cpu", 9, 4), (plan.limitedBy, plan.workers, plan.threads))
+        # a connection per thread
+        self.assertEqual((4, 2), (plan.dbPoolSize, plan.dbMaxOverflow))
+        self.assertEqual("gthread", plan.workerClass())
+        self.assertEqual((1000, 100), (plan.maxRequests, plan.maxRequestsJitter))
+
+        # the memory of 4 workers
+        plan = planWorkers(4, GB, workerMemoryBytes=200 * 1024 * 1024)
+        self.assertEqual(("memory", 4), (plan.limitedBy, plan.workers))
+        # the DB's connections
+        plan = planWorkers(16, 64 * GB, profile=PoolProfile.IO_BOUND, dbMaxConnections=50)
+        self.assertEqual(("db", 5, 8), (plan.limitedBy, plan.workers, plan.threads))
+        self.assertLessEqual(plan.dbConnections(), 50)
+        # never less than a worker
+        self.assertEqual(1, planWorkers(1, 64 * 1024 * 1024).workers)
+        # the unknown memory does not cap the workers
+        self.assertEqual(3, planWorkers(1, None).workers)
+        logger.debug("-test_plan_gthread()")
+        print()
+
+    def test_plan_async(self):
+        logger.debug("+test_plan_async()")
+        plan = planWorkers(4, 16 * GB, mode=WorkerMode.GEVENT, profile=PoolProfile.IO_BOUND, dbMaxConnections=200,
+                           maxRequests=0)
+        logger.debug(f"plan={plan.to_json()}")
+        self.assertEqual((4, 1, 1000), (plan.workers, plan.threads, plan.workerConnections))
+        self.assertEqual((16, 16), (plan.dbPoolSize, plan.dbMaxOverflow))
+        self.assertEqual((0, 0), (plan.maxRequests, plan.maxRequestsJitter))
+        self.assertEqual("gevent", plan.to_json()["workerClass"])
+        logger.debug("-test_plan_async()")
+        print()
+
+    def test_resolve_worker_mode(self):
+        logger.debug("+test_resolve_worker_mode()")
+        self.assertEqual(WorkerMode.GTHREAD, resolveWorkerMode(None))
+        self.assertEqual(WorkerMode.GTHREAD, resolveWorkerMode("GTHREAD"))
+        with patch("importlib.util.find_spec", return_value=None):
+            self.assertEqual(WorkerMode.GTHREAD, resolveWorkerMode("gevent"))
+        with patch("importlib.util.find_spec", return_value=object()):
+            self.assertEqual(WorkerMode.EVENTLET, resolveWorkerMode("eventlet", dbDriver="psycopg"))
+            # the 'sqlite3' queries would block the event-loop
+            self.assertEqual(WorkerMode.GTHREAD, resolveWorkerMode("eventlet"))
+            self.assertFalse(WorkerMode.GEVENT.isSupported("sqlite3"))
+            self.assertTrue(WorkerMode.GTHREAD.isSupported("sqlite3"))
+        with self.assertRaises(ValueError):
+            resolveWorkerMode("uvicorn")
+        with self.assertRaises(ValueError):
+            resolveWorkerMode("tornado")
+        logger.debug("-test_resolve_worker_mode()")
+        print()
+
+    def test_cgroup_limits(self):
+        logger.debug("+test_cgroup_limits()")
+        with tempfile.TemporaryDirectory() as cgroupRoot:
+            meminfoPath = os.path.join(cgroupRoot, "meminfo")
+            with open(meminfoPath, "w") as file:
+                file.write("MemTotal:       16384000 kB\nMemAvailable:    8192000 kB\n")
+
+            self.assertEqual(8192000 * 1024, availableMemory(cgroupRoot, meminfoPath))
+            self.assertEqual(cpuCount(cgroupRoot), len(os.sched_getaffinity(0)))
+
+            # the container's limits
+            for name, text in (("memory.max", str(GB)), ("memory.current", str(GB // 4)), ("cpu.max", "50000 100000")):
+                with open(os.path.join(cgroupRoot, name), "w") as file:
+                    file.write(text)
+
+            self.assertEqual(GB - GB // 4, availableMemory(cgroupRoot, meminfoPath))
+            self.assertEqual(1, cpuCount(cgroupRoot))
+            self.assertIsNone(availableMemory(os.path.join(cgroupRoot, "missing"), meminfoPath + ".missing"))
+        logger.debug("-test_cgroup_limits()")
+        print()
+
+    def test_gunicorn_config(self):
+        logger.debug("+test_gunicorn_config()")
+        with patch.dict(os.environ, {"HOST": "10.0.0.1", "WORKER_MODE": "gevent", "MAX_REQUESTS": "500"}):
+            os.environ.pop("WORKERS", None)
+            os.environ.pop("DB_POOL_SIZE", None)
+            settings = runpy.run_path("gunicorn.conf.py")
+            logger.debug(f"plan={settings['plan']}")
+            # the gevent workers would block on SQLite
+            self.assertEqual("gthread", settings["worker_class"])
+            self.assertEqual("wsgi:app", settings["wsgi_app"])
+            self.assertEqual(settings["plan"].workers, settings["workers"])
+            self.assertEqual((500, 50), (settings["max_requests"], settings["max_requests_jitter"]))
+            self.assertEqual(str(settings["plan"].dbPoolSize), os.environ["DB_POOL_SIZE"])
+            self.assertTrue(settings["preload_app"])
+            self.assertEqual("info", settings["loglevel"])
+        logger.debug("-test_gunicorn_config()")
+        print()
+
+
+# Starting point
+if __name__ == 'unittest':
+    unittest.main(exit=False)
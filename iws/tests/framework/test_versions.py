@@ -0,0 +1,174 @@
+#
+# Author: Rohtash Lakra
+#
+import logging
+import os
+import tempfile
+import unittest
+
+from flask import Flask
+from sqlalchemy import create_engine, delete, text
+from sqlalchemy.orm import Session
+
+from framework.db.router import EngineRouter
+from framework.orm.sqlalchemy.schema import BaseSchema
+from framework.versions import TableVersions
+from rest.role.schema import RoleSchema
+from tests import app
+from tests.base import AbstractTestCase
+
+logger = logging.getLogger(__name__)
+
+
+class TableVersionsTest(AbstractTestCase):
+    """Unit-tests for TableVersions"""
+
+    def setUp(self):
+        logger.debug("+setUp()")
+        self.engine = create_engine("sqlite://")
+        BaseSchema.metadata.create_all(self.engine)
+        self.versions = TableVersions().attach(self.engine)
+        logger.debug("-setUp()")
+
+    def tearDown(self):
+        logger.debug("+tearDown()")
+        self.versions.detach()
+        self.engine.dispose()
+        EngineRouter.resetPin()
+        logger.debug("-tearDown()")
+
+    def getVersion(self, name: str) -> int:
+        return self.versions.getVersions([name])[name][0]
+
+    def test_bump(self):
+        logger.debug("+test_bump()")
+        self.assertEqual(0, self.getVersion("roles"))
+        with Session(self.engine) as session:
+            session.add_all([RoleSchema(name="Admin", active=True), RoleSchema(name="Member", active=True)])
+            session.commit()
+        self.assertEqual(1, self.getVersion("roles"))
+
+        # a rolled back change does not bump
+        with Session(self.engine) as session:
+            session.add(RoleSchema(name="Viewer", active=True))
+            session.flush()
+            session.rollback()
+        self.assertEqual(1, self.getVersion("roles"))
+
+        # the bulk statements bump too
+        with Session(self.engine) as session:
+            session.execute(delete(RoleSchema).where(RoleSchema.name == "Member"))
+            session.commit()
+        self.assertEqual(2, self.getVersion("roles"))
+        self.assertEqual(0, self.getVersion("permissions"))
+        logger.debug("-test_bump()")
+        print()
+
+    def test_conditional(self):
+        logger.debug("+test_conditional()")
+        testApp = Flask(__name__)
+        calls = []
+
+        @testApp.get("/roles")
+        @self.versions.conditional("roles")
+        def roles():
+            # a read-only request is not pinned to the primary
+            self.assertFalse(EngineRouter.isPinned())
+            calls.append(1)
+            return {"data": []}
+
+        client = testApp.test_client()
+        response = client.get("/roles")
+        etag, weak = response.get_etag()
+        logger.debug(f"etag={etag}, headers={response.headers}")
+        self.assertEqual((200, True), (response.status_code, weak))
+        self.assertTrue(response.cache_control.no_cache)
+
+        # the route is not called for the client's current representation
+        response = client.get("/roles", headers={"If-None-Match": f'W/"{etag}"'})
+        self.assertEqual((304, b""), (response.status_code, response.data))
+        self.assertEqual(etag, response.get_etag()[0])
+        self.assertEqual(1, len(calls))
+        # the query is part of the tag
+        self.assertEqual(200, client.get("/roles?active=true", headers={"If-None-Match": f'W/"{etag}"'}).status_code)
+
+        with Session(self.engine) as session:
+            session.add(RoleSchema(name="Admin", active=True))
+            session.commit()
+        response = client.get("/roles", headers={"If-None-Match": f'W/"{etag}"'})
+        self.assertEqual(200, response.status_code)
+        self.assertNotEqual(etag, response.get_etag()[0])
+        # the time of a bump within the last second is not sent
+        self.assertIsNone(response.last_modified)
+
+        with self.engine.begin() as connection:
+            connection.execute(text("UPDATE table_versions SET updated_at = updated_at - 60"))
+        response = client.get("/roles")
+        self.assertIsNotNone(response.last_modified)
+        response = client.get("/roles", headers={"If-Modified-Since": response.headers["Last-Modified"]})
+        self.assertEqual(304, response.status_code)
+        logger.debug("-test_conditional()")
+        print()
+
+    def test_replica_versions(self):
+        logger.debug("+test_replica_versions()")
+        with tempfile.TemporaryDirectory() as tempDir:
+            primary = create_engine(f"sqlite:///{os.path.join(tempDir, 'primary.db')}")
+            replicas = [create_engine(f"sqlite:///{os.path.join(tempDir, f'replica{index}.db')}") for index in range(2)]
+            for engine in [primary, *replicas]:
+                BaseSchema.metadata.create_all(engine)
+
+            router = EngineRouter(primary, replicas)
+            self.versions.detach()
+            self.versions = TableVersions().attach(primary, router)
+            testApp = Flask(__name__)
+            testApp.teardown_request(EngineRouter.resetPin)
+            engines = []
+
+            @testApp.get("/roles")
+            @self.versions.conditional("roles")
+            def roles():
+                # the rows are read on the replica of the versions
+                engines.append([router.readEngine() for _ in range(3)])
+                return {"data": []}
+
+            client = testApp.test_client()
+            etag = client.get("/roles").get_etag()[0]
+            self.assertEqual(1, len(set(engines[-1])))
+            self.assertIn(engines[-1][0], replicas)
+
+            # the replicas don't have the primary's write yet, their rows and versions are tagged alike
+            with Session(primary) as session:
+                session.add(RoleSchema(name="Admin", active=True))
+                session.commit()
+            EngineRouter.resetPin()
+            self.assertEqual(1, self.versions.getVersions(["roles"], primary)["roles"][0])
+            self.assertEqual(304, client.get("/roles", headers={"If-None-Match": f'W/"{etag}"'}).status_code)
+
+            router.syncReplicas()
+            response = client.get("/roles", headers={"If-None-Match": f'W/"{etag}"'})
+            self.assertEqual(200, response.status_code)
+            self.assertIn(engines[-1][0], replicas)
+            self.assertNotEqual(etag, response.get_etag()[0])
+            for engine in [primary, *replicas]:
+                engine.dispose()
+
+        logger.debug("-test_replica_versions()")
+        print()
+
+    def test_routes(self):
+        logger.debug("+test_routes()")
+        client = app.test_client()
+        response = client.get("/rest/v1/roles/")
+        self.assertEqual(200, response.status_code)
+        etag, weak = response.get_etag()
+        self.assertTrue(weak)
+        response = client.get("/rest/v1/roles/", headers={"If-None-Match": f'W/"{etag}"'})
+        self.assertEqual(304, response.status_code)
+        logger.debug("-test_routes()")
+        print()
+
+
+# Starting point
+if __name__ == 'unittest':
+    unittest.main(exit=False)
@@ -0,0 +1,3 @@
+#
+# Author: Rohtash Lakra
+#
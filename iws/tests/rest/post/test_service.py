@@ -0,0 +1,211 @@
+#
+# Author: Rohtash Lakra
+#
+import logging
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine, text
+
+from framework.db.seed import DatasetGenerator, SeedOptions
+from framework.exception import BadRequestException
+from framework.orm.sqlalchemy.schema import BaseSchema
+from rest.post.model import Comment
+from rest.post.repository import CommentRepository, PostRepository
+from rest.post.service import CommentService, PostService, decodeCursor, encodeCursor
+from tests.base import AbstractTestCase
+
+logger = logging.getLogger(__name__)
+
+
+class PostServiceTest(AbstractTestCase):
+    """Unit-tests for PostService"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.engine = create_engine(f"sqlite:///{os.path.join(cls.directory.name, 'posts.db')}")
+        BaseSchema.metadata.create_all(cls.engine)
+        DatasetGenerator(cls.engine, SeedOptions(users=400, companies=0)).generate()
+        # the posts of the same time, the defaulted ones don't have microseconds
+        with cls.engine.begin() as connection:
+            connection.execute(text("UPDATE posts SET posted_on = '2024-06-01 12:00:00' WHERE id BETWEEN 50 AND 54"))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.engine.dispose()
+        cls.directory.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        logger.debug("+setUp()")
+        self.postService = PostService(PostRepository(self.engine))
+        self.commentService = self.postService.commentService
+        logger.debug("-setUp()")
+
+    def test_cursor(self):
+        logger.debug("+test_cursor()")
+        cursor = encodeCursor("2024-06-01 12:00:00", 54)
+        self.assertNotIn("=", cursor)
+        self.assertEqual(("2024-06-01 12:00:00", 54), decodeCursor(cursor))
+        for cursor in ("not-a-cursor", encodeCursor("2024-06-01", "id")):
+            with self.assertRaises(BadRequestException):
+                decodeCursor(cursor)
+        logger.debug("-test_cursor()")
+        print()
+
+    def test_feed(self):
+        logger.debug("+test_feed()")
+        pages, ids, cursor = 0, [], None
+        while True:
+            posts, cursor = self.postService.feed(cursor, 30)
+            pages += 1
+            ids.extend(post.id for post in posts)
+            if cursor is None:
+                break
+
+        # every post once, the newest first and the ties by their ids
+        self.assertEqual((7, 200), (pages, len(ids)))
+        with self.engine.connect() as connection:
+            expected = connection.execute(text("SELECT id FROM posts ORDER BY posted_on DESC, id DESC")).scalars()
+            self.assertEqual(list(expected), ids)
+
+        posts, cursor = self.postService.feed(limit="5")
+        self.assertEqual(5, len(posts))
+        self.assertEqual("Post", posts[0].getClassName())
+        for limit in (0, 101, "many"):
+            with self.assertRaises(BadRequestException):
+                self.postService.feed(limit=limit)
+        logger.debug("-test_feed()")
+        print()
+
+    def test_feed_plan(self):
+        logger.debug("+test_feed_plan()")
+        with self.engine.connect() as connection:
+            plan = connection.exec_driver_sql(
+                "EXPLAIN QUERY PLAN SELECT id FROM posts WHERE (posted_on, id) < ('2024-06-01 12:00:00', 54) "
+                "ORDER BY posted_on DESC, id DESC LIMIT 21").fetchall()
+        logger.debug(f"plan={plan}")
+        self.assertIn("ix_posts_posted_on_id", str(plan))
+        self.assertNotIn("TEMP B-TREE", str(plan))
+        logger.debug("-test_feed_plan()")
+        print()
+
+    def test_feed_comments(self):
+        logger.debug("+test_feed_comments()")
+        posts, _ = self.postService.feed(limit=100, comments=2)
+        with self.engine.connect() as connection:
+            for post in posts:
+                expected = connection.execute(text("SELECT id FROM comments WHERE post_id = :id "
+                                                   "ORDER BY created_at DESC, id DESC"), {"id": post.id}).scalars()
+                expected = list(expected)
+                # the counters match the comments, and the preview is their newest two
+                self.assertEqual(len(expected), post.comment_count)
+                self.assertEqual(expected[:2], [comment.id for comment in post.comments])
+                if expected:
+                    self.assertEqual(post.comments[0].created_at, post.last_comment_at)
+
+        self.assertTrue(any(post.comment_count > 2 for post in posts))
+        self.assertIsNone(self.postService.feed(limit=1)[0][0].comments)
+        for comments in (-1, 11, "all"):
+            with self.assertRaises(BadRequestException):
+                self.postService.feed(comments=comments)
+        logger.debug("-test_feed_comments()")
+        print()
+
+    def test_latest_plan(self):
+        logger.debug("+test_latest_plan()")
+        statement = CommentRepository(self.engine).latestStatement(3).params(postIds=[1, 2, 3])
+        sql = str(statement.compile(self.engine, compile_kwargs={"literal_binds": True}))
+        with self.engine.connect() as connection:
+            plan = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+        logger.debug(f"plan={plan}")
+        # a range of the index per post, not a scan of all the posts' comments
+        self.assertIn("ix_comments_post_id_created_at_id", str(plan))
+        self.assertNotIn("SCAN", str(plan))
+        logger.debug("-test_latest_plan()")
+        print()
+
+    def test_comment_pages(self):
+        logger.debug("+test_comment_pages()")
+        with self.engine.connect() as connection:
+            postId, count = connection.execute(text("SELECT id, comment_count FROM posts "
+                                                    "ORDER BY comment_count DESC LIMIT 1")).one()
+            expected = connection.execute(text("SELECT id FROM comments WHERE post_id = :id "
+                                               "ORDER BY created_at DESC, id DESC"), {"id": postId}).scalars().all()
+
+        pages, ids, cursor = 0, [], None
+        while True:
+            comments, cursor = self.commentService.page(postId, cursor, 2)
+            pages += 1
+            ids.extend(comment.id for comment in comments)
+            if cursor is None:
+                break
+
+        # every comment once, the newest first
+        self.assertEqual(((count + 1) // 2, expected), (pages, ids))
+        self.assertEqual(([], None), self.commentService.page(10_000))
+
+        # a new comment is counted in the transaction inserting it
+        comment = self.commentService.create(Comment(post_id=postId, user_id=1, content="The newest comment."))
+        comments, _ = self.commentService.page(postId, limit=1)
+        self.assertEqual([comment.id], [comment.id for comment in comments])
+        posts = self.postService.findByFilter({"id": postId})
+        self.assertEqual([(count + 1, comment.created_at)], [(post.comment_count, post.last_comment_at)
+                                                             for post in posts])
+        with self.engine.begin() as connection:
+            connection.execute(text("DELETE FROM comments WHERE id = :id"), {"id": comment.id})
+        logger.debug("-test_comment_pages()")
+        print()
+
+    def test_search(self):
+        logger.debug("+test_search()")
+        posts, nextOffset = self.postService.search("python", limit=10)
+        self.assertEqual((10, 10), (len(posts), nextOffset))
+        self.assertEqual(sorted(post.rank for post in posts), [post.rank for post in posts])
+        self.assertIn("<mark>", posts[0].snippet)
+
+        # the next page continues the ranking
+        nextPosts, _ = self.postService.search("python", limit=10, offset=nextOffset)
+        self.assertLessEqual(posts[-1].rank, nextPosts[0].rank)
+        self.assertFalse({post.id for post in posts} & {post.id for post in nextPosts})
+
+        newest, _ = self.postService.search("python pyth*", order="newest", limit=5)
+        self.assertEqual(sorted([post.id for post in newest], reverse=True), [post.id for post in newest])
+        self.assertEqual(([], None), self.postService.search("xylophone"))
+        for query, order, offset in ((" ", None, None), ("python", "oldest", None), ("python", None, "-1"),
+                                     ("python", None, "5000")):
+            with self.assertRaises(BadRequestException):
+                self.postService.search(query, order, offset=offset)
+        logger.debug("-test_search()")
+        print()
+
+    def test_routes(self):
+        logger.debug("+test_routes()")
+        response = self.client.get("/rest/v1/posts/?limit=1")
+        self.assertEqual(200, response.status_code)
+        self.assertIn("next", response.json)
+        self.assertEqual(400, self.client.get("/rest/v1/posts/?cursor=not-a-cursor").status_code)
+
+        response = self.client.get("/rest/v1/posts/search?q=flask&order=newest")
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(400, self.client.get("/rest/v1/posts/search?q=").status_code)
+
+        response = self.client.get("/rest/v1/posts/1/comments?limit=5")
+        self.assertEqual(200, response.status_code)
+        self.assertIn("next", response.json)
+        self.assertEqual(400, self.client.get("/rest/v1/posts/1/comments?cursor=not-a-cursor").status_code)
+        self.assertEqual(404, self.client.post("/rest/v1/posts/0/comments",
+                                               json={"user_id": 1, "content": "Nice!"}).status_code)
+
+        self.assertEqual(200, self.client.get("/api/v1/posts/").status_code)
+        self.assertEqual(200, self.client.get("/api/v1/blogs/?limit=2").status_code)
+        logger.debug("-test_routes()")
+        print()
+
+
+# Starting point
+if __name__ == 'unittest':
+    unittest.main(exit=False)
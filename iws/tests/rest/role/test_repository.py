@@ -230,6 +230,22 @@ class RoleRepositoryTest(AbstractTestCase):
         logger.debug("-test_assign_permission()")
         print()
 
+    def test_bulk_delete_queries(self):
+        logger.debug("+test_bulk_delete_queries()")
+        names = [f"Bulk-{nowMillis()}-{index}" for index in range(5)]
+        self.roleRepository.save_all([RoleSchema(name=name, active=True) for name in names])
+        ids = [role.id for role in self.roleRepository.filter({"name": names})]
+        self.assertEqual(5, len(ids))
+        # a select of the roles, a delete of all the rows (an 'executemany'), not a statement per role, and the bump of
+        # the table's version
+        with self.assertMaxQueries(3) as counter:
+            self.roleRepository.bulkDelete(ids)
+
+        logger.debug(f"shapes={counter.shapes()}")
+        self.assertEqual([], self.roleRepository.filter({"id": ids}))
+        logger.debug("-test_bulk_delete_queries()")
+        print()
+
 
 # Starting point
 if __name__ == 'main':
@@ -1,7 +1,12 @@
+import hashlib
 import logging
+import os
+import tempfile
 import unittest
+from unittest.mock import patch
 
-from framework.exception import ValidationException
+from common.config import Config
+from framework.exception import AuthenticationException, ValidationException
 from framework.http import HTTPStatus
 from framework.orm.sqlalchemy.schema import SchemaOperation
 from framework.security.jwt import TokenTypeEnum
@@ -143,6 +148,19 @@ class UserServiceTest(AbstractTestCase):
         logger.debug("-test_register_user()")
         print()
 
+    def test_register_user_queries(self):
+        logger.debug("+test_register_user_queries()")
+        # exists, save (and refresh) the user, save (and refresh) its security, and the bumps of the tables' versions
+        with self.assertMaxQueries(7) as counter:
+            self.user = self.userService.register(self.user)
+
+        logger.debug(f"statements={counter.count}")
+        self.assertIsNotNone(self.user.id)
+        # a version's bump per transaction (the user's and its security's)
+        self.assertEqual([], [suspect for suspect in counter.suspects(2) if "table_versions" not in suspect[0]])
+        logger.debug("-test_register_user_queries()")
+        print()
+
     def test_login_user(self):
         logger.debug("+test_login_user()")
         logger.debug(f"user={self.user}")
@@ -172,6 +190,165 @@ class UserServiceTest(AbstractTestCase):
         logger.debug("-test_login_user()")
         print()
 
+    def test_login_user_with_jwt(self):
+        logger.debug("+test_login_user_with_jwt()")
+        self.user = self.userService.register(self.user)
+        logger.debug(f"user={self.user}")
+        self.assertIsNotNone(self.user.id)
+
+        # login
+        loginUser = LoginUser(email=self.user.email, password="password", token_type=TokenTypeEnum.JWT.value)
+        with tempfile.TemporaryDirectory() as tempDir, self.jwtConfigs(tempDir):
+            self.assertJwtLogin(loginUser)
+
+        logger.debug("-test_login_user_with_jwt()")
+        print()
+
+    def test_revoke_jwt_tokens(self):
+        logger.debug("+test_revoke_jwt_tokens()")
+        self.user = self.userService.register(self.user)
+        loginUser = LoginUser(email=self.user.email, password="password", token_type=TokenTypeEnum.JWT.value)
+        with tempfile.TemporaryDirectory() as tempDir, self.jwtConfigs(tempDir):
+            authUser = self.userService.login(loginUser)
+            self.assertTrue(self.userService.authenticate(TokenTypeEnum.JWT, authUser.token).authenticated)
+
+            # logout
+            self.assertEqual(2, self.userService.revokeTokens(authUser.token, authUser.refresh_token, None))
+            with self.assertRaises(AuthenticationException):
+                self.userService.authenticate(TokenTypeEnum.JWT, authUser.token)
+            with self.assertRaises(AuthenticationException):
+                self.userService.refreshToken(authUser.refresh_token)
+
+            # the rebuilt filter still has the revoked (not expired) tokens
+            self.assertLessEqual(2, self.userService.rebuildRevocationList())
+            with self.assertRaises(AuthenticationException):
+                self.userService.authenticate(TokenTypeEnum.JWT, authUser.token)
+
+            # a new login is not affected
+            authUser = self.userService.login(loginUser)
+            self.assertTrue(self.userService.authenticate(TokenTypeEnum.JWT, authUser.token).authenticated)
+
+        logger.debug("-test_revoke_jwt_tokens()")
+        print()
+
+    def test_login_user_with_legacy_key(self):
+        logger.debug("+test_login_user_with_legacy_key()")
+        self.user = self.userService.register(self.user)
+        loginUser = LoginUser(email=self.user.email, password="password")
+        # the legacy 'ENC_KEY' alone is the key '1', the active one when 'ENC_KEY_ID' is not set
+        with patch.multiple(Config, ENC_KEYS=None, ENC_KEY="12345678123456781234567812345678", ENC_KEY_ID=None):
+            authUser = self.userService.login(loginUser)
+            userObject = self.userService.authenticate(TokenTypeEnum.AUTH, authUser.token)
+            self.assertEqual(self.user.id, userObject.id)
+
+        logger.debug("-test_login_user_with_legacy_key()")
+        print()
+
+    def test_auth_token_max_age_and_password_change(self):
+        logger.debug("+test_auth_token_max_age_and_password_change()")
+        self.user = self.userService.register(self.user)
+        loginUser = LoginUser(email=self.user.email, password="password")
+        with patch.multiple(Config, ENC_KEYS="1:12345678123456781234567812345678", ENC_KEY_ID=None):
+            token = self.userService.login(loginUser).token
+            self.assertTrue(self.userService.authenticate(TokenTypeEnum.AUTH, token).authenticated)
+            # older than the max age
+            with patch.object(Config, "AUTH_TOKEN_MAX_AGE_SECONDS", -1):
+                with self.assertRaises(AuthenticationException):
+                    self.userService.authenticate(TokenTypeEnum.AUTH, token)
+
+            # a password change rejects the tokens issued before it
+            self.userService.changePassword(self.user.id, "newPassword")
+            with self.assertRaises(AuthenticationException):
+                self.userService.authenticate(TokenTypeEnum.AUTH, token)
+            with self.assertRaises(AuthenticationException):
+                self.userService.login(loginUser)
+
+            newToken = self.userService.login(LoginUser(email=self.user.email, password="newPassword")).token
+            self.assertEqual(self.user.id, self.userService.authenticate(TokenTypeEnum.AUTH, newToken).id)
+
+        logger.debug("-test_auth_token_max_age_and_password_change()")
+        print()
+
+    def test_login_user_with_rotated_keys(self):
+        logger.debug("+test_login_user_with_rotated_keys()")
+        self.user = self.userService.register(self.user)
+        oldKeys = "1:12345678123456781234567812345678"
+        newKeys = f"{oldKeys},2:87654321876543218765432187654321"
+        loginUser = LoginUser(email=self.user.email, password="password")
+        with patch.multiple(Config, ENC_KEYS=oldKeys, ENC_KEY_ID=None):
+            oldToken = self.userService.login(loginUser).token
+
+        with patch.multiple(Config, ENC_KEYS=newKeys, ENC_KEY_ID=None):
+            authUser = self.userService.login(loginUser)
+            logger.debug(f"authUser={authUser}")
+            self.assertEqual(TokenTypeEnum.AUTH.value, authUser.token_type)
+            # the old key's tokens are still accepted after the rotation
+            for token in (oldToken, authUser.token):
+                userObject = self.userService.authenticate(TokenTypeEnum.AUTH, token)
+                self.assertEqual(self.user.id, userObject.id)
+                self.assertTrue(userObject.authenticated)
+
+        with patch.multiple(Config, ENC_KEYS=newKeys.split(",")[1], ENC_KEY_ID=None):
+            with self.assertRaises(AuthenticationException):
+                self.userService.authenticate(TokenTypeEnum.AUTH, oldToken)
+
+        logger.debug("-test_login_user_with_rotated_keys()")
+        print()
+
+    def test_login_rehashes_legacy_password(self):
+        logger.debug("+test_login_rehashes_legacy_password()")
+        self.user = self.userService.register(self.user)
+        userSecuritySchema = self.userService.userSecurityRepository.filter({"user_id": self.user.id})[0]
+        logger.debug(f"userSecuritySchema={userSecuritySchema}")
+        self.assertTrue(userSecuritySchema.hashed_auth_token.startswith("$scrypt$"))
+        self.assertFalse(self.userService.getPasswordHasher().needsRehash(userSecuritySchema.hashed_auth_token))
+
+        # a user registered with the legacy unsalted SHA-256 hash
+        legacyHash = hashlib.sha256(b"password").hexdigest()
+        self.userService.userSecurityRepository.updateHashedAuthToken(self.user.id, legacyHash, userSecuritySchema.salt)
+        loginUser = LoginUser(email=self.user.email, password="password", token_type=TokenTypeEnum.JWT.value)
+        with tempfile.TemporaryDirectory() as tempDir, self.jwtConfigs(tempDir):
+            with self.assertRaises(AuthenticationException):
+                self.userService.login(LoginUser(email=self.user.email, password="wrong"))
+            self.assertTrue(self.userService.login(loginUser).token)
+
+        # upgraded on login
+        userSecuritySchema = self.userService.userSecurityRepository.filter({"user_id": self.user.id})[0]
+        logger.debug(f"userSecuritySchema={userSecuritySchema}")
+        self.assertNotEqual(legacyHash, userSecuritySchema.hashed_auth_token)
+        self.assertFalse(self.userService.getPasswordHasher().needsRehash(userSecuritySchema.hashed_auth_token))
+        self.assertTrue(self.userService.getPasswordHasher().verify("password", userSecuritySchema.hashed_auth_token))
+        logger.debug("-test_login_rehashes_legacy_password()")
+        print()
+
+    def jwtConfigs(self, tempDir: str):
+        """The JWT configs, independent of the env's configs"""
+        return patch.multiple(Config, CLIENT_ID="posts-iws", CLIENT_SECRET="a79387fed978428e9ced80fb1db9125d",
+                              REVOCATION_LIST_PATH=os.path.join(tempDir, "revoked-tokens.bin"))
+
+    def assertJwtLogin(self, loginUser: LoginUser):
+        authUser = self.userService.login(loginUser)
+        logger.debug(f"authUser={authUser}")
+        self.assertEqual(TokenTypeEnum.JWT.value, authUser.token_type)
+        self.assertIsNotNone(authUser.refresh_token)
+        self.assertEqual(authUser.user_id, self.user.id)
+
+        # authenticate in memory
+        userObject = self.userService.authenticate(TokenTypeEnum.JWT, authUser.token)
+        logger.debug(f"userObject={userObject}")
+        self.assertEqual(userObject.id, self.user.id)
+        self.assertTrue(userObject.authenticated)
+
+        # the refresh token is not an access token
+        with self.assertRaises(AuthenticationException):
+            self.userService.authenticate(TokenTypeEnum.JWT, authUser.refresh_token)
+
+        # refresh
+        refreshedUser = self.userService.refreshToken(authUser.refresh_token)
+        logger.debug(f"refreshedUser={refreshedUser}")
+        self.assertEqual(refreshedUser.user_id, self.user.id)
+        self.assertTrue(self.userService.authenticate(TokenTypeEnum.JWT, refreshedUser.token).authenticated)
+
     def test_register_user_with_address(self):
         logger.debug("+test_register_user_with_address()")
         userEmail = super().getTestEmail()
@@ -5,29 +5,37 @@
 import importlib.metadata
 import logging
 import os
-from datetime import datetime
 from pathlib import Path
 from typing import Any
 
 from dotenv import load_dotenv
 from flask import Flask, Blueprint, make_response, request
 from flask_cors import CORS
+from werkzeug.utils import import_string
 # https://flask.palletsprojects.com/en/3.0.x/deploying/proxy_fix/
 from werkzeug.middleware.proxy_fix import ProxyFix
 
-from api import bp as api_bp
 from common.config import Config
+from framework.cache import ResponseCacheStoreType, createResponseCacheStore
 from framework.enums import EnvType
 from framework.enums import KeyEnum
 from framework.http import HTTPStatus
 from framework.logger import DefaultLogger
 from framework.orm.pydantic.model import ResponseModel
-from globals import connector
-from rest import bp as rest_bp
-from webapp.routes import bp as webapp_bp
+from framework.ratelimit import RateLimitAlgorithm, RateLimitStoreType, createRateLimitStore
+from framework.startup import StartupProfiler
+from globals import compressor, connector, limiter, metrics, responseCache, templates, versions
 
 logger = logging.getLogger(__name__)
 
+# the blueprint trees by their names (the 'BLUEPRINTS' config), their route modules are imported by 'create_app()' and
+# only for the trees the app serves, so importing this module (i.e. by the 'flask' CLI) stays cheap
+BLUEPRINTS = {
+    "rest": "rest:bp",
+    "api": "api:bp",
+    "webapp": "webapp.routes:bp",
+}
+
 
 class WebApp:
     """Create WebApp class"""
@@ -43,12 +51,15 @@ class WebApp:
         # logger.debug(f"sys.path={sys.path}")
         self.environment: dict = {}
         self.app: Flask = None
+        self.startup: StartupProfiler = None
 
     def __load_env(self, test_mode: bool = False):
         logger.debug(f"__load_env({test_mode})")
         # with self.app.app_context():
-        flask_version = importlib.metadata.version("flask")
-        logger.debug(f"Running Application [{self.app.name}] on version [{flask_version}] with testMode [{test_mode}]")
+        # reading the package's metadata scans the 'site-packages', only done when it's logged
+        if logger.isEnabledFor(logging.DEBUG):
+            flask_version = importlib.metadata.version("flask")
+            logger.debug(f"Running Application [{self.app.name}] on version [{flask_version}] with testMode [{test_mode}]")
         logger.info(f"ENV_TYPE={EnvType.get_env_type()}")
         # Load the environment variables
         dotEnvFileName = ".env.test" if test_mode or EnvType.is_testing(EnvType.get_env_type()) else ".env"
@@ -92,6 +103,7 @@ class WebApp:
         It encourages you to separate different parts of your application, like routes, configurations, and initializations,
         into different files later on. This encourages a cleaner and more maintainable codebase.
         """
+        self.startup = StartupProfiler()
         # create a new flask application object
         app = Flask(__name__)
         # app = connexion.App(__name__, specification_dir="./")
@@ -104,19 +116,29 @@ class WebApp:
         app.logger = DefaultLogger(app)
         app.logger.logConfig()
 
-        # app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1, x_host=1, x_prefix=1)
-        app.wsgi_app = ProxyFix(app.wsgi_app)
-        # wsgi_app = ProxyFix(app.wsgi_app)
         self.app = app
-        self.__load_env(test_mode=test_mode)
+        with self.startup.phase("env"):
+            self.__load_env(test_mode=test_mode)
+
         # load app's configs
-        app.config.from_object(config_class)
-        if test_mode or EnvType.is_testing(EnvType.get_env_type()):
-            app.config.update({
-                KeyEnum.ENV_TYPE.name: EnvType.TEST.name,
-                "TESTING": True,
-                "DB_NAME": "testPosts.db",
-            })
+        with self.startup.phase("config"):
+            app.config.from_object(config_class)
+            if test_mode or EnvType.is_testing(EnvType.get_env_type()):
+                app.config.update({
+                    KeyEnum.ENV_TYPE.name: EnvType.TEST.name,
+                    "TESTING": True,
+                    "DB_NAME": "testPosts.db",
+                    # the tests' database is created with the app
+                    "DB_CREATE_ALL": True,
+                    # the tests' rate limits are per process, never left in a shared file by the previous run
+                    "RATE_LIMIT_STORE": "memory",
+                })
+
+            # app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1, x_host=1, x_prefix=1)
+            # the forwarded headers are only trusted behind the configured proxies, the limits are per client address
+            proxies = app.config.get("PROXY_FIX_X_FOR", 0)
+            if proxies > 0:
+                app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxies, x_proto=proxies)
 
         # logger.debug(f"app.config={app.config}")
 
@@ -126,8 +148,37 @@ class WebApp:
 
         # Initialize/Register Flask Extensions/Components, if any
         # if not test_mode:
-        connector.init(app)
-        connector.init_db({KeyEnum.DB_TYPE.name: KeyEnum.SQLALCHEMY.name})
+        with self.startup.phase("db"):
+            connector.init(app)
+            connector.init_db({KeyEnum.DB_TYPE.name: KeyEnum.SQLALCHEMY.name})
+            versions.init_app(app, enabled=Config.CONDITIONAL_GET_ENABLED).attach(connector.engine, connector.router)
+
+        with self.startup.phase("metrics"):
+            metrics.init_app(app, directory=Config.METRICS_DIR, flushSeconds=Config.METRICS_FLUSH_SECONDS,
+                             enabled=Config.METRICS_ENABLED)
+            for engine in [connector.engine, *connector.router.replicas]:
+                metrics.instrumentEngine(engine)
+
+        with self.startup.phase("compression"):
+            compressor.init_app(app, minSize=Config.COMPRESSION_MIN_SIZE, gzipLevel=Config.COMPRESSION_GZIP_LEVEL,
+                                brotliQuality=Config.COMPRESSION_BROTLI_QUALITY, metrics=metrics,
+                                enabled=Config.COMPRESSION_ENABLED)
+
+        with self.startup.phase("responseCache"):
+            responseCache.init_app(app,
+                                   store=createResponseCacheStore(
+                                       ResponseCacheStoreType.of_name(Config.RESPONSE_CACHE_STORE),
+                                       path=Config.RESPONSE_CACHE_PATH, maxSize=Config.RESPONSE_CACHE_MAX_SIZE),
+                                   versions=versions, metrics=metrics, compressor=compressor,
+                                   ttl=Config.RESPONSE_CACHE_TTL_SECONDS,
+                                   enabled=Config.RESPONSE_CACHE_ENABLED)
+
+        with self.startup.phase("rateLimiter"):
+            limiter.init_app(app,
+                             store=createRateLimitStore(RateLimitStoreType.of_name(app.config["RATE_LIMIT_STORE"]),
+                                                        path=Config.RATE_LIMIT_PATH),
+                             algorithm=RateLimitAlgorithm.of_name(Config.RATE_LIMIT_ALGORITHM),
+                             enabled=Config.RATE_LIMIT_ENABLED)
 
         # Initialize/Register Default Error Handlers, if any
 
@@ -157,16 +208,10 @@ class WebApp:
                 ResponseModel.jsonResponse(HTTPStatus.INTERNAL_SERVER_ERROR, message=error.description),
                 HTTPStatus.INTERNAL_SERVER_ERROR.statusCode)
 
-        # Register Date & Time Formatter for Jinja Template
-        @app.template_filter('strftime')
-        def _jinja2_filter_datetime(date_str, datetime_format: str = None):
-            """Formats the date_str"""
-            date = datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S.%f")
-            native = date.replace(tzinfo=None)
-            if datetime_format:
-                return native.strftime(datetime_format)
-            else:
-                return native.strftime("%b %d, %Y at %I:%M%p")
+        # Configure the Jinja templates, their bytecode cache and the 'strftime' filter of their dates
+        with self.startup.phase("templates"):
+            templates.init_app(app, cacheDir=Config.TEMPLATES_CACHE_DIR, autoReload=Config.TEMPLATES_AUTO_RELOAD,
+                               metrics=metrics, enabled=Config.TEMPLATES_CACHE_ENABLED)
 
         # Initialize/Register Blueprints, if any
 
@@ -179,14 +224,20 @@ class WebApp:
         """
         # bp = Blueprint("iws", __name__, url_prefix="/posts")
         bp = Blueprint("iws", __name__)
+        # times the requests of all the end-points
+        metrics.instrument(bp)
 
-        # register more app's here.
-        bp.register_blueprint(rest_bp)
-        bp.register_blueprint(api_bp)
-        bp.register_blueprint(webapp_bp)
+        # register more app's here, their route modules are imported now
+        for name in [name.strip() for name in (app.config.get("BLUEPRINTS") or "").split(",") if name.strip()]:
+            if name not in BLUEPRINTS:
+                raise ValueError(f"Unknown blueprint '{name}', expected one of {list(BLUEPRINTS)}!")
+
+            with self.startup.phase(f"blueprints.{name}"):
+                bp.register_blueprint(import_string(BLUEPRINTS[name]))
 
         # Register root blueprint with app that connects an app with other end-points
-        app.register_blueprint(bp)
+        with self.startup.phase("routes"):
+            app.register_blueprint(bp)
 
         # Initialize/Register Request's behavior/db connection
         if not test_mode:
@@ -194,6 +245,9 @@ class WebApp:
             # app.teardown_request(connector.close_connection())
             pass
 
+        app.extensions["startup"] = self.startup
+        logger.info(f"Created the app in {self.startup.summary()}")
+
         # log application context path
         # Running on http://127.0.0.1:5000 (Press CTRL+C to quit)
         logger.debug(